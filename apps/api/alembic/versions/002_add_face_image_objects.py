@@ -0,0 +1,37 @@
+"""Add face_image_objects for content-addressed face crops
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "face_image_objects",
+        sa.Column(
+            "tenant_id",
+            sa.String(64),
+            sa.ForeignKey("tenants.tenant_id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("object_name", sa.String(500), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("face_image_objects")
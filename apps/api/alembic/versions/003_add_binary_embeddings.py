@@ -0,0 +1,30 @@
+"""Add float32 bytea embedding columns to visits and customer_face_images
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 00:00:00.000000
+
+Existing rows keep their JSON embeddings; readers fall back to them while
+the binary column is NULL, so no backfill is needed.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("visits", sa.Column("face_embedding_vec", sa.LargeBinary(), nullable=True))
+    op.add_column(
+        "customer_face_images", sa.Column("embedding_vec", sa.LargeBinary(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("customer_face_images", "embedding_vec")
+    op.drop_column("visits", "face_embedding_vec")
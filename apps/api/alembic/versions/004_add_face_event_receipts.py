@@ -0,0 +1,39 @@
+"""Add face_event_receipts for idempotent face event ingestion
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "face_event_receipts",
+        sa.Column(
+            "tenant_id",
+            sa.String(64),
+            sa.ForeignKey("tenants.tenant_id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("idempotency_key", sa.String(64), primary_key=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_face_event_receipts_created_at", "face_event_receipts", ["created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_face_event_receipts_created_at", table_name="face_event_receipts")
+    op.drop_table("face_event_receipts")
@@ -48,6 +48,11 @@ class Settings:
     )
     database_echo: bool = os.getenv("DATABASE_ECHO", "false").lower() == "true"
 
+    # Face embedding store: "milvus", or "mmap" for the in-process store of
+    # memory-mapped per-tenant files under vector_store_path (no Milvus needed)
+    vector_store_backend: str = os.getenv("VECTOR_STORE_BACKEND", "milvus").lower()
+    vector_store_path: str = os.getenv("VECTOR_STORE_PATH", ".api_data/vectors")
+
     # Milvus Configuration
     milvus_host: str = os.getenv("MILVUS_HOST", "localhost")
     milvus_port: int = int(os.getenv("MILVUS_PORT", "19530"))
@@ -55,6 +60,27 @@ class Settings:
     milvus_user: str | None = os.getenv("MILVUS_USER")
     milvus_password: str | None = os.getenv("MILVUS_PASSWORD")
     milvus_secure: bool = os.getenv("MILVUS_SECURE", "false").lower() == "true"
+    # Threads running blocking pymilvus calls, and how many calls may be in
+    # flight at once (extra callers wait without blocking the event loop)
+    milvus_max_workers: int = int(os.getenv("MILVUS_MAX_WORKERS", "8"))
+    milvus_max_concurrency: int = int(os.getenv("MILVUS_MAX_CONCURRENCY", "8"))
+    milvus_slow_call_ms: float = float(os.getenv("MILVUS_SLOW_CALL_MS", "500"))
+    # Write-behind inserts: batch size/age that triggers a write, seconds
+    # between collection flushes, and unflushed rows that force an early flush
+    milvus_insert_batch_size: int = int(os.getenv("MILVUS_INSERT_BATCH_SIZE", "64"))
+    milvus_insert_max_delay: float = float(os.getenv("MILVUS_INSERT_MAX_DELAY", "0.5"))
+    milvus_flush_interval: float = float(os.getenv("MILVUS_FLUSH_INTERVAL", "30"))
+    milvus_overlay_max_rows: int = int(os.getenv("MILVUS_OVERLAY_MAX_ROWS", "20000"))
+    # Collection layout: tenant_id as partition key so a tenant's searches only
+    # touch its own partitions, and the vector index type (IVF_FLAT, IVF_SQ8 or
+    # HNSW). Index/search params are JSON objects overriding the per-type
+    # defaults; tenant search params map tenant_id -> params.
+    milvus_partition_key: bool = os.getenv("MILVUS_PARTITION_KEY", "true").lower() == "true"
+    milvus_num_partitions: int = int(os.getenv("MILVUS_NUM_PARTITIONS", "64"))
+    milvus_index_type: str = os.getenv("MILVUS_INDEX_TYPE", "IVF_FLAT").upper()
+    milvus_index_params: str = os.getenv("MILVUS_INDEX_PARAMS", "")
+    milvus_search_params: str = os.getenv("MILVUS_SEARCH_PARAMS", "")
+    milvus_tenant_search_params: str = os.getenv("MILVUS_TENANT_SEARCH_PARAMS", "")
 
     # MinIO Configuration
     minio_endpoint: str = os.getenv("MINIO_ENDPOINT", "localhost:9000")
@@ -62,6 +88,12 @@ class Settings:
     minio_secret_key: str = os.getenv("MINIO_SECRET_KEY", "minioadmin")
     minio_bucket_raw: str = os.getenv("MINIO_BUCKET_RAW", "faces-raw")
     minio_bucket_derived: str = os.getenv("MINIO_BUCKET_DERIVED", "faces-derived")
+    # Presigned GET URLs are reused for at most this long, and never past half
+    # of their own expiry (0 disables the cache)
+    presigned_url_cache_size: int = int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "20000"))
+    presigned_url_cache_ttl_secs: float = float(
+        os.getenv("PRESIGNED_URL_CACHE_TTL_SECS", "1200")
+    )
 
     # Other Configuration
     tenant_header: str = os.getenv("TENANT_HEADER", "X-Tenant-ID")
@@ -69,6 +101,25 @@ class Settings:
         os.getenv("FACE_SIMILARITY_THRESHOLD", "0.6")
     )
     max_face_results: int = int(os.getenv("MAX_FACE_RESULTS", "5"))
+    # Upper bound on events accepted by POST /v1/events/face/batch
+    max_event_batch_size: int = int(os.getenv("MAX_EVENT_BATCH_SIZE", "64"))
+    # How long recorded event idempotency keys are kept (face_event_receipts)
+    # so worker replays of a delivered event are not recorded twice, and how
+    # many are also remembered in memory
+    event_idempotency_ttl_secs: float = float(
+        os.getenv("EVENT_IDEMPOTENCY_TTL_SECS", "86400")
+    )
+    event_idempotency_max_keys: int = int(
+        os.getenv("EVENT_IDEMPOTENCY_MAX_KEYS", "100000")
+    )
+    # "sync": POST /v1/events/face runs the pipeline before responding.
+    # "async": the event is written to ingest_queue_dir and acknowledged with
+    # a ticket; sharded consumers process it (a request may pass ?mode=)
+    event_ingest_mode: str = os.getenv("EVENT_INGEST_MODE", "sync").lower()
+    ingest_queue_dir: str = os.getenv("INGEST_QUEUE_DIR", ".api_data/ingest")
+    ingest_shards: int = int(os.getenv("INGEST_SHARDS", "4"))
+    ingest_queue_max_pending: int = int(os.getenv("INGEST_QUEUE_MAX_PENDING", "5000"))
+    ingest_result_ttl_secs: float = float(os.getenv("INGEST_RESULT_TTL_SECS", "3600"))
 
     # Customer face gallery settings
     # Default increased to 12 per requirement (was 4/5 previously)
@@ -92,6 +143,28 @@ class Settings:
     )
     # Stricter minimum detection quality to reduce false positives
     quality_min_score: float = float(os.getenv("QUALITY_MIN_SCORE", "0.7"))
+    # Recently recognized customers matched in memory before searching the
+    # vector store: entries per tenant (0 disables) and seconds an entry lives
+    identity_cache_size: int = int(os.getenv("IDENTITY_CACHE_SIZE", "2000"))
+    identity_cache_ttl_secs: float = float(os.getenv("IDENTITY_CACHE_TTL_SECS", "900"))
+    # Open visits are updated in memory and written to their rows at most
+    # every visit_session_flush_secs (customer last_seen / visit_count too);
+    # requires one API process per tenant
+    visit_session_cache: bool = os.getenv("VISIT_SESSION_CACHE", "true").lower() == "true"
+    visit_session_flush_secs: float = float(os.getenv("VISIT_SESSION_FLUSH_SECS", "5"))
+    # Unrecognized faces are clustered per camera (cosine similarity to a
+    # cluster centroid) until min_cluster_samples make a new customer
+    pending_cluster_similarity: float = float(os.getenv("PENDING_CLUSTER_SIMILARITY", "0.65"))
+    pending_clusters_per_camera: int = int(os.getenv("PENDING_CLUSTERS_PER_CAMERA", "64"))
+    pending_cluster_cameras: int = int(os.getenv("PENDING_CLUSTER_CAMERAS", "256"))
+    # Gallery rankings of recently seen customers kept in memory to accept or
+    # reject new face images without querying the gallery (0 disables)
+    gallery_cache_size: int = int(os.getenv("GALLERY_CACHE_SIZE", "5000"))
+    gallery_cache_ttl_secs: float = float(os.getenv("GALLERY_CACHE_TTL_SECS", "300"))
+    # Blend sharpness/exposure of the pixels into gallery quality scores
+    # (decoded at reduced size in a worker thread, cached by image hash)
+    face_image_metrics: bool = os.getenv("FACE_IMAGE_METRICS", "false").lower() == "true"
+    face_image_metrics_cache_size: int = int(os.getenv("FACE_IMAGE_METRICS_CACHE_SIZE", "4096"))
 
 
 settings = Settings()
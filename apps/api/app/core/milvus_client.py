@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import json
 import logging
 import os
+import time
 import warnings
-from typing import Any, Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
 
 from .config import settings
+from .vector_store import VectorStore
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +42,7 @@ except Exception as e:
 
         def insert(self, data):
             class MockResult:
-                primary_keys = ["mock_id_123"]
+                primary_keys = [f"mock_id_{id(row)}" for row in data]
 
             return MockResult()
 
@@ -83,14 +93,215 @@ except Exception as e:
 
 logger = logging.getLogger(__name__)
 
+# Build and search parameters for the supported index types; MILVUS_INDEX_PARAMS
+# and MILVUS_SEARCH_PARAMS override individual keys
+INDEX_DEFAULTS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "IVF_FLAT": {"build": {"nlist": 1024}, "search": {"nprobe": 16}},
+    "IVF_SQ8": {"build": {"nlist": 1024}, "search": {"nprobe": 16}},
+    "HNSW": {"build": {"M": 16, "efConstruction": 200}, "search": {"ef": 64}},
+}
+
+_DATA_FIELDS = ["tenant_id", "person_id", "person_type", "embedding", "created_at"]
+
+
+def _json_setting(name: str, raw: str) -> Dict[str, Any]:
+    """Parse a JSON object setting, ignoring (and logging) invalid values"""
+    if not raw:
+        return {}
+    try:
+        value = json.loads(raw)
+    except ValueError as e:
+        logger.error(f"Ignoring invalid {name}: {e}")
+        return {}
+    if not isinstance(value, dict):
+        logger.error(f"Ignoring {name}: expected a JSON object")
+        return {}
+    return value
+
+
+class MilvusCallStats:
+    """Per-operation call counts and latency over a recent window"""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.max_ms: Dict[str, float] = {}
+
+    def record(self, op: str, elapsed_ms: float, ok: bool) -> None:
+        self.calls[op] = self.calls.get(op, 0) + 1
+        if not ok:
+            self.errors[op] = self.errors.get(op, 0) + 1
+        self.latencies.setdefault(op, deque(maxlen=self.window)).append(elapsed_ms)
+        self.max_ms[op] = max(self.max_ms.get(op, 0.0), elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for op, samples in self.latencies.items():
+            ordered = sorted(samples)
+            stats[op] = {
+                "calls": self.calls[op],
+                "errors": self.errors.get(op, 0),
+                "p50_ms": round(ordered[len(ordered) // 2], 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                "max_ms": round(self.max_ms[op], 2),
+            }
+        return stats
+
+
+@dataclass
+class _BufferedEmbedding:
+    """An inserted embedding that Milvus has not flushed yet"""
+
+    seq: int
+    row: Dict[str, Any]
+    pk: Optional[str] = None  # set once written to Milvus
+
+
+class _TenantOverlay:
+    """A tenant's unflushed rows, with their L2-normalized vectors kept in
+    one preallocated matrix that grows on insert and is compacted on flush"""
 
-class MilvusClient:
+    def __init__(self):
+        self.entries: List[_BufferedEmbedding] = []
+        self._vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: len(self.entries)]
+
+    def append(self, entry: _BufferedEmbedding, vector: np.ndarray) -> None:
+        count = len(self.entries)
+        if self._vectors is None:
+            self._vectors = np.empty((64, len(vector)), dtype=np.float32)
+        elif count == len(self._vectors):
+            grown = np.empty((2 * count, self._vectors.shape[1]), dtype=np.float32)
+            grown[:count] = self._vectors
+            self._vectors = grown
+        self._vectors[count] = vector
+        self.entries.append(entry)
+
+    def compact(self, keep: Callable[[_BufferedEmbedding], bool]) -> int:
+        """Drop the entries ``keep`` rejects; returns how many were dropped"""
+        kept = [i for i, e in enumerate(self.entries) if keep(e)]
+        dropped = len(self.entries) - len(kept)
+        if dropped:
+            vectors = self._vectors[kept]
+            if len(self._vectors) > 64 and 4 * len(kept) < len(self._vectors):
+                # Give back memory after a burst was flushed
+                self._vectors = np.empty(
+                    (max(64, 2 * len(kept)), self._vectors.shape[1]), dtype=np.float32
+                )
+            self._vectors[: len(kept)] = vectors
+            self.entries = [self.entries[i] for i in kept]
+        return dropped
+
+
+class MilvusClient(VectorStore):
     def __init__(self):
         self.collection_name = settings.milvus_collection
         self.connection_alias = "default"
         self.collection: Optional[Collection] = None
         self.is_connected = False
 
+        # pymilvus is synchronous: every call runs on a dedicated bounded
+        # thread pool so a slow search never blocks the event loop
+        self.max_workers = settings.milvus_max_workers
+        self.max_concurrency = settings.milvus_max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.call_stats = MilvusCallStats()
+
+        # Write-behind inserts: rows are buffered and written in batches, and
+        # collection.flush() runs periodically instead of after every insert.
+        # Until flushed, rows stay in a per-tenant overlay searched in-process.
+        self.insert_batch_size = settings.milvus_insert_batch_size
+        self.insert_max_delay = settings.milvus_insert_max_delay
+        self.flush_interval = settings.milvus_flush_interval
+        self.overlay_max_rows = settings.milvus_overlay_max_rows
+        self._pending: List[_BufferedEmbedding] = []
+        self._pending_since = 0.0
+        self._overlay: Dict[str, _TenantOverlay] = {}
+        self._overlay_rows = 0
+        self._seq = 0
+        self._last_flush = time.monotonic()
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._writer_wakeup: Optional[asyncio.Event] = None
+
+        # Collection layout. tenant_id is a partition key, so Milvus routes a
+        # tenant's rows to one of num_partitions partitions and a search
+        # filtered on tenant_id only scans that partition.
+        self.partition_key = settings.milvus_partition_key
+        self.num_partitions = settings.milvus_num_partitions
+        self.index_type = settings.milvus_index_type
+        if self.index_type not in INDEX_DEFAULTS:
+            logger.error(
+                f"Unsupported MILVUS_INDEX_TYPE {self.index_type}, using IVF_FLAT"
+            )
+            self.index_type = "IVF_FLAT"
+        self.index_params = {
+            **INDEX_DEFAULTS[self.index_type]["build"],
+            **_json_setting("MILVUS_INDEX_PARAMS", settings.milvus_index_params),
+        }
+        self.search_params = _json_setting(
+            "MILVUS_SEARCH_PARAMS", settings.milvus_search_params
+        )
+        self.tenant_search_params = _json_setting(
+            "MILVUS_TENANT_SEARCH_PARAMS", settings.milvus_tenant_search_params
+        )
+        # Index of the collection actually in use; differs from index_type
+        # while an existing collection waits for migrate_collection()
+        self.active_index_type = self.index_type
+        self.migration_needed = False
+
+    async def _call(self, op: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking pymilvus call off the event loop.
+
+        At most ``max_concurrency`` calls are in flight; further callers wait
+        here without holding a thread. Latency is recorded per ``op``.
+        """
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="milvus"
+            )
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = await loop.run_in_executor(
+                    self._executor, functools.partial(fn, *args, **kwargs)
+                )
+                ok = True
+                return result
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.call_stats.record(op, elapsed_ms, ok)
+                if elapsed_ms > settings.milvus_slow_call_ms:
+                    logger.warning(f"Slow Milvus {op}: {elapsed_ms:.0f}ms")
+
+    def get_call_stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "operations": self.call_stats.snapshot(),
+            "write_behind": {
+                "pending_rows": len(self._pending),
+                "unflushed_rows": self._overlay_rows,
+                "seconds_since_flush": round(time.monotonic() - self._last_flush, 1),
+            },
+        }
+
     async def connect(self):
         """Connect to Milvus server"""
         if not MILVUS_AVAILABLE:
@@ -128,7 +339,7 @@ class MilvusClient:
                 connect_params["secure"] = True
                 logger.info("Using secure connection to Milvus")
 
-            connections.connect(**connect_params)
+            await self._call("connect", connections.connect, **connect_params)
             await self._ensure_collection_exists()
             self.is_connected = True
             logger.info(
@@ -136,7 +347,9 @@ class MilvusClient:
             )
         except Exception as e:
             logger.error(
-                f"Failed to connect to Milvus: {e}. Using mock implementation."
+                f"Failed to connect to Milvus: {e}. Using mock implementation; "
+                f"face searches will find no matches. Set VECTOR_STORE_BACKEND=mmap "
+                f"to run recognition without Milvus."
             )
             self.collection = Collection("mock_collection")
             self.is_connected = False
@@ -146,11 +359,18 @@ class MilvusClient:
         if not self.is_connected:
             return
 
+        await self._stop_writer()
+
         try:
             if MILVUS_AVAILABLE:
-                connections.disconnect(alias=self.connection_alias)
+                await self._call(
+                    "disconnect", connections.disconnect, alias=self.connection_alias
+                )
             self.is_connected = False
             self.collection = None
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
             logger.info("Disconnected from Milvus")
         except Exception as e:
             logger.warning(f"Error disconnecting from Milvus: {e}")
@@ -164,6 +384,7 @@ class MilvusClient:
                     "status": "mock",
                     "message": "Using mock Milvus implementation",
                     "connected": True,
+                    "calls": self.get_call_stats(),
                 }
 
             if not self.is_connected:
@@ -174,7 +395,11 @@ class MilvusClient:
                 }
 
             # Try to list collections as a health check
-            collections = utility.list_collections(using=self.connection_alias)
+            collections = await self._call(
+                "list_collections",
+                utility.list_collections,
+                using=self.connection_alias,
+            )
 
             return {
                 "status": "healthy",
@@ -182,6 +407,9 @@ class MilvusClient:
                 "connected": True,
                 "collection_exists": self.collection_name in collections,
                 "collections_count": len(collections),
+                "index_type": self.active_index_type,
+                "migration_needed": self.migration_needed,
+                "calls": self.get_call_stats(),
             }
         except Exception as e:
             return {
@@ -194,19 +422,60 @@ class MilvusClient:
         """Create collection if it doesn't exist or recreate if schema is wrong"""
         if not MILVUS_AVAILABLE:
             return
+        await self._call("ensure_collection", self._ensure_collection_exists_sync)
 
-        # Define the expected schema
-        expected_fields = [
+    def _expected_schema(self) -> CollectionSchema:
+        fields = [
             FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-            FieldSchema(name="tenant_id", dtype=DataType.VARCHAR, max_length=64),
+            FieldSchema(
+                name="tenant_id",
+                dtype=DataType.VARCHAR,
+                max_length=64,
+                is_partition_key=self.partition_key,
+            ),
             FieldSchema(name="person_id", dtype=DataType.VARCHAR, max_length=64),
             FieldSchema(name="person_type", dtype=DataType.VARCHAR, max_length=16),
             FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=512),
             FieldSchema(name="created_at", dtype=DataType.INT64),
         ]
-        schema = CollectionSchema(
-            expected_fields, description="Face embeddings for recognition"
+        return CollectionSchema(fields, description="Face embeddings for recognition")
+
+    def _create_collection(self, name: str) -> Collection:
+        """Create a collection in the configured layout, with its index"""
+        extra = {"num_partitions": self.num_partitions} if self.partition_key else {}
+        collection = Collection(
+            name=name,
+            schema=self._expected_schema(),
+            using=self.connection_alias,
+            **extra,
         )
+        index_params = {
+            "metric_type": "COSINE",
+            "index_type": self.index_type,
+            "params": self.index_params,
+        }
+        collection.create_index(field_name="embedding", index_params=index_params)
+        logger.info(
+            f"Created Milvus collection {name} "
+            f"(index={self.index_type}, partition_key={self.partition_key})"
+        )
+        return collection
+
+    @staticmethod
+    def _collection_layout(collection) -> tuple:
+        """(tenant_id is a partition key, embedding index type) of a collection"""
+        partition_key = any(
+            field.name == "tenant_id" and getattr(field, "is_partition_key", False)
+            for field in collection.schema.fields
+        )
+        index_type = None
+        for index in collection.indexes:
+            if index.field_name == "embedding":
+                index_type = index.params.get("index_type")
+        return partition_key, index_type
+
+    def _ensure_collection_exists_sync(self):
+        expected_field_names = ["id"] + _DATA_FIELDS
 
         # Check if collection exists
         if utility.has_collection(self.collection_name, using=self.connection_alias):
@@ -219,7 +488,6 @@ class MilvusClient:
 
                 # Get field names from existing schema
                 existing_field_names = [field.name for field in existing_fields]
-                expected_field_names = [field.name for field in expected_fields]
 
                 # Check if schema matches
                 if set(existing_field_names) != set(expected_field_names):
@@ -235,7 +503,24 @@ class MilvusClient:
                     )
                     logger.info(f"Dropped existing collection: {self.collection_name}")
                 else:
-                    # Schema matches, use existing collection
+                    # Schema matches, use existing collection. A different
+                    # layout or index is kept as is (its data is live) until
+                    # migrate_collection() rebuilds it.
+                    partition_key, index_type = self._collection_layout(
+                        existing_collection
+                    )
+                    self.active_index_type = index_type or self.index_type
+                    self.migration_needed = partition_key != self.partition_key or (
+                        self.active_index_type != self.index_type
+                    )
+                    if self.migration_needed:
+                        logger.warning(
+                            f"Collection {self.collection_name} uses "
+                            f"index={self.active_index_type}, partition_key={partition_key}; "
+                            f"configured index={self.index_type}, "
+                            f"partition_key={self.partition_key}. Run "
+                            f"scripts/migrate_milvus_layout.py to migrate."
+                        )
                     self.collection = existing_collection
                     self.collection.load()
                     logger.info(
@@ -254,25 +539,71 @@ class MilvusClient:
                 except Exception:
                     pass  # Collection might not exist or be accessible
 
-        # Create new collection
-        collection = Collection(
-            name=self.collection_name,
-            schema=schema,
-            using=self.connection_alias,
-        )
+        self.collection = self._create_collection(self.collection_name)
+        self.active_index_type = self.index_type
+        self.migration_needed = False
+        self.collection.load()
 
-        # Create index
-        index_params = {
-            "metric_type": "COSINE",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 1024},
-        }
-        collection.create_index(field_name="embedding", index_params=index_params)
+    async def migrate_collection(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """Rebuild the collection in the configured layout and index.
 
-        logger.info(f"Created new Milvus collection: {self.collection_name}")
+        Rows are copied into a new collection which then takes over the
+        collection name; the old one is kept as ``<name>_legacy_<timestamp>``
+        for rollback. Inserts made meanwhile are held in the write-behind
+        buffer and land in the new collection.
+        """
+        if not MILVUS_AVAILABLE or not self.is_connected:
+            raise RuntimeError("Not connected to Milvus")
 
-        self.collection = collection
+        await self.flush()
+        async with self._write_lock:
+            result = await self._call(
+                "migrate", self._migrate_collection_sync, batch_size
+            )
+        logger.info(
+            f"Migrated {result['copied']} embeddings into {self.collection_name} "
+            f"(previous collection kept as {result['legacy_collection']})"
+        )
+        return result
+
+    def _migrate_collection_sync(self, batch_size: int) -> Dict[str, Any]:
+        alias = self.connection_alias
+        target_name = f"{self.collection_name}_migrating"
+        if utility.has_collection(target_name, using=alias):
+            # Left over from an interrupted run
+            utility.drop_collection(target_name, using=alias)
+
+        source = Collection(self.collection_name, using=alias)
+        source.load()
+        target = self._create_collection(target_name)
+
+        copied = 0
+        iterator = source.query_iterator(
+            batch_size=batch_size,
+            expr='tenant_id != ""',
+            output_fields=_DATA_FIELDS,
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                target.insert([{k: row[k] for k in _DATA_FIELDS} for row in rows])
+                copied += len(rows)
+        finally:
+            iterator.close()
+        target.flush()
+
+        legacy_name = f"{self.collection_name}_legacy_{int(time.time())}"
+        source.release()
+        utility.rename_collection(self.collection_name, legacy_name, using=alias)
+        utility.rename_collection(target_name, self.collection_name, using=alias)
+
+        self.collection = Collection(self.collection_name, using=alias)
         self.collection.load()
+        self.active_index_type = self.index_type
+        self.migration_needed = False
+        return {"copied": copied, "legacy_collection": legacy_name}
 
     async def reset_collection(self):
         """Drop and recreate the collection - useful for development"""
@@ -281,11 +612,17 @@ class MilvusClient:
             return
 
         try:
-            if utility.has_collection(
-                self.collection_name, using=self.connection_alias
+            if await self._call(
+                "has_collection",
+                utility.has_collection,
+                self.collection_name,
+                using=self.connection_alias,
             ):
-                utility.drop_collection(
-                    self.collection_name, using=self.connection_alias
+                await self._call(
+                    "drop_collection",
+                    utility.drop_collection,
+                    self.collection_name,
+                    using=self.connection_alias,
                 )
                 logger.info(f"Dropped collection: {self.collection_name}")
 
@@ -296,64 +633,216 @@ class MilvusClient:
             logger.error(f"Failed to reset collection: {e}")
             raise
 
-    async def insert_embedding(
-        self,
-        tenant_id: int,
-        person_id: int,
-        person_type: str,
-        embedding: List[float],
-        created_at: int,
-    ) -> str:
-        """Insert a face embedding"""
+    async def insert_embeddings(self, rows: List[Dict[str, Any]]) -> None:
+        """Queue face embeddings for a batched write.
+
+        Each row has ``tenant_id``, ``person_id``, ``person_type``,
+        ``embedding`` and ``created_at``. Rows are searchable through the
+        overlay as soon as this returns.
+        """
         if not self.collection:
             raise RuntimeError("Not connected to Milvus")
+        if not rows:
+            return
 
-        # For Milvus, data should be provided as a list of dictionaries or as column-wise data
-        # Since we have auto_id=True for the 'id' field, we shouldn't include it
-        # Convert IDs to strings to match the VARCHAR schema
-        data = [
-            {
-                "tenant_id": str(tenant_id),
-                "person_id": str(person_id),
-                "person_type": person_type,
-                "embedding": embedding,
-                "created_at": created_at,
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        for row in rows:
+            # Since we have auto_id=True for the 'id' field, we shouldn't include it
+            # Convert IDs to strings to match the VARCHAR schema
+            data = {
+                "tenant_id": str(row["tenant_id"]),
+                "person_id": str(row["person_id"]),
+                "person_type": row["person_type"],
+                "embedding": row["embedding"],
+                "created_at": row["created_at"],
             }
-        ]
+            vector = np.asarray(row["embedding"], dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            self._seq += 1
+            entry = _BufferedEmbedding(seq=self._seq, row=data)
+            self._pending.append(entry)
+            self._overlay.setdefault(data["tenant_id"], _TenantOverlay()).append(
+                entry, vector / norm if norm else vector
+            )
+            self._overlay_rows += 1
+
+        self._ensure_writer()
+        if (
+            len(self._pending) >= self.insert_batch_size
+            or self._overlay_rows >= self.overlay_max_rows
+        ):
+            self._writer_wakeup.set()
+
+    def _ensure_writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._writer_task is None
+            or self._writer_task.done()
+            or self._writer_task.get_loop() is not loop
+        ):
+            self._write_lock = asyncio.Lock()
+            self._writer_wakeup = asyncio.Event()
+            self._writer_task = loop.create_task(self._write_behind_loop())
+
+    async def _write_behind_loop(self) -> None:
+        while True:
+            try:
+                now = time.monotonic()
+                if self._pending:
+                    timeout = self._pending_since + self.insert_max_delay - now
+                else:
+                    timeout = self._last_flush + self.flush_interval - now
+                try:
+                    await asyncio.wait_for(
+                        self._writer_wakeup.wait(), timeout=max(0.0, timeout)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._writer_wakeup.clear()
+
+                now = time.monotonic()
+                if self._pending and (
+                    len(self._pending) >= self.insert_batch_size
+                    or now - self._pending_since >= self.insert_max_delay
+                ):
+                    await self._write_pending()
+                if self._overlay_rows and (
+                    now - self._last_flush >= self.flush_interval
+                    or self._overlay_rows >= self.overlay_max_rows
+                ):
+                    await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Milvus write-behind failed, will retry: {e}")
+                await asyncio.sleep(self.insert_max_delay)
+
+    async def _write_pending(self) -> None:
+        """Insert every buffered row with one Milvus insert"""
+        async with self._write_lock:
+            if not self._pending or not self.collection:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                result = await self._call(
+                    "insert", self.collection.insert, [e.row for e in batch]
+                )
+            except Exception:
+                # Keep the rows (and their overlay entries) for the next round
+                self._pending = batch + self._pending
+                self._pending_since = time.monotonic()
+                raise
+            for entry, pk in zip(batch, result.primary_keys):
+                entry.pk = str(pk)
+
+    async def flush(self) -> None:
+        """Write buffered rows, flush the collection and trim the overlay"""
+        if not self.collection:
+            return
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        await self._write_pending()
+        flushed_seq = self._seq
+        await self._call("flush", self.collection.flush)
+        self._last_flush = time.monotonic()
+
+        for tenant_id in list(self._overlay):
+            overlay = self._overlay[tenant_id]
+            self._overlay_rows -= overlay.compact(
+                lambda e: e.seq > flushed_seq or e.pk is None
+            )
+            if not overlay:
+                del self._overlay[tenant_id]
+
+    async def _stop_writer(self) -> None:
+        """Stop the write-behind task and persist everything buffered"""
+        task, self._writer_task = self._writer_task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._overlay_rows:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(
+                    f"Failed to flush {self._overlay_rows} buffered embeddings: {e}"
+                )
 
-        result = self.collection.insert(data)
-        self.collection.flush()
+    def _search_overlay(
+        self, tenant_id: str, embeddings: List[List[float]], threshold: float
+    ) -> List[List[Dict]]:
+        """Match queries against this tenant's unflushed rows"""
+        overlay = self._overlay.get(tenant_id)
+        if not overlay:
+            return [[] for _ in embeddings]
 
-        return str(result.primary_keys[0])
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        scores = queries @ overlay.vectors.T
 
-    async def search_similar_faces(
+        matches = []
+        for row_scores in scores:
+            hits = []
+            for i in np.flatnonzero(row_scores >= threshold):
+                e = overlay.entries[i]
+                hits.append(
+                    {
+                        "person_id": (
+                            int(e.row["person_id"])
+                            if e.row["person_id"].isdigit()
+                            else e.row["person_id"]
+                        ),
+                        "person_type": e.row["person_type"],
+                        "similarity": float(row_scores[i]),
+                        "id": e.pk or f"pending-{e.seq}",
+                        "created_at": e.row["created_at"],
+                    }
+                )
+            matches.append(hits)
+        return matches
+
+    async def search_similar_faces_batch(
         self,
         tenant_id: int,
-        embedding: List[float],
+        embeddings: List[List[float]],
         limit: int = 5,
         threshold: float = 0.6,
-    ) -> List[Dict]:
-        """Search for similar face embeddings within a tenant"""
+    ) -> List[List[Dict]]:
+        """Search for several embeddings in one Milvus request.
+
+        Returns one match list per embedding, in order.
+        """
         if not self.collection:
             raise RuntimeError("Not connected to Milvus")
+        if not embeddings:
+            return []
 
         # Enhanced logging for debugging
         logger.info(
-            f"Searching for similar faces: tenant_id={tenant_id}, threshold={threshold}, limit={limit}"
+            f"Searching for similar faces: tenant_id={tenant_id}, queries={len(embeddings)}, threshold={threshold}, limit={limit}"
         )
 
         search_params = {
             "metric_type": "COSINE",
-            "params": {"nprobe": 16},  # Increased nprobe for better search quality
+            "params": self._search_params(str(tenant_id), limit * 2),
         }
 
-        # Search with tenant filter - convert tenant_id to string for VARCHAR schema
+        # Search with tenant filter - convert tenant_id to string for VARCHAR schema.
+        # With tenant_id as partition key this also restricts the search to
+        # the tenant's partition.
         expr = f'tenant_id == "{str(tenant_id)}"'
         logger.debug(f"Milvus search expression: {expr}")
 
         try:
-            results = self.collection.search(
-                data=[embedding],
+            results = await self._call(
+                "search",
+                self.collection.search,
+                data=embeddings,
                 anns_field="embedding",
                 param=search_params,
                 limit=limit * 2,  # Get more results for better filtering
@@ -362,13 +851,41 @@ class MilvusClient:
             )
         except Exception as e:
             logger.error(f"Milvus search failed: {e}")
-            return []
-
+            return [[] for _ in embeddings]
+
+        # Merge rows still in the write-behind overlay so a face inserted
+        # moments ago matches itself; rows Milvus also returned are skipped
+        overlay = self._search_overlay(str(tenant_id), embeddings, threshold)
+        merged = []
+        for i in range(len(embeddings)):
+            matches = self._filter_hits(
+                results[i] if results and i < len(results) else [], limit, threshold
+            )
+            seen = {m["id"] for m in matches}
+            matches.extend(m for m in overlay[i] if m["id"] not in seen)
+            matches.sort(key=lambda x: x["similarity"], reverse=True)
+            merged.append(matches[:limit])
+        return merged
+
+    def _search_params(self, tenant_id: str, top_k: int) -> Dict[str, Any]:
+        """Index defaults, then deployment overrides, then tenant overrides"""
+        params = dict(INDEX_DEFAULTS[self.active_index_type]["search"])
+        # Overrides are written for the configured index; a collection still
+        # awaiting migration keeps the defaults of the index it has
+        if self.active_index_type == self.index_type:
+            params.update(self.search_params)
+            params.update(self.tenant_search_params.get(tenant_id, {}))
+        if "ef" in params:
+            params["ef"] = max(int(params["ef"]), top_k)  # HNSW requires ef >= top_k
+        return params
+
+    def _filter_hits(self, hits, limit: int, threshold: float) -> List[Dict]:
+        """Convert raw hits for one query into thresholded, sorted matches"""
         matches = []
-        if results and len(results[0]) > 0:
-            logger.info(f"Milvus returned {len(results[0])} raw results")
+        if hits and len(hits) > 0:
+            logger.info(f"Milvus returned {len(hits)} raw results")
 
-            for hit in results[0]:
+            for hit in hits:
                 similarity_score = float(hit.score)
 
                 # Apply strict threshold filtering
@@ -430,6 +947,26 @@ class MilvusClient:
         if not self.collection:
             raise RuntimeError("Not connected to Milvus")
 
+        # Unwritten rows are simply dropped; written but unflushed rows are
+        # found by the query below, so forget them in the overlay as well
+        def keep(entry: _BufferedEmbedding) -> bool:
+            return (
+                entry.row["tenant_id"] != str(tenant_id)
+                or entry.row["person_id"] != str(person_id)
+                or (person_type is not None and entry.row["person_type"] != person_type)
+            )
+
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:  # let an in-flight batch land first
+            self._pending = [e for e in self._pending if keep(e)]
+            tenant_overlay = self._overlay.get(str(tenant_id))
+            if tenant_overlay is not None:
+                self._overlay_rows -= tenant_overlay.compact(keep)
+                if not tenant_overlay:
+                    del self._overlay[str(tenant_id)]
+        self._notify_deleted(tenant_id, person_id, person_type)
+
         try:
             # Query for primary keys of matching records - convert IDs to strings for VARCHAR schema
             query_expr = (
@@ -441,7 +978,14 @@ class MilvusClient:
             rows = []
             try:
                 # Prefer query API to fetch primary keys
-                rows = self.collection.query(expr=query_expr, output_fields=["id"])  # type: ignore[attr-defined]
+                rows = await self._call(
+                    "query",
+                    self.collection.query,  # type: ignore[attr-defined]
+                    expr=query_expr,
+                    output_fields=["id"],
+                    # Also see rows written moments ago by the write-behind
+                    consistency_level="Strong",
+                )
             except Exception as e:
                 logger.warning(
                     f"Milvus query not available or failed during delete lookup: {e}"
@@ -460,8 +1004,13 @@ class MilvusClient:
             if primary_keys:
                 pk_list = ",".join(str(pk) for pk in primary_keys)
                 delete_expr = f"id in [{pk_list}]"
-                self.collection.delete(delete_expr)
-                self.collection.flush()
+                collection = self.collection
+
+                def delete_and_flush():
+                    collection.delete(delete_expr)
+                    collection.flush()
+
+                await self._call("delete", delete_and_flush)
                 logger.info(
                     f"Deleted {len(primary_keys)} embeddings for {person_type or 'person'} {person_id}"
                 )
@@ -480,40 +1029,15 @@ class MilvusClient:
                 f"Failed to delete existing embeddings for tenant_id={tenant_id}, person_id={person_id}, person_type={person_type}: {e}"
             )
 
-    async def delete_face_embedding(self, tenant_id: str, visit_id: str):
-        """Delete face embedding by visit_id (uses metadata approach)
 
-        Since current Milvus schema doesn't include visit_id,
-        this is a placeholder for future implementation.
-        In the current system, we rely on database cleanup to handle this.
-        """
-        if not self.collection:
-            raise RuntimeError("Not connected to Milvus")
+def create_vector_store() -> VectorStore:
+    """The embedding store selected by VECTOR_STORE_BACKEND"""
+    if settings.vector_store_backend == "mmap":
+        from .mmap_vector_store import MmapVectorStore
 
-        # Current limitation: Milvus schema doesn't include visit_id
-        # For now, we'll log this action but cannot delete specific visit embeddings
-        # In a future version, the schema should include visit_id as a field
-        logger.warning(
-            f"delete_face_embedding called for visit_id={visit_id}, but current Milvus schema doesn't support visit_id filtering"
-        )
-
-        # TODO: Enhance Milvus schema to include visit_id field for precise deletion
-        # For now, the database cleanup will handle visit removal, and orphaned embeddings
-        # will be cleaned up through periodic maintenance jobs
-
-    async def delete_embedding_by_metadata(self, tenant_id: int, metadata_filter: Dict):
-        """Delete embeddings by metadata filter - simplified to delete by person_id"""
-        if not self.collection:
-            raise RuntimeError("Not connected to Milvus")
-
-        # Since we don't have metadata support in the current schema,
-        # we'll just log a warning and not delete anything for now
-        # In production, you'd want to store metadata and use it for deletion
-        logger.warning(
-            f"delete_embedding_by_metadata called with filter {metadata_filter}, but metadata is not supported in current schema"
-        )
-        # For now, we'll ignore this operation to avoid errors
+        return MmapVectorStore(settings.vector_store_path)
+    return MilvusClient()
 
 
-# Global Milvus client instance
-milvus_client = MilvusClient()
+# Global vector store instance (Milvus unless configured otherwise)
+milvus_client: VectorStore = create_vector_store()
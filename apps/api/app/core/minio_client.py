@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
 
 try:
     from minio import Minio
@@ -56,6 +61,62 @@ if not MINIO_AVAILABLE:
     logger.warning("MinIO not available, using mock implementation")
 
 
+UrlKey = Tuple[str, str, int]  # (bucket, object name, expiry seconds)
+
+
+class PresignedUrlCache:
+    """Recently signed GET URLs, reused while most of their life is left.
+
+    An entry is served for ``ttl_secs`` at most and never past half of the
+    URL's own expiry, so a URL handed out is valid for at least half its
+    expiry. Least recently used entries are evicted beyond ``capacity``.
+    """
+
+    def __init__(self, capacity: int, ttl_secs: float):
+        self.capacity = capacity
+        self.ttl_secs = ttl_secs
+        self._urls: "OrderedDict[UrlKey, Tuple[str, float]]" = OrderedDict()
+        # Signing also runs in executor threads
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+
+    def get(self, key: UrlKey) -> Optional[str]:
+        with self._lock:
+            entry = self._urls.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            url, reuse_until = entry
+            if time.monotonic() >= reuse_until:
+                del self._urls[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._urls.move_to_end(key)
+            self.stats["hits"] += 1
+            return url
+
+    def put(self, key: UrlKey, url: str) -> None:
+        if self.capacity <= 0:
+            return
+        reuse_secs = min(self.ttl_secs, key[2] / 2)
+        with self._lock:
+            self._urls[key] = (url, time.monotonic() + reuse_secs)
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.capacity:
+                self._urls.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "cached": len(self._urls),
+            "capacity": self.capacity,
+            "ttl_secs": self.ttl_secs,
+        }
+
+
 class MinIOClient:
     def __init__(self):
         self.client = Minio(
@@ -66,6 +127,9 @@ class MinIOClient:
         )
         self.bucket_raw = settings.minio_bucket_raw
         self.bucket_derived = settings.minio_bucket_derived
+        self.url_cache = PresignedUrlCache(
+            settings.presigned_url_cache_size, settings.presigned_url_cache_ttl_secs
+        )
 
     async def setup_buckets(self):
         """Create buckets and set lifecycle policies"""
@@ -124,12 +188,56 @@ class MinIOClient:
     def get_presigned_url(
         self, bucket: str, object_name: str, expiry: timedelta = timedelta(hours=1)
     ) -> str:
-        """Generate presigned URL for object access"""
+        """Generate presigned URL for object access, reusing a recent one"""
+        key = (bucket, object_name, int(expiry.total_seconds()))
+        url = self.url_cache.get(key)
+        if url is not None:
+            return url
         try:
-            return self.client.presigned_get_object(bucket, object_name, expires=expiry)
+            url = self.client.presigned_get_object(bucket, object_name, expires=expiry)
         except Exception as e:
             logger.error(f"Failed to generate presigned URL for {object_name}: {e}")
             raise
+        self.url_cache.put(key, url)
+        return url
+
+    async def get_presigned_urls(
+        self,
+        objects: Sequence[Optional[Tuple[str, str]]],
+        expiry: timedelta = timedelta(hours=1),
+    ) -> List[Optional[str]]:
+        """Presigned URLs for many (bucket, object name) pairs, in order.
+
+        Cached URLs are served directly; the rest are signed together in one
+        worker thread (signing may look up the bucket region). A None pair,
+        or an object that could not be signed, gives None.
+        """
+        expiry_secs = int(expiry.total_seconds())
+        urls: Dict[Tuple[str, str], Optional[str]] = {}
+        for pair in objects:
+            if pair is not None and pair not in urls:
+                urls[pair] = self.url_cache.get((*pair, expiry_secs))
+
+        missing = [pair for pair, url in urls.items() if url is None]
+        if missing:
+            signed = await asyncio.to_thread(self._sign_all, missing, expiry)
+            for pair, url in zip(missing, signed):
+                urls[pair] = url
+                if url is not None:
+                    self.url_cache.put((*pair, expiry_secs), url)
+        return [urls[pair] if pair is not None else None for pair in objects]
+
+    def _sign_all(
+        self, objects: List[Tuple[str, str]], expiry: timedelta
+    ) -> List[Optional[str]]:
+        signed: List[Optional[str]] = []
+        for bucket, object_name in objects:
+            try:
+                signed.append(self.client.presigned_get_object(bucket, object_name, expires=expiry))
+            except Exception as e:
+                logger.warning(f"Failed to generate presigned URL for {object_name}: {e}")
+                signed.append(None)
+        return signed
 
     def get_presigned_put_url(
         self, bucket: str, object_name: str, expiry: timedelta = timedelta(hours=1)
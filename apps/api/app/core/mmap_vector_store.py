@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .vector_store import EMBEDDING_DIM, VectorStore, parse_person_id
+
+logger = logging.getLogger(__name__)
+
+# Per-row metadata stored next to the vectors; deleted rows are tombstoned
+META_DTYPE = np.dtype(
+    [
+        ("person_id", "S64"),
+        ("person_type", "S16"),
+        ("created_at", "<i8"),
+        ("deleted", "u1"),
+        ("written", "u1"),
+    ]
+)
+
+# Both files grow by this many rows at a time, so most appends write into
+# space that is already mapped
+GROWTH_ROWS = 1024
+
+_SAFE_TENANT = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class _TenantMatrix:
+    """One tenant's embeddings: an append-only float32 matrix and its metadata.
+
+    ``vectors.f32`` holds L2-normalized rows back to back and ``meta.bin``
+    one META_DTYPE record per row; both are memory-mapped read-write, so
+    opening a tenant costs no reads and the OS pages vectors in as searches
+    touch them. The files are preallocated in GROWTH_ROWS chunks; a row
+    counts once its metadata record is marked written, which happens after
+    its vector is flushed. A row's index is its id.
+
+    ``lock`` guards this tenant's rows; callers hold it for every method.
+    """
+
+    def __init__(self, directory: Path, dim: int = EMBEDDING_DIM):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = directory / "vectors.f32"
+        self.meta_path = directory / "meta.bin"
+        self.lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path.touch()
+        self.meta_path.touch()
+        self.rows = 0
+        self.tombstones = 0
+        self.capacity = 0
+        self.deleted = np.empty(0, dtype=bool)
+
+        capacity = min(
+            self.vectors_path.stat().st_size // (self.dim * 4),
+            self.meta_path.stat().st_size // META_DTYPE.itemsize,
+        )
+        self._map(capacity)
+        # A crash mid-append leaves rows whose metadata was never marked
+        # written; they are overwritten by the next append
+        unwritten = np.flatnonzero(self.meta["written"] == 0)
+        self.rows = int(unwritten[0]) if len(unwritten) else capacity
+        self.deleted[: self.rows] = self.meta["deleted"][: self.rows] != 0
+        self.tombstones = int(self.deleted.sum())
+
+    def _map(self, capacity: int) -> None:
+        """Size both files to ``capacity`` rows and map them"""
+        for path, size in (
+            (self.vectors_path, capacity * self.dim * 4),
+            (self.meta_path, capacity * META_DTYPE.itemsize),
+        ):
+            if path.stat().st_size != size:
+                os.truncate(path, size)
+
+        if capacity:
+            self.vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+            )
+            self.meta = np.memmap(self.meta_path, dtype=META_DTYPE, mode="r+", shape=(capacity,))
+        else:
+            self.vectors = np.empty((0, self.dim), dtype=np.float32)
+            self.meta = np.empty(0, dtype=META_DTYPE)
+
+        deleted = np.zeros(capacity, dtype=bool)
+        deleted[: self.rows] = self.deleted[: self.rows]
+        self.deleted = deleted
+        self.capacity = capacity
+
+    def append(self, vectors: np.ndarray, meta: np.ndarray) -> None:
+        start, end = self.rows, self.rows + len(vectors)
+        if end > self.capacity:
+            self._map(-(-end // GROWTH_ROWS) * GROWTH_ROWS)
+
+        self.vectors[start:end] = vectors
+        self.vectors.flush()
+        meta = meta.copy()
+        meta["written"] = 1
+        self.meta[start:end] = meta
+        self.meta.flush()
+        self.rows = end
+
+    def delete(self, person_id: str, person_type: Optional[str]) -> int:
+        if not self.rows:
+            return 0
+        meta = self.meta[: self.rows]
+        deleted = self.deleted[: self.rows]
+        mask = (meta["person_id"] == person_id.encode()) & ~deleted
+        if person_type is not None:
+            mask &= meta["person_type"] == person_type.encode()
+        count = int(mask.sum())
+        if count:
+            meta["deleted"][mask] = 1
+            self.meta.flush()
+            deleted |= mask
+            self.tombstones += count
+        return count
+
+    def search(
+        self, queries: np.ndarray, limit: int, threshold: float
+    ) -> List[List[Dict[str, Any]]]:
+        if self.rows == self.tombstones:
+            return [[] for _ in queries]
+
+        scores = queries @ self.vectors[: self.rows].T
+        scores[:, self.deleted[: self.rows]] = -np.inf
+        k = min(limit, self.rows - self.tombstones)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row_scores, candidates in zip(scores, top):
+            candidates = candidates[np.argsort(-row_scores[candidates])]
+            matches = []
+            for index in candidates:
+                score = float(row_scores[index])
+                if score < threshold:
+                    break
+                record = self.meta[index]
+                matches.append(
+                    {
+                        "person_id": parse_person_id(record["person_id"].decode()),
+                        "person_type": record["person_type"].decode(),
+                        "similarity": score,
+                        "id": str(index),
+                        "created_at": int(record["created_at"]),
+                    }
+                )
+            results.append(matches)
+        return results
+
+
+class MmapVectorStore(VectorStore):
+    """Exact cosine search over per-tenant memory-mapped matrices.
+
+    For single-process deployments without Milvus (small sites, development,
+    tests). Each tenant lives in its own directory under ``path``; searches
+    are a brute-force matrix product over the tenant's rows only, run off
+    the event loop. Deletes set a tombstone flag in place. ``_lock`` only
+    guards the tenant table; each tenant's own lock covers its rows, so one
+    tenant's searches never wait on another tenant's work.
+    """
+
+    def __init__(self, path: str, dim: int = EMBEDDING_DIM):
+        self.path = Path(path)
+        self.dim = dim
+        self.is_connected = False
+        self._tenants: Dict[str, _TenantMatrix] = {}
+        self._lock = threading.Lock()
+
+    async def connect(self):
+        """Map every tenant found under the store directory"""
+        await asyncio.to_thread(self._open_all)
+        self.is_connected = True
+        logger.info(
+            f"Opened memory-mapped vector store at {self.path} "
+            f"({len(self._tenants)} tenants)"
+        )
+
+    def _open_all(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for directory in sorted(p for p in self.path.iterdir() if p.is_dir()):
+                tenant_id = self._tenant_id(directory.name)
+                self._tenants[tenant_id] = _TenantMatrix(directory, self.dim)
+
+    async def disconnect(self):
+        with self._lock:
+            self._tenants.clear()
+        self.is_connected = False
+
+    async def health_check(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = sum(t.rows for t in self._tenants.values())
+            tombstones = sum(t.tombstones for t in self._tenants.values())
+            tenants = len(self._tenants)
+        return {
+            "status": "healthy" if self.is_connected else "disconnected",
+            "message": f"Memory-mapped vector store at {self.path}",
+            "connected": self.is_connected,
+            "backend": "mmap",
+            "tenants": tenants,
+            "rows": rows,
+            "deleted_rows": tombstones,
+        }
+
+    @staticmethod
+    def _directory_name(tenant_id: str) -> str:
+        if _SAFE_TENANT.match(tenant_id):
+            return tenant_id
+        return "~" + tenant_id.encode().hex()
+
+    @staticmethod
+    def _tenant_id(directory_name: str) -> str:
+        if directory_name.startswith("~"):
+            return bytes.fromhex(directory_name[1:]).decode()
+        return directory_name
+
+    def _tenant(self, tenant_id: str, create: bool) -> Optional[_TenantMatrix]:
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None and create:
+                tenant = _TenantMatrix(self.path / self._directory_name(tenant_id), self.dim)
+                self._tenants[tenant_id] = tenant
+            return tenant
+
+    def _normalize(self, embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    async def insert_embeddings(self, rows: List[Dict[str, Any]]) -> None:
+        if not self.is_connected:
+            raise RuntimeError("Vector store not connected")
+        if not rows:
+            return
+        await asyncio.to_thread(self._insert_sync, rows)
+
+    def _insert_sync(self, rows: List[Dict[str, Any]]) -> None:
+        by_tenant: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_tenant.setdefault(str(row["tenant_id"]), []).append(row)
+
+        for tenant_id, tenant_rows in by_tenant.items():
+            meta = np.zeros(len(tenant_rows), dtype=META_DTYPE)
+            meta["person_id"] = [str(r["person_id"]).encode() for r in tenant_rows]
+            meta["person_type"] = [r["person_type"].encode() for r in tenant_rows]
+            meta["created_at"] = [int(r["created_at"]) for r in tenant_rows]
+            vectors = self._normalize([r["embedding"] for r in tenant_rows])
+            tenant = self._tenant(tenant_id, create=True)
+            with tenant.lock:
+                tenant.append(vectors, meta)
+
+    async def search_similar_faces_batch(
+        self,
+        tenant_id: int,
+        embeddings: List[List[float]],
+        limit: int = 5,
+        threshold: float = 0.6,
+    ) -> List[List[Dict]]:
+        if not self.is_connected:
+            raise RuntimeError("Vector store not connected")
+        if not embeddings:
+            return []
+        return await asyncio.to_thread(
+            self._search_sync, str(tenant_id), embeddings, limit, threshold
+        )
+
+    def _search_sync(
+        self, tenant_id: str, embeddings: List[List[float]], limit: int, threshold: float
+    ) -> List[List[Dict]]:
+        tenant = self._tenant(tenant_id, create=False)
+        if tenant is None:
+            return [[] for _ in embeddings]
+        queries = self._normalize(embeddings)
+        with tenant.lock:
+            return tenant.search(queries, limit, threshold)
+
+    async def delete_person_embeddings(
+        self, tenant_id: int, person_id: int, person_type: Optional[str] = None
+    ):
+        if not self.is_connected:
+            raise RuntimeError("Vector store not connected")
+        deleted = await asyncio.to_thread(
+            self._delete_sync, str(tenant_id), str(person_id), person_type
+        )
+        self._notify_deleted(tenant_id, person_id, person_type)
+        logger.info(
+            f"Deleted {deleted} embeddings for {person_type or 'person'} {person_id}"
+        )
+
+    def _delete_sync(
+        self, tenant_id: str, person_id: str, person_type: Optional[str]
+    ) -> int:
+        tenant = self._tenant(tenant_id, create=False)
+        if tenant is None:
+            return 0
+        with tenant.lock:
+            return tenant.delete(person_id, person_type)
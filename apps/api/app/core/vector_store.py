@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Dimension of the face embeddings produced by the workers
+EMBEDDING_DIM = 512
+
+
+class VectorStore(ABC):
+    """Storage and similarity search of face embeddings, partitioned by tenant.
+
+    ``milvus_client`` is the configured implementation (VECTOR_STORE_BACKEND):
+    Milvus, or the in-process memory-mapped store for deployments without it.
+    Matches are dicts with ``person_id``, ``person_type``, ``similarity``
+    (cosine), ``id`` and ``created_at``.
+    """
+
+    is_connected: bool = False
+
+    @abstractmethod
+    async def connect(self):
+        """Open the store"""
+
+    @abstractmethod
+    async def disconnect(self):
+        """Persist buffered writes and close the store"""
+
+    @abstractmethod
+    async def health_check(self) -> Dict[str, Any]:
+        """Status dict for the health endpoint"""
+
+    @abstractmethod
+    async def insert_embeddings(self, rows: List[Dict[str, Any]]) -> None:
+        """Store face embeddings.
+
+        Each row has ``tenant_id``, ``person_id``, ``person_type``,
+        ``embedding`` and ``created_at``. Rows are searchable once this
+        returns.
+        """
+
+    @abstractmethod
+    async def search_similar_faces_batch(
+        self,
+        tenant_id: int,
+        embeddings: List[List[float]],
+        limit: int = 5,
+        threshold: float = 0.6,
+    ) -> List[List[Dict]]:
+        """Search for several embeddings at once.
+
+        Returns one match list per embedding, in order, each sorted by
+        similarity and holding at most ``limit`` matches >= ``threshold``.
+        """
+
+    @abstractmethod
+    async def delete_person_embeddings(
+        self, tenant_id: int, person_id: int, person_type: Optional[str] = None
+    ):
+        """Delete all embeddings for a person, optionally of one person type"""
+
+    async def flush(self) -> None:
+        """Make every stored embedding durable"""
+
+    def add_delete_listener(
+        self, callback: Callable[[str, str, Optional[str]], None]
+    ) -> None:
+        """Call ``callback(tenant_id, person_id, person_type)`` whenever a
+        person's embeddings are deleted, so caches of them can be dropped"""
+        self._delete_listeners = [*getattr(self, "_delete_listeners", []), callback]
+
+    def _notify_deleted(self, tenant_id, person_id, person_type: Optional[str]) -> None:
+        for callback in getattr(self, "_delete_listeners", []):
+            try:
+                callback(str(tenant_id), str(person_id), person_type)
+            except Exception as e:
+                logger.warning(f"Embedding delete listener failed: {e}")
+
+    async def insert_embedding(
+        self,
+        tenant_id: int,
+        person_id: int,
+        person_type: str,
+        embedding: List[float],
+        created_at: int,
+    ) -> None:
+        """Insert a face embedding"""
+        await self.insert_embeddings(
+            [
+                {
+                    "tenant_id": tenant_id,
+                    "person_id": person_id,
+                    "person_type": person_type,
+                    "embedding": embedding,
+                    "created_at": created_at,
+                }
+            ]
+        )
+
+    async def search_similar_faces(
+        self,
+        tenant_id: int,
+        embedding: List[float],
+        limit: int = 5,
+        threshold: float = 0.6,
+    ) -> List[Dict]:
+        """Search for similar face embeddings within a tenant"""
+        results = await self.search_similar_faces_batch(
+            tenant_id, [embedding], limit=limit, threshold=threshold
+        )
+        return results[0]
+
+    async def delete_face_embedding(self, tenant_id: str, visit_id: str):
+        """Delete the embedding recorded for a visit.
+
+        Embeddings are not keyed by visit, so this only logs; orphaned
+        embeddings are left to periodic maintenance.
+        """
+        logger.warning(
+            f"delete_face_embedding called for visit_id={visit_id}, but embeddings are not stored per visit"
+        )
+
+    async def delete_embedding_by_metadata(self, tenant_id: int, metadata_filter: Dict):
+        """Delete embeddings by metadata filter (metadata is not stored)"""
+        logger.warning(
+            f"delete_embedding_by_metadata called with filter {metadata_filter}, but metadata is not stored"
+        )
+
+
+def parse_person_id(value: Optional[str]):
+    """Stored person ids are strings; numeric ones are returned as int"""
+    return int(value) if value and value.isdigit() else value
@@ -62,6 +62,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.warning(f"Failed to connect to MinIO: {e}")
 
+    # Consume face events queued for async ingest (including any left on disk)
+    try:
+        from .services.ingest_queue import ingest_queue
+
+        await ingest_queue.start()
+    except Exception as e:
+        logging.warning(f"Failed to start ingest queue: {e}")
+
+    # Periodically write open visit sessions and customer activity back
+    from .services.face_service import face_service
+
+    await face_service.visit_sessions.start(db.get_session)
+    await face_service.customer_activity.start(db.get_session)
+
     # Initialize camera proxy service
     await initialize_camera_proxy()
 
@@ -131,6 +145,11 @@ async def lifespan(app: FastAPI):
             await worker_registry.stop()
             await worker_command_service.stop()
             await camera_delegation_service.stop()
+            from .services.ingest_queue import ingest_queue
+            await ingest_queue.stop()
+            from .services.face_service import face_service
+            await face_service.visit_sessions.stop(db.get_session)
+            await face_service.customer_activity.stop(db.get_session)
             await milvus_client.disconnect()
             await db.close()
             logging.info("Successfully disconnected from services")
@@ -7,9 +7,9 @@ from datetime import datetime
 from passlib.context import CryptContext
 from sqlalchemy import (JSON, TIMESTAMP, BigInteger, Boolean, Column, DateTime,
                         Enum, Float, ForeignKey, ForeignKeyConstraint, Index,
-                        Integer, String, Text)
+                        Integer, LargeBinary, String, Text)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 
@@ -332,7 +332,9 @@ class CustomerFaceImage(Base):  # type: ignore[valid-type,misc]
     confidence_score = Column(Float, nullable=False)
     quality_score = Column(Float, nullable=True)
     face_bbox = Column(JSON, nullable=True)  # [x, y, w, h]
-    embedding = Column(JSON, nullable=True)  # Face embedding vector
+    # Embedding columns are only loaded when asked for (undefer / explicit select)
+    embedding_vec = deferred(Column(LargeBinary, nullable=True), group="embedding")  # float32
+    embedding = deferred(Column(JSON, nullable=True), group="embedding")  # Legacy JSON vector
     image_hash = Column(String(64), nullable=True)  # For duplicate detection
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     visit_id = Column(String(64), nullable=True)  # Reference to source visit
@@ -361,6 +363,38 @@ class CustomerFaceImage(Base):  # type: ignore[valid-type,misc]
     )
 
 
+class FaceImageObject(Base):  # type: ignore[valid-type,misc]
+    """A content-addressed face crop in object storage and its reference count"""
+
+    __tablename__ = "face_image_objects"
+
+    tenant_id = Column(
+        String(64),
+        ForeignKey("tenants.tenant_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the bytes
+    object_name = Column(String(500), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class FaceEventReceipt(Base):  # type: ignore[valid-type,misc]
+    """Result of a recorded face event, by the worker's idempotency key"""
+
+    __tablename__ = "face_event_receipts"
+
+    tenant_id = Column(
+        String(64),
+        ForeignKey("tenants.tenant_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    idempotency_key = Column(String(64), primary_key=True)
+    result = Column(JSON, nullable=True)  # NULL while the event is being recorded
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class Visit(Base):  # type: ignore[valid-type,misc]
     __tablename__ = "visits"
 
@@ -372,7 +406,8 @@ class Visit(Base):  # type: ignore[valid-type,misc]
     camera_id = Column(BigInteger, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     confidence_score = Column(Float, nullable=False)
-    face_embedding = Column(Text)  # JSON serialized vector
+    face_embedding_vec = deferred(Column(LargeBinary), group="embedding")  # float32
+    face_embedding = deferred(Column(Text), group="embedding")  # Legacy JSON vector
     image_path = Column(Text)
     bbox_x = Column(Float)
     bbox_y = Column(Float)
@@ -9,10 +9,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
 from ..core.database import db, get_db_session
+from ..core.embedding_storage import has_embedding, load_embedding
 from ..core.milvus_client import milvus_client
 from ..core.security import get_current_user
 from ..models.database import Customer
 from ..schemas import CustomerCreate, CustomerResponse
+from ..services.customer_face_service import customer_face_service
 from ..services.event_broadcaster import tenant_event_broadcaster
 
 router = APIRouter(prefix="/v1", tags=["Customer Management"])
@@ -38,60 +40,53 @@ async def list_customers(
     )
     customers = result.scalars().all()
 
-    # Get avatar URLs for each customer by fetching their best face image
-    customer_responses = []
-    for customer in customers:
-        avatar_url = None
-
+    # Avatar of each customer: its best face image (highest confidence + quality),
+    # all fetched in one query and signed as one batch
+    avatar_urls = {}
+    if customers:
         try:
-            # Get the best face image for this customer (highest confidence + quality)
-            from sqlalchemy import desc, func
+            from sqlalchemy import desc
 
+            from ..core.minio_client import minio_client
             from ..models.database import CustomerFaceImage
 
-            face_result = await db_session.execute(
-                select(CustomerFaceImage.image_path)
-                .where(
-                    CustomerFaceImage.tenant_id == user["tenant_id"],
-                    CustomerFaceImage.customer_id == customer.customer_id,
-                )
-                .order_by(
-                    desc(
+            rank = (
+                func.row_number()
+                .over(
+                    partition_by=CustomerFaceImage.customer_id,
+                    order_by=desc(
                         CustomerFaceImage.confidence_score
                         + func.coalesce(CustomerFaceImage.quality_score, 0.5)
-                    )
+                    ),
                 )
-                .limit(1)
+                .label("rank")
             )
+            ranked = (
+                select(CustomerFaceImage.customer_id, CustomerFaceImage.image_path, rank)
+                .where(
+                    CustomerFaceImage.tenant_id == user["tenant_id"],
+                    CustomerFaceImage.customer_id.in_([c.customer_id for c in customers]),
+                )
+                .subquery()
+            )
+            face_result = await db_session.execute(
+                select(ranked.c.customer_id, ranked.c.image_path).where(ranked.c.rank == 1)
+            )
+            best_images = face_result.all()
 
-            face_image = face_result.scalar_one_or_none()
-            if face_image:
-                # Generate MinIO presigned URL for the avatar
-                import asyncio
-
-                from ..core.minio_client import minio_client
-
-                try:
-                    from datetime import timedelta
-
-                    avatar_url = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        minio_client.get_presigned_url,
-                        "faces-derived",  # Use derived bucket for processed face images
-                        face_image,
-                        timedelta(hours=1),  # 1 hour expiry
-                    )
-                except Exception as url_error:
-                    logger.warning(
-                        f"Could not generate avatar URL for customer {customer.customer_id}: {url_error}"
-                    )
-                    avatar_url = None  # Continue without avatar
-
-        except Exception as e:
-            logger.warning(
-                f"Could not fetch avatar for customer {customer.customer_id}: {e}"
+            # Processed face images are in the derived bucket
+            urls = await minio_client.get_presigned_urls(
+                [("faces-derived", image_path) for _, image_path in best_images]
             )
-            avatar_url = None  # Continue without avatar
+            avatar_urls = {
+                customer_id: url for (customer_id, _), url in zip(best_images, urls)
+            }
+        except Exception as e:
+            logger.warning(f"Could not fetch customer avatars: {e}")
+
+    customer_responses = []
+    for customer in customers:
+        avatar_url = avatar_urls.get(customer.customer_id)  # None without an avatar
 
         try:
             # Create customer response with proper null handling
@@ -368,6 +363,9 @@ async def merge_customers(
                 )
 
                 await session.commit()
+                customer_face_service.gallery_rankings.invalidate(
+                    tenant_id, [primary_customer_id, secondary_customer_id]
+                )
 
                 # Embeddings maintenance (best-effort)
                 try:
@@ -380,7 +378,6 @@ async def merge_customers(
 
                     # Aggregate vectors for primary (same as earlier version)
                     import hashlib
-                    import json
 
                     aggregated = []
                     inserted_keys = set()
@@ -388,6 +385,7 @@ async def merge_customers(
 
                     gres = await session.execute(
                         select(
+                            CustomerFaceImage.embedding_vec,
                             CustomerFaceImage.embedding,
                             CustomerFaceImage.created_at,
                             CustomerFaceImage.image_hash,
@@ -395,18 +393,17 @@ async def merge_customers(
                             and_(
                                 CustomerFaceImage.tenant_id == tenant_id,
                                 CustomerFaceImage.customer_id == primary_customer_id,
-                                CustomerFaceImage.embedding.is_not(None),
+                                has_embedding(
+                                    CustomerFaceImage.embedding_vec, CustomerFaceImage.embedding
+                                ),
                             )
                         )
                     )
-                    for emb, created_at, ih in gres.all():
-                        if not emb or not isinstance(emb, list) or len(emb) != 512:
+                    for packed, legacy, created_at, ih in gres.all():
+                        emb = load_embedding(packed, legacy)
+                        if emb is None:
                             continue
-                        key = (
-                            f"img:{ih}"
-                            if ih
-                            else f"vec:{hashlib.sha256(str(emb).encode()).hexdigest()}"
-                        )
+                        key = f"img:{ih}" if ih else f"vec:{hashlib.sha256(emb).hexdigest()}"
                         if key in inserted_keys:
                             continue
                         inserted_keys.add(key)
@@ -414,25 +411,22 @@ async def merge_customers(
                         aggregated.append((emb, ts))
 
                     vres = await session.execute(
-                        select(Visit.face_embedding, Visit.timestamp).where(
+                        select(
+                            Visit.face_embedding_vec, Visit.face_embedding, Visit.timestamp
+                        ).where(
                             and_(
                                 Visit.tenant_id == tenant_id,
                                 Visit.person_type == "customer",
                                 Visit.person_id == primary_customer_id,
-                                Visit.face_embedding.is_not(None),
+                                has_embedding(Visit.face_embedding_vec, Visit.face_embedding),
                             )
                         )
                     )
-                    for emb_text, ts_dt in vres.all():
-                        if not emb_text:
-                            continue
-                        try:
-                            emb = json.loads(emb_text)
-                        except Exception:
-                            emb = None
-                        if not isinstance(emb, list) or len(emb) != 512:
+                    for packed, legacy, ts_dt in vres.all():
+                        emb = load_embedding(packed, legacy)
+                        if emb is None:
                             continue
-                        key = f"vis:{hashlib.sha256(str(emb).encode()).hexdigest()}"
+                        key = f"vis:{hashlib.sha256(emb).hexdigest()}"
                         if key in inserted_keys:
                             continue
                         inserted_keys.add(key)
@@ -445,7 +439,7 @@ async def merge_customers(
                         )
                         for emb, ts in aggregated:
                             await milvus_client.insert_embedding(
-                                tenant_id, primary_customer_id, "customer", emb, ts
+                                tenant_id, primary_customer_id, "customer", emb.tolist(), ts
                             )
 
                 except Exception as e:
@@ -509,7 +503,7 @@ async def find_similar_customers(
         from ..models.database import CustomerFaceImage
 
         images_res = await db_session.execute(
-            select(CustomerFaceImage.embedding, CustomerFaceImage.image_id).where(
+            select(CustomerFaceImage.embedding_vec, CustomerFaceImage.embedding).where(
                 and_(
                     CustomerFaceImage.tenant_id == user["tenant_id"],
                     CustomerFaceImage.customer_id == customer_id,
@@ -536,13 +530,14 @@ async def find_similar_customers(
         similar_map: dict[int, float] = {}
 
         # Query Milvus for each embedding and aggregate by max similarity per customer
-        for emb, _img_id in images:
-            if not emb or not isinstance(emb, list) or len(emb) != 512:
+        for packed, legacy in images:
+            emb = load_embedding(packed, legacy)
+            if emb is None:
                 continue
             try:
                 matches = await milvus_client.search_similar_faces(
                     tenant_id=user["tenant_id"],
-                    embedding=emb,
+                    embedding=emb.tolist(),
                     limit=limit,
                     threshold=used_threshold,
                 )
@@ -652,39 +647,35 @@ async def reconcile_customers(
             from ..models.database import CustomerFaceImage, Visit
 
             img_res = await db_session.execute(
-                select(CustomerFaceImage.embedding)
+                select(CustomerFaceImage.embedding_vec, CustomerFaceImage.embedding)
                 .where(
                     and_(
                         CustomerFaceImage.tenant_id == tenant_id,
                         CustomerFaceImage.customer_id == c.customer_id,
+                        has_embedding(
+                            CustomerFaceImage.embedding_vec, CustomerFaceImage.embedding
+                        ),
                     )
                 )
                 .limit(3)
             )
-            embs = [row[0] for row in img_res if row[0]]
+            embs = [load_embedding(packed, legacy) for packed, legacy in img_res.all()]
+            embs = [e for e in embs if e is not None]
             if not embs:
                 vres = await db_session.execute(
-                    select(Visit.face_embedding)
+                    select(Visit.face_embedding_vec, Visit.face_embedding)
                     .where(
                         and_(
                             Visit.tenant_id == tenant_id,
                             Visit.person_type == "customer",
                             Visit.person_id == c.customer_id,
-                            Visit.face_embedding.is_not(None),
+                            has_embedding(Visit.face_embedding_vec, Visit.face_embedding),
                         )
                     )
                     .limit(3)
                 )
-                import json as _json
-
-                embs = []
-                for (etxt,) in vres.all():
-                    try:
-                        vec = _json.loads(etxt) if etxt else None
-                        if isinstance(vec, list) and len(vec) == 512:
-                            embs.append(vec)
-                    except Exception:
-                        pass
+                embs = [load_embedding(packed, legacy) for packed, legacy in vres.all()]
+                embs = [e for e in embs if e is not None]
             if not embs:
                 continue
 
@@ -695,7 +686,7 @@ async def reconcile_customers(
                 try:
                     matches = await milvus_client.search_similar_faces(
                         tenant_id=tenant_id,
-                        embedding=emb,
+                        embedding=emb.tolist(),
                         limit=5,
                         threshold=settings.embedding_distance_thr,
                     )
@@ -893,6 +884,7 @@ async def delete_customer_face_images_batch(
     try:
         from ..models.database import CustomerFaceImage
         from ..services.customer_face_service import customer_face_service
+        from ..services.object_staging import StagedObjects
 
         # Load images for this customer and tenant only
         res = await db_session.execute(
@@ -905,10 +897,13 @@ async def delete_customer_face_images_batch(
             )
         )
         images = res.scalars().all()
+        staging = StagedObjects()
         for img in images:
-            await customer_face_service._delete_face_image(db_session, img)
+            await customer_face_service._delete_face_image(db_session, img, staging)
         deleted_count = len(images)
         await db_session.commit()
+        await staging.commit()
+        customer_face_service.gallery_rankings.invalidate(user["tenant_id"], [customer_id])
         return {
             "message": "Deleted customer face images",
             "deleted_count": deleted_count,
@@ -982,15 +977,18 @@ async def reassign_visit(
             status_code=400, detail="visit_id and new_customer_id are required"
         )
 
-    import json
+    from sqlalchemy.orm import undefer_group
 
     from ..core.milvus_client import milvus_client
     from ..models.database import Customer, Visit
+    from ..services.face_service import face_service
 
     try:
         # Load visit
         visit_result = await db_session.execute(
-            select(Visit).where(
+            select(Visit)
+            .options(undefer_group("embedding"))
+            .where(
                 and_(
                     Visit.tenant_id == user["tenant_id"],
                     Visit.visit_id == visit_id,
@@ -1033,6 +1031,8 @@ async def reassign_visit(
 
         # Recompute visit counts and seen times for old and new customers
         async def _recompute_customer_stats(customer_id: int):
+            # Buffered activity is already reflected in the visit rows counted here
+            face_service.customer_activity.discard(user["tenant_id"], [customer_id])
             stats_res = await db_session.execute(
                 select(
                     func.count(Visit.visit_id),
@@ -1069,20 +1069,16 @@ async def reassign_visit(
         if update_embeddings:
             try:
                 # Insert embedding for new customer if present on visit
-                if visit.face_embedding:
-                    try:
-                        emb = json.loads(visit.face_embedding)
-                    except Exception:
-                        emb = None
-                    if isinstance(emb, list) and len(emb) == 512:
-                        await milvus_client.insert_embedding(
-                            tenant_id=user["tenant_id"],
-                            person_id=new_customer_id,
-                            person_type="customer",
-                            embedding=emb,
-                            created_at=int(visit.timestamp.timestamp()),
-                        )
-                        embedding_action = "inserted_for_new"
+                emb = load_embedding(visit.face_embedding_vec, visit.face_embedding)
+                if emb is not None:
+                    await milvus_client.insert_embedding(
+                        tenant_id=user["tenant_id"],
+                        person_id=new_customer_id,
+                        person_type="customer",
+                        embedding=emb.tolist(),
+                        created_at=int(visit.timestamp.timestamp()),
+                    )
+                    embedding_action = "inserted_for_new"
 
                 # If old customer has no more visits, delete their embeddings to avoid ghost matches
                 if old_count == 0:
@@ -1161,7 +1157,8 @@ async def reassign_face_image(
         if not cust_res.scalar_one_or_none():
             raise HTTPException(status_code=404, detail="New customer not found")
 
-        if face_image.customer_id == int(new_customer_id):
+        previous_customer_id = int(face_image.customer_id)
+        if previous_customer_id == int(new_customer_id):
             return {"message": "No changes: image already assigned to this customer"}
 
         # Reassign
@@ -1177,6 +1174,9 @@ async def reassign_face_image(
         )
 
         await db_session.commit()
+        customer_face_service.gallery_rankings.invalidate(
+            user["tenant_id"], [previous_customer_id, int(new_customer_id)]
+        )
         return {
             "message": "Face image reassigned",
             "image_id": int(image_id),
@@ -1271,6 +1271,7 @@ async def delete_customer(
         )
 
         await db_session.commit()
+        customer_face_service.gallery_rankings.invalidate(user["tenant_id"], [customer_id])
 
         # Clean up embeddings from Milvus (best effort)
         try:
@@ -1517,6 +1518,7 @@ async def bulk_delete_customers(
         )
 
         await db_session.commit()
+        customer_face_service.gallery_rankings.invalidate(user["tenant_id"], customer_ids)
 
         # Clean up embeddings from Milvus (best effort)
         failed_embedding_cleanups = []
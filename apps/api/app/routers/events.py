@@ -2,20 +2,28 @@ import json
 import logging
 import uuid
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from common.models import FaceDetectedEvent
 from fastapi import (APIRouter, Depends, File, Form, HTTPException, Query,
-                     UploadFile, status)
+                     Request, Response, UploadFile, status)
 from pydantic import BaseModel
 from sqlalchemy import and_, case, delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.config import settings
 from ..core.database import db, get_db_session
+from ..core.embedding_storage import has_embedding
 from ..core.security import get_current_user
 from ..models.database import Visit
-from ..schemas import FaceEventResponse, VisitResponse, VisitsPaginatedResponse
+from ..schemas import (FaceEventBatchResponse, FaceEventResponse, VisitResponse,
+                       VisitsPaginatedResponse)
+from ..services.customer_face_service import customer_face_service
+from ..services.event_broadcaster import tenant_event_broadcaster
+from ..services.face_image_store import face_image_store, is_content_addressed
 from ..services.face_service import face_service
+from ..services.ingest_queue import IngestQueueFull, ingest_queue
+from ..services.object_staging import StagedObjects
 
 router = APIRouter(prefix="/v1", tags=["Events & Detection", "Visits & Analytics"])
 logger = logging.getLogger(__name__)
@@ -30,11 +38,21 @@ def to_naive_utc(dt: datetime) -> datetime:
 
 @router.post("/events/face", response_model=FaceEventResponse)
 async def process_face_event(
+    response: Response,
     event_data: str = Form(..., description="JSON-encoded FaceDetectedEvent"),
     face_image: UploadFile = File(..., description="Cropped face image from worker"),
+    mode: Optional[str] = Query(
+        None, pattern="^(sync|async)$", description="Override EVENT_INGEST_MODE"
+    ),
     user: dict = Depends(get_current_user),
     db_session: AsyncSession = Depends(get_db_session),
 ):
+    """Record a worker face event.
+
+    In async mode the event is persisted and queued, and the response (202)
+    carries a ``ticket`` for GET /events/face/status/{ticket}; otherwise the
+    match result is returned directly.
+    """
     await db.set_tenant_context(db_session, user["tenant_id"])
 
     # Parse the event data
@@ -57,6 +75,27 @@ async def process_face_event(
     # Read the face image data
     face_image_data = await face_image.read()
 
+    if (mode or settings.event_ingest_mode) == "async":
+        try:
+            ticket = await ingest_queue.submit(
+                user["tenant_id"], event, face_image_data, face_image.filename or "face.jpg"
+            )
+        except IngestQueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "5"},
+            )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return FaceEventResponse(
+            match="queued",
+            person_id=None,
+            similarity=0.0,
+            visit_id=None,
+            person_type="customer",
+            ticket=ticket,
+        )
+
     result = await face_service.process_face_event_with_image(
         event=event,
         face_image_data=face_image_data,
@@ -68,6 +107,87 @@ async def process_face_event(
     return FaceEventResponse(**result)
 
 
+@router.get("/events/face/status/{ticket}")
+async def get_face_event_status(ticket: str, user: dict = Depends(get_current_user)):
+    """Status of an event queued for async ingest: queued, done (with the
+    match result) or failed"""
+    event_status = ingest_queue.get_status(user["tenant_id"], ticket)
+    if event_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Unknown or expired ticket"
+        )
+    return event_status
+
+
+@router.get("/events/face/stream")
+async def stream_face_event_results(request: Request, user: dict = Depends(get_current_user)):
+    """SSE stream of async ingest results (``face_event_result`` messages)"""
+    return await tenant_event_broadcaster.stream(user["tenant_id"], request)
+
+
+@router.post("/events/face/batch", response_model=FaceEventBatchResponse)
+async def process_face_events_batch(
+    events_data: str = Form(..., description="JSON array of FaceDetectedEvent"),
+    face_images: List[UploadFile] = File(
+        ..., description="Cropped face images, one per event in the same order"
+    ),
+    user: dict = Depends(get_current_user),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    """Ingest several worker face events in one request.
+
+    Events are gated and searched in batch and recorded in a single
+    transaction; results are returned per event, in request order.
+    """
+    await db.set_tenant_context(db_session, user["tenant_id"])
+
+    try:
+        raw_events = json.loads(events_data)
+        if not isinstance(raw_events, list):
+            raise ValueError("events_data must be a JSON array")
+        events = [FaceDetectedEvent(**event_dict) for event_dict in raw_events]
+    except (json.JSONDecodeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid event data: {str(e)}",
+        )
+
+    if not events:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="No events provided"
+        )
+    if len(events) > settings.max_event_batch_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.max_event_batch_size} events",
+        )
+    if len(face_images) != len(events):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Expected {len(events)} face images, got {len(face_images)}",
+        )
+
+    items = []
+    for event, face_image in zip(events, face_images):
+        if not face_image.content_type or not face_image.content_type.startswith(
+            "image/"
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Face image must be a valid image file",
+            )
+        items.append((event, await face_image.read(), face_image.filename or "face.jpg"))
+
+    results = await face_service.process_face_events_batch(
+        items=items, db_session=db_session, tenant_id=user["tenant_id"]
+    )
+
+    return FaceEventBatchResponse(
+        results=[FaceEventResponse(**result) for result in results],
+        total=len(results),
+    )
+
+
 class ImageProcessingResult(BaseModel):
     success: bool
     customer_id: Optional[int] = None
@@ -243,6 +363,7 @@ async def process_uploaded_images(
                             face_image_filename=f"{image.filename or 'uploaded_image'}_face_{face_data['face_index']}.jpg",
                             db_session=db_session,
                             tenant_id=user["tenant_id"],
+                            manual_import=True,
                         )
                         logger.info(
                             f"🎯 Face matching result for {face_id}: {face_match_result.get('match')} (person_id: {face_match_result.get('person_id')}, similarity: {face_match_result.get('similarity', 0):.3f})"
@@ -361,6 +482,24 @@ async def process_uploaded_images(
 # ===============================
 
 
+def _visit_image_location(image_path: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(bucket, object name) of a stored visit image; None for no image or a URL"""
+    if not image_path or image_path.startswith("http"):
+        return None
+    if image_path.startswith("s3://"):
+        # Extract bucket and object name from s3://bucket/object format
+        parts = image_path[5:].split("/", 1)
+        return (parts[0], parts[1]) if len(parts) == 2 else None
+    if image_path.startswith("visits-faces/"):
+        # API-generated face crops are in faces-derived bucket
+        return ("faces-derived", image_path.replace("visits-faces/", ""))
+    if is_content_addressed(image_path):
+        # Content-addressed face crops, stored under their own path
+        return ("faces-derived", image_path)
+    # Assume it's a path in the faces-raw bucket
+    return ("faces-raw", image_path)
+
+
 @router.get("/visits", response_model=VisitsPaginatedResponse)
 async def list_visits(
     site_id: Optional[int] = Query(None),
@@ -416,45 +555,14 @@ async def list_visits(
         # Use the last visit's timestamp as cursor for next page
         next_cursor = visits[-1].last_seen.isoformat()
 
-    # Convert visits to response format with presigned URLs
+    # Convert visits to response format with presigned URLs, signed as one batch
+    locations = [_visit_image_location(v.image_path) for v in visits]
+    signed_urls = await minio_client.get_presigned_urls(locations)
+
     visit_responses = []
-    for visit in visits:
-        # Convert MinIO path to presigned URL if image_path exists
-        image_url = None
-        if visit.image_path:
-            try:
-                # Check if it's a MinIO s3:// path or already a URL
-                if visit.image_path.startswith("s3://"):
-                    # Extract bucket and object name from s3://bucket/object format
-                    path_parts = visit.image_path[5:].split(
-                        "/", 1
-                    )  # Remove 's3://' prefix
-                    if len(path_parts) == 2:
-                        bucket, object_name = path_parts
-                        image_url = minio_client.get_presigned_url(bucket, object_name)
-                    else:
-                        image_url = visit.image_path
-                elif visit.image_path.startswith("http"):
-                    # Already a URL, use as-is
-                    image_url = visit.image_path
-                else:
-                    # Handle different image path types
-                    if visit.image_path.startswith("visits-faces/"):
-                        # API-generated face crops are in faces-derived bucket
-                        object_path = visit.image_path.replace("visits-faces/", "")
-                        image_url = minio_client.get_presigned_url(
-                            "faces-derived", object_path
-                        )
-                    else:
-                        # Assume it's a path in the faces-raw bucket
-                        image_url = minio_client.get_presigned_url(
-                            "faces-raw", visit.image_path
-                        )
-            except Exception as e:
-                logger.warning(
-                    f"Failed to generate presigned URL for {visit.image_path}: {e}"
-                )
-                image_url = None
+    for visit, location, signed_url in zip(visits, locations, signed_urls):
+        # Paths that are already URLs are returned as-is
+        image_url = signed_url if location is not None else visit.image_path or None
 
         visit_response = VisitResponse(
             tenant_id=visit.tenant_id,
@@ -671,11 +779,13 @@ async def remove_visit_face_detection(
 
         # Get the visit to be deleted
         visit_result = await db_session.execute(
-            select(Visit).where(
+            select(
+                Visit, has_embedding(Visit.face_embedding_vec, Visit.face_embedding)
+            ).where(
                 and_(Visit.tenant_id == user["tenant_id"], Visit.visit_id == visit_id)
             )
         )
-        visit = visit_result.scalar_one_or_none()
+        visit, embedding_stored = visit_result.one_or_none() or (None, False)
 
         if not visit:
             raise HTTPException(status_code=404, detail="Visit not found")
@@ -708,7 +818,7 @@ async def remove_visit_face_detection(
             )
 
         # Delete from Milvus if face embedding exists
-        if visit.face_embedding:
+        if embedding_stored:
             try:
                 await milvus_client.delete_face_embedding(
                     tenant_id=user["tenant_id"], visit_id=visit_id
@@ -741,13 +851,26 @@ async def remove_visit_face_detection(
                 .update({Customer.visit_count: Customer.visit_count - 1})
             )
 
+        # Release content-addressed images; they are deleted after the commit
+        # once no other visit or gallery entry references them
+        staging = StagedObjects()
+        legacy_paths = await face_image_store.release(
+            db_session,
+            user["tenant_id"],
+            [visit.image_path, customer_face_image_path],
+            staging,
+        )
+        images_cleaned = len(staging.pending_deletes)
+
         await db_session.commit()
+        await staging.commit()
+        if customer_id:
+            customer_face_service.gallery_rankings.invalidate(user["tenant_id"], [customer_id])
 
-        # Clean up images from MinIO (after database commit)
-        images_cleaned = 0
+        # Clean up legacy images from MinIO (after database commit)
 
         # Clean up visit image
-        if visit.image_path:
+        if visit.image_path in legacy_paths:
             try:
                 if visit.image_path.startswith("s3://"):
                     # Extract bucket and object name from s3://bucket/object format
@@ -769,7 +892,7 @@ async def remove_visit_face_detection(
                 logger.warning(f"Failed to delete visit image {visit.image_path}: {e}")
 
         # Clean up customer face image
-        if customer_face_image_path:
+        if customer_face_image_path in legacy_paths:
             try:
                 if customer_face_image_path.startswith("customer-faces/"):
                     # Legacy format - remove the prefix
@@ -791,7 +914,7 @@ async def remove_visit_face_detection(
             "visit_id": visit_id,
             "customer_id": customer_id,
             "images_cleaned": images_cleaned,
-            "embedding_cleaned": bool(visit.face_embedding),
+            "embedding_cleaned": bool(embedding_stored),
         }
 
     except HTTPException:
@@ -164,6 +164,15 @@ async def serve_file(
             raise HTTPException(status_code=403, detail="Forbidden")
         bucket = "faces-derived"
         object_path = file_path
+    elif file_path.startswith("faces/"):
+        # Content-addressed face crops: faces/{tenant_id}/{hh}/{sha256}.jpg
+        parts = file_path.split("/")
+        if len(parts) < 4:
+            raise HTTPException(status_code=404, detail="File not found")
+        if parts[1] != payload.get("tenant_id"):
+            raise HTTPException(status_code=403, detail="Forbidden")
+        bucket = "faces-derived"
+        object_path = file_path
 
     else:
         # Only allow specific secure path types
@@ -24,6 +24,61 @@ async def health_milvus():
     return milvus_health
 
 
+@router.get("/health/identity-cache")
+async def health_identity_cache():
+    """Hit rate and size of the recently-recognized customer cache"""
+    from ..services.face_service import face_service
+
+    return face_service.identity_cache.get_stats()
+
+
+@router.get("/health/pending-clusters")
+async def health_pending_clusters():
+    """Clusters of unrecognized faces waiting to become new customers"""
+    from ..services.face_service import face_service
+
+    return face_service.pending_clusters.get_stats()
+
+
+@router.get("/health/ingest")
+async def health_ingest():
+    """Depth and throughput of the async face-event ingest queue"""
+    from ..services.ingest_queue import ingest_queue
+
+    return ingest_queue.get_stats()
+
+
+@router.get("/health/visit-sessions")
+async def health_visit_sessions():
+    """Open visit sessions and pending customer activity"""
+    from ..services.face_service import face_service
+
+    return {
+        **face_service.visit_sessions.get_stats(),
+        "customer_activity": face_service.customer_activity.get_stats(),
+    }
+
+
+@router.get("/health/gallery-rankings")
+async def health_gallery_rankings():
+    """Cached customer gallery rankings, images rejected before upload and
+    cached image metrics"""
+    from ..services.customer_face_service import customer_face_service
+
+    return {
+        **customer_face_service.gallery_rankings.get_stats(),
+        "image_metrics": customer_face_service.image_metrics.get_stats(),
+    }
+
+
+@router.get("/health/presigned-urls")
+async def health_presigned_urls():
+    """Reuse of signed image URLs by listings"""
+    from ..core.minio_client import minio_client
+
+    return minio_client.url_cache.get_stats()
+
+
 @router.get("/health/face-processing")
 async def health_face_processing():
     """Check if face processing dependencies are available."""
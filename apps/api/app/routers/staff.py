@@ -3,9 +3,10 @@ import hashlib
 import json
 import logging
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from common.staff_vectors import MEDIA_TYPE, encode_staff_vectors
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy import and_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -39,6 +40,50 @@ async def list_staff(
     return staff_members
 
 
+@router.get("/staff/embeddings/sync")
+async def sync_staff_embeddings(
+    site_id: Optional[int] = Query(None),
+    since: Optional[str] = Query(None, description="Version from a previous sync"),
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(get_current_user),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    """Versioned staff vector feed for workers.
+
+    Returns a binary float32 payload (see ``common.staff_vectors``): a full
+    snapshot without ``since``, otherwise only staff changed since that
+    version. Responds 304 when nothing changed, so polling is cheap.
+    """
+    await db.set_tenant_context(db_session, user["tenant_id"])
+
+    version = await staff_service.get_staff_vector_version(
+        db_session, user["tenant_id"], site_id
+    )
+    headers = {"X-Staff-Version": version, "ETag": f'"{version}"'}
+
+    known_version = since or (if_none_match or "").strip('"')
+    if known_version == version:
+        return Response(status_code=304, headers=headers)
+
+    full, active_ids, rows = await staff_service.get_staff_vectors(
+        db_session, user["tenant_id"], site_id, since=known_version or None
+    )
+
+    dim = len(rows[0][1]) if rows else 512
+    consistent_rows = [row for row in rows if len(row[1]) == dim]
+    if len(consistent_rows) != len(rows):
+        logger.warning(
+            f"Dropped {len(rows) - len(consistent_rows)} staff embeddings with dim != {dim}"
+        )
+
+    headers["X-Staff-Sync"] = "full" if full else "delta"
+    return Response(
+        content=encode_staff_vectors(active_ids, consistent_rows, dim, full=full),
+        media_type=MEDIA_TYPE,
+        headers=headers,
+    )
+
+
 @router.post("/staff", response_model=StaffResponse)
 async def create_staff(
     staff: StaffCreate,
@@ -646,6 +691,16 @@ async def delete_staff_face_image(
         # Delete from database first (this removes the hash constraint immediately)
         await db_session.delete(face_image)
 
+        # Deleting an image leaves no timestamp behind; touch the staff row so
+        # the embedding sync feed picks up the reduced vector set
+        await db_session.execute(
+            update(Staff)
+            .where(
+                and_(Staff.tenant_id == user["tenant_id"], Staff.staff_id == staff_id)
+            )
+            .values(updated_at=datetime.utcnow())
+        )
+
         # Clean up external resources (best effort - don't let failures block DB deletion)
         minio_success = False
         milvus_success = False
@@ -22,6 +22,7 @@ import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Set
 
+from common.embedding_codec import negotiate_embedding_encoding
 from common.enums.worker import WorkerStatus
 from fastapi import (APIRouter, Depends, HTTPException, Request, WebSocket,
                      WebSocketDisconnect)
@@ -309,6 +310,10 @@ async def register_worker(
         result = await WorkerService.register_worker(
             registration, current_user.tenant_id, client_ip, db
         )
+        # Compact embedding encoding for this worker's face events (None = JSON)
+        result["embedding_encoding"] = negotiate_embedding_encoding(
+            (registration.capabilities or {}).get("embedding_encoding")
+        )
 
         # Broadcast worker registration
         await connection_manager.broadcast_to_tenant(
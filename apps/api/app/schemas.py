@@ -328,3 +328,10 @@ class FaceEventResponse(BaseModel):
     similarity: float
     visit_id: Optional[str]
     person_type: str
+    message: Optional[str] = None
+    ticket: Optional[str] = None  # set when the event was queued for async ingest
+
+
+class FaceEventBatchResponse(BaseModel):
+    results: List[FaceEventResponse]
+    total: int
@@ -0,0 +1,207 @@
+"""
+Write-behind aggregation of customer last_seen / visit_count
+
+Every recorded detection used to update its customer row (and commit),
+which serialized events of a busy customer on that row's lock and counted
+detections rather than visits. Activity is now accumulated per customer in
+memory and applied per tenant as one batched UPDATE: every
+``flush_interval_secs``, piggybacked on requests, and at shutdown.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import (BigInteger, DateTime, Integer, and_, bindparam, case,
+                        column, or_, update, values)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import db
+from ..models.database import Customer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CustomerActivity:
+    """Changes to one customer row not yet written"""
+
+    last_seen: datetime
+    visits: int = 0
+
+    def merge(self, last_seen: datetime, visits: int) -> None:
+        if last_seen > self.last_seen:
+            self.last_seen = last_seen
+        self.visits += visits
+
+
+class CustomerActivityBuffer:
+    """Per-tenant pending customer activity, flushed in one statement"""
+
+    def __init__(self, flush_interval_secs: float = 5.0):
+        self.flush_interval_secs = flush_interval_secs
+        # pending[tenant_id][customer_id] = activity
+        self.pending: Dict[str, Dict[int, CustomerActivity]] = {}
+        self._last_flush: Dict[str, float] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.stats = {"recorded": 0, "flushes": 0, "rows_flushed": 0}
+
+    def record(self, tenant_id, customer_id: int, seen_at: datetime, new_visit: bool) -> None:
+        """Note a detection of ``customer_id``; ``new_visit`` when it opened a visit"""
+        tenant = self.pending.setdefault(str(tenant_id), {})
+        activity = tenant.get(int(customer_id))
+        if activity is None:
+            tenant[int(customer_id)] = CustomerActivity(seen_at, int(new_visit))
+        else:
+            activity.merge(seen_at, int(new_visit))
+        self.stats["recorded"] += 1
+
+    def discard(self, tenant_id, customer_ids: Iterable[int]) -> None:
+        """Drop pending activity of customers whose stats are being recomputed"""
+        tenant = self.pending.get(str(tenant_id), {})
+        for customer_id in customer_ids:
+            tenant.pop(int(customer_id), None)
+
+    def flush_due(self, tenant_id) -> bool:
+        now = time.monotonic()
+        last = self._last_flush.setdefault(str(tenant_id), now)
+        return now - last >= self.flush_interval_secs
+
+    async def flush(self, db_session: AsyncSession, tenant_id, commit: bool = True) -> int:
+        """Apply a tenant's pending activity; ``db_session`` must be in its context.
+
+        Returns the number of customers updated.
+        """
+        tenant_id = str(tenant_id)
+        self._last_flush[tenant_id] = time.monotonic()
+        pending = self.pending.pop(tenant_id, None)
+        if not pending:
+            return 0
+
+        # Sorted so concurrent flushes lock rows in the same order
+        rows = [
+            {"customer_id": cid, "last_seen": a.last_seen, "visits": a.visits}
+            for cid, a in sorted(pending.items())
+        ]
+        try:
+            if db_session.bind.dialect.name == "postgresql":
+                await db_session.execute(self._values_update(tenant_id, rows))
+            else:
+                await db_session.execute(
+                    self._executemany_update(tenant_id),
+                    [{f"b_{k}": v for k, v in row.items()} for row in rows],
+                )
+            if commit:
+                await db_session.commit()
+        except Exception:
+            # Keep the activity for the next flush
+            tenant = self.pending.setdefault(tenant_id, {})
+            for cid, activity in pending.items():
+                if cid in tenant:
+                    tenant[cid].merge(activity.last_seen, activity.visits)
+                else:
+                    tenant[cid] = activity
+            raise
+
+        self.stats["flushes"] += 1
+        self.stats["rows_flushed"] += len(rows)
+        return len(rows)
+
+    @staticmethod
+    def _values_update(tenant_id: str, rows: List[Dict]):
+        """UPDATE customers ... FROM (VALUES ...) for all rows at once"""
+        customers = Customer.__table__
+        activity = values(
+            column("customer_id", BigInteger),
+            column("last_seen", DateTime),
+            column("visits", Integer),
+            name="activity",
+        ).data([(r["customer_id"], r["last_seen"], r["visits"]) for r in rows])
+        return (
+            update(customers)
+            .where(
+                and_(
+                    customers.c.tenant_id == tenant_id,
+                    customers.c.customer_id == activity.c.customer_id,
+                )
+            )
+            .values(
+                last_seen=case(
+                    (
+                        or_(
+                            customers.c.last_seen.is_(None),
+                            customers.c.last_seen < activity.c.last_seen,
+                        ),
+                        activity.c.last_seen,
+                    ),
+                    else_=customers.c.last_seen,
+                ),
+                visit_count=customers.c.visit_count + activity.c.visits,
+            )
+        )
+
+    @staticmethod
+    def _executemany_update(tenant_id: str):
+        """Same update, one parameter set per row, for backends without VALUES lists"""
+        customers = Customer.__table__
+        last_seen = bindparam("b_last_seen", type_=DateTime)
+        return (
+            update(customers)
+            .where(
+                and_(
+                    customers.c.tenant_id == tenant_id,
+                    customers.c.customer_id == bindparam("b_customer_id"),
+                )
+            )
+            .values(
+                last_seen=case(
+                    (
+                        or_(customers.c.last_seen.is_(None), customers.c.last_seen < last_seen),
+                        last_seen,
+                    ),
+                    else_=customers.c.last_seen,
+                ),
+                visit_count=customers.c.visit_count + bindparam("b_visits"),
+            )
+        )
+
+    async def flush_all(self, session_factory: Callable) -> int:
+        """Flush every tenant, each in its own session and tenant context"""
+        written = 0
+        for tenant_id in sorted(self.pending):
+            try:
+                async with session_factory() as db_session:
+                    await db.set_tenant_context(db_session, tenant_id)
+                    written += await self.flush(db_session, tenant_id)
+            except Exception as e:
+                logger.error(f"Failed to flush customer activity of tenant {tenant_id}: {e}")
+        return written
+
+    async def start(self, session_factory: Callable) -> None:
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.create_task(self._flush_loop(session_factory))
+
+    async def stop(self, session_factory: Callable) -> None:
+        """Stop the flush loop and write out all pending activity"""
+        task, self._flush_task = self._flush_task, None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush_all(session_factory)
+
+    async def _flush_loop(self, session_factory: Callable) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_secs)
+            await self.flush_all(session_factory)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "pending": sum(len(t) for t in self.pending.values()),
+        }
@@ -6,12 +6,17 @@ import hashlib
 import logging
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import asc, desc, func, select
+import numpy as np
+from sqlalchemy import and_, asc, delete, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
-from ..core.minio_client import minio_client
+from ..core.embedding_storage import has_embedding, load_embedding, pack_embedding
 from ..models.database import CustomerFaceImage
+from .face_image_store import face_image_store
+from .gallery_ranking import CustomerGallery, GalleryEntry, GalleryRankingCache, rank_score
+from .image_quality import ImageMetricsCache, image_dimensions
+from .object_staging import StagedObjects, derived_object_name
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +27,14 @@ class CustomerFaceService:
     def __init__(self):
         self.max_images_per_customer = settings.max_face_images
         self.min_confidence_to_save = settings.min_face_confidence_to_save
+        self.gallery_rankings = GalleryRankingCache(
+            capacity=settings.gallery_cache_size,
+            ttl_secs=settings.gallery_cache_ttl_secs,
+        )
+        self.image_metrics = ImageMetricsCache(
+            enabled=settings.face_image_metrics,
+            capacity=settings.face_image_metrics_cache_size,
+        )
 
     async def add_face_image(
         self,
@@ -34,6 +47,7 @@ class CustomerFaceService:
         embedding: List[float],
         visit_id: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        staging: Optional[StagedObjects] = None,
     ) -> Optional[CustomerFaceImage]:
         """
         Add a face image for a customer, managing gallery size and quality
@@ -48,40 +62,17 @@ class CustomerFaceService:
             embedding: Face embedding vector
             visit_id: Optional source visit ID
             metadata: Additional metadata
+            staging: Objects of the caller's transaction; when given, a new
+                upload is removed again on rollback, evicted images are deleted
+                only after commit, and errors are raised for the caller's
+                savepoint instead of rolling back the session
 
         Returns:
             Created CustomerFaceImage or None if not saved
         """
         try:
-            # First, verify the customer exists - if not, create one
             from datetime import datetime
 
-            from ..models.database import Customer
-
-            result = await db.execute(
-                select(Customer).where(
-                    Customer.tenant_id == tenant_id, Customer.customer_id == customer_id
-                )
-            )
-            customer = result.scalar_one_or_none()
-
-            if not customer:
-                logger.warning(
-                    f"Customer {customer_id} not found in tenant {tenant_id}, creating new customer"
-                )
-                # Create the missing customer
-                customer = Customer(
-                    customer_id=customer_id,  # Use the provided customer_id
-                    tenant_id=tenant_id,
-                    first_seen=datetime.utcnow(),
-                    visit_count=0,
-                )
-                db.add(customer)
-                await db.flush()  # Ensure the customer is created before proceeding
-                logger.info(
-                    f"Created missing customer {customer_id} for tenant {tenant_id}"
-                )
-
             # Check if confidence meets minimum threshold
             # For manual uploads, use a more lenient threshold since they are curated by users
             is_manual_upload = metadata and metadata.get("source") == "manual_upload"
@@ -95,34 +86,40 @@ class CustomerFaceService:
                 )
                 return None
 
+            gallery = self.gallery_rankings.get(tenant_id, customer_id)
+            if gallery is None:
+                await self._ensure_customer(db, tenant_id, customer_id)
+                gallery = await self.gallery_rankings.load(db, tenant_id, customer_id)
+
             # Calculate image hash for duplicate detection
             image_hash = hashlib.sha256(image_data).hexdigest()
 
             # Check for duplicate image
-            result = await db.execute(
-                select(CustomerFaceImage).where(
-                    CustomerFaceImage.tenant_id == tenant_id,
-                    CustomerFaceImage.customer_id == customer_id,
-                    CustomerFaceImage.image_hash == image_hash,
-                )
-            )
-            existing = result.scalar_one_or_none()
-
-            if existing:
+            existing_id = gallery.by_hash.get(image_hash)
+            if existing_id is not None:
                 logger.debug(
                     f"Duplicate face image detected for customer {customer_id}, skipping"
                 )
-                return existing
+                return await db.get(CustomerFaceImage, existing_id)
 
             # Calculate quality score
             quality_score = await self._calculate_quality_score(
-                image_data, face_bbox, metadata
+                image_data, face_bbox, metadata, image_hash
             )
 
-            # Upload image to MinIO
-            image_path = await self._upload_face_image(
-                tenant_id, customer_id, image_data
-            )
+            # Only upload images that would survive gallery eviction
+            created_at = datetime.utcnow()
+            rank = rank_score(confidence_score, quality_score, created_at)
+            if not gallery.accepts(rank, self.max_images_per_customer):
+                self.gallery_rankings.stats["rejected"] += 1
+                logger.debug(
+                    f"Face image ranks below the gallery of customer {customer_id}, skipping"
+                )
+                return None
+
+            # Store the image by content; the visit snapshot of the same crop
+            # is the same object, so it is only referenced again
+            image_path = await face_image_store.acquire(db, tenant_id, image_data, staging)
             if not image_path:
                 logger.error("Failed to upload face image to MinIO")
                 return None
@@ -135,18 +132,19 @@ class CustomerFaceService:
                 confidence_score=confidence_score,
                 quality_score=quality_score,
                 face_bbox=face_bbox,
-                embedding=embedding,
+                embedding_vec=pack_embedding(embedding),
                 image_hash=image_hash,
                 visit_id=visit_id,
                 detection_metadata=metadata,
-                created_at=datetime.utcnow(),
+                created_at=created_at,
             )
 
             db.add(face_image)
+            await db.flush()
+            gallery.add(GalleryEntry(rank, int(face_image.image_id), image_hash, image_path))
 
             # Manage gallery size - keep only the best images
-            # This needs to happen after the image is added to the session
-            await self._manage_gallery_size(db, tenant_id, customer_id)
+            await self._manage_gallery_size(db, tenant_id, customer_id, gallery, staging)
 
             # Don't commit here - let the caller handle the transaction
 
@@ -156,6 +154,10 @@ class CustomerFaceService:
             return face_image
 
         except Exception as e:
+            # The cached ranking may no longer match what will be committed
+            self.gallery_rankings.invalidate(tenant_id, [customer_id])
+            if staging is not None:
+                raise
             # Handle missing table gracefully - this can happen if migrations haven't been run
             if 'relation "customer_face_images" does not exist' in str(e):
                 logger.info(
@@ -176,23 +178,23 @@ class CustomerFaceService:
         image_data: bytes,
         face_bbox: List[float],
         metadata: Optional[Dict[str, Any]] = None,
+        image_hash: Optional[str] = None,
     ) -> float:
-        """Calculate overall quality score for a face image"""
-        try:
-            import io
+        """Calculate overall quality score for a face image.
 
-            import numpy as np
-            from PIL import Image
-
-            # Open image
-            image = Image.open(io.BytesIO(image_data))
-            np.array(image)
+        Only the image header is read; pixel metrics are blended in when
+        enabled (computed off the event loop, cached by ``image_hash``).
+        """
+        try:
+            dimensions = image_dimensions(image_data)
+            if dimensions is None:
+                return 0.7  # Default quality
 
             # Base quality factors
             quality_factors = []
 
             # Image resolution quality
-            width, height = image.size
+            width, height = dimensions
             resolution_score = min(
                 1.0, (width * height) / (200 * 200)
             )  # 200x200 as baseline
@@ -224,129 +226,85 @@ class CustomerFaceService:
             else:
                 quality_factors.extend([0.7 * 0.2, 0.7 * 0.2])  # Default values
 
-            return sum(quality_factors)
-
-        except Exception as e:
-            logger.warning(f"Error calculating quality score: {e}")
-            return 0.7  # Default quality
-
-    async def _upload_face_image(
-        self, tenant_id: str, customer_id: int, image_data: bytes
-    ) -> Optional[str]:
-        """Upload face image to MinIO and return path"""
-        try:
-            import asyncio
-            import uuid
+            score = sum(quality_factors)
 
-            # Generate unique filename with proper path structure
-            filename = (
-                f"customers/{tenant_id}/{customer_id}/face-{uuid.uuid4().hex[:8]}.jpg"
+            # Sharpness and exposure of the actual pixels
+            metrics = await self.image_metrics.get(
+                image_hash or hashlib.sha256(image_data).hexdigest(), image_data
             )
+            if metrics is not None:
+                score = score * 0.8 + metrics.score * 0.2
 
-            # Upload to faces-derived bucket (run in executor to avoid blocking)
-            def upload_sync():
-                return minio_client.upload_image(
-                    bucket="faces-derived",
-                    object_name=filename,
-                    data=image_data,
-                    content_type="image/jpeg",
-                )
-
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, upload_sync)
-
-            if result:
-                # Return the filename without adding extra prefix to avoid duplication
-                return filename
-            return None
+            return score
 
         except Exception as e:
-            logger.error(f"Error uploading face image: {e}")
-            return None
-
-    async def _manage_gallery_size(
-        self, db: AsyncSession, tenant_id: str, customer_id: int
-    ) -> None:
-        """Manage the size of customer face gallery, keeping only the best images"""
-        try:
-            # First verify the customer still exists (defensive programming)
-            from ..models.database import Customer
+            logger.warning(f"Error calculating quality score: {e}")
+            return 0.7  # Default quality
 
-            result = await db.execute(
-                select(Customer).where(
-                    Customer.tenant_id == tenant_id, Customer.customer_id == customer_id
-                )
-            )
-            customer = result.scalar_one_or_none()
+    async def _ensure_customer(self, db: AsyncSession, tenant_id: str, customer_id: int) -> None:
+        """Create the customer if it does not exist (yet)"""
+        from datetime import datetime
 
-            if not customer:
-                logger.warning(
-                    f"Customer {customer_id} not found during gallery management, skipping"
-                )
-                return
+        from ..models.database import Customer
 
-            # Count current committed images (excluding any pending in current transaction)
-            # Use a separate query to get the actual committed count
-            result = await db.execute(
-                select(func.count(CustomerFaceImage.image_id)).where(
-                    CustomerFaceImage.tenant_id == tenant_id,
-                    CustomerFaceImage.customer_id == customer_id,
-                )
+        result = await db.execute(
+            select(Customer.customer_id).where(
+                Customer.tenant_id == tenant_id, Customer.customer_id == customer_id
             )
-            current_count = result.scalar()
-
-            # The current count includes the newly added image in the session
-            # We want to keep max_images_per_customer, so if current_count >= max_images_per_customer,
-            # we need to remove (current_count - max_images_per_customer + 1) images
-            if current_count < self.max_images_per_customer:
-                return
-
-            # Calculate excess images to remove
-            # Since current_count includes the new image, we need to remove enough to get back to the limit
-            excess_count = current_count - self.max_images_per_customer + 1
-
-            logger.info(
-                f"Managing gallery size for customer {customer_id}: current={current_count}, max={self.max_images_per_customer}, removing={excess_count}"
+        )
+        if result.scalar_one_or_none() is not None:
+            return
+
+        logger.warning(
+            f"Customer {customer_id} not found in tenant {tenant_id}, creating new customer"
+        )
+        db.add(
+            Customer(
+                customer_id=customer_id,  # Use the provided customer_id
+                tenant_id=tenant_id,
+                first_seen=datetime.utcnow(),
+                visit_count=0,
             )
+        )
+        await db.flush()  # Ensure the customer is created before proceeding
+        logger.info(f"Created missing customer {customer_id} for tenant {tenant_id}")
 
-            # Get worst images (lowest combined score) excluding the newly added one that's not committed yet
-            # We need to get committed images only, so we'll flush first to see the new image, then select the worst
-            await db.flush()  # Make sure the new image is visible in queries
-
-            result = await db.execute(
-                select(CustomerFaceImage)
-                .where(
+    async def _manage_gallery_size(
+        self,
+        db: AsyncSession,
+        tenant_id: str,
+        customer_id: int,
+        gallery: CustomerGallery,
+        staging: Optional[StagedObjects] = None,
+    ) -> None:
+        """Evict the worst images beyond the gallery limit, as ranked by ``gallery``"""
+        evicted = gallery.pop_excess(self.max_images_per_customer)
+        if not evicted:
+            return
+
+        logger.info(
+            f"Managing gallery size for customer {customer_id}: max={self.max_images_per_customer}, removing={len(evicted)}"
+        )
+        result = await db.execute(
+            delete(CustomerFaceImage)
+            .where(
+                and_(
                     CustomerFaceImage.tenant_id == tenant_id,
-                    CustomerFaceImage.customer_id == customer_id,
-                )
-                .order_by(
-                    # Combined score: confidence + quality + recency bonus (lower is worse)
-                    asc(
-                        CustomerFaceImage.confidence_score
-                        + func.coalesce(CustomerFaceImage.quality_score, 0.5)
-                        + func.extract(
-                            "epoch", func.now() - CustomerFaceImage.created_at
-                        )
-                        / 86400
-                        * 0.01  # Small recency bonus
-                    )
+                    CustomerFaceImage.image_id.in_([e.image_id for e in evicted]),
                 )
-                .limit(excess_count)
             )
-            worst_images = result.scalars().all()
+            .returning(CustomerFaceImage.image_path)
+        )
+        removed_paths = [row[0] for row in result.all()]
+        if len(removed_paths) < len(evicted):
+            # Rows removed elsewhere: the ranking was stale
+            self.gallery_rankings.invalidate(tenant_id, [customer_id])
 
-            # Remove worst images
-            for image in worst_images:
-                await self._delete_face_image_content_only(image)
-                await db.delete(image)
+        for path in removed_paths:
+            await self._release_face_image_content(db, tenant_id, path, staging)
+        self.gallery_rankings.stats["evicted_images"] += len(removed_paths)
 
-            logger.info(
-                f"Removed {len(worst_images)} excess face images for customer {customer_id}"
-            )
-
-        except Exception as e:
-            logger.error(f"Error managing gallery size for customer {customer_id}: {e}")
-            # Don't re-raise - this is a cleanup operation and shouldn't break the main flow
+        logger.info(f"Removed {len(removed_paths)} excess face images for customer {customer_id}")
 
     async def cleanup_excess_images_for_customer(
         self, db: AsyncSession, tenant_id: str, customer_id: int
@@ -391,12 +349,17 @@ class CustomerFaceService:
             worst_images = result.scalars().all()
 
             # Remove excess images
+            staging = StagedObjects()
             for image in worst_images:
-                await self._delete_face_image_content_only(image)
+                await self._release_face_image_content(
+                    db, tenant_id, image.image_path, staging
+                )
                 await db.delete(image)
 
             # Commit the deletions
             await db.commit()
+            await staging.commit()
+            self.gallery_rankings.invalidate(tenant_id, [customer_id])
 
             logger.info(
                 f"Cleaned up {len(worst_images)} excess images for customer {customer_id} (had {current_count}, limit {self.max_images_per_customer})"
@@ -463,47 +426,41 @@ class CustomerFaceService:
                 "error": str(e),
             }
 
-    async def _delete_face_image_content_only(
-        self, face_image: CustomerFaceImage
+    async def _release_face_image_content(
+        self,
+        db: AsyncSession,
+        tenant_id: str,
+        image_path: Optional[str],
+        staging: Optional[StagedObjects] = None,
     ) -> None:
-        """Delete face image content from MinIO only (not database record)"""
-        try:
-            # Delete from MinIO (run in executor to avoid blocking)
-            if face_image.image_path:
-                # Handle both old (customer-faces/ prefix) and new (direct path) formats
-                if face_image.image_path.startswith("customer-faces/"):
-                    # Legacy format - remove the prefix
-                    object_path = face_image.image_path.replace("customer-faces/", "")
-                else:
-                    # New format - use path directly
-                    object_path = face_image.image_path
-
-                try:
-                    import asyncio
-
-                    loop = asyncio.get_event_loop()
-                    await loop.run_in_executor(
-                        None,
-                        lambda: minio_client.delete_file("faces-derived", object_path),
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to delete image from MinIO: {e}")
+        """Drop a gallery image's reference to its stored object.
 
+        Content-addressed objects are deleted once nothing references them,
+        legacy per-customer objects right away. Deletion waits for ``staging``
+        to be committed; without it, it happens immediately.
+        """
+        pending = staging or StagedObjects()
+        try:
+            legacy = await face_image_store.release(db, tenant_id, [image_path], pending)
+            for path in legacy:
+                pending.delete_on_commit("faces-derived", derived_object_name(path))
         except Exception as e:
-            logger.error(
-                f"Error deleting face image content {face_image.image_id}: {e}"
-            )
+            logger.error(f"Error releasing face image content {image_path}: {e}")
+        if staging is None:
+            await pending.commit()
 
     async def _delete_face_image(
-        self, db: AsyncSession, face_image: CustomerFaceImage
+        self,
+        db: AsyncSession,
+        face_image: CustomerFaceImage,
+        staging: Optional[StagedObjects] = None,
     ) -> None:
-        """Delete a face image from both MinIO and database"""
+        """Delete a face image record and release its stored object"""
         try:
-            # Delete content first
-            await self._delete_face_image_content_only(face_image)
-
-            # Delete from database
-            db.delete(face_image)
+            await self._release_face_image_content(
+                db, face_image.tenant_id, face_image.image_path, staging
+            )
+            await db.delete(face_image)
 
         except Exception as e:
             logger.error(f"Error deleting face image {face_image.image_id}: {e}")
@@ -556,13 +513,26 @@ class CustomerFaceService:
         tenant_id: str,
         customer_id: int,
         max_embeddings: int = 3,
-    ) -> List[List[float]]:
+    ) -> List[np.ndarray]:
         """Get the best face embeddings for a customer for recognition comparison"""
         try:
-            images = await self.get_customer_face_images(
-                db, tenant_id, customer_id, limit=max_embeddings
+            result = await db.execute(
+                select(CustomerFaceImage.embedding_vec, CustomerFaceImage.embedding)
+                .where(
+                    CustomerFaceImage.tenant_id == tenant_id,
+                    CustomerFaceImage.customer_id == customer_id,
+                    has_embedding(CustomerFaceImage.embedding_vec, CustomerFaceImage.embedding),
+                )
+                .order_by(
+                    desc(
+                        CustomerFaceImage.confidence_score
+                        + func.coalesce(CustomerFaceImage.quality_score, 0.5)
+                    )
+                )
+                .limit(max_embeddings)
             )
-            return [img.embedding for img in images if img.embedding]
+            embeddings = (load_embedding(packed, legacy) for packed, legacy in result.all())
+            return [e for e in embeddings if e is not None]
 
         except Exception as e:
             logger.error(
@@ -0,0 +1,168 @@
+"""
+Content-addressed storage of face crops
+
+A crop is stored once per tenant under a key derived from the SHA-256 of its
+bytes, ``faces/{tenant_id}/{hh}/{sha256}-{generation}.jpg`` in the
+faces-derived bucket, and that path is what visits and customer galleries
+reference. The ``face_image_objects`` table counts the references: acquiring
+bytes that are already stored only bumps the count, and releasing the last
+reference removes the row and, once the transaction has committed, the
+object.
+
+Object writes are not part of the transaction, so every row gets its own
+object: the generation is random per upload. Deleting the object of a
+removed (or rolled-back) row can then never hit the object a concurrent
+transaction has just uploaded for the same bytes.
+"""
+
+import asyncio
+import hashlib
+import logging
+import uuid
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.database import FaceImageObject
+from .object_staging import StagedObjects
+
+logger = logging.getLogger(__name__)
+
+BUCKET = "faces-derived"
+PATH_PREFIX = "faces/"
+
+
+def content_path(tenant_id, digest: str, generation: str = "") -> str:
+    name = f"{digest}-{generation}" if generation else digest
+    return f"{PATH_PREFIX}{tenant_id}/{digest[:2]}/{name}.jpg"
+
+
+def content_hash_of(path: str) -> str:
+    return path.rsplit("/", 1)[-1].split(".", 1)[0].split("-", 1)[0]
+
+
+def is_content_addressed(path: Optional[str]) -> bool:
+    return bool(path) and path.startswith(PATH_PREFIX)
+
+
+class FaceImageStore:
+    """Reference-counted, deduplicated face crop storage"""
+
+    async def acquire(
+        self,
+        db: AsyncSession,
+        tenant_id: str,
+        data: bytes,
+        staging: Optional[StagedObjects] = None,
+    ) -> Optional[str]:
+        """Take a reference to ``data``, uploading it if it is not stored yet.
+
+        Returns the image path, or None if the upload failed. A new upload is
+        registered with ``staging`` so a rollback removes it again.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        stored = await self._add_refs(db, tenant_id, digest, 1)
+        if stored:
+            return stored
+
+        path = content_path(tenant_id, digest, uuid.uuid4().hex[:12])
+
+        from ..core.minio_client import minio_client
+
+        uploaded = await asyncio.to_thread(
+            minio_client.upload_image,
+            bucket=BUCKET,
+            object_name=path,
+            data=data,
+            content_type="image/jpeg",
+        )
+        if not uploaded:
+            return None
+        try:
+            async with db.begin_nested():
+                await db.execute(
+                    insert(FaceImageObject.__table__).values(
+                        tenant_id=tenant_id,
+                        content_hash=digest,
+                        object_name=path,
+                        size_bytes=len(data),
+                        ref_count=1,
+                    )
+                )
+        except IntegrityError:
+            # Stored by a concurrent transaction in the meantime: use its
+            # object and drop the one just uploaded, which nothing references
+            try:
+                await asyncio.to_thread(minio_client.delete_object, BUCKET, path)
+            except Exception as e:
+                logger.warning(f"Failed to delete unused face image {path}: {e}")
+            return await self._add_refs(db, tenant_id, digest, 1)
+        if staging is not None:
+            staging.added(BUCKET, path)
+        return path
+
+    async def release(
+        self,
+        db: AsyncSession,
+        tenant_id: str,
+        paths: Iterable[Optional[str]],
+        staging: StagedObjects,
+    ) -> List[str]:
+        """Drop one reference per path.
+
+        Objects left without references are deleted when ``staging`` is
+        committed. Returns the paths that are not content-addressed, which
+        the caller still has to delete itself.
+        """
+        legacy: List[str] = []
+        table = FaceImageObject.__table__
+        for path in paths:
+            if not path:
+                continue
+            if not is_content_addressed(path):
+                legacy.append(path)
+                continue
+            digest = content_hash_of(path)
+            # Matched on the object too: a path of an earlier generation of
+            # the same bytes never touches the current row
+            await self._add_refs(db, tenant_id, digest, -1, path)
+            result = await db.execute(
+                delete(table).where(
+                    and_(
+                        table.c.tenant_id == tenant_id,
+                        table.c.content_hash == digest,
+                        table.c.object_name == path,
+                        table.c.ref_count <= 0,
+                    )
+                )
+            )
+            if result.rowcount:
+                staging.delete_on_commit(BUCKET, path)
+        return legacy
+
+    @staticmethod
+    async def _add_refs(
+        db: AsyncSession,
+        tenant_id: str,
+        digest: str,
+        delta: int,
+        object_name: Optional[str] = None,
+    ) -> Optional[str]:
+        """Adjust the reference count; returns the stored object's path, or
+        None if there is no such row"""
+        table = FaceImageObject.__table__
+        conditions = [table.c.tenant_id == tenant_id, table.c.content_hash == digest]
+        if object_name is not None:
+            conditions.append(table.c.object_name == object_name)
+        result = await db.execute(
+            update(table)
+            .where(and_(*conditions))
+            .values(ref_count=table.c.ref_count + delta)
+            .returning(table.c.object_name)
+        )
+        return result.scalar_one_or_none()
+
+
+face_image_store = FaceImageStore()
@@ -1,24 +1,60 @@
 from __future__ import annotations
 
-import asyncio
 import json
 import logging
 import time
 import uuid
-from datetime import datetime
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
 from common.models import FaceDetectedEvent
-from sqlalchemy import and_, select, update
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
+from ..core.embedding_storage import pack_embedding
 from ..core.milvus_client import milvus_client
-from ..models.database import Customer, Staff, Visit
+from ..models.database import (Customer, FaceEventReceipt, Staff,
+                               StaffFaceImage, Visit)
+from .customer_activity import CustomerActivityBuffer
+from .identity_cache import IdentityCache
+from .pending_clusters import PendingClusters
+from .face_image_store import face_image_store
+from .object_staging import StagedObjects
+from .visit_sessions import VisitSession, VisitSessionTable
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _EventBatch:
+    """Side effects of the events in one transaction, applied once it has
+    committed or undone when it (or one event's savepoint) rolls back"""
+
+    embeddings: List[Dict] = field(default_factory=list)
+    opened_sessions: List[tuple] = field(default_factory=list)
+    # (session, state before, version after) per detection merged in memory
+    session_changes: List[tuple] = field(default_factory=list)
+    customer_activity: List[tuple] = field(default_factory=list)
+    galleries: List[tuple] = field(default_factory=list)
+    clusters: List[tuple] = field(default_factory=list)
+    objects: StagedObjects = field(default_factory=StagedObjects)
+
+    def mark(self) -> tuple:
+        return (
+            len(self.embeddings),
+            len(self.opened_sessions),
+            len(self.session_changes),
+            len(self.customer_activity),
+            len(self.galleries),
+            len(self.clusters),
+            self.objects.mark(),
+        )
+
+
 class FaceMatchingService:
     def __init__(self):
         # Read thresholds and knobs from settings
@@ -35,28 +71,51 @@ class FaceMatchingService:
         # In-memory caches for smoothing / clustering (best-effort, per-process)
         # recent_assignments[(tenant_id, camera_id)] = (person_id, timestamp, similarity)
         self.recent_assignments: dict[tuple[str, int], tuple[int, float, float]] = {}
-        # pending clusters keyed by coarse hash of embedding
-        # pending[(tenant_id, site_id, camera_id, key)] = [(ts, embedding)]
-        self.pending: dict[
-            tuple[str, int, int, str], list[tuple[float, list[float]]]
-        ] = {}
         # Align pending window with (extended) hysteresis for stability
         self.pending_window_secs = max(self.temporal_hysteresis_secs, 5.0)
+        # Unrecognized faces per camera, gathered until they are seen often
+        # enough to become a new customer
+        self.pending_clusters = PendingClusters(
+            similarity_threshold=settings.pending_cluster_similarity,
+            window_secs=self.pending_window_secs,
+            clusters_per_camera=settings.pending_clusters_per_camera,
+            max_cameras=settings.pending_cluster_cameras,
+        )
+        # Results of recorded events by idempotency key, oldest first; a
+        # front for the face_event_receipts table, which is authoritative
+        # across restarts and processes
+        # recorded_events[(tenant_id, key)] = (timestamp, result)
+        self.recorded_events: "OrderedDict[tuple[str, str], tuple[float, Dict]]" = (
+            OrderedDict()
+        )
+        self.idempotency_ttl_secs = settings.event_idempotency_ttl_secs
+        self.idempotency_max_keys = settings.event_idempotency_max_keys
+        # Recently recognized customers, checked before the vector store; a
+        # hit must clear the strong-match threshold by a clear margin
+        self.identity_cache = IdentityCache(
+            capacity=settings.identity_cache_size,
+            ttl_secs=settings.identity_cache_ttl_secs,
+            hit_threshold=self.merge_distance_thr,
+            margin=self.merge_margin,
+        )
+        milvus_client.add_delete_listener(self._forget_identity)
+        # Open visits, updated in memory and flushed to their rows periodically
+        self.visit_sessions = VisitSessionTable(
+            flush_interval_secs=settings.visit_session_flush_secs,
+            enabled=settings.visit_session_cache,
+        )
+        # Customer last_seen / visit_count changes, applied in batches
+        self.customer_activity = CustomerActivityBuffer(
+            flush_interval_secs=settings.visit_session_flush_secs
+        )
 
         self.debug_mode = True
 
-    async def process_face_event(
-        self, event: FaceDetectedEvent, db_session: AsyncSession, tenant_id: int
-    ) -> Dict:
-        """Process a face detection event and return matching results"""
-
-        # Enhanced logging for debugging
-        is_manual_upload = hasattr(event, "_manual_face_data")
-        filename = getattr(event, "_manual_filename", "camera_stream")
-        logger.info(
-            f"🔍 Processing face event from {filename}: confidence={event.confidence:.3f}, bbox={event.bbox}, manual_upload={is_manual_upload}"
-        )
+    def _precheck_event(self, event: FaceDetectedEvent) -> Optional[Dict]:
+        """Staff, quality and size gating that needs no vector search.
 
+        Returns the final result for events that stop here, else None.
+        """
         # Skip if it's already identified as staff locally
         if event.is_staff_local:
             logger.info(f"Staff member identified locally: {event.staff_id}")
@@ -105,26 +164,213 @@ class FaceMatchingService:
         except Exception:
             pass
 
-        # Determine search and decision thresholds
-        is_manual_upload = hasattr(event, "_manual_face_data")
+        return None
+
+    def _replayed_result(self, tenant_id, event: FaceDetectedEvent) -> Optional[Dict]:
+        """Result of an already recorded event with the same idempotency key"""
+        if not event.idempotency_key:
+            return None
+        entry = self.recorded_events.get((str(tenant_id), event.idempotency_key))
+        if not entry or time.time() - entry[0] > self.idempotency_ttl_secs:
+            return None
+        logger.info(f"Ignoring replay of recorded event {event.idempotency_key}")
+        return {**entry[1], "message": "Duplicate event, already recorded"}
+
+    def _remember_result(self, tenant_id, event: FaceDetectedEvent, result: Dict):
+        if not event.idempotency_key or result.get("match") not in ("known", "new"):
+            return
+        key = (str(tenant_id), event.idempotency_key)
+        self.recorded_events[key] = (time.time(), result)
+        self.recorded_events.move_to_end(key)
+        cutoff = time.time() - self.idempotency_ttl_secs
+        while self.recorded_events and (
+            len(self.recorded_events) > self.idempotency_max_keys
+            or next(iter(self.recorded_events.values()))[0] < cutoff
+        ):
+            self.recorded_events.popitem(last=False)
+
+    async def _claim_event(
+        self, db_session: AsyncSession, tenant_id, event: FaceDetectedEvent
+    ) -> Optional[Dict]:
+        """Claim the event's idempotency key in the event's transaction.
+
+        Returns the stored result if another request (in any process, before
+        or after a restart) already recorded the event, else None. A
+        concurrent claim of the same key waits for that transaction.
+        """
+        if not event.idempotency_key:
+            return None
+        table = FaceEventReceipt.__table__
+        key = and_(
+            table.c.tenant_id == str(tenant_id),
+            table.c.idempotency_key == event.idempotency_key,
+        )
+        try:
+            async with db_session.begin_nested():
+                await db_session.execute(
+                    insert(table).values(
+                        tenant_id=str(tenant_id),
+                        idempotency_key=event.idempotency_key,
+                        result=None,
+                        created_at=datetime.utcnow(),
+                    )
+                )
+            return None
+        except IntegrityError:
+            pass
+
+        row = (
+            await db_session.execute(select(table.c.result, table.c.created_at).where(key))
+        ).one_or_none()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.idempotency_ttl_secs)
+        if row is not None and row.result and row.created_at >= cutoff:
+            logger.info(f"Ignoring replay of recorded event {event.idempotency_key}")
+            return {**row.result, "message": "Duplicate event, already recorded"}
+        # Expired, or dropped by its claimer in the meantime: take it over
+        if row is None:
+            await db_session.execute(
+                insert(table).values(
+                    tenant_id=str(tenant_id),
+                    idempotency_key=event.idempotency_key,
+                    result=None,
+                    created_at=datetime.utcnow(),
+                )
+            )
+        else:
+            await db_session.execute(
+                update(table).where(key).values(result=None, created_at=datetime.utcnow())
+            )
+        return None
+
+    async def _store_receipt(
+        self, db_session: AsyncSession, tenant_id, event: FaceDetectedEvent, result: Dict
+    ) -> None:
+        """Keep the result of a recorded event; other outcomes release the key
+        so a replay is evaluated again"""
+        if not event.idempotency_key:
+            return
+        table = FaceEventReceipt.__table__
+        key = and_(
+            table.c.tenant_id == str(tenant_id),
+            table.c.idempotency_key == event.idempotency_key,
+        )
+        if result.get("match") in ("known", "new"):
+            await db_session.execute(update(table).where(key).values(result=result))
+        else:
+            await db_session.execute(delete(table).where(key))
+
+    async def _record_event(
+        self,
+        event: FaceDetectedEvent,
+        similar_faces: List[Dict],
+        db_session: AsyncSession,
+        tenant_id,
+        batch: _EventBatch,
+    ) -> Dict:
+        """Resolve and record an event unless its idempotency key was already
+        recorded, keeping its receipt in the same transaction"""
+        recorded = await self._claim_event(db_session, tenant_id, event)
+        if recorded is not None:
+            return recorded
+        result = await self._resolve_and_record(
+            event, similar_faces, db_session, tenant_id, batch
+        )
+        await self._store_receipt(db_session, tenant_id, event, result)
+        return result
+
+    def _cached_matches(self, tenant_id, event: FaceDetectedEvent) -> Optional[List[Dict]]:
+        """Matches from the identity cache, or None to search the vector store"""
+        if not self.identity_cache.enabled or self._is_manual_import(event):
+            return None
+        return self.identity_cache.lookup(tenant_id, event.embedding)
+
+    def _remember_identity(self, tenant_id, event: FaceDetectedEvent, result: Dict):
+        if result["match"] in ("known", "new") and result["person_type"] == "customer":
+            self.identity_cache.remember(tenant_id, result["person_id"], event.embedding)
+
+    def _forget_identity(self, tenant_id: str, person_id: str, person_type: Optional[str]):
+        if person_type in (None, "customer"):
+            self.identity_cache.invalidate(tenant_id, person_id)
+
+    @staticmethod
+    def _is_manual_import(event: FaceDetectedEvent) -> bool:
+        """Whether the event comes from an imported image rather than a camera
+        worker; worker events carry a face crop as well"""
+        return getattr(event, "_manual_import", False)
+
+    def _search_threshold(self, is_manual_upload: bool) -> float:
         # Use a slightly lower search threshold to retrieve near misses, but keep decision thresholds strict
         if not is_manual_upload:
-            search_threshold = max(0.70, self.embedding_distance_thr - 0.05)
-        else:
-            search_threshold = max(self.merge_distance_thr, 0.95)
+            return max(0.70, self.embedding_distance_thr - 0.05)
+        return max(self.merge_distance_thr, 0.95)
+
+    async def process_face_event(
+        self, event: FaceDetectedEvent, db_session: AsyncSession, tenant_id: int
+    ) -> Dict:
+        """Process a face detection event and return matching results"""
+
+        # Enhanced logging for debugging
+        is_manual_upload = self._is_manual_import(event)
+        filename = getattr(event, "_manual_filename", "camera_stream")
         logger.info(
-            f"🔍 Thresholds: search={search_threshold:.3f}, merge={self.merge_distance_thr:.3f}, "
-            f"margin={self.merge_margin:.3f}, min_conf={self.min_confidence_score:.2f}"
+            f"🔍 Processing face event from {filename}: confidence={event.confidence:.3f}, bbox={event.bbox}, manual_upload={is_manual_upload}"
         )
+
+        replayed = self._replayed_result(tenant_id, event)
+        if replayed:
+            return replayed
+
+        rejection = self._precheck_event(event)
+        if rejection:
+            return rejection
+
+        # Determine search and decision thresholds
+        search_threshold = self._search_threshold(is_manual_upload)
         logger.info(
-            f"🔍 Searching Milvus for similar faces (limit={self.max_search_results})"
-        )
-        similar_faces = await milvus_client.search_similar_faces(
-            tenant_id=tenant_id,
-            embedding=event.embedding,
-            limit=self.max_search_results,
-            threshold=search_threshold,
+            f"🔍 Thresholds: search={search_threshold:.3f}, merge={self.merge_distance_thr:.3f}, "
+            f"margin={self.merge_margin:.3f}, min_conf={self.min_confidence_score:.2f}"
         )
+        similar_faces = self._cached_matches(tenant_id, event)
+        if similar_faces is None:
+            logger.info(
+                f"🔍 Searching Milvus for similar faces (limit={self.max_search_results})"
+            )
+            similar_faces = await milvus_client.search_similar_faces(
+                tenant_id=tenant_id,
+                embedding=event.embedding,
+                limit=self.max_search_results,
+                threshold=search_threshold,
+            )
+
+        # One transaction per event; uploads are undone if it fails
+        batch = _EventBatch()
+        try:
+            result = await self._record_event(
+                event, similar_faces, db_session, tenant_id, batch
+            )
+        except Exception:
+            await self._rollback_events(batch)
+            raise
+        await self._commit_events(db_session, tenant_id, batch)
+        self._remember_result(tenant_id, event, result)
+        self._remember_identity(tenant_id, event, result)
+        return result
+
+    async def _resolve_and_record(
+        self,
+        event: FaceDetectedEvent,
+        similar_faces: List[Dict],
+        db_session: AsyncSession,
+        tenant_id: int,
+        batch: _EventBatch,
+    ) -> Dict:
+        """Decide the identity from search results, then store embedding and visit.
+
+        Nothing is committed here: rows are flushed into the caller's
+        transaction and the Milvus insert is queued on ``batch`` until the
+        caller commits.
+        """
+        is_manual_upload = self._is_manual_import(event)
         logger.info(f"🔍 Milvus returned {len(similar_faces)} similar faces")
         for i, face in enumerate(similar_faces):
             logger.info(
@@ -197,36 +443,70 @@ class FaceMatchingService:
 
         if not person_id:
             # Cluster gating: require min samples within small window before creating a new customer
-            def _coarse_key(vec: List[float]) -> str:
-                # Round first 16 dims to 2 decimals as coarse signature
-                return ",".join(f"{v:.2f}" for v in vec[:16])
+            cluster_key = self.pending_clusters.key(tenant_id, event.site_id, event.camera_id)
+            cluster = self.pending_clusters.observe(cluster_key, event.embedding)
+            if cluster.person_id is not None:
+                if cluster.similarity < self.embedding_distance_thr:
+                    # Held to the same bar as a vector-store match; a second
+                    # customer for the cluster is not created either
+                    logger.info(
+                        f"⏳ Too far from new customer {cluster.person_id} of its cluster: "
+                        f"{cluster.similarity:.3f} < {self.embedding_distance_thr:.3f}"
+                    )
+                    return {
+                        "match": "rejected",
+                        "person_id": None,
+                        "similarity": 0.0,
+                        "visit_id": None,
+                        "person_type": "customer",
+                        "message": "Ambiguous match to a new customer",
+                    }
+                # Same face as a customer just created from this camera
+                person_id = cluster.person_id
+                person_type = "customer"
+                similarity = cluster.similarity
+                match_type = "known"
+                logger.info(f"🟢 Joined the cluster of new customer {person_id}")
 
-            pkey = (
-                str(tenant_id),
-                int(event.site_id),
-                int(event.camera_id),
-                _coarse_key(event.embedding),
-            )
-            now_ts = time.time()
+        if not person_id:
             window = self.pending_window_secs
-            lst = self.pending.get(pkey, [])
-            # prune old
-            lst = [(ts, emb) for ts, emb in lst if (now_ts - ts) <= window]
-            lst.append((now_ts, event.embedding))
-            self.pending[pkey] = lst
+
+            # Worker tracks are reported at birth and again once they are long
+            # enough, so a track's length counts as samples of the same face
+            track_length = event.track_length
+            if (
+                not is_manual_upload
+                and track_length is not None
+                and track_length < self.min_track_length
+            ):
+                logger.info(
+                    f"⏳ Deferring new customer creation: track length {track_length}/{self.min_track_length}"
+                )
+                return {
+                    "match": "rejected",
+                    "person_id": None,
+                    "similarity": 0.0,
+                    "visit_id": None,
+                    "person_type": "customer",
+                    "message": "Track too short for new identity",
+                }
 
             # Allow manual uploads to create a customer immediately (required_samples=1)
             required_samples = 1 if is_manual_upload else self.min_cluster_samples
-            if len(lst) >= required_samples:
+            samples = max(cluster.samples, track_length or 0)
+            if samples >= required_samples:
                 logger.info(
                     f"🆕 Creating new customer after cluster min_samples={required_samples}"
                 )
                 person_id = await self._create_new_customer(db_session, tenant_id)
                 person_type = "customer"
+                self.pending_clusters.assign(cluster_key, cluster.cluster_id, person_id)
+                # Undone if the customer is rolled back
+                batch.clusters.append((cluster_key, cluster.cluster_id))
             else:
                 # Not enough evidence; treat as rejected to avoid over-segmentation
                 logger.info(
-                    f"⏳ Deferring new customer creation: {len(lst)}/{required_samples} samples in {window}s"
+                    f"⏳ Deferring new customer creation: {samples}/{required_samples} samples in {window}s"
                 )
                 return {
                     "match": "rejected",
@@ -239,19 +519,20 @@ class FaceMatchingService:
 
         # Store the embedding in Milvus (with quality check)
         if event.confidence >= self.min_confidence_score:
-            current_time = int(time.time())
-            await milvus_client.insert_embedding(
-                tenant_id=tenant_id,
-                person_id=person_id,
-                person_type=person_type,
-                embedding=event.embedding,
-                created_at=current_time,
+            batch.embeddings.append(
+                {
+                    "tenant_id": tenant_id,
+                    "person_id": person_id,
+                    "person_type": person_type,
+                    "embedding": event.embedding,
+                    "created_at": int(time.time()),
+                }
             )
             logger.info(
-                f"Stored embedding for {person_type} {person_id} with confidence {event.confidence:.3f}"
+                f"Queued embedding for {person_type} {person_id} with confidence {event.confidence:.3f}"
             )
 
-        # Create visit record (this will commit the customer and visit together)
+        # Create visit record (committed with the customer by the caller)
         visit_id = await self._create_visit_record(
             db_session=db_session,
             tenant_id=tenant_id,
@@ -259,12 +540,9 @@ class FaceMatchingService:
             person_id=person_id,
             person_type=person_type,
             confidence_score=similarity,
+            batch=batch,
         )
 
-        # Update customer last_seen
-        if person_type == "customer":
-            await self._update_customer_last_seen(db_session, tenant_id, person_id)
-
         # Update recent assignment cache for hysteresis
         try:
             self.recent_assignments[(str(tenant_id), int(event.camera_id))] = (
@@ -293,8 +571,14 @@ class FaceMatchingService:
         face_image_filename: str,
         db_session: AsyncSession,
         tenant_id: int,
+        manual_import: bool = False,
     ) -> Dict:
-        """Process a face detection event with uploaded face image and return matching results"""
+        """Process a face detection event with uploaded face image and return matching results
+
+        ``manual_import`` marks faces from a user's image import, which may
+        create a customer from a single sample; worker crops are gated like
+        any other camera event.
+        """
 
         # Store the face image data directly on the event for later use
         # This avoids unnecessary upload/download cycles
@@ -302,6 +586,8 @@ class FaceMatchingService:
 
         # Add filename for tracking
         event._manual_filename = face_image_filename
+        if manual_import:
+            event._manual_import = True
 
         # Process the event normally (this will handle face matching and visit creation)
         result = await self.process_face_event(event, db_session, tenant_id)
@@ -310,9 +596,113 @@ class FaceMatchingService:
         delattr(event, "_manual_face_data")
         if hasattr(event, "_manual_filename"):
             delattr(event, "_manual_filename")
+        if hasattr(event, "_manual_import"):
+            delattr(event, "_manual_import")
 
         return result
 
+    async def process_face_events_batch(
+        self,
+        items: List[Tuple[FaceDetectedEvent, Optional[bytes], str]],
+        db_session: AsyncSession,
+        tenant_id: int,
+    ) -> List[Dict]:
+        """Process several worker events with batched searches and one commit.
+
+        ``items`` are ``(event, face_image_bytes, filename)``. Results are
+        returned per event, in order; an event that fails is rolled back to
+        its savepoint and reported without affecting the rest of the batch.
+        """
+        results: List[Optional[Dict]] = [None] * len(items)
+
+        # Same handling of attached crops as process_face_event_with_image
+        for event, face_image_data, filename in items:
+            if face_image_data is not None:
+                event._manual_face_data = face_image_data
+                event._manual_filename = filename
+
+        try:
+            # Gate first so only surviving events are searched, grouped by
+            # search threshold so each group is a single Milvus request
+            to_search: Dict[float, List[int]] = {}
+            similar: Dict[int, List[Dict]] = {}
+            duplicates: Dict[int, int] = {}
+            first_by_key: Dict[str, int] = {}
+            for i, (event, _, _) in enumerate(items):
+                replayed = self._replayed_result(tenant_id, event)
+                if replayed:
+                    results[i] = replayed
+                    continue
+                if event.idempotency_key in first_by_key:
+                    duplicates[i] = first_by_key[event.idempotency_key]
+                    continue
+                if event.idempotency_key:
+                    first_by_key[event.idempotency_key] = i
+                rejection = self._precheck_event(event)
+                if rejection:
+                    results[i] = rejection
+                    continue
+                cached = self._cached_matches(tenant_id, event)
+                if cached is not None:
+                    similar[i] = cached
+                    continue
+                threshold = self._search_threshold(self._is_manual_import(event))
+                to_search.setdefault(threshold, []).append(i)
+
+            for threshold, indices in to_search.items():
+                matches = await milvus_client.search_similar_faces_batch(
+                    tenant_id=tenant_id,
+                    embeddings=[items[i][0].embedding for i in indices],
+                    limit=self.max_search_results,
+                    threshold=threshold,
+                )
+                similar.update(zip(indices, matches))
+
+            # Resolve in arrival order so hysteresis and visit merging behave
+            # as if the events had been sent one by one
+            batch = _EventBatch()
+            for i in sorted(similar):
+                mark = batch.mark()
+                try:
+                    async with db_session.begin_nested():
+                        results[i] = await self._record_event(
+                            items[i][0], similar[i], db_session, tenant_id, batch
+                        )
+                except Exception as e:
+                    logger.error(f"Failed to process batched face event {i}: {e}")
+                    await self._rollback_events(batch, mark)
+                    results[i] = {
+                        "match": "error",
+                        "person_id": None,
+                        "similarity": 0.0,
+                        "visit_id": None,
+                        "person_type": "customer",
+                        "message": f"Processing failed: {e}",
+                    }
+
+            await self._commit_events(db_session, tenant_id, batch)
+
+            for i in similar:
+                self._remember_result(tenant_id, items[i][0], results[i])
+                self._remember_identity(tenant_id, items[i][0], results[i])
+            for i, first in duplicates.items():
+                results[i] = self._replayed_result(tenant_id, items[first][0]) or {
+                    **results[first],
+                    "message": "Duplicate event in batch",
+                }
+        finally:
+            for event, _, _ in items:
+                if hasattr(event, "_manual_face_data"):
+                    delattr(event, "_manual_face_data")
+                if hasattr(event, "_manual_filename"):
+                    delattr(event, "_manual_filename")
+
+        logger.info(
+            f"Processed batch of {len(items)} face events: "
+            f"{sum(1 for r in results if r and r['match'] in ('known', 'new'))} recorded"
+        )
+        return results
+
     async def _create_new_customer(
         self, db_session: AsyncSession, tenant_id: int
     ) -> int:
@@ -337,11 +727,10 @@ class FaceMatchingService:
         person_id: int,
         person_type: str,
         confidence_score: float,
+        batch: _EventBatch,
     ) -> str:
         """Create or update a visit record with session-based deduplication"""
-        from datetime import timedelta
-
-        visit_merge_window = timedelta(minutes=30)  # 30-minute merge window
+        visit_merge_window = self.visit_sessions.merge_window
         current_time = (
             event.timestamp.replace(tzinfo=None)
             if event.timestamp.tzinfo
@@ -376,26 +765,14 @@ class FaceMatchingService:
                 logger.warning(f"Failed to download face image: {e}")
 
         # If we have a real cropped face (manual or worker) but no visit image yet, upload it for the visit
+        # (stored by content, so the gallery copy of the same crop is not uploaded again)
         if not image_path and face_image_bytes:
             try:
-                from ..core.minio_client import minio_client
-
-                # Store visit snapshots in faces-derived bucket and reference with visits-faces/ prefix
-                object_name = f"visits/{tenant_id}/{uuid.uuid4().hex[:8]}.jpg"
-
-                # Run upload sync in default thread to avoid blocking event loop
-                def _upload_sync():
-                    return minio_client.upload_image(
-                        bucket="faces-derived",
-                        object_name=object_name,
-                        data=face_image_bytes,
-                        content_type="image/jpeg",
-                    )
-
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, _upload_sync)
-                image_path = f"visits-faces/{object_name}"
-                logger.info(f"✅ Uploaded visit face snapshot: {image_path}")
+                image_path = await face_image_store.acquire(
+                    db_session, tenant_id, face_image_bytes, batch.objects
+                )
+                if image_path:
+                    logger.info(f"✅ Stored visit face snapshot: {image_path}")
             except Exception as e:
                 logger.warning(
                     f"Failed to upload visit face snapshot, will try fallback: {e}"
@@ -408,7 +785,6 @@ class FaceMatchingService:
         if not image_path and event.bbox and len(event.bbox) >= 4:
             logger.info("Attempting to generate fallback face crop from bbox")
             try:
-                from ..core.minio_client import minio_client
                 from .image_processing import image_processor
 
                 face_crop_bytes = await image_processor.generate_face_crop_from_bbox(
@@ -419,10 +795,8 @@ class FaceMatchingService:
                 )
 
                 if face_crop_bytes:
-                    image_path = await image_processor.upload_generated_image(
-                        image_bytes=face_crop_bytes,
-                        minio_client=minio_client,
-                        bucket="faces-derived",
+                    image_path = await face_image_store.acquire(
+                        db_session, tenant_id, face_crop_bytes, batch.objects
                     )
 
                     if image_path:
@@ -442,6 +816,51 @@ class FaceMatchingService:
                 logger.error(f"Traceback: {traceback.format_exc()}")
                 # Continue without image - not critical
 
+        # An open session in memory absorbs the detection without touching the
+        # database; its row is brought up to date by the next flush
+        session_key = VisitSessionTable.key(tenant_id, person_type, person_id, event.site_id)
+        open_session = self.visit_sessions.get(session_key, current_time)
+        if open_session is not None:
+            previous_image = open_session.image_path
+            self._record_session_detection(
+                open_session,
+                batch,
+                current_time,
+                confidence_score,
+                image_path,
+                event.bbox,
+                pack_embedding(event.embedding),
+            )
+            if image_path and (
+                open_session.image_path != image_path or previous_image == image_path
+            ):
+                # Not kept (or already referenced); drop the reference taken for it
+                await face_image_store.release(
+                    db_session, tenant_id, [image_path], batch.objects
+                )
+
+            if person_type == "customer" and face_image_bytes:
+                await self._save_gallery_image(
+                    db_session,
+                    tenant_id,
+                    person_id,
+                    face_image_bytes,
+                    event,
+                    open_session.visit_id,
+                    batch,
+                )
+
+            self._record_customer_activity(
+                tenant_id, person_id, person_type, current_time, False, batch
+            )
+
+            logger.info(
+                f"Updated open visit session {open_session.visit_session_id}: "
+                f"duration={open_session.duration_seconds}s, "
+                f"detections={open_session.detection_count}"
+            )
+            return open_session.visit_id
+
         # Look for existing visit session within the merge window
         cutoff_time = current_time - visit_merge_window
 
@@ -483,39 +902,42 @@ class FaceMatchingService:
                 )
 
             # Update image path if this detection has an image and previous didn't, or if confidence is higher
+            unused_image = image_path
             if image_path and (
                 not existing_visit.image_path or confidence_score > original_confidence
             ):
+                unused_image = existing_visit.image_path
                 existing_visit.image_path = image_path
                 # Update bounding box info for the best detection
                 existing_visit.bbox_x = event.bbox[0] if len(event.bbox) >= 4 else None
                 existing_visit.bbox_y = event.bbox[1] if len(event.bbox) >= 4 else None
                 existing_visit.bbox_w = event.bbox[2] if len(event.bbox) >= 4 else None
                 existing_visit.bbox_h = event.bbox[3] if len(event.bbox) >= 4 else None
-                existing_visit.face_embedding = json.dumps(event.embedding)
+                existing_visit.face_embedding_vec = pack_embedding(event.embedding)
+                existing_visit.face_embedding = None
+            if unused_image:
+                await face_image_store.release(
+                    db_session, tenant_id, [unused_image], batch.objects
+                )
 
-            await db_session.commit()
+            # Flushed so later events of the transaction see this one's rows
+            await db_session.flush()
+            self._open_visit_session(session_key, existing_visit, batch)
+            self._record_customer_activity(
+                tenant_id, person_id, person_type, current_time, False, batch
+            )
 
             # Save face image to customer gallery if we have image data
-            # Use original detection confidence; allow manual uploads at lower threshold via service policy
             if person_type == "customer" and face_image_bytes:
-                try:
-                    await self._save_customer_face_image(
-                        db_session,
-                        tenant_id,
-                        person_id,
-                        face_image_bytes,
-                        event.confidence,
-                        event.bbox,
-                        event.embedding,
-                        existing_visit.visit_id,
-                        manual_upload=hasattr(event, "_manual_face_data"),
-                    )
-                except Exception as e:
-                    # Don't let face gallery errors break the main transaction
-                    logger.warning(
-                        f"Failed to save customer face image, continuing: {e}"
-                    )
+                await self._save_gallery_image(
+                    db_session,
+                    tenant_id,
+                    person_id,
+                    face_image_bytes,
+                    event,
+                    existing_visit.visit_id,
+                    batch,
+                )
 
             logger.info(
                 f"Updated existing visit session {existing_visit.visit_session_id}: "
@@ -544,7 +966,7 @@ class FaceMatchingService:
                 detection_count=1,
                 confidence_score=confidence_score,
                 highest_confidence=confidence_score,
-                face_embedding=json.dumps(event.embedding),
+                face_embedding_vec=pack_embedding(event.embedding),
                 image_path=image_path,
                 bbox_x=event.bbox[0] if len(event.bbox) >= 4 else None,
                 bbox_y=event.bbox[1] if len(event.bbox) >= 4 else None,
@@ -553,28 +975,24 @@ class FaceMatchingService:
             )
 
             db_session.add(visit)
-            await db_session.commit()
+            # Flushed so later events of the transaction see this one's rows
+            await db_session.flush()
+            self._open_visit_session(session_key, visit, batch)
+            self._record_customer_activity(
+                tenant_id, person_id, person_type, current_time, True, batch
+            )
 
             # Save face image to customer gallery if we have image data
-            # Use original detection confidence; allow manual uploads at lower threshold via service policy
             if person_type == "customer" and face_image_bytes:
-                try:
-                    await self._save_customer_face_image(
-                        db_session,
-                        tenant_id,
-                        person_id,
-                        face_image_bytes,
-                        event.confidence,
-                        event.bbox,
-                        event.embedding,
-                        visit_id,
-                        manual_upload=hasattr(event, "_manual_face_data"),
-                    )
-                except Exception as e:
-                    # Don't let face gallery errors break the main transaction
-                    logger.warning(
-                        f"Failed to save customer face image, continuing: {e}"
-                    )
+                await self._save_gallery_image(
+                    db_session,
+                    tenant_id,
+                    person_id,
+                    face_image_bytes,
+                    event,
+                    visit_id,
+                    batch,
+                )
 
             logger.info(
                 f"Created new visit session {session_id} for person {person_id}, image_path={'Yes' if image_path else 'No'}"
@@ -582,21 +1000,142 @@ class FaceMatchingService:
 
             return visit_id
 
-    async def _update_customer_last_seen(
-        self, db_session: AsyncSession, tenant_id: int, customer_id: int
+    async def _commit_events(
+        self, db_session: AsyncSession, tenant_id, batch: _EventBatch
     ):
-        """Update customer's last seen timestamp and visit count"""
-        stmt = (
-            update(Customer)
-            .where(Customer.tenant_id == tenant_id, Customer.customer_id == customer_id)
-            .values(
-                last_seen=datetime.utcnow(),
-                visit_count=Customer.visit_count + 1,
+        """Commit the events' transaction, then apply their deferred side effects"""
+        try:
+            await db_session.commit()
+        except Exception:
+            await self._rollback_events(batch)
+            raise
+
+        for session, _, _ in batch.session_changes:
+            session.in_flight -= 1
+        for args in batch.customer_activity:
+            self.customer_activity.record(*args)
+        await batch.objects.commit()
+        if batch.embeddings:
+            try:
+                await milvus_client.insert_embeddings(batch.embeddings)
+            except Exception as e:
+                logger.error(f"Failed to store {len(batch.embeddings)} embeddings: {e}")
+        if self.visit_sessions.flush_due(tenant_id):
+            await self._flush_write_behind(db_session, tenant_id)
+
+    async def _rollback_events(self, batch: _EventBatch, mark: Optional[tuple] = None):
+        """Undo the side effects queued since ``mark`` (all when None)"""
+        embeddings, sessions, changes, activity, galleries, clusters, objects = (
+            mark or _EventBatch().mark()
+        )
+        del batch.embeddings[embeddings:]
+        self.visit_sessions.discard(batch.opened_sessions[sessions:])
+        del batch.opened_sessions[sessions:]
+        for session, state, version in reversed(batch.session_changes[changes:]):
+            session.in_flight -= 1
+            if session.version == version:
+                closed = session.closed
+                session.restore(state)
+                session.closed = session.closed or closed
+            else:
+                # Changed by another transaction meanwhile; rather than write
+                # either state, drop it so the next detection reloads the row
+                # (the version bump sends that transaction's rollback here too)
+                session.version += 1
+                session.closed = True
+                session.flushed_version = session.version
+        del batch.session_changes[changes:]
+        del batch.customer_activity[activity:]
+        if batch.galleries[galleries:]:
+            from .customer_face_service import customer_face_service
+
+            for tenant_id, customer_id in batch.galleries[galleries:]:
+                customer_face_service.gallery_rankings.invalidate(tenant_id, [customer_id])
+            del batch.galleries[galleries:]
+        for cluster_key, cluster_id in batch.clusters[clusters:]:
+            self.pending_clusters.assign(cluster_key, cluster_id, None)
+        del batch.clusters[clusters:]
+        await batch.objects.rollback(objects)
+
+    @staticmethod
+    def _record_session_detection(
+        session: VisitSession, batch: _EventBatch, *detection
+    ) -> None:
+        """Merge a detection into an open session, restored if the
+        transaction rolls back and not flushed before it commits"""
+        state = session.snapshot()
+        session.record_detection(*detection)
+        session.in_flight += 1
+        batch.session_changes.append((session, state, session.version))
+
+    def _open_visit_session(self, key, visit: Visit, batch: _EventBatch):
+        self.visit_sessions.open(key, VisitSession.from_visit(visit))
+        # Dropped again if the transaction is rolled back
+        batch.opened_sessions.append(key)
+
+    def _record_customer_activity(
+        self,
+        tenant_id,
+        person_id,
+        person_type: str,
+        seen_at: datetime,
+        new_visit: bool,
+        batch: _EventBatch,
+    ):
+        """Count the detection towards the customer's last_seen and visit_count
+        once the transaction commits"""
+        if person_type == "customer":
+            batch.customer_activity.append((tenant_id, person_id, seen_at, new_visit))
+
+    async def _flush_write_behind(self, db_session: AsyncSession, tenant_id):
+        """Piggyback the tenant's pending visit and customer updates on a request"""
+        try:
+            await self.visit_sessions.flush(db_session, tenant_id)
+            await self.customer_activity.flush(db_session, tenant_id)
+            await self._purge_receipts(db_session, tenant_id)
+        except Exception as e:
+            # Pending changes stay in memory for the next flush
+            logger.warning(f"Failed to flush pending visit/customer updates: {e}")
+            await db_session.rollback()
+
+    async def _purge_receipts(self, db_session: AsyncSession, tenant_id) -> None:
+        """Forget recorded idempotency keys older than the replay window"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.idempotency_ttl_secs)
+        table = FaceEventReceipt.__table__
+        await db_session.execute(
+            delete(table).where(
+                and_(table.c.tenant_id == str(tenant_id), table.c.created_at < cutoff)
             )
         )
-        await db_session.execute(stmt)
         await db_session.commit()
 
+    async def _save_gallery_image(
+        self,
+        db_session: AsyncSession,
+        tenant_id: int,
+        person_id: int,
+        face_image_bytes: bytes,
+        event: FaceDetectedEvent,
+        visit_id: str,
+        batch: _EventBatch,
+    ):
+        """Add the crop to the customer gallery within the event's transaction"""
+        # Its cached ranking is dropped again if the transaction rolls back
+        batch.galleries.append((tenant_id, person_id))
+        # Use original detection confidence; allow manual uploads at lower threshold via service policy
+        await self._save_customer_face_image(
+            db_session,
+            tenant_id,
+            person_id,
+            face_image_bytes,
+            event.confidence,
+            event.bbox,
+            event.embedding,
+            visit_id,
+            batch.objects,
+            manual_upload=self._is_manual_import(event),
+        )
+
     async def _save_customer_face_image(
         self,
         db_session: AsyncSession,
@@ -607,79 +1146,56 @@ class FaceMatchingService:
         bbox: List[float],
         embedding: List[float],
         visit_id: str,
+        staging: StagedObjects,
         manual_upload: bool = False,
     ):
-        """Save face image to customer gallery using a fresh database session"""
-        fresh_session = None
-        try:
-            import asyncio
-
-            from ..core.database import get_db_session
-            from .customer_face_service import customer_face_service
-
-            # Add a small delay to ensure the main transaction is fully committed
-            # This helps avoid race conditions with fresh database sessions
-            await asyncio.sleep(0.1)
+        """Save face image to customer gallery in a savepoint of ``db_session``.
 
-            # Get a fresh database session to avoid rollback issues
-            # The customer should already be committed at this point
-            fresh_session_generator = get_db_session()
-            fresh_session = await fresh_session_generator.__anext__()
-
-            # Set tenant context for the fresh session
-            from ..core.database import db
-
-            await db.set_tenant_context(fresh_session, tenant_id)
-
-            # Extract metadata for quality assessment
-            metadata = {
-                "source": "manual_upload" if manual_upload else "worker_detection",
-                "visit_id": visit_id,
-                "bbox": bbox,
-            }
+        A failed gallery write is rolled back (including its upload) without
+        affecting the visit; it is committed together with the visit.
+        """
+        from .customer_face_service import customer_face_service
 
-            logger.info(
-                f"🖼️ Attempting to save face image to customer {customer_id} gallery: confidence={confidence_score:.3f}, manual_upload={manual_upload}, bytes={len(face_image_bytes)}"
-            )
+        # Extract metadata for quality assessment
+        metadata = {
+            "source": "manual_upload" if manual_upload else "worker_detection",
+            "visit_id": visit_id,
+            "bbox": bbox,
+        }
 
-            result = await customer_face_service.add_face_image(
-                db=fresh_session,
-                tenant_id=tenant_id,
-                customer_id=customer_id,
-                image_data=face_image_bytes,
-                confidence_score=confidence_score,
-                face_bbox=bbox,
-                embedding=embedding,
-                visit_id=visit_id,
-                metadata=metadata,
-            )
+        logger.info(
+            f"🖼️ Attempting to save face image to customer {customer_id} gallery: confidence={confidence_score:.3f}, manual_upload={manual_upload}, bytes={len(face_image_bytes)}"
+        )
 
-            if result:
-                # Commit the fresh session
-                await fresh_session.commit()
-                logger.info(
-                    f"✅ Saved face image to customer {customer_id} gallery with confidence {confidence_score:.3f} (manual_upload={manual_upload})"
-                )
-            else:
-                logger.debug(
-                    f"⚠️ Face image not saved to customer {customer_id} gallery (quality/duplicate/below_threshold)"
+        mark = staging.mark()
+        try:
+            async with db_session.begin_nested():
+                result = await customer_face_service.add_face_image(
+                    db=db_session,
+                    tenant_id=tenant_id,
+                    customer_id=customer_id,
+                    image_data=face_image_bytes,
+                    confidence_score=confidence_score,
+                    face_bbox=bbox,
+                    embedding=embedding,
+                    visit_id=visit_id,
+                    metadata=metadata,
+                    staging=staging,
                 )
-
         except Exception as e:
+            # Don't re-raise - this is a non-critical operation
+            await staging.rollback(mark)
             logger.error(f"❌ Error saving face image to customer gallery: {e}")
-            import traceback
+            return
 
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            # Don't re-raise - this is a non-critical operation
-        finally:
-            # Clean up the fresh session
-            if fresh_session:
-                try:
-                    await fresh_session.close()
-                except Exception as cleanup_error:
-                    logger.warning(f"Error closing fresh session: {cleanup_error}")
-            # Don't re-raise - this is a non-critical operation
-            # Don't re-raise - this is a non-critical operation
+        if result:
+            logger.info(
+                f"✅ Saved face image to customer {customer_id} gallery with confidence {confidence_score:.3f} (manual_upload={manual_upload})"
+            )
+        else:
+            logger.debug(
+                f"⚠️ Face image not saved to customer {customer_id} gallery (quality/duplicate/below_threshold)"
+            )
 
     async def cleanup_duplicate_embeddings(
         self, db_session: AsyncSession, tenant_id: int
@@ -826,6 +1342,122 @@ class StaffService:
             if staff.face_embedding
         ]
 
+    @staticmethod
+    def _site_filter(tenant_id: str, site_id: Optional[int]):
+        # Staff without a site are tenant-wide and apply to every site
+        conditions = [Staff.tenant_id == tenant_id]
+        if site_id is not None:
+            conditions.append(or_(Staff.site_id == site_id, Staff.site_id.is_(None)))
+        return and_(*conditions)
+
+    @staticmethod
+    def _to_millis(value: Optional[datetime]) -> int:
+        if value is None:
+            return 0
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+
+    async def get_staff_vector_version(
+        self,
+        db_session: AsyncSession,
+        tenant_id: str,
+        site_id: Optional[int] = None,
+    ) -> str:
+        """Opaque version of the staff vector set: ``<last-change-ms>-<staff>-<images>``
+
+        The counts make deletions change the version even though they leave
+        no timestamp behind.
+        """
+        site_filter = self._site_filter(tenant_id, site_id)
+        staff_row = (
+            await db_session.execute(
+                select(func.max(Staff.updated_at), func.count(Staff.staff_id)).where(
+                    site_filter
+                )
+            )
+        ).one()
+        image_row = (
+            await db_session.execute(
+                select(
+                    func.max(StaffFaceImage.updated_at),
+                    func.count(StaffFaceImage.image_id),
+                )
+                .join(Staff, Staff.staff_id == StaffFaceImage.staff_id)
+                .where(site_filter, StaffFaceImage.face_embedding.isnot(None))
+            )
+        ).one()
+
+        last_change = max(self._to_millis(staff_row[0]), self._to_millis(image_row[0]))
+        return f"{last_change}-{staff_row[1] or 0}-{image_row[1] or 0}"
+
+    async def get_staff_vectors(
+        self,
+        db_session: AsyncSession,
+        tenant_id: str,
+        site_id: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> Tuple[bool, List[int], List[Tuple[int, List[float]]]]:
+        """Staff vectors for the sync feed.
+
+        Returns ``(full, active_ids, rows)``. With a parseable ``since``
+        version only staff changed at or after it are included in ``rows``;
+        ``active_ids`` always lists every active staff member with vectors so
+        receivers can drop deleted or deactivated staff.
+        """
+        since_dt: Optional[datetime] = None
+        if since:
+            try:
+                since_dt = datetime.utcfromtimestamp(int(since.split("-")[0]) / 1000)
+            except (ValueError, OverflowError):
+                since_dt = None
+        full = since_dt is None
+
+        site_filter = and_(self._site_filter(tenant_id, site_id), Staff.is_active)
+        staff_result = await db_session.execute(
+            select(Staff.staff_id, Staff.updated_at, Staff.face_embedding).where(
+                site_filter
+            )
+        )
+        staff_rows = staff_result.all()
+
+        image_result = await db_session.execute(
+            select(
+                StaffFaceImage.staff_id,
+                StaffFaceImage.updated_at,
+                StaffFaceImage.face_embedding,
+            )
+            .join(Staff, Staff.staff_id == StaffFaceImage.staff_id)
+            .where(site_filter, StaffFaceImage.face_embedding.isnot(None))
+            .order_by(StaffFaceImage.staff_id, StaffFaceImage.created_at)
+        )
+        images_by_staff: Dict[int, List[Tuple[datetime, str]]] = {}
+        for staff_id, updated_at, embedding in image_result.all():
+            images_by_staff.setdefault(staff_id, []).append((updated_at, embedding))
+
+        active_ids: List[int] = []
+        rows: List[Tuple[int, List[float]]] = []
+        for staff_id, updated_at, legacy_embedding in staff_rows:
+            images = images_by_staff.get(staff_id, [])
+            if not images and not legacy_embedding:
+                continue
+            active_ids.append(staff_id)
+
+            changed = full or updated_at >= since_dt
+            changed = changed or any(ts >= since_dt for ts, _ in images)
+            if not changed:
+                continue
+
+            # Face images supersede the legacy single embedding
+            embeddings = [embedding for _, embedding in images] or [legacy_embedding]
+            for embedding in embeddings:
+                try:
+                    rows.append((staff_id, json.loads(embedding)))
+                except (TypeError, ValueError):
+                    logger.warning(f"Skipping malformed embedding for staff {staff_id}")
+
+        return full, active_ids, rows
+
 
 # Service instances
 face_service = FaceMatchingService()
@@ -0,0 +1,178 @@
+"""
+Incrementally maintained customer gallery rankings
+
+Deciding whether a new face image makes it into a customer's gallery used
+to cost a COUNT and an ORDER BY over the gallery on every detection. The
+ranking of each recently active customer's gallery is now kept in memory:
+its size, its images ordered by eviction score and their hashes. A new
+image is accepted or rejected by comparing it with the current worst entry,
+before anything is uploaded.
+
+The eviction score is ``confidence + quality + age_days * 0.01``. Its age
+term grows at the same rate for every image, so the order it induces never
+changes and each image can be ranked once by
+``confidence + quality - created_days * 0.01``.
+
+Galleries are loaded on first use and dropped when they expire, when the
+transaction that changed them rolls back and when gallery rows are
+changed outside of ingestion (merges, reassignments, deletions).
+"""
+
+import bisect
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.database import CustomerFaceImage
+
+GalleryKey = Tuple[str, int]
+
+_SECONDS_PER_DAY = 86400
+_AGE_WEIGHT = 0.01  # per day
+
+
+def rank_score(
+    confidence: Optional[float], quality: Optional[float], created_at: datetime
+) -> float:
+    """Time-invariant eviction score of an image; lower is evicted first"""
+    return (
+        float(confidence or 0.0)
+        + float(0.5 if quality is None else quality)
+        - created_at.timestamp() / _SECONDS_PER_DAY * _AGE_WEIGHT
+    )
+
+
+@dataclass(order=True)
+class GalleryEntry:
+    rank: float
+    image_id: int
+    image_hash: Optional[str] = field(default=None, compare=False)
+    image_path: Optional[str] = field(default=None, compare=False)
+
+
+class CustomerGallery:
+    """One customer's gallery images, worst first"""
+
+    def __init__(self, entries: Iterable[GalleryEntry] = ()):
+        self.entries: List[GalleryEntry] = sorted(entries)
+        self.by_hash: Dict[str, int] = {
+            e.image_hash: e.image_id for e in self.entries if e.image_hash
+        }
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def worst(self) -> Optional[GalleryEntry]:
+        return self.entries[0] if self.entries else None
+
+    def accepts(self, rank: float, capacity: int) -> bool:
+        """Whether an image ranked ``rank`` would survive being added"""
+        return len(self.entries) < capacity or rank > self.entries[0].rank
+
+    def add(self, entry: GalleryEntry) -> None:
+        bisect.insort(self.entries, entry)
+        if entry.image_hash:
+            self.by_hash[entry.image_hash] = entry.image_id
+
+    def pop_excess(self, capacity: int) -> List[GalleryEntry]:
+        """Remove and return the worst entries beyond ``capacity``"""
+        excess = max(0, len(self.entries) - capacity)
+        evicted, self.entries = self.entries[:excess], self.entries[excess:]
+        for entry in evicted:
+            if entry.image_hash and self.by_hash.get(entry.image_hash) == entry.image_id:
+                del self.by_hash[entry.image_hash]
+        return evicted
+
+
+class GalleryRankingCache:
+    """Bounded LRU cache of customer gallery rankings"""
+
+    def __init__(self, capacity: int = 5000, ttl_secs: float = 300.0):
+        self.capacity = capacity
+        self.ttl_secs = ttl_secs
+        self._galleries: "OrderedDict[GalleryKey, CustomerGallery]" = OrderedDict()
+
+        # Statistics
+        self.stats = {
+            "hits": 0,
+            "loads": 0,
+            "rejected": 0,
+            "evicted_images": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @staticmethod
+    def key(tenant_id, customer_id) -> GalleryKey:
+        return (str(tenant_id), int(customer_id))
+
+    def get(self, tenant_id, customer_id) -> Optional[CustomerGallery]:
+        key = self.key(tenant_id, customer_id)
+        gallery = self._galleries.get(key)
+        if gallery is None:
+            return None
+        if time.monotonic() - gallery.loaded_at >= self.ttl_secs:
+            del self._galleries[key]
+            return None
+        self._galleries.move_to_end(key)
+        self.stats["hits"] += 1
+        return gallery
+
+    async def load(self, db: AsyncSession, tenant_id, customer_id) -> CustomerGallery:
+        """Read a customer's gallery ranking from the database and cache it"""
+        result = await db.execute(
+            select(
+                CustomerFaceImage.image_id,
+                CustomerFaceImage.confidence_score,
+                CustomerFaceImage.quality_score,
+                CustomerFaceImage.created_at,
+                CustomerFaceImage.image_hash,
+                CustomerFaceImage.image_path,
+            ).where(
+                and_(
+                    CustomerFaceImage.tenant_id == tenant_id,
+                    CustomerFaceImage.customer_id == customer_id,
+                )
+            )
+        )
+        gallery = CustomerGallery(
+            GalleryEntry(
+                rank=rank_score(row.confidence_score, row.quality_score, row.created_at),
+                image_id=int(row.image_id),
+                image_hash=row.image_hash,
+                image_path=row.image_path,
+            )
+            for row in result.all()
+        )
+        self.stats["loads"] += 1
+        if self.enabled:
+            key = self.key(tenant_id, customer_id)
+            self._galleries[key] = gallery
+            self._galleries.move_to_end(key)
+            while len(self._galleries) > self.capacity:
+                self._galleries.popitem(last=False)
+        return gallery
+
+    def invalidate(self, tenant_id, customer_ids: Iterable[int]) -> None:
+        """Forget galleries changed outside of ingestion or rolled back"""
+        for customer_id in customer_ids:
+            if self._galleries.pop(self.key(tenant_id, customer_id), None) is not None:
+                self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "customers": len(self._galleries),
+            "capacity": self.capacity,
+            "ttl_secs": self.ttl_secs,
+        }
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..core.vector_store import EMBEDDING_DIM
+
+
+class _TenantIdentities:
+    """Fixed-capacity matrix of recently matched customers of one tenant"""
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.person_ids: List[Any] = [None] * capacity
+        self.stored_at = np.zeros(capacity, dtype=np.float64)
+        self.used_at = np.full(capacity, -np.inf)  # -inf marks a free slot
+        self.slots: Dict[str, int] = {}  # str(person_id) -> slot
+
+
+class IdentityCache:
+    """Per-tenant cache of recently recognized customers' embeddings.
+
+    Repeat sightings of someone recognized minutes ago are matched against
+    this small in-memory matrix instead of the vector store. Only an
+    unambiguous strong match is a hit: the best score must reach
+    ``hit_threshold`` and beat the next cached person by ``margin``;
+    everything else goes to the full search. Entries expire ``ttl_secs``
+    after they were stored and the least recently used one is evicted when
+    a tenant's cache is full.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ttl_secs: float,
+        hit_threshold: float,
+        margin: float,
+        dim: int = EMBEDDING_DIM,
+    ):
+        self.capacity = capacity
+        self.ttl_secs = ttl_secs
+        self.hit_threshold = hit_threshold
+        self.margin = margin
+        self.dim = dim
+        self._tenants: Dict[str, _TenantIdentities] = {}
+
+        # Statistics
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "ambiguous": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def lookup(self, tenant_id, embedding: List[float]) -> Optional[List[Dict]]:
+        """Matches for ``embedding`` in the same form as a vector store
+        search, or None when the cache cannot decide"""
+        tenant = self._tenants.get(str(tenant_id))
+        if tenant is None or not tenant.slots:
+            self.stats["misses"] += 1
+            return None
+
+        now = time.time()
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        scores = tenant.vectors @ (query / norm if norm else query)
+        live = np.isfinite(tenant.used_at) & (tenant.stored_at >= now - self.ttl_secs)
+        scores[~live] = -np.inf
+
+        order = np.argpartition(-scores, 1)[:2] if len(scores) > 2 else np.arange(len(scores))
+        order = order[np.argsort(-scores[order])]
+        best = float(scores[order[0]])
+        second = float(scores[order[1]]) if len(order) > 1 else -np.inf
+        if best < self.hit_threshold:
+            self.stats["misses"] += 1
+            return None
+        if best - second < self.margin:
+            self.stats["ambiguous"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        tenant.used_at[order[0]] = now
+        matches = [
+            {
+                "person_id": tenant.person_ids[slot],
+                "person_type": "customer",
+                "similarity": float(scores[slot]),
+                "id": f"cache-{slot}",
+                "created_at": int(tenant.stored_at[slot]),
+            }
+            for slot in order
+            if np.isfinite(scores[slot])
+        ]
+        return matches
+
+    def remember(self, tenant_id, person_id, embedding: List[float]) -> None:
+        """Store ``embedding`` as the latest sighting of ``person_id``"""
+        if not self.enabled:
+            return
+        tenant = self._tenants.get(str(tenant_id))
+        if tenant is None:
+            tenant = self._tenants[str(tenant_id)] = _TenantIdentities(
+                self.capacity, self.dim
+            )
+
+        slot = tenant.slots.get(str(person_id))
+        if slot is None:
+            slot = int(np.argmin(tenant.used_at))
+            if np.isfinite(tenant.used_at[slot]):
+                self.stats["evictions"] += 1
+                tenant.slots.pop(str(tenant.person_ids[slot]), None)
+            tenant.slots[str(person_id)] = slot
+            tenant.person_ids[slot] = person_id
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        tenant.vectors[slot] = vector / norm if norm else vector
+        tenant.stored_at[slot] = tenant.used_at[slot] = time.time()
+
+    def invalidate(self, tenant_id, person_id) -> None:
+        """Forget a person whose embeddings were deleted or merged away"""
+        tenant = self._tenants.get(str(tenant_id))
+        if tenant is None:
+            return
+        slot = tenant.slots.pop(str(person_id), None)
+        if slot is None:
+            return
+        tenant.person_ids[slot] = None
+        tenant.used_at[slot] = -np.inf
+        self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["ambiguous"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "tenants": len(self._tenants),
+            "entries": sum(len(t.slots) for t in self._tenants.values()),
+            "capacity_per_tenant": self.capacity,
+            "ttl_secs": self.ttl_secs,
+        }
+
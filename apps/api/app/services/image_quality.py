@@ -0,0 +1,107 @@
+"""
+Cheap image quality inputs for gallery scoring
+
+Gallery scoring only needs an image's dimensions, which are read from the
+header without decoding any pixels. Pixel metrics (sharpness and exposure)
+are optional: they are computed in a worker thread on a reduced decode of
+the image and cached by image hash, so an image is analysed at most once.
+"""
+
+import asyncio
+import io
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Longest side of the image the pixel metrics are computed on
+_METRICS_SIZE = 128
+
+
+def image_dimensions(image_data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the image header; pixels are not decoded"""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            return image.size
+    except Exception as e:
+        logger.debug(f"Could not read image header: {e}")
+        return None
+
+
+@dataclass(frozen=True)
+class ImageMetrics:
+    sharpness: float  # 0..1, variance of the Laplacian
+    exposure: float  # 0..1, mean brightness close to mid-grey
+
+    @property
+    def score(self) -> float:
+        return (self.sharpness + self.exposure) / 2
+
+
+def compute_image_metrics(image_data: bytes) -> ImageMetrics:
+    """Sharpness and exposure of a reduced grayscale decode (blocking)"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_data)) as image:
+        # JPEGs are decoded at a reduced scale straight from the DCT
+        image.draft("L", (_METRICS_SIZE, _METRICS_SIZE))
+        gray = image.convert("L")
+        gray.thumbnail((_METRICS_SIZE, _METRICS_SIZE))
+        pixels = np.asarray(gray, dtype=np.float32)
+
+    if pixels.shape[0] < 3 or pixels.shape[1] < 3:
+        return ImageMetrics(sharpness=0.0, exposure=0.0)
+
+    # Same scales as the staff face crop assessment
+    laplacian = (
+        pixels[:-2, 1:-1]
+        + pixels[2:, 1:-1]
+        + pixels[1:-1, :-2]
+        + pixels[1:-1, 2:]
+        - 4 * pixels[1:-1, 1:-1]
+    )
+    sharpness = min(1.0, float(laplacian.var()) / 200)
+    exposure = max(0.0, 1.0 - abs(float(pixels.mean()) - 120) / 120)
+    return ImageMetrics(sharpness=sharpness, exposure=exposure)
+
+
+class ImageMetricsCache:
+    """Pixel metrics by image hash, computed off the event loop"""
+
+    def __init__(self, enabled: bool = False, capacity: int = 4096):
+        self.enabled = enabled
+        self.capacity = capacity
+        self._metrics: "OrderedDict[str, ImageMetrics]" = OrderedDict()
+
+        # Statistics
+        self.stats = {"hits": 0, "computed": 0, "failed": 0}
+
+    async def get(self, image_hash: str, image_data: bytes) -> Optional[ImageMetrics]:
+        """Metrics of the image, or None when disabled or not decodable"""
+        if not self.enabled:
+            return None
+        metrics = self._metrics.get(image_hash)
+        if metrics is not None:
+            self._metrics.move_to_end(image_hash)
+            self.stats["hits"] += 1
+            return metrics
+
+        try:
+            metrics = await asyncio.to_thread(compute_image_metrics, image_data)
+        except Exception as e:
+            logger.warning(f"Error computing image metrics: {e}")
+            self.stats["failed"] += 1
+            return None
+        self.stats["computed"] += 1
+        self._metrics[image_hash] = metrics
+        while len(self._metrics) > self.capacity:
+            self._metrics.popitem(last=False)
+        return metrics
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "enabled": self.enabled, "cached": len(self._metrics)}
@@ -0,0 +1,366 @@
+"""
+Asynchronous ingest queue for worker face events
+
+In async ingest mode POST /v1/events/face only validates the event, writes it
+(with its face crop) to the ingest directory and returns a ticket. A fixed
+pool of consumers then runs the recognition pipeline. Events are sharded by
+(tenant, camera) and each shard has a single consumer, so events from one
+camera are processed in arrival order and never race each other to create
+duplicate visits.
+
+Results are kept for a while for GET /v1/events/face/status/{ticket} and
+pushed to the tenant's SSE stream. Events still on disk at shutdown are
+recovered in the background on the next start and processed, in ticket
+order, before any new event.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from common.models import FaceDetectedEvent
+
+from ..core.config import settings
+from ..core.database import db
+from .event_broadcaster import tenant_event_broadcaster
+
+logger = logging.getLogger(__name__)
+
+_EVENT_SUFFIX = ".evt"
+
+
+class IngestQueueFull(Exception):
+    """Raised when the shard for an event has no room left"""
+
+
+@dataclass
+class IngestItem:
+    ticket: str
+    tenant_id: str
+    event: FaceDetectedEvent
+    image: bytes
+    filename: str
+    attempts: int = 0
+
+
+class IngestQueue:
+    """Durable, sharded, single-writer-per-shard queue of face events"""
+
+    def __init__(
+        self,
+        directory: str,
+        shards: int = 4,
+        max_pending: int = 5000,
+        result_ttl_secs: float = 3600,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0,
+        session_factory: Optional[Callable] = None,
+        processor: Optional[Callable] = None,
+    ):
+        self.directory = Path(directory)
+        self.shards = max(1, shards)
+        self.max_pending = max_pending
+        self.result_ttl_secs = result_ttl_secs
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._session_factory = session_factory
+        self._processor = processor
+
+        self._queues: List[asyncio.Queue] = []
+        # Slots claimed by submits still writing their event file
+        self._reserved: List[int] = []
+        self._consumers: List[asyncio.Task] = []
+        # Files left by a previous run, per shard, read when processed
+        self._backlog: List[deque] = []
+        self._recovered = asyncio.Event()
+        self._recovery: Optional[asyncio.Task] = None
+        # results[ticket] = (finished_at, tenant_id, status), oldest first;
+        # queued tickets are tracked in _queued
+        self.results: "OrderedDict[str, tuple[float, str, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._queued: Dict[str, str] = {}
+
+        # Statistics
+        self.stats = {
+            "accepted": 0,
+            "processed": 0,
+            "failed": 0,
+            "rejected_full": 0,
+            "recovered": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+
+    @property
+    def running(self) -> bool:
+        return bool(self._consumers) and not all(t.done() for t in self._consumers)
+
+    async def start(self) -> None:
+        """Start the consumers and re-queue events left from a previous run"""
+        if self.running:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        per_shard = max(1, self.max_pending // self.shards)
+        self._queues = [asyncio.Queue(maxsize=per_shard) for _ in range(self.shards)]
+        self._reserved = [0] * self.shards
+        self._backlog = [deque() for _ in range(self.shards)]
+        self._recovered = asyncio.Event()
+        self._consumers = [
+            asyncio.create_task(self._consume(shard)) for shard in range(self.shards)
+        ]
+        # Startup does not wait for a large backlog; consumers hold new
+        # events until the scan is done and their shard's backlog is drained
+        self._recovery = asyncio.create_task(self._recover(self._ticket_prefix()))
+        logger.info(
+            f"Ingest queue started with {self.shards} shards at {self.directory}"
+        )
+
+    async def stop(self) -> None:
+        """Stop consuming; unprocessed events stay on disk for the next start"""
+        consumers, self._consumers = self._consumers, []
+        if self._recovery is not None:
+            consumers.append(self._recovery)
+            self._recovery = None
+        for task in consumers:
+            task.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+        self._queued.clear()
+
+    async def _recover(self, started: str) -> None:
+        """Assign files left by a previous run to their shards' backlogs.
+
+        Tickets sort by creation time, so files from before ``started`` are
+        exactly the ones this run did not submit.
+        """
+        try:
+            paths = await asyncio.to_thread(
+                lambda: sorted(
+                    p for p in self.directory.glob(f"*{_EVENT_SUFFIX}") if p.name < started
+                )
+            )
+            for path in paths:
+                try:
+                    meta = await asyncio.to_thread(self._read_header, path)
+                except Exception as e:
+                    logger.error(f"Discarding unreadable ingest file {path.name}: {e}")
+                    path.unlink(missing_ok=True)
+                    continue
+                self._queued[meta["ticket"]] = meta["tenant_id"]
+                shard = self._shard(meta["tenant_id"], meta["event"]["camera_id"])
+                self._backlog[shard].append(path)
+                self.stats["recovered"] += 1
+            if paths:
+                logger.info(f"Recovered {self.stats['recovered']} ingested events")
+        finally:
+            self._recovered.set()
+
+    # ------------------------------------------------------------------
+    # Public API
+
+    async def submit(
+        self, tenant_id: str, event: FaceDetectedEvent, image: bytes, filename: str
+    ) -> str:
+        """Persist an event and queue it for processing; returns its ticket"""
+        await self.start()
+        item = IngestItem(
+            ticket=f"{self._ticket_prefix()}-{uuid.uuid4().hex[:8]}",
+            tenant_id=str(tenant_id),
+            event=event,
+            image=image,
+            filename=filename,
+        )
+        shard = self._shard(item.tenant_id, item.event.camera_id)
+        queue = self._queues[shard]
+        # The slot is reserved before the file is written, so concurrent
+        # submits cannot fill the shard while this one is on disk
+        if queue.qsize() + self._reserved[shard] >= queue.maxsize:
+            self.stats["rejected_full"] += 1
+            raise IngestQueueFull(f"Ingest shard full ({queue.maxsize} events)")
+
+        self._reserved[shard] += 1
+        try:
+            await asyncio.to_thread(self._write, item)
+        finally:
+            self._reserved[shard] -= 1
+        queue.put_nowait(item)
+        self._queued[item.ticket] = item.tenant_id
+        self.stats["accepted"] += 1
+        return item.ticket
+
+    @staticmethod
+    def _ticket_prefix() -> str:
+        return f"{time.time_ns():020d}"
+
+    def get_status(self, tenant_id: str, ticket: str) -> Optional[Dict[str, Any]]:
+        """Status of a ticket of ``tenant_id``, or None if unknown"""
+        if self._queued.get(ticket) == str(tenant_id):
+            return {"ticket": ticket, "status": "queued"}
+        entry = self.results.get(ticket)
+        if entry is None or entry[1] != str(tenant_id):
+            return None
+        return entry[2]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "running": self.running,
+            "queued": len(self._queued),
+            "shard_depths": [q.qsize() for q in self._queues],
+        }
+
+    # ------------------------------------------------------------------
+    # Consumers
+
+    def _shard(self, tenant_id: str, camera_id: Any) -> int:
+        key = f"{tenant_id}:{camera_id}".encode()
+        return zlib.crc32(key) % self.shards
+
+    async def _consume(self, shard: int) -> None:
+        # A camera's recovered events go before anything it sent since
+        await self._recovered.wait()
+        backlog = self._backlog[shard]
+        while backlog:
+            path = backlog.popleft()
+            try:
+                item = await asyncio.to_thread(self._read, path)
+            except Exception as e:
+                logger.error(f"Discarding unreadable ingest file {path.name}: {e}")
+                path.unlink(missing_ok=True)
+                self._queued.pop(path.stem, None)
+                continue
+            await self._handle(shard, item)
+
+        queue = self._queues[shard]
+        while True:
+            item = await queue.get()
+            try:
+                await self._handle(shard, item)
+            finally:
+                queue.task_done()
+
+    async def _handle(self, shard: int, item: IngestItem) -> None:
+        try:
+            await self._process(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ingest consumer {shard} failed on {item.ticket}: {e}")
+
+    async def _process(self, item: IngestItem) -> None:
+        while True:
+            item.attempts += 1
+            try:
+                async with self._session() as db_session:
+                    await db.set_tenant_context(db_session, item.tenant_id)
+                    result = await self._run_processor(item, db_session)
+                status = {"ticket": item.ticket, "status": "done", "result": result}
+                self.stats["processed"] += 1
+                break
+            except Exception as e:
+                if item.attempts < self.max_attempts:
+                    logger.warning(
+                        f"Ingested event {item.ticket} failed (attempt {item.attempts}), "
+                        f"retrying: {e}"
+                    )
+                    await asyncio.sleep(self.retry_delay * item.attempts)
+                    continue
+                logger.error(f"Giving up on ingested event {item.ticket}: {e}")
+                status = {"ticket": item.ticket, "status": "failed", "error": str(e)}
+                self.stats["failed"] += 1
+                break
+
+        await asyncio.to_thread(self._delete, item.ticket)
+        self._queued.pop(item.ticket, None)
+        self._remember(item, status)
+        await tenant_event_broadcaster.broadcast(
+            item.tenant_id, {"type": "face_event_result", **status}
+        )
+
+    async def _run_processor(self, item: IngestItem, db_session) -> Dict[str, Any]:
+        if self._processor is not None:
+            return await self._processor(item, db_session)
+        from .face_service import face_service
+
+        return await face_service.process_face_event_with_image(
+            event=item.event,
+            face_image_data=item.image,
+            face_image_filename=item.filename,
+            db_session=db_session,
+            tenant_id=item.tenant_id,
+        )
+
+    def _session(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        return db.get_session()
+
+    def _remember(self, item: IngestItem, status: Dict[str, Any]) -> None:
+        now = time.time()
+        self.results[item.ticket] = (now, item.tenant_id, status)
+        cutoff = now - self.result_ttl_secs
+        while self.results and (
+            len(self.results) > self.max_pending * 10
+            or next(iter(self.results.values()))[0] < cutoff
+        ):
+            self.results.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Files: one per event, JSON header line followed by the image bytes
+
+    def _path(self, ticket: str) -> Path:
+        return self.directory / f"{ticket}{_EVENT_SUFFIX}"
+
+    def _write(self, item: IngestItem) -> None:
+        header = json.dumps(
+            {
+                "ticket": item.ticket,
+                "tenant_id": item.tenant_id,
+                "filename": item.filename,
+                "event": item.event.to_wire("f32"),
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        path = self._path(item.ticket)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(header + b"\n" + item.image)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _read_header(self, path: Path) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            return json.loads(f.readline())
+
+    def _read(self, path: Path) -> IngestItem:
+        data = path.read_bytes()
+        header, _, image = data.partition(b"\n")
+        meta = json.loads(header)
+        return IngestItem(
+            ticket=meta["ticket"],
+            tenant_id=meta["tenant_id"],
+            event=FaceDetectedEvent(**meta["event"]),
+            image=image,
+            filename=meta["filename"],
+        )
+
+    def _delete(self, ticket: str) -> None:
+        self._path(ticket).unlink(missing_ok=True)
+
+
+ingest_queue = IngestQueue(
+    directory=settings.ingest_queue_dir,
+    shards=settings.ingest_shards,
+    max_pending=settings.ingest_queue_max_pending,
+    result_ttl_secs=settings.ingest_result_ttl_secs,
+)
@@ -4,14 +4,20 @@ Service for handling visit merge operations asynchronously.
 
 import asyncio
 import logging
+from collections import Counter
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy import and_, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
 
+from ..core.embedding_storage import has_embedding, load_embedding
 from ..models.database import Customer, CustomerFaceImage, Visit
 from .background_jobs import BackgroundJob
+from .customer_face_service import customer_face_service
+from .face_image_store import face_image_store
+from .object_staging import StagedObjects
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,16 @@ class MergeService:
 
         background_job_service.update_job_progress(job_id, progress, message)
 
+    async def _settle_visit_sessions(
+        self, db_session: AsyncSession, tenant_id: str, visit_ids: List[str]
+    ):
+        """Write pending detections of open visit sessions to their rows and
+        stop merging into ``visit_ids`` before they are rewritten here"""
+        from .face_service import face_service
+
+        await face_service.visit_sessions.flush(db_session, tenant_id)
+        face_service.visit_sessions.close_visits(tenant_id, visit_ids)
+
     async def execute_merge_visits_job(
         self, job: BackgroundJob, db_session: AsyncSession
     ) -> Dict[str, Any]:
@@ -39,10 +55,13 @@ class MergeService:
                 raise ValueError("At least two visit IDs required for merge")
 
             self._update_job_progress(job.job_id, 10, "Loading visits to merge")
+            await self._settle_visit_sessions(db_session, job.tenant_id, visit_ids)
 
-            # Load visits
+            # Load visits, with the embedding of the one whose image is kept
             result = await db_session.execute(
-                select(Visit).where(
+                select(Visit)
+                .options(undefer_group("embedding"))
+                .where(
                     and_(
                         Visit.tenant_id == job.tenant_id, Visit.visit_id.in_(visit_ids)
                     )
@@ -94,6 +113,9 @@ class MergeService:
 
             self._update_job_progress(job.job_id, 40, "Calculating aggregated data")
 
+            # Snapshot references held by the visits before they are rewritten
+            held_images = Counter(v.image_path for v in visits if v.image_path)
+
             # Aggregations
             first_seen = min(v.first_seen for v in visits)
             last_seen = max(v.last_seen for v in visits)
@@ -134,6 +156,7 @@ class MergeService:
                 primary.bbox_y = best_with_image.bbox_y
                 primary.bbox_w = best_with_image.bbox_w
                 primary.bbox_h = best_with_image.bbox_h
+                primary.face_embedding_vec = best_with_image.face_embedding_vec
                 primary.face_embedding = best_with_image.face_embedding
 
             self._update_job_progress(
@@ -158,9 +181,20 @@ class MergeService:
 
             self._update_job_progress(job.job_id, 70, "Deleting merged visits")
 
-            # Collect image paths for cleanup before deletion
+            # Release the snapshots no longer referenced by the primary visit;
+            # shared content-addressed objects are only deleted at zero references
+            if primary.image_path:
+                held_images[primary.image_path] -= 1
+            staging = StagedObjects()
+            legacy_paths = set(
+                await face_image_store.release(
+                    db_session, job.tenant_id, held_images.elements(), staging
+                )
+            )
             non_primary_with_images: List[Tuple[str, Optional[str]]] = [
-                (v.visit_id, v.image_path) for v in non_primary_visits
+                (v.visit_id, v.image_path)
+                for v in non_primary_visits
+                if v.image_path in legacy_paths
             ]
 
             # Delete non-primary visits
@@ -178,6 +212,7 @@ class MergeService:
 
             # Commit database changes before external cleanup
             await db_session.commit()
+            await staging.commit()
 
             self._update_job_progress(job.job_id, 80, "Cleaning up images")
 
@@ -321,6 +356,7 @@ class MergeService:
             total_operations = len(merges)
             completed_merges = []
             failed_merges = []
+            staging = StagedObjects()
 
             for i, merge_op in enumerate(merges):
                 try:
@@ -339,7 +375,11 @@ class MergeService:
                     for secondary_id in secondary_ids:
                         try:
                             result = await self._execute_single_customer_merge(
-                                db_session, job.tenant_id, primary_id, secondary_id
+                                db_session,
+                                job.tenant_id,
+                                primary_id,
+                                secondary_id,
+                                staging,
                             )
                             merge_results.append(
                                 {
@@ -387,6 +427,14 @@ class MergeService:
                         }
                     )
 
+            # Images dropped by deduplication are deleted once the merges are committed
+            await db_session.commit()
+            await staging.commit()
+            for op in completed_merges:
+                customer_face_service.gallery_rankings.invalidate(
+                    job.tenant_id, [op["primary_customer_id"], *op["secondary_customer_ids"]]
+                )
+
             self._update_job_progress(job.job_id, 100, "Bulk customer merge completed")
 
             # Calculate summary statistics
@@ -416,6 +464,7 @@ class MergeService:
         self, db_session: AsyncSession, tenant_id: str, visit_ids: List[str]
     ) -> Dict[str, Any]:
         """Helper method for bulk visit deletion"""
+        await self._settle_visit_sessions(db_session, tenant_id, visit_ids)
 
         # Get visits with their image paths for cleanup
         visits_with_images_query = select(Visit.visit_id, Visit.image_path).where(
@@ -425,14 +474,28 @@ class MergeService:
         visits_with_images = result.all()
 
         # Get associated customer face images
-        customer_face_images_query = select(CustomerFaceImage.image_path).where(
+        customer_face_images_query = select(
+            CustomerFaceImage.customer_id, CustomerFaceImage.image_path
+        ).where(
             and_(
                 CustomerFaceImage.tenant_id == tenant_id,
                 CustomerFaceImage.visit_id.in_(visit_ids),
             )
         )
         result = await db_session.execute(customer_face_images_query)
-        customer_face_image_paths = [row[0] for row in result.all()]
+        customer_face_images = result.all()
+        customer_face_image_paths = [row[1] for row in customer_face_images]
+
+        # Release the stored objects; only legacy per-visit objects are deleted directly
+        staging = StagedObjects()
+        legacy_paths = set(
+            await face_image_store.release(
+                db_session,
+                tenant_id,
+                [path for _, path in visits_with_images] + customer_face_image_paths,
+                staging,
+            )
+        )
 
         # Delete customer face images first
         await db_session.execute(
@@ -452,13 +515,17 @@ class MergeService:
         )
 
         await db_session.commit()
+        await staging.commit()
+        customer_face_service.gallery_rankings.invalidate(
+            tenant_id, {row[0] for row in customer_face_images}
+        )
 
         # Cleanup images (async, non-blocking)
         visit_image_paths = [
-            (vid, img_path) for vid, img_path in visits_with_images if img_path
+            (vid, img_path) for vid, img_path in visits_with_images if img_path in legacy_paths
         ]
         customer_image_tuples = [
-            ("customer_face", path) for path in customer_face_image_paths if path
+            ("customer_face", path) for path in customer_face_image_paths if path in legacy_paths
         ]
 
         all_image_paths = visit_image_paths + customer_image_tuples
@@ -545,6 +612,10 @@ class MergeService:
         self, db_session: AsyncSession, tenant_id: str, customer_id: int
     ):
         """Recompute customer visit statistics"""
+        from .face_service import face_service
+
+        # Buffered activity is already reflected in the visit rows counted here
+        face_service.customer_activity.discard(tenant_id, [customer_id])
         stats_res = await db_session.execute(
             select(
                 func.count(Visit.visit_id),
@@ -576,6 +647,7 @@ class MergeService:
         tenant_id: str,
         primary_customer_id: int,
         secondary_customer_id: int,
+        staging: Optional[StagedObjects] = None,
     ) -> Dict[str, Any]:
         """Execute a single customer merge operation"""
         from ..core.milvus_client import milvus_client
@@ -657,7 +729,7 @@ class MergeService:
 
         # 3. Deduplicate face images by hash (keep highest quality)
         dedup_count = await self._deduplicate_customer_face_images(
-            db_session, tenant_id, primary_customer_id
+            db_session, tenant_id, primary_customer_id, staging
         )
 
         # 4. Copy missing attributes from secondary to primary
@@ -736,9 +808,17 @@ class MergeService:
         }
 
     async def _deduplicate_customer_face_images(
-        self, db_session: AsyncSession, tenant_id: str, customer_id: int
+        self,
+        db_session: AsyncSession,
+        tenant_id: str,
+        customer_id: int,
+        staging: Optional[StagedObjects] = None,
     ) -> int:
-        """Remove duplicate face images based on hash, keeping highest quality"""
+        """Remove duplicate face images based on hash, keeping highest quality.
+
+        The removed images' stored objects are released; objects left
+        unreferenced are deleted when ``staging`` is committed.
+        """
         from ..models.database import CustomerFaceImage
 
         # Get all images with hashes for this customer
@@ -759,6 +839,7 @@ class MergeService:
         # Group by hash and find duplicates
         by_hash = {}
         to_delete = []
+        released_paths = []
 
         def quality_score(img):
             return float((img.confidence_score or 0.0) + (img.quality_score or 0.5))
@@ -774,12 +855,17 @@ class MergeService:
                 # Keep the higher quality image
                 if quality_score(img) > quality_score(existing):
                     to_delete.append(int(existing.image_id))
+                    released_paths.append(existing.image_path)
                     by_hash[img.image_hash] = img
                 else:
                     to_delete.append(int(img.image_id))
+                    released_paths.append(img.image_path)
 
         # Delete duplicates
         if to_delete:
+            await face_image_store.release(
+                db_session, tenant_id, released_paths, staging or StagedObjects()
+            )
             await db_session.execute(
                 delete(CustomerFaceImage).where(
                     and_(
@@ -797,7 +883,6 @@ class MergeService:
     ) -> int:
         """Rebuild embeddings for a customer from gallery and visits"""
         import hashlib
-        import json
 
         from ..core.milvus_client import milvus_client
         from ..models.database import CustomerFaceImage, Visit
@@ -808,6 +893,7 @@ class MergeService:
         # Get embeddings from gallery
         gallery_result = await db_session.execute(
             select(
+                CustomerFaceImage.embedding_vec,
                 CustomerFaceImage.embedding,
                 CustomerFaceImage.created_at,
                 CustomerFaceImage.image_hash,
@@ -815,20 +901,17 @@ class MergeService:
                 and_(
                     CustomerFaceImage.tenant_id == tenant_id,
                     CustomerFaceImage.customer_id == customer_id,
-                    CustomerFaceImage.embedding.is_not(None),
+                    has_embedding(CustomerFaceImage.embedding_vec, CustomerFaceImage.embedding),
                 )
             )
         )
 
-        for emb, created_at, img_hash in gallery_result.all():
-            if not emb or not isinstance(emb, list) or len(emb) != 512:
+        for packed, legacy, created_at, img_hash in gallery_result.all():
+            emb = load_embedding(packed, legacy)
+            if emb is None:
                 continue
 
-            key = (
-                f"img:{img_hash}"
-                if img_hash
-                else f"vec:{hashlib.sha256(str(emb).encode()).hexdigest()}"
-            )
+            key = f"img:{img_hash}" if img_hash else f"vec:{hashlib.sha256(emb).hexdigest()}"
             if key in inserted_keys:
                 continue
 
@@ -838,29 +921,22 @@ class MergeService:
 
         # Get embeddings from visits
         visits_result = await db_session.execute(
-            select(Visit.face_embedding, Visit.timestamp).where(
+            select(Visit.face_embedding_vec, Visit.face_embedding, Visit.timestamp).where(
                 and_(
                     Visit.tenant_id == tenant_id,
                     Visit.person_type == "customer",
                     Visit.person_id == customer_id,
-                    Visit.face_embedding.is_not(None),
+                    has_embedding(Visit.face_embedding_vec, Visit.face_embedding),
                 )
             )
         )
 
-        for emb_text, timestamp_dt in visits_result.all():
-            if not emb_text:
-                continue
-
-            try:
-                emb = json.loads(emb_text)
-            except Exception:
-                continue
-
-            if not isinstance(emb, list) or len(emb) != 512:
+        for packed, legacy, timestamp_dt in visits_result.all():
+            emb = load_embedding(packed, legacy)
+            if emb is None:
                 continue
 
-            key = f"vis:{hashlib.sha256(str(emb).encode()).hexdigest()}"
+            key = f"vis:{hashlib.sha256(emb).hexdigest()}"
             if key in inserted_keys:
                 continue
 
@@ -873,7 +949,7 @@ class MergeService:
         for emb, timestamp in aggregated:
             try:
                 await milvus_client.insert_embedding(
-                    tenant_id, customer_id, "customer", emb, timestamp
+                    tenant_id, customer_id, "customer", emb.tolist(), timestamp
                 )
                 inserted_count += 1
             except Exception as e:
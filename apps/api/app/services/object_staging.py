@@ -0,0 +1,70 @@
+"""
+Object-storage writes tied to a database transaction
+
+Face ingestion uploads images before the rows referencing them are
+committed. ``StagedObjects`` records those uploads so they can be removed
+again if the transaction (or one event's savepoint) is rolled back, and
+holds deletions of objects whose rows are removed in the transaction until
+it has committed, so a rollback never leaves rows pointing at deleted
+objects.
+"""
+
+import asyncio
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Path prefixes used in the database for objects of the faces-derived bucket
+_DERIVED_PREFIXES = ("visits-faces/", "customer-faces/")
+
+
+def derived_object_name(path: str) -> str:
+    """Object name in the faces-derived bucket for a stored image path"""
+    for prefix in _DERIVED_PREFIXES:
+        if path.startswith(prefix):
+            return path[len(prefix) :]
+    return path
+
+
+class StagedObjects:
+    """Uploads to compensate on rollback and deletes to run on commit"""
+
+    def __init__(self):
+        self.uploaded: List[Tuple[str, str]] = []
+        self.pending_deletes: List[Tuple[str, str]] = []
+
+    def mark(self) -> Tuple[int, int]:
+        """Position to roll back to when a savepoint fails"""
+        return len(self.uploaded), len(self.pending_deletes)
+
+    def added(self, bucket: str, object_name: str) -> None:
+        self.uploaded.append((bucket, object_name))
+
+    def delete_on_commit(self, bucket: str, object_name: str) -> None:
+        self.pending_deletes.append((bucket, object_name))
+
+    async def rollback(self, mark: Tuple[int, int] = (0, 0)) -> None:
+        """Remove objects uploaded since ``mark`` and forget their deletes"""
+        uploaded = self.uploaded[mark[0] :]
+        del self.uploaded[mark[0] :]
+        del self.pending_deletes[mark[1] :]
+        await self._delete(uploaded)
+
+    async def commit(self) -> None:
+        """The transaction committed: uploads are kept, deletes are applied"""
+        pending, self.pending_deletes = self.pending_deletes, []
+        self.uploaded = []
+        await self._delete(pending)
+
+    @staticmethod
+    async def _delete(objects: List[Tuple[str, str]]) -> None:
+        if not objects:
+            return
+        from ..core.minio_client import minio_client
+
+        for bucket, object_name in objects:
+            try:
+                await asyncio.to_thread(minio_client.delete_object, bucket, object_name)
+            except Exception as e:
+                logger.warning(f"Failed to delete staged object {object_name}: {e}")
@@ -0,0 +1,166 @@
+"""
+Online clustering of unrecognized faces, per camera
+
+A face that matches nobody only becomes a new customer once it has been
+seen ``min_cluster_samples`` times. Unrecognized embeddings are therefore
+grouped into micro-clusters per (tenant, site, camera): each embedding
+joins the live cluster whose centroid it is most similar to (cosine, one
+matrix product over the camera's centroids) or starts a new one. Once a
+cluster has produced a customer, later detections joining it are assigned
+to that customer rather than creating another one before the customer's
+embeddings are searchable.
+
+Clusters expire ``window_secs`` after their last detection. Each camera
+holds at most ``clusters_per_camera`` clusters (the least recently seen is
+replaced) and at most ``max_cameras`` cameras are tracked.
+"""
+
+from __future__ import annotations
+
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.vector_store import EMBEDDING_DIM
+
+CameraKey = Tuple[str, int, int]
+
+
+@dataclass
+class ClusterSample:
+    """Where one embedding landed"""
+
+    cluster_id: int
+    samples: int
+    similarity: float  # to the cluster centroid; 1.0 for a new cluster
+    person_id: Optional[Any] = None
+
+
+class _CameraClusters:
+    """Fixed-capacity centroid matrix of one camera"""
+
+    def __init__(self, capacity: int, dim: int):
+        # Sum of each cluster's unit embeddings; its direction is the centroid
+        self.sums = np.zeros((capacity, dim), dtype=np.float32)
+        self.norms = np.ones(capacity, dtype=np.float32)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.last_seen = np.full(capacity, -np.inf)  # -inf marks a free slot
+        self.cluster_ids = np.zeros(capacity, dtype=np.int64)
+        self.person_ids: List[Any] = [None] * capacity
+
+    def slot_of(self, cluster_id: int) -> Optional[int]:
+        slots = np.flatnonzero(
+            (self.cluster_ids == cluster_id) & np.isfinite(self.last_seen)
+        )
+        return int(slots[0]) if len(slots) else None
+
+
+class PendingClusters:
+    """Per-camera micro-clusters of faces not yet matched to a customer"""
+
+    def __init__(
+        self,
+        similarity_threshold: float,
+        window_secs: float,
+        clusters_per_camera: int = 64,
+        max_cameras: int = 256,
+        dim: int = EMBEDDING_DIM,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.window_secs = window_secs
+        self.clusters_per_camera = max(1, clusters_per_camera)
+        self.max_cameras = max(1, max_cameras)
+        self.dim = dim
+        self._cameras: "OrderedDict[CameraKey, _CameraClusters]" = OrderedDict()
+        self._next_id = itertools.count(1)
+
+        # Statistics
+        self.stats = {"joined": 0, "created": 0, "expired": 0, "replaced": 0}
+
+    @staticmethod
+    def key(tenant_id, site_id, camera_id) -> CameraKey:
+        return (str(tenant_id), int(site_id), int(camera_id))
+
+    def observe(
+        self, key: CameraKey, embedding: List[float], now: Optional[float] = None
+    ) -> ClusterSample:
+        """Add an unrecognized embedding to its cluster and describe it"""
+        now = time.time() if now is None else now
+        camera = self._camera(key)
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector = vector / norm
+
+        expired = np.isfinite(camera.last_seen) & (
+            camera.last_seen < now - self.window_secs
+        )
+        if expired.any():
+            self.stats["expired"] += int(expired.sum())
+            camera.last_seen[expired] = -np.inf
+            for slot in np.flatnonzero(expired):
+                camera.person_ids[slot] = None
+
+        scores = (camera.sums @ vector) / camera.norms
+        scores[~np.isfinite(camera.last_seen)] = -np.inf
+        slot = int(np.argmax(scores))
+        if scores[slot] >= self.similarity_threshold:
+            similarity = float(scores[slot])
+            camera.sums[slot] += vector
+            camera.norms[slot] = float(np.linalg.norm(camera.sums[slot])) or 1.0
+            camera.counts[slot] += 1
+            self.stats["joined"] += 1
+        else:
+            similarity = 1.0
+            slot = int(np.argmin(camera.last_seen))
+            if np.isfinite(camera.last_seen[slot]):
+                self.stats["replaced"] += 1
+            camera.sums[slot] = vector
+            camera.norms[slot] = 1.0
+            camera.counts[slot] = 1
+            camera.cluster_ids[slot] = next(self._next_id)
+            camera.person_ids[slot] = None
+            self.stats["created"] += 1
+        camera.last_seen[slot] = now
+
+        return ClusterSample(
+            cluster_id=int(camera.cluster_ids[slot]),
+            samples=int(camera.counts[slot]),
+            similarity=similarity,
+            person_id=camera.person_ids[slot],
+        )
+
+    def assign(self, key: CameraKey, cluster_id: int, person_id: Any) -> None:
+        """Record the customer a cluster became; None undoes it"""
+        camera = self._cameras.get(key)
+        slot = camera.slot_of(cluster_id) if camera is not None else None
+        if slot is not None:
+            camera.person_ids[slot] = person_id
+
+    def _camera(self, key: CameraKey) -> _CameraClusters:
+        camera = self._cameras.get(key)
+        if camera is None:
+            camera = self._cameras[key] = _CameraClusters(self.clusters_per_camera, self.dim)
+            while len(self._cameras) > self.max_cameras:
+                self._cameras.popitem(last=False)
+        else:
+            self._cameras.move_to_end(key)
+        return camera
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        live = sum(
+            int((c.last_seen >= now - self.window_secs).sum())
+            for c in self._cameras.values()
+        )
+        return {
+            **self.stats,
+            "cameras": len(self._cameras),
+            "live_clusters": live,
+            "clusters_per_camera": self.clusters_per_camera,
+            "window_secs": self.window_secs,
+        }
@@ -0,0 +1,347 @@
+"""
+In-process table of open visit sessions
+
+A visit session is the visit row a person's detections at a site are merged
+into while they keep being seen within the merge window. Instead of reading
+and rewriting that row for every detection, open sessions are kept here,
+keyed by (tenant, person type, person, site), and updated in memory. The
+database is only touched when a session is opened (lookup or insert) and
+when dirty sessions are flushed: every ``flush_interval_secs``, piggybacked
+on request transactions and at shutdown. A flush that finds its row gone
+(the visit was deleted or merged away) drops the session. Sessions holding
+detections of a transaction that has not finished yet are left for the
+next flush, so a rolled-back detection (restored from a snapshot) is never
+written.
+
+The table is authoritative for the process that owns it; run a single API
+process per tenant (or the async ingest mode) so detections of one person
+are not split across processes.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import db
+from ..models.database import Visit
+from .face_image_store import face_image_store
+from .object_staging import StagedObjects
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str, str, int]
+
+
+@dataclass
+class VisitSession:
+    """Open visit row, mirrored in memory"""
+
+    tenant_id: str
+    visit_id: str
+    visit_session_id: str
+    first_seen: datetime
+    last_seen: datetime
+    detection_count: int
+    highest_confidence: float
+    confidence_score: float
+    image_path: Optional[str]
+    bbox: Optional[Tuple[float, float, float, float]]
+    face_embedding: Optional[bytes]  # packed float32; set with a better detection
+    version: int = 0  # bumped on every change
+    flushed_version: int = 0
+    image_changed: bool = False
+    closed: bool = False
+    touched_at: float = 0.0  # monotonic time of the last detection
+    # Snapshots replaced by a better detection, released once the row is written
+    replaced_images: List[str] = field(default_factory=list)
+    in_flight: int = 0  # detections whose transaction has not finished
+
+    @classmethod
+    def from_visit(cls, visit: Visit) -> "VisitSession":
+        return cls(
+            tenant_id=str(visit.tenant_id),
+            visit_id=visit.visit_id,
+            visit_session_id=visit.visit_session_id,
+            first_seen=visit.first_seen,
+            last_seen=visit.last_seen,
+            detection_count=int(visit.detection_count or 0),
+            highest_confidence=float(visit.highest_confidence or 0.0),
+            confidence_score=float(visit.confidence_score or 0.0),
+            image_path=visit.image_path,
+            bbox=(
+                (visit.bbox_x, visit.bbox_y, visit.bbox_w, visit.bbox_h)
+                if visit.bbox_x is not None
+                else None
+            ),
+            # Deferred column: left unloaded, only written once the image changes
+            face_embedding=None,
+            touched_at=time.monotonic(),
+        )
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.flushed_version
+
+    @property
+    def duration_seconds(self) -> int:
+        return int((self.last_seen - self.first_seen).total_seconds())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State to restore if the next detection is rolled back"""
+        state = dict(self.__dict__)
+        state["replaced_images"] = list(self.replaced_images)
+        del state["in_flight"]
+        return state
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.replaced_images = list(state["replaced_images"])
+
+    def record_detection(
+        self,
+        seen_at: datetime,
+        confidence: float,
+        image_path: Optional[str],
+        bbox: List[float],
+        face_embedding: Optional[bytes],
+    ) -> None:
+        """Merge one more detection into the session"""
+        original_confidence = self.confidence_score
+        self.last_seen = seen_at
+        self.detection_count += 1
+        if confidence > (self.highest_confidence or 0):
+            self.highest_confidence = confidence
+            self.confidence_score = confidence
+        # Keep the image of the best detection
+        if image_path and (not self.image_path or confidence > original_confidence):
+            if self.image_path and self.image_path != image_path:
+                self.replaced_images.append(self.image_path)
+            self.image_path = image_path
+            self.bbox = tuple(bbox[:4]) if len(bbox) >= 4 else None
+            self.face_embedding = face_embedding
+            self.image_changed = True
+        self.version += 1
+        self.touched_at = time.monotonic()
+
+
+class VisitSessionTable:
+    """Open visit sessions with write coalescing and expiry"""
+
+    def __init__(
+        self,
+        merge_window: timedelta = timedelta(minutes=30),
+        flush_interval_secs: float = 5.0,
+        enabled: bool = True,
+    ):
+        self.merge_window = merge_window
+        self.flush_interval_secs = flush_interval_secs
+        self.enabled = enabled
+        self.sessions: Dict[SessionKey, VisitSession] = {}
+        # Sessions replaced before their last changes were flushed
+        self._retired: List[VisitSession] = []
+        self._last_flush: Dict[str, float] = {}  # per tenant
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.stats = {
+            "hits": 0,
+            "opened": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "closed": 0,
+        }
+
+    @staticmethod
+    def key(tenant_id, person_type: str, person_id, site_id) -> SessionKey:
+        return (str(tenant_id), person_type, str(person_id), int(site_id))
+
+    def get(self, key: SessionKey, seen_at: datetime) -> Optional[VisitSession]:
+        """The open session for ``key`` if ``seen_at`` is within its window"""
+        if not self.enabled:
+            return None
+        session = self.sessions.get(key)
+        if (
+            session is None
+            or session.closed
+            or session.last_seen < seen_at - self.merge_window
+        ):
+            return None
+        self.stats["hits"] += 1
+        return session
+
+    def open(self, key: SessionKey, session: VisitSession) -> None:
+        """Track a session just loaded from or inserted into the database"""
+        if not self.enabled:
+            return
+        previous = self.sessions.get(key)
+        if previous is not None and previous.dirty:
+            self._retired.append(previous)
+        self.sessions[key] = session
+        self.stats["opened"] += 1
+
+    def discard(self, keys: Iterable[SessionKey]) -> None:
+        """Forget sessions whose rows were rolled back"""
+        for key in keys:
+            self.sessions.pop(key, None)
+
+    def close_visits(self, tenant_id, visit_ids: Iterable[str]) -> None:
+        """Stop merging into visits that are being merged or deleted elsewhere"""
+        visit_ids = set(visit_ids)
+        for session in self.sessions.values():
+            if session.tenant_id == str(tenant_id) and session.visit_id in visit_ids:
+                session.closed = True
+
+    def flush_due(self, tenant_id) -> bool:
+        now = time.monotonic()
+        last = self._last_flush.setdefault(str(tenant_id), now)
+        return now - last >= self.flush_interval_secs
+
+    def tenants(self) -> List[str]:
+        return sorted(
+            {s.tenant_id for s in self.sessions.values()}
+            | {s.tenant_id for s in self._retired}
+        )
+
+    async def flush(self, db_session: AsyncSession, tenant_id) -> int:
+        """Write dirty sessions of a tenant to their visit rows and drop the
+        tenant's closed/expired ones.
+
+        ``db_session`` must already be in ``tenant_id``'s context. Returns the
+        number of rows written.
+        """
+        tenant_id = str(tenant_id)
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            now = self._last_flush[tenant_id] = time.monotonic()
+            idle_cutoff = now - self.merge_window.total_seconds()
+            retired = [s for s in self._retired if s.tenant_id == tenant_id]
+            self._retired = [s for s in self._retired if s.tenant_id != tenant_id]
+            tenant_sessions = [
+                (key, s) for key, s in self.sessions.items() if s.tenant_id == tenant_id
+            ]
+            written: List[Tuple[VisitSession, int]] = []
+            missing: List[VisitSession] = []
+            released: List[Tuple[VisitSession, int]] = []
+            staging = StagedObjects()
+
+            try:
+                for session in retired + [s for _, s in tenant_sessions]:
+                    if session.in_flight:
+                        continue
+                    if session.dirty:
+                        version = session.version
+                        result = await db_session.execute(
+                            update(Visit)
+                            .where(
+                                and_(
+                                    Visit.tenant_id == session.tenant_id,
+                                    Visit.visit_id == session.visit_id,
+                                )
+                            )
+                            .values(**self._row_values(session))
+                        )
+                        if result.rowcount == 0:
+                            missing.append(session)  # deleted or merged away meanwhile
+                        else:
+                            written.append((session, version))
+                    if session.replaced_images:
+                        count = len(session.replaced_images)
+                        await face_image_store.release(
+                            db_session, tenant_id, session.replaced_images[:count], staging
+                        )
+                        released.append((session, count))
+                await db_session.commit()
+            except Exception:
+                self._retired = retired + self._retired
+                raise
+            self._retired.extend(s for s in retired if s.in_flight)
+
+            await staging.commit()
+            for session, count in released:
+                del session.replaced_images[:count]
+
+            for session, version in written:
+                session.flushed_version = version
+                if session.version == version:
+                    session.image_changed = False
+            for session in missing:
+                session.closed = True
+                session.flushed_version = session.version
+            for key, session in tenant_sessions:
+                if not session.dirty and (session.closed or session.touched_at < idle_cutoff):
+                    if self.sessions.get(key) is session:
+                        del self.sessions[key]
+                    self.stats["closed"] += 1
+
+            if written:
+                self.stats["flushes"] += 1
+                self.stats["rows_flushed"] += len(written)
+            return len(written)
+
+    @staticmethod
+    def _row_values(session: VisitSession) -> Dict[str, Any]:
+        values = {
+            "last_seen": session.last_seen,
+            "visit_duration_seconds": session.duration_seconds,
+            "detection_count": session.detection_count,
+            "highest_confidence": session.highest_confidence,
+            "confidence_score": session.confidence_score,
+        }
+        if session.image_changed:
+            bbox = session.bbox or (None, None, None, None)
+            values.update(
+                image_path=session.image_path,
+                bbox_x=bbox[0],
+                bbox_y=bbox[1],
+                bbox_w=bbox[2],
+                bbox_h=bbox[3],
+                face_embedding_vec=session.face_embedding,
+                face_embedding=None,
+            )
+        return values
+
+    async def flush_all(self, session_factory: Callable) -> int:
+        """Flush every tenant, each in its own session and tenant context"""
+        written = 0
+        for tenant_id in self.tenants():
+            try:
+                async with session_factory() as db_session:
+                    await db.set_tenant_context(db_session, tenant_id)
+                    written += await self.flush(db_session, tenant_id)
+            except Exception as e:
+                logger.error(f"Failed to flush visit sessions of tenant {tenant_id}: {e}")
+        return written
+
+    async def start(self, session_factory: Callable) -> None:
+        """Flush periodically even when no detections arrive"""
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.create_task(self._flush_loop(session_factory))
+
+    async def stop(self, session_factory: Callable) -> None:
+        """Stop the flush loop and write out every pending change"""
+        task, self._flush_task = self._flush_task, None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush_all(session_factory)
+
+    async def _flush_loop(self, session_factory: Callable) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_secs)
+            await self.flush_all(session_factory)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "open": len(self.sessions),
+            "dirty": sum(1 for s in self.sessions.values() if s.dirty),
+        }
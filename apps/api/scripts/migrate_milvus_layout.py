@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Migrate the Milvus face embedding collection to the configured layout
+
+Copies every embedding into a new collection using tenant_id as partition key
+(MILVUS_PARTITION_KEY, MILVUS_NUM_PARTITIONS) and the index from
+MILVUS_INDEX_TYPE / MILVUS_INDEX_PARAMS, then swaps it in under the same
+name. The previous collection is kept as <name>_legacy_<timestamp>; drop it
+once the API has been verified.
+
+Pause event ingestion (stop the API or workers) while this runs: rows inserted
+by another process during the copy are not carried over.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the parent directory to the path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.milvus_client import milvus_client
+
+
+async def run_migration(batch_size: int, force: bool):
+    """Rebuild the collection unless it already matches the configuration"""
+
+    await milvus_client.connect()
+    if not milvus_client.is_connected:
+        print("❌ Could not connect to Milvus")
+        sys.exit(1)
+
+    try:
+        if not milvus_client.migration_needed and not force:
+            print(
+                f"✅ {milvus_client.collection_name} already uses "
+                f"index={milvus_client.index_type}, "
+                f"partition_key={milvus_client.partition_key}; nothing to do"
+            )
+            return
+
+        print(
+            f"Migrating {milvus_client.collection_name} to "
+            f"index={milvus_client.index_type}, "
+            f"partition_key={milvus_client.partition_key}..."
+        )
+        result = await milvus_client.migrate_collection(batch_size=batch_size)
+        print(
+            f"✅ Copied {result['copied']} embeddings; previous collection kept as "
+            f"{result['legacy_collection']}"
+        )
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        await milvus_client.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the collection already matches the configuration",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_migration(args.batch_size, args.force))
@@ -15,8 +15,57 @@ os.environ["DATABASE_URL"] = "sqlite+aiosqlite:////tmp/customer_visit_test.db"
 os.environ["ENV"] = "test"
 
 from apps.api.app.core.database import get_db, get_db_session
+from apps.api.app.core.minio_client import PresignedUrlCache, minio_client
 from apps.api.app.main import app
 from apps.api.app.models.database import Base
+from apps.api.app.services.customer_activity import CustomerActivityBuffer
+from apps.api.app.services.customer_face_service import customer_face_service
+from apps.api.app.services.face_service import face_service
+from apps.api.app.services.gallery_ranking import GalleryRankingCache
+from apps.api.app.services.pending_clusters import PendingClusters
+from apps.api.app.services.visit_sessions import VisitSessionTable
+
+
+@pytest.fixture(autouse=True)
+def fresh_visit_sessions(monkeypatch):
+    """Open visit sessions must not leak between tests' databases."""
+    table = VisitSessionTable()
+    monkeypatch.setattr(face_service, "visit_sessions", table)
+    return table
+
+
+@pytest.fixture(autouse=True)
+def fresh_customer_activity(monkeypatch):
+    """Buffered customer activity must not leak between tests' databases."""
+    buffer = CustomerActivityBuffer()
+    monkeypatch.setattr(face_service, "customer_activity", buffer)
+    return buffer
+
+
+@pytest.fixture(autouse=True)
+def fresh_gallery_rankings(monkeypatch):
+    """Cached gallery rankings must not leak between tests' databases."""
+    rankings = GalleryRankingCache()
+    monkeypatch.setattr(customer_face_service, "gallery_rankings", rankings)
+    return rankings
+
+
+@pytest.fixture(autouse=True)
+def fresh_pending_clusters(monkeypatch):
+    """Pending face clusters must not leak between tests."""
+    current = face_service.pending_clusters
+    clusters = PendingClusters(current.similarity_threshold, current.window_secs)
+    monkeypatch.setattr(face_service, "pending_clusters", clusters)
+    return clusters
+
+
+@pytest.fixture(autouse=True)
+def fresh_url_cache(monkeypatch):
+    """Signed image URLs must not leak between tests."""
+    current = minio_client.url_cache
+    cache = PresignedUrlCache(current.capacity, current.ttl_secs)
+    monkeypatch.setattr(minio_client, "url_cache", cache)
+    return cache
 
 
 @pytest.fixture
@@ -0,0 +1,66 @@
+"""Tests for write-behind customer last_seen / visit_count updates."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from apps.api.app.models.database import Customer, Tenant
+from apps.api.app.services.customer_activity import CustomerActivityBuffer
+
+
+def test_activity_counts_visits_and_keeps_latest_sighting():
+    buffer = CustomerActivityBuffer()
+    seen = datetime(2025, 1, 1, 12, 0, 0)
+    buffer.record("t1", 5, seen, new_visit=True)
+    buffer.record("t1", 5, seen + timedelta(minutes=2), new_visit=False)
+    buffer.record("t1", 5, seen + timedelta(minutes=1), new_visit=False)
+    buffer.record("t2", 5, seen, new_visit=True)
+
+    activity = buffer.pending["t1"][5]
+    assert (activity.visits, activity.last_seen) == (1, seen + timedelta(minutes=2))
+    assert buffer.get_stats()["pending"] == 2
+
+    buffer.discard("t1", [5])
+    assert buffer.pending["t1"] == {}
+
+
+def test_postgres_flush_is_a_single_values_update():
+    rows = [
+        {"customer_id": 1, "last_seen": datetime(2025, 1, 1), "visits": 1},
+        {"customer_id": 2, "last_seen": datetime(2025, 1, 1), "visits": 0},
+    ]
+    stmt = CustomerActivityBuffer._values_update("t1", rows)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE customers SET")
+    assert "FROM (VALUES" in sql
+    assert "visit_count=(customers.visit_count + activity.visits)" in sql
+
+
+@pytest.mark.asyncio
+async def test_flush_applies_pending_activity(db_session):
+    old = datetime(2025, 1, 1, 9, 0, 0)
+    db_session.add(Tenant(tenant_id="t-act", name="Activity Tenant"))
+    db_session.add_all(
+        [
+            Customer(tenant_id="t-act", customer_id=11, visit_count=3, last_seen=old),
+            Customer(tenant_id="t-act", customer_id=12, visit_count=1, last_seen=old),
+        ]
+    )
+    await db_session.commit()
+
+    buffer = CustomerActivityBuffer()
+    buffer.record("t-act", 11, old + timedelta(hours=1), new_visit=True)
+    buffer.record("t-act", 11, old + timedelta(hours=2), new_visit=False)
+    buffer.record("t-act", 12, old - timedelta(hours=1), new_visit=False)  # late event
+
+    assert await buffer.flush(db_session, "t-act") == 2
+    db_session.expire_all()
+    customers = {
+        c.customer_id: c for c in (await db_session.execute(select(Customer))).scalars()
+    }
+    assert (customers[11].visit_count, customers[11].last_seen) == (4, old + timedelta(hours=2))
+    assert (customers[12].visit_count, customers[12].last_seen) == (1, old)
+    assert buffer.pending == {}
+    assert await buffer.flush(db_session, "t-act") == 0
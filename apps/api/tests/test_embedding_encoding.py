@@ -0,0 +1,86 @@
+"""Tests for the compact embedding wire encoding."""
+
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from common.embedding_codec import (decode_embedding, encode_embedding,
+                                    negotiate_embedding_encoding)
+from common.models import FaceDetectedEvent
+from httpx import AsyncClient
+from pydantic import ValidationError
+
+from apps.api.app.core.security import mint_jwt
+from apps.api.app.services.face_service import face_service
+
+
+def _event() -> FaceDetectedEvent:
+    return FaceDetectedEvent(
+        tenant_id="t1",
+        site_id=1,
+        camera_id=1,
+        timestamp=datetime.utcnow(),
+        embedding=[(i % 17) / 64 - 0.125 for i in range(512)],
+        bbox=[0, 0, 120, 120],
+        confidence=0.9,
+    )
+
+
+def test_wire_roundtrip_per_encoding():
+    event = _event()
+
+    assert FaceDetectedEvent(**event.to_wire()).embedding == event.embedding
+    f32 = event.to_wire("f32")
+    assert f32["embedding_encoding"] == "f32"
+    assert FaceDetectedEvent(**f32).embedding == event.embedding
+
+    f16 = FaceDetectedEvent(**event.to_wire("f16")).embedding
+    assert max(abs(a - b) for a, b in zip(f16, event.embedding)) < 1e-3
+    assert len(json.dumps(event.to_wire("f16"))) < len(json.dumps(event.to_wire())) / 3
+
+
+def test_invalid_compact_embedding_is_rejected():
+    wire = _event().to_wire("f32")
+    wire["embedding"] = encode_embedding([0.1] * 511)
+    with pytest.raises(ValidationError):
+        FaceDetectedEvent(**wire)
+
+    with pytest.raises(ValueError):
+        decode_embedding("not base64!", "f32")
+    with pytest.raises(ValueError):
+        decode_embedding(encode_embedding([0.1] * 4), "f64")
+
+
+def test_negotiation_falls_back_to_json():
+    assert negotiate_embedding_encoding("f16") == "f16"
+    assert negotiate_embedding_encoding("json") is None
+    assert negotiate_embedding_encoding(None) is None
+
+
+@pytest.mark.asyncio
+async def test_event_endpoint_accepts_compact_embedding(async_client: AsyncClient):
+    tok = mint_jwt(sub="worker", role="worker", tenant_id="t1")
+    event = _event()
+    result = {
+        "match": "new",
+        "person_id": 1,
+        "similarity": 0.0,
+        "visit_id": "v_1",
+        "person_type": "customer",
+    }
+
+    with patch.object(
+        face_service, "process_face_event_with_image", new=AsyncMock(return_value=result)
+    ) as process:
+        r = await async_client.post(
+            "/v1/events/face",
+            data={"event_data": json.dumps(event.to_wire("f16"))},
+            files={"face_image": ("face.jpg", b"jpeg", "image/jpeg")},
+            headers={"Authorization": f"Bearer {tok}"},
+        )
+
+    assert r.status_code == 200
+    received = process.await_args.kwargs["event"]
+    assert len(received.embedding) == 512
+    assert received.embedding[1] == pytest.approx(event.embedding[1], abs=1e-3)
@@ -0,0 +1,80 @@
+"""Tests for binary embedding columns and the legacy JSON fallback."""
+
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from sqlalchemy import inspect, select
+
+from apps.api.app.core.embedding_storage import (load_embedding, pack_embedding,
+                                                 unpack_embedding)
+from apps.api.app.models.database import Tenant, Visit
+from apps.api.app.services.merge_service import merge_service
+
+
+def test_packed_embeddings_decode_without_copying():
+    embedding = np.linspace(-1, 1, 512).tolist()
+    packed = pack_embedding(embedding)
+
+    assert len(packed) == 512 * 4
+    vector = unpack_embedding(packed)
+    assert vector.dtype == np.float32 and not vector.flags.writeable
+    assert np.shares_memory(vector, np.frombuffer(packed, dtype=np.uint8))
+    assert np.allclose(vector, embedding, atol=1e-6)
+
+    # Legacy rows: JSON text (visits) or a decoded list (gallery)
+    assert np.allclose(load_embedding(None, json.dumps(embedding)), vector)
+    assert np.allclose(load_embedding(None, embedding), vector)
+    # The binary column wins over a stale legacy value
+    assert np.allclose(load_embedding(packed, [0.0] * 512), vector)
+
+    assert load_embedding(None, "not json") is None
+    assert load_embedding(pack_embedding([0.1] * 4)) is None
+    assert unpack_embedding(b"abc") is None
+
+
+def _visit(visit_id: str, **kwargs) -> Visit:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    return Visit(
+        tenant_id="t-emb",
+        visit_id=visit_id,
+        visit_session_id=f"session_{visit_id}",
+        person_id=501,
+        person_type="customer",
+        site_id=1,
+        camera_id=1,
+        timestamp=now,
+        first_seen=now,
+        last_seen=now,
+        confidence_score=0.9,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_visit_embeddings_are_deferred_and_read_from_both_columns(db_session):
+    db_session.add(Tenant(tenant_id="t-emb", name="Embedding Tenant"))
+    db_session.add_all(
+        [
+            _visit("v_bin", face_embedding_vec=pack_embedding([0.25] * 512)),
+            _visit("v_json", face_embedding=json.dumps([0.5] * 512)),
+            _visit("v_none"),
+        ]
+    )
+    await db_session.commit()
+    db_session.expire_all()
+
+    visits = (await db_session.execute(select(Visit))).scalars().all()
+    assert len(visits) == 3
+    for visit in visits:
+        assert {"face_embedding_vec", "face_embedding"} <= inspect(visit).unloaded
+
+    insert = AsyncMock()
+    with patch("apps.api.app.core.milvus_client.milvus_client.insert_embedding", new=insert):
+        inserted = await merge_service._rebuild_customer_embeddings(db_session, "t-emb", 501)
+
+    assert inserted == 2
+    stored = sorted(call.args[3][0] for call in insert.await_args_list)
+    assert stored == [0.25, 0.5]
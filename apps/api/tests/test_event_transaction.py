@@ -0,0 +1,88 @@
+"""Tests for committing each face event (or batch) in one transaction."""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from common.models import FaceDetectedEvent
+from sqlalchemy import func, select
+
+from apps.api.app.models.database import Customer, CustomerFaceImage, Tenant, Visit
+from apps.api.app.services.customer_face_service import customer_face_service
+from apps.api.app.services.face_service import face_service
+from apps.api.app.services.object_staging import StagedObjects
+
+
+@pytest.mark.asyncio
+async def test_staged_objects_compensate_and_defer_deletes():
+    staging = StagedObjects()
+    staging.added("faces-derived", "visits/a.jpg")
+    mark = staging.mark()
+    staging.added("faces-derived", "customers/b.jpg")
+    staging.delete_on_commit("faces-derived", "customers/old.jpg")
+
+    minio = MagicMock()
+    with patch("apps.api.app.core.minio_client.minio_client", new=minio):
+        await staging.rollback(mark)
+        assert staging.pending_deletes == []
+        minio.delete_object.assert_called_once_with("faces-derived", "customers/b.jpg")
+
+        staging.delete_on_commit("faces-derived", "customers/old.jpg")
+        await staging.commit()
+    assert minio.delete_object.call_args.args == ("faces-derived", "customers/old.jpg")
+    assert staging.uploaded == []
+
+
+@pytest.mark.asyncio
+async def test_event_commits_once_and_survives_gallery_failure(db_session, monkeypatch):
+    monkeypatch.setattr(face_service, "min_confidence_score", 0.7)
+    db_session.add(Tenant(tenant_id="t-uow", name="Unit of Work Tenant"))
+    db_session.add(Customer(tenant_id="t-uow", customer_id=501, visit_count=1))
+    await db_session.commit()
+
+    event = FaceDetectedEvent(
+        tenant_id="t-uow",
+        site_id=1,
+        camera_id=1,
+        timestamp=datetime.utcnow(),
+        embedding=[0.1] * 512,
+        bbox=[0, 0, 120, 120],
+        confidence=0.95,
+    )
+    commits = []
+    real_commit = db_session.commit
+
+    async def counting_commit():
+        commits.append(1)
+        await real_commit()
+
+    async def failing_add(*args, staging, **kwargs):
+        staging.added("faces-derived", "customers/t-uow/501/face.jpg")
+        raise RuntimeError("gallery write failed")
+
+    minio = MagicMock()
+    insert = AsyncMock()
+    monkeypatch.setattr(db_session, "commit", counting_commit)
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces",
+        new=AsyncMock(
+            return_value=[{"person_id": 501, "person_type": "customer", "similarity": 0.97}]
+        ),
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.insert_embeddings", new=insert
+    ), patch("apps.api.app.core.minio_client.minio_client", new=minio), patch.object(
+        customer_face_service, "add_face_image", new=failing_add
+    ):
+        result = await face_service.process_face_event_with_image(
+            event, b"jpeg", "face.jpg", db_session, "t-uow"
+        )
+
+    assert result["match"] == "known"
+    assert len(commits) == 1
+    insert.assert_awaited_once()
+    # The failed gallery write's upload was removed; the visit was kept
+    deleted = [c.args for c in minio.delete_object.call_args_list]
+    assert ("faces-derived", "customers/t-uow/501/face.jpg") in deleted
+    visits = (await db_session.execute(select(func.count(Visit.visit_id)))).scalar()
+    images = (await db_session.execute(select(func.count(CustomerFaceImage.image_id)))).scalar()
+    assert (visits, images) == (1, 0)
@@ -0,0 +1,190 @@
+"""Tests for batch face-event ingestion."""
+
+import json
+from collections import OrderedDict
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from common.models import FaceDetectedEvent
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from apps.api.app.core.security import mint_jwt
+from apps.api.app.models.database import Customer, FaceEventReceipt, Tenant, Visit
+from apps.api.app.services.face_service import face_service
+
+
+def _event(confidence=0.95, embedding_value=0.05):
+    return FaceDetectedEvent(
+        tenant_id="t-batch",
+        site_id=1,
+        camera_id=1,
+        timestamp=datetime.utcnow(),
+        embedding=[embedding_value] * 512,
+        bbox=[0, 0, 120, 120],
+        confidence=confidence,
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_one_search_and_one_insert(db_session, monkeypatch):
+    monkeypatch.setattr(face_service, "min_confidence_score", 0.7)
+    db_session.add(Tenant(tenant_id="t-batch", name="Batch Tenant"))
+    db_session.add_all(
+        [
+            Customer(tenant_id="t-batch", customer_id=cid, visit_count=1)
+            for cid in (101, 102)
+        ]
+    )
+    await db_session.commit()
+
+    events = [_event(), _event(confidence=0.3), _event(embedding_value=0.06)]
+    items = [(event, b"jpeg-bytes", f"face_{i}.jpg") for i, event in enumerate(events)]
+
+    search = AsyncMock(
+        return_value=[
+            [{"person_id": 101, "person_type": "customer", "similarity": 0.95}],
+            [{"person_id": 102, "person_type": "customer", "similarity": 0.95}],
+        ]
+    )
+    insert = AsyncMock(return_value=["1", "2"])
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces_batch",
+        new=search,
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.insert_embeddings",
+        new=insert,
+    ), patch(
+        "apps.api.app.core.minio_client.minio_client.upload_image",
+        new=MagicMock(return_value=None),
+    ), patch.object(
+        face_service, "_save_customer_face_image", new=AsyncMock()
+    ) as save_gallery:
+        results = await face_service.process_face_events_batch(
+            items, db_session, tenant_id="t-batch"
+        )
+
+    assert [r["match"] for r in results] == ["known", "rejected", "known"]
+    # Only the two events that passed gating were searched, in one request
+    search.assert_awaited_once()
+    assert len(search.await_args.kwargs["embeddings"]) == 2
+    # Embeddings stored with a single insert after the commit
+    insert.assert_awaited_once()
+    assert len(insert.await_args.args[0]) == 2
+    assert save_gallery.await_count == 2
+
+    assert [r["person_id"] for r in results if r["match"] == "known"] == [101, 102]
+    visits = (await db_session.execute(select(func.count(Visit.visit_id)))).scalar()
+    assert visits == 2
+    assert not any(hasattr(event, "_manual_face_data") for event in events)
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_returns_per_event_results(async_client: AsyncClient):
+    tok = mint_jwt(sub="worker", role="worker", tenant_id="t1")
+    events = [_event().model_dump(mode="json") for _ in range(2)]
+    mock_results = [
+        {
+            "match": "known",
+            "person_id": 7,
+            "similarity": 0.9,
+            "visit_id": "v_1",
+            "person_type": "customer",
+        },
+        {
+            "match": "rejected",
+            "person_id": None,
+            "similarity": 0.0,
+            "visit_id": None,
+            "person_type": "customer",
+            "message": "Insufficient samples for new identity",
+        },
+    ]
+
+    with patch.object(
+        face_service, "process_face_events_batch", new=AsyncMock(return_value=mock_results)
+    ) as process:
+        r = await async_client.post(
+            "/v1/events/face/batch",
+            data={"events_data": json.dumps(events)},
+            files=[
+                ("face_images", ("a.jpg", b"a", "image/jpeg")),
+                ("face_images", ("b.jpg", b"b", "image/jpeg")),
+            ],
+            headers={"Authorization": f"Bearer {tok}"},
+        )
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total"] == 2
+    assert [res["match"] for res in body["results"]] == ["known", "rejected"]
+    items = process.await_args.kwargs["items"]
+    assert [data for _, data, _ in items] == [b"a", b"b"]
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_rejects_image_count_mismatch(async_client: AsyncClient):
+    tok = mint_jwt(sub="worker", role="worker", tenant_id="t1")
+    events = [_event().model_dump(mode="json") for _ in range(2)]
+
+    r = await async_client.post(
+        "/v1/events/face/batch",
+        data={"events_data": json.dumps(events)},
+        files=[("face_images", ("a.jpg", b"a", "image/jpeg"))],
+        headers={"Authorization": f"Bearer {tok}"},
+    )
+
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_replayed_events_are_not_recorded_twice(db_session, monkeypatch):
+    monkeypatch.setattr(face_service, "recorded_events", OrderedDict())
+    monkeypatch.setattr(face_service.identity_cache, "capacity", 0)
+    db_session.add(Tenant(tenant_id="t-batch", name="Batch Tenant"))
+    db_session.add(Customer(tenant_id="t-batch", customer_id=201, visit_count=1))
+    await db_session.commit()
+
+    event = _event()
+    event.idempotency_key = "evt-1"
+    search = AsyncMock(
+        return_value=[
+            [{"person_id": 201, "person_type": "customer", "similarity": 0.95}]
+        ]
+    )
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces_batch",
+        new=search,
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.insert_embeddings",
+        new=AsyncMock(return_value=["1"]),
+    ), patch(
+        "apps.api.app.core.minio_client.minio_client.upload_image",
+        new=MagicMock(return_value=None),
+    ), patch.object(face_service, "_save_customer_face_image", new=AsyncMock()):
+        first = await face_service.process_face_events_batch(
+            [(event, b"jpeg", "a.jpg")], db_session, tenant_id="t-batch"
+        )
+        # A replay of the same event, plus a duplicate inside one batch
+        replay = await face_service.process_face_events_batch(
+            [(event, b"jpeg", "a.jpg"), (event, b"jpeg", "a.jpg")],
+            db_session,
+            tenant_id="t-batch",
+        )
+        # After a restart the key is only known to the database
+        face_service.recorded_events.clear()
+        restarted = await face_service.process_face_events_batch(
+            [(event, b"jpeg", "a.jpg")], db_session, tenant_id="t-batch"
+        )
+
+    assert first[0]["match"] == "known"
+    assert [r["visit_id"] for r in replay] == [first[0]["visit_id"]] * 2
+    assert restarted[0]["visit_id"] == first[0]["visit_id"]
+    assert restarted[0]["message"] == "Duplicate event, already recorded"
+    assert search.await_count == 2
+    await face_service.customer_activity.flush(db_session, "t-batch")
+    customer = await db_session.get(Customer, 201)
+    assert customer.visit_count == 2
+    receipts = (await db_session.execute(select(FaceEventReceipt))).scalars().all()
+    assert [r.idempotency_key for r in receipts] == ["evt-1"]
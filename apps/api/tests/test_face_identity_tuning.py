@@ -61,10 +61,42 @@ async def test_prefers_known_with_soft_threshold_and_margin(monkeypatch):
         new=AsyncMock(return_value=matches),
     ):
         with patch(
-            "apps.api.app.services.face_service.milvus_client.insert_embedding",
+            "apps.api.app.services.face_service.milvus_client.insert_embeddings",
             new=AsyncMock(return_value="ok"),
         ):
             db_session = AsyncMock()
             res = await face_service.process_face_event(evt, db_session, tenant_id="t1")
             assert res["match"] == "known"
             assert res["person_id"] == 42
+
+
+@pytest.mark.asyncio
+async def test_short_track_does_not_create_identity(monkeypatch):
+    monkeypatch.setattr(face_service, "min_confidence_score", 0.2)
+    monkeypatch.setattr(face_service, "min_track_length", 3)
+
+    evt = FaceDetectedEvent(
+        tenant_id="t1",
+        site_id=1,
+        camera_id=1,
+        timestamp=__import__("datetime").datetime.utcnow(),
+        embedding=[0.02] * 512,
+        bbox=[0, 0, 200, 200],
+        confidence=0.99,
+        snapshot_url=None,
+        is_staff_local=False,
+        track_id=7,
+        track_length=2,
+    )
+
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces",
+        new=AsyncMock(return_value=[]),
+    ):
+        db_session = AsyncMock()
+        # Worker events carry a crop; that must not bypass track gating
+        res = await face_service.process_face_event_with_image(
+            evt, b"jpeg", "face.jpg", db_session, tenant_id="t1"
+        )
+        assert res["match"] == "rejected"
+        assert res["message"] == "Track too short for new identity"
@@ -0,0 +1,111 @@
+"""Tests for content-addressed, reference-counted face image storage."""
+
+import hashlib
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from apps.api.app.models.database import FaceImageObject, Tenant
+from apps.api.app.services.face_image_store import content_hash_of, face_image_store
+from apps.api.app.services.object_staging import StagedObjects
+
+
+@pytest.mark.asyncio
+async def test_identical_crops_are_stored_once_and_deleted_with_last_reference(db_session):
+    db_session.add(Tenant(tenant_id="t-cas", name="Content Store Tenant"))
+    await db_session.commit()
+
+    data = b"\xff\xd8same face crop"
+    digest = hashlib.sha256(data).hexdigest()
+    minio = MagicMock()
+    minio.upload_image.return_value = True
+    staging = StagedObjects()
+
+    with patch("apps.api.app.core.minio_client.minio_client", new=minio):
+        first = await face_image_store.acquire(db_session, "t-cas", data, staging)
+        second = await face_image_store.acquire(db_session, "t-cas", data, staging)
+        await db_session.commit()
+
+        assert first == second
+        assert first.startswith(f"faces/t-cas/{digest[:2]}/{digest}-")
+        assert content_hash_of(first) == digest
+        minio.upload_image.assert_called_once()
+        assert staging.uploaded == [("faces-derived", first)]
+        row = (
+            await db_session.execute(
+                select(FaceImageObject).where(FaceImageObject.content_hash == digest)
+            )
+        ).scalar_one()
+        assert row.ref_count == 2
+        assert row.size_bytes == len(data)
+
+        # One reference left: nothing is deleted
+        release = StagedObjects()
+        legacy = await face_image_store.release(db_session, "t-cas", [first], release)
+        await db_session.commit()
+        await release.commit()
+        assert legacy == []
+        minio.delete_object.assert_not_called()
+
+        # Last reference, plus legacy paths the caller still has to delete
+        legacy = await face_image_store.release(
+            db_session, "t-cas", [first, "visits-faces/old.jpg", None], release
+        )
+        assert release.pending_deletes == [("faces-derived", first)]
+        await db_session.commit()
+        await release.commit()
+
+    assert legacy == ["visits-faces/old.jpg"]
+    minio.delete_object.assert_called_once_with("faces-derived", first)
+    remaining = (
+        await db_session.execute(
+            select(FaceImageObject).where(FaceImageObject.content_hash == digest)
+        )
+    ).scalar_one_or_none()
+    assert remaining is None
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_takes_no_reference(db_session):
+    db_session.add(Tenant(tenant_id="t-cas2", name="Content Store Tenant"))
+    await db_session.commit()
+
+    minio = MagicMock()
+    minio.upload_image.return_value = False
+    with patch("apps.api.app.core.minio_client.minio_client", new=minio):
+        path = await face_image_store.acquire(db_session, "t-cas2", b"crop")
+
+    assert path is None
+    rows = (await db_session.execute(select(FaceImageObject))).scalars().all()
+    assert rows == []
+
+
+@pytest.mark.asyncio
+async def test_reupload_after_last_release_gets_its_own_object(db_session):
+    db_session.add(Tenant(tenant_id="t-cas3", name="Content Store Tenant"))
+    await db_session.commit()
+
+    data = b"\xff\xd8returning face"
+    minio = MagicMock()
+    minio.upload_image.return_value = True
+    with patch("apps.api.app.core.minio_client.minio_client", new=minio):
+        first = await face_image_store.acquire(db_session, "t-cas3", data)
+        await db_session.commit()
+        release = StagedObjects()
+        await face_image_store.release(db_session, "t-cas3", [first], release)
+        await db_session.commit()
+
+        # Stored again before the released object is deleted
+        second = await face_image_store.acquire(db_session, "t-cas3", data)
+        await db_session.commit()
+        await release.commit()
+
+        # A stale release of the old object leaves the new row alone
+        await face_image_store.release(db_session, "t-cas3", [first], StagedObjects())
+        await db_session.commit()
+
+    assert second != first
+    minio.delete_object.assert_called_once_with("faces-derived", first)
+    row = (await db_session.execute(select(FaceImageObject))).scalar_one()
+    assert (row.object_name, row.ref_count) == (second, 1)
@@ -0,0 +1,105 @@
+"""Tests for the incrementally maintained customer gallery ranking."""
+
+import itertools
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import event, select
+
+from apps.api.app.models.database import Customer, CustomerFaceImage, Tenant
+from apps.api.app.services.customer_face_service import customer_face_service
+from apps.api.app.services.gallery_ranking import (CustomerGallery, GalleryEntry,
+                                                   rank_score)
+
+
+def test_rank_score_orders_like_the_eviction_score():
+    now = datetime(2026, 1, 10)
+    images = [
+        (0.90, 0.70, now - timedelta(days=30)),
+        (0.95, 0.70, now),
+        (0.80, None, now - timedelta(days=2)),
+    ]
+
+    def eviction_score(confidence, quality, created_at, at):
+        age_days = (at - created_at).total_seconds() / 86400
+        return confidence + (0.5 if quality is None else quality) + age_days * 0.01
+
+    expected = sorted(range(3), key=lambda i: eviction_score(*images[i], now))
+    later = sorted(range(3), key=lambda i: eviction_score(*images[i], now + timedelta(days=90)))
+    ranked = sorted(range(3), key=lambda i: rank_score(*images[i]))
+    assert ranked == expected == later
+
+    gallery = CustomerGallery(
+        GalleryEntry(rank_score(*img), i, f"h{i}") for i, img in enumerate(images)
+    )
+    assert gallery.worst.image_id == expected[0]
+    assert not gallery.accepts(gallery.worst.rank, capacity=3)
+    assert gallery.accepts(gallery.worst.rank, capacity=4)
+    evicted = gallery.pop_excess(2)
+    assert [e.image_id for e in evicted] == expected[:1]
+    assert f"h{expected[0]}" not in gallery.by_hash
+
+
+@pytest.fixture
+def image_ids():
+    """SQLite does not autoincrement BIGINT primary keys; number the images here"""
+    ids = itertools.count(1)
+
+    def assign(mapper, connection, target):
+        if target.image_id is None:
+            target.image_id = next(ids)
+
+    event.listen(CustomerFaceImage, "before_insert", assign)
+    yield
+    event.remove(CustomerFaceImage, "before_insert", assign)
+
+
+@pytest.mark.asyncio
+async def test_full_gallery_rejects_worse_images_before_upload(
+    db_session, image_ids, monkeypatch
+):
+    monkeypatch.setattr(customer_face_service, "max_images_per_customer", 2)
+    monkeypatch.setattr(customer_face_service, "min_confidence_to_save", 0.5)
+    db_session.add(Tenant(tenant_id="t-gal", name="Gallery Tenant"))
+    db_session.add(Customer(tenant_id="t-gal", customer_id=601, visit_count=1))
+    await db_session.commit()
+
+    minio = MagicMock()
+    minio.upload_image.return_value = True
+
+    async def add(data: bytes, confidence: float):
+        return await customer_face_service.add_face_image(
+            db_session, "t-gal", 601, data, confidence, [0, 0, 120, 120], [0.1] * 4
+        )
+
+    with patch("apps.api.app.core.minio_client.minio_client", new=minio), patch.object(
+        customer_face_service, "_calculate_quality_score", new=AsyncMock(return_value=0.7)
+    ):
+        await add(b"crop-a", 0.80)
+        await add(b"crop-b", 0.90)
+        await db_session.commit()
+        assert minio.upload_image.call_count == 2
+
+        # Ranked below the worst image of a full gallery: not even uploaded
+        assert await add(b"crop-c", 0.60) is None
+        assert minio.upload_image.call_count == 2
+
+        # Better than the worst image: replaces it
+        best = await add(b"crop-d", 0.99)
+        await db_session.commit()
+        assert best is not None
+        assert minio.upload_image.call_count == 3
+
+    rows = (
+        await db_session.execute(
+            select(CustomerFaceImage.confidence_score).where(
+                CustomerFaceImage.customer_id == 601
+            )
+        )
+    ).scalars().all()
+    assert sorted(rows) == [0.90, 0.99]
+    stats = customer_face_service.gallery_rankings.get_stats()
+    assert stats["loads"] == 1
+    assert stats["rejected"] == 1
+    assert stats["evicted_images"] == 1
@@ -0,0 +1,135 @@
+"""Tests for the in-memory cache of recently recognized customers."""
+
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+from common.models import FaceDetectedEvent
+
+from apps.api.app.models.database import Customer, Tenant
+from apps.api.app.services.face_service import face_service
+from apps.api.app.services.identity_cache import IdentityCache
+
+
+def _vector(axis: int, tilt: float = 0.0) -> list:
+    vector = np.zeros(512, dtype=np.float32)
+    vector[axis] = 1.0
+    vector[511] = tilt
+    return vector.tolist()
+
+
+def _cache(**kwargs) -> IdentityCache:
+    options = {"capacity": 2, "ttl_secs": 60, "hit_threshold": 0.9, "margin": 0.05}
+    options.update(kwargs)
+    return IdentityCache(**options)
+
+
+def test_strong_unambiguous_match_is_a_hit():
+    cache = _cache()
+    cache.remember("t1", 7, _vector(0))
+    cache.remember("t1", 8, _vector(1))
+
+    matches = cache.lookup("t1", _vector(0, tilt=0.1))
+    assert [m["person_id"] for m in matches] == [7, 8]
+    assert matches[0]["similarity"] == pytest.approx(1 / np.sqrt(1.01), rel=1e-5)
+
+    assert cache.lookup("t1", _vector(2)) is None  # below threshold
+    assert cache.lookup("t2", _vector(0)) is None  # other tenant
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+
+
+def test_close_second_person_is_ambiguous():
+    cache = _cache()
+    cache.remember("t1", 7, _vector(0))
+    cache.remember("t1", 8, _vector(0, tilt=0.05))
+
+    assert cache.lookup("t1", _vector(0)) is None
+    assert cache.get_stats()["ambiguous"] == 1
+
+
+def test_lru_eviction_ttl_and_invalidation():
+    cache = _cache()
+    cache.remember("t1", 7, _vector(0))
+    cache.remember("t1", 8, _vector(1))
+    assert cache.lookup("t1", _vector(0)) is not None  # 7 is now most recent
+    cache.remember("t1", 9, _vector(2))
+
+    assert cache.lookup("t1", _vector(1)) is None
+    assert cache.lookup("t1", _vector(2))[0]["person_id"] == 9
+    assert cache.get_stats()["evictions"] == 1
+
+    cache.invalidate("t1", "9")
+    assert cache.lookup("t1", _vector(2)) is None
+
+    cache.ttl_secs = 0.01
+    time.sleep(0.02)
+    assert cache.lookup("t1", _vector(0)) is None
+
+
+@pytest.mark.asyncio
+async def test_repeat_visitor_skips_vector_search(db_session, monkeypatch):
+    monkeypatch.setattr(face_service, "identity_cache", _cache(hit_threshold=0.75))
+    monkeypatch.setattr(face_service, "min_confidence_score", 0.7)
+    db_session.add(Tenant(tenant_id="t-cache", name="Cache Tenant"))
+    db_session.add(Customer(tenant_id="t-cache", customer_id=301, visit_count=1))
+    await db_session.commit()
+
+    def event():
+        return FaceDetectedEvent(
+            tenant_id="t-cache",
+            site_id=1,
+            camera_id=1,
+            timestamp=datetime.utcnow(),
+            embedding=_vector(3),
+            bbox=[0, 0, 120, 120],
+            confidence=0.95,
+        )
+
+    search = AsyncMock(
+        return_value=[{"person_id": 301, "person_type": "customer", "similarity": 0.97}]
+    )
+    batch_search = AsyncMock(return_value=[])
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces",
+        new=search,
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces_batch",
+        new=batch_search,
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.insert_embeddings",
+        new=AsyncMock(),
+    ), patch(
+        "apps.api.app.core.minio_client.minio_client.upload_image",
+        new=MagicMock(return_value=None),
+    ), patch.object(face_service, "_save_customer_face_image", new=AsyncMock()):
+        # Worker events carry a crop; that alone must not bypass the cache
+        first = await face_service.process_face_event_with_image(
+            event(), b"jpeg", "face.jpg", db_session, "t-cache"
+        )
+        second = await face_service.process_face_event_with_image(
+            event(), b"jpeg", "face.jpg", db_session, "t-cache"
+        )
+        batched = await face_service.process_face_events_batch(
+            [(event(), b"jpeg", "face.jpg")], db_session, "t-cache"
+        )
+
+        # Imported images are always searched in the vector store
+        await face_service.process_face_event_with_image(
+            event(), b"jpeg", "face.jpg", db_session, "t-cache", manual_import=True
+        )
+
+        # Deleting the customer's embeddings drops it from the cache
+        face_service._forget_identity("t-cache", "301", None)
+        await face_service.process_face_event_with_image(
+            event(), b"jpeg", "face.jpg", db_session, "t-cache"
+        )
+
+    assert first["match"] == second["match"] == batched[0]["match"] == "known"
+    assert second["person_id"] == batched[0]["person_id"] == 301
+    batch_search.assert_not_awaited()
+    assert search.await_count == 3
+    assert face_service.identity_cache.get_stats()["hits"] == 2
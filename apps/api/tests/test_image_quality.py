@@ -0,0 +1,55 @@
+"""Tests for header-only quality inputs and cached pixel metrics."""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from apps.api.app.services.customer_face_service import customer_face_service
+from apps.api.app.services.image_quality import (ImageMetricsCache, compute_image_metrics,
+                                                 image_dimensions)
+
+
+def _jpeg(pixels: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buf, format="JPEG", quality=95)
+    return buf.getvalue()
+
+
+def test_dimensions_come_from_the_header_alone():
+    data = _jpeg(np.full((240, 320), 128))
+    # Truncated well before the pixel data ends: still readable
+    assert image_dimensions(data[:700]) == (320, 240)
+    assert image_dimensions(b"not an image") is None
+
+
+def test_metrics_tell_sharp_from_flat_and_dark_images():
+    checker = (np.indices((256, 256)).sum(axis=0) // 4 % 2) * 200 + 20
+    sharp = compute_image_metrics(_jpeg(checker))
+    flat = compute_image_metrics(_jpeg(np.full((256, 256), 120)))
+    dark = compute_image_metrics(_jpeg(np.full((256, 256), 5)))
+
+    assert sharp.sharpness > 0.9
+    assert flat.sharpness < 0.05
+    assert flat.exposure > 0.95
+    assert dark.exposure < 0.1
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_computed_once_per_image_hash(monkeypatch):
+    data = _jpeg(np.full((64, 64), 120))
+    cache = ImageMetricsCache(enabled=True)
+    monkeypatch.setattr(customer_face_service, "image_metrics", cache)
+
+    bbox = [0, 0, 100, 100]
+    first = await customer_face_service._calculate_quality_score(data, bbox, None, "h1")
+    second = await customer_face_service._calculate_quality_score(data, bbox, None, "h1")
+
+    assert first == second
+    assert cache.stats == {"hits": 1, "computed": 1, "failed": 0}
+
+    # Disabled: the score only uses the header
+    monkeypatch.setattr(customer_face_service, "image_metrics", ImageMetricsCache())
+    header_only = await customer_face_service._calculate_quality_score(data, bbox, None, "h1")
+    assert header_only == pytest.approx(min(1.0, 64 * 64 / 40000) * 0.3 + 0.3 + 0.28)
@@ -0,0 +1,306 @@
+"""Tests for the non-blocking Milvus access layer."""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from apps.api.app.core.milvus_client import (MilvusClient, _BufferedEmbedding,
+                                             _TenantOverlay)
+
+
+class SlowCollection:
+    """Blocking stand-in for a pymilvus Collection"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def search(self, data, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return [[] for _ in data]
+
+
+@pytest.mark.asyncio
+async def test_slow_search_does_not_block_event_loop():
+    client = MilvusClient()
+    client.collection = SlowCollection(delay=0.2)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        result = await client.search_similar_faces("t1", [0.1] * 512)
+    finally:
+        task.cancel()
+
+    assert result == []
+    # The loop kept running while the search blocked its worker thread
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_and_latency_recorded():
+    client = MilvusClient()
+    client.max_concurrency = 2
+    collection = SlowCollection(delay=0.05)
+    client.collection = collection
+
+    await asyncio.gather(
+        *(client.search_similar_faces("t1", [0.1] * 512) for _ in range(6))
+    )
+
+    assert collection.max_in_flight == 2
+    stats = client.get_call_stats()["operations"]["search"]
+    assert stats["calls"] == 6
+    assert stats["errors"] == 0
+    assert stats["p50_ms"] >= 40
+
+
+class RecordingCollection:
+    """Collection whose search never sees unflushed rows"""
+
+    def __init__(self):
+        self.inserts = []
+        self.flushes = 0
+        self.deleted = []
+
+    def insert(self, data):
+        start = sum(len(batch) for batch in self.inserts)
+        self.inserts.append(data)
+        return SimpleNamespace(primary_keys=list(range(start, start + len(data))))
+
+    def flush(self):
+        self.flushes += 1
+
+    def search(self, data, **kwargs):
+        return [[] for _ in data]
+
+    def query(self, expr, output_fields, **kwargs):
+        return []
+
+    def delete(self, expr):
+        self.deleted.append(expr)
+
+
+def _row(person_id, value, tenant_id="t1"):
+    return {
+        "tenant_id": tenant_id,
+        "person_id": person_id,
+        "person_type": "customer",
+        "embedding": [value] + [0.0] * 511,
+        "created_at": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_unflushed_inserts_match_and_are_written_in_batches():
+    client = MilvusClient()
+    client.insert_max_delay = 0.05
+    client.flush_interval = 3600
+    collection = RecordingCollection()
+    client.collection = collection
+
+    await client.insert_embedding(**_row(7, 1.0))
+    await client.insert_embeddings([_row(8, -1.0), _row(9, 1.0, tenant_id="t2")])
+
+    # Read-your-writes before anything reached Milvus
+    matches = await client.search_similar_faces("t1", [1.0] + [0.0] * 511)
+    assert [m["person_id"] for m in matches] == [7]
+    assert collection.inserts == []
+
+    await asyncio.sleep(0.15)
+    assert len(collection.inserts) == 1 and len(collection.inserts[0]) == 3
+    assert collection.flushes == 0
+    # Written but unflushed rows still come from the overlay
+    matches = await client.search_similar_faces("t1", [1.0] + [0.0] * 511)
+    assert matches[0]["id"] == "0"
+
+    await client._stop_writer()
+    assert collection.flushes == 1
+    assert client.get_call_stats()["write_behind"]["unflushed_rows"] == 0
+    assert await client.search_similar_faces("t1", [1.0] + [0.0] * 511) == []
+
+
+@pytest.mark.asyncio
+async def test_delete_drops_buffered_rows_of_person():
+    client = MilvusClient()
+    client.insert_max_delay = 3600
+    collection = RecordingCollection()
+    client.collection = collection
+
+    await client.insert_embeddings([_row(7, 1.0), _row(8, 1.0)])
+    await client.delete_person_embeddings("t1", 7, "customer")
+
+    matches = await client.search_similar_faces("t1", [1.0] + [0.0] * 511)
+    assert [m["person_id"] for m in matches] == [8]
+
+    await client._stop_writer()
+    assert [row["person_id"] for row in collection.inserts[0]] == ["8"]
+
+
+def test_overlay_matrix_grows_on_insert_and_compacts():
+    overlay = _TenantOverlay()
+    for seq in range(100):
+        vector = np.zeros(4, dtype=np.float32)
+        vector[seq % 4] = 1.0
+        overlay.append(_BufferedEmbedding(seq=seq, row={}), vector)
+
+    assert overlay.vectors.shape == (100, 4)
+    assert overlay.compact(lambda e: e.seq % 10 == 0) == 90
+    assert [e.seq for e in overlay.entries] == list(range(0, 100, 10))
+    # Rows keep their own vectors after compaction
+    assert overlay.vectors.argmax(axis=1).tolist() == [s % 4 for s in range(0, 100, 10)]
+    assert overlay._vectors.shape[0] == 64
+
+def test_search_params_layer_tenant_overrides_on_index_defaults():
+    client = MilvusClient()
+    client.index_type = client.active_index_type = "HNSW"
+    client.search_params = {"ef": 32}
+    client.tenant_search_params = {"big": {"ef": 200}}
+
+    assert client._search_params("small", 10) == {"ef": 32}
+    assert client._search_params("big", 10) == {"ef": 200}
+    # HNSW needs ef >= top_k
+    assert client._search_params("small", 100) == {"ef": 100}
+
+    # A collection not migrated yet keeps its own index's defaults
+    client.active_index_type = "IVF_FLAT"
+    assert client._search_params("big", 10) == {"nprobe": 16}
+
+
+class LayoutCollection:
+    """Stand-in for an existing collection with a given layout and rows"""
+
+    def __init__(self, name, partition_key=False, index_type="IVF_FLAT", rows=()):
+        self.name = name
+        fields = ["id", "tenant_id", "person_id", "person_type", "embedding", "created_at"]
+        self.schema = SimpleNamespace(
+            fields=[
+                SimpleNamespace(
+                    name=f, is_partition_key=partition_key and f == "tenant_id"
+                )
+                for f in fields
+            ]
+        )
+        self.indexes = [
+            SimpleNamespace(field_name="embedding", params={"index_type": index_type})
+        ]
+        self.rows = list(rows)
+        self.inserted = []
+        self.flushed = self.loaded = self.released = False
+
+    def load(self):
+        self.loaded = True
+
+    def release(self):
+        self.released = True
+
+    def insert(self, rows):
+        self.inserted.extend(rows)
+
+    def flush(self):
+        self.flushed = True
+
+    def query_iterator(self, batch_size, **kwargs):
+        batches = [self.rows[i : i + batch_size] for i in range(0, len(self.rows), batch_size)]
+        return SimpleNamespace(
+            next=lambda: batches.pop(0) if batches else [], close=lambda: None
+        )
+
+
+class FakeMilvus:
+    """Collections by name plus the utility calls the client makes"""
+
+    def __init__(self, **collections):
+        self.collections = collections
+        self.created = []
+
+    def collection(self, name=None, schema=None, using=None, **kwargs):
+        if schema is None:
+            return self.collections[name]
+        created = LayoutCollection(name, partition_key=True, index_type="HNSW")
+        created.create_index = lambda field_name, index_params: None
+        created.kwargs = kwargs
+        self.created.append(created)
+        self.collections[name] = created
+        return created
+
+    def has_collection(self, name, using=None):
+        return name in self.collections
+
+    def drop_collection(self, name, using=None):
+        del self.collections[name]
+
+    def rename_collection(self, old, new, using=None):
+        self.collections[new] = self.collections.pop(old)
+
+
+def _patch_milvus(monkeypatch, fake):
+    import apps.api.app.core.milvus_client as module
+
+    monkeypatch.setattr(module, "Collection", fake.collection)
+    monkeypatch.setattr(module, "utility", fake)
+    monkeypatch.setattr(module, "MILVUS_AVAILABLE", True)
+
+
+def _hnsw_client():
+    client = MilvusClient()
+    client.collection_name = "faces"
+    client.partition_key = True
+    client.index_type = "HNSW"
+    return client
+
+
+def test_existing_collection_in_old_layout_is_kept_until_migrated(monkeypatch):
+    legacy = LayoutCollection("faces")
+    fake = FakeMilvus(faces=legacy)
+    _patch_milvus(monkeypatch, fake)
+    client = _hnsw_client()
+
+    client._ensure_collection_exists_sync()
+
+    assert client.collection is legacy and legacy.loaded
+    assert client.migration_needed
+    assert client.active_index_type == "IVF_FLAT"
+    assert fake.created == []
+
+
+@pytest.mark.asyncio
+async def test_migration_copies_rows_and_swaps_collections(monkeypatch):
+    rows = [dict(_row(i, 1.0), person_id=str(i), id=i) for i in range(5)]
+    legacy = LayoutCollection("faces", rows=rows)
+    fake = FakeMilvus(faces=legacy)
+    _patch_milvus(monkeypatch, fake)
+    client = _hnsw_client()
+    client._ensure_collection_exists_sync()
+    client.is_connected = True
+
+    result = await client.migrate_collection(batch_size=2)
+
+    assert result["copied"] == 5
+    migrated = fake.created[0]
+    assert migrated.kwargs == {"num_partitions": client.num_partitions}
+    # Primary keys are regenerated by the new collection
+    assert [r["person_id"] for r in migrated.inserted] == ["0", "1", "2", "3", "4"]
+    assert "id" not in migrated.inserted[0]
+    assert fake.collections["faces"] is migrated is client.collection
+    assert fake.collections[result["legacy_collection"]] is legacy
+    assert legacy.released and migrated.flushed
+    assert not client.migration_needed and client.active_index_type == "HNSW"
@@ -0,0 +1,129 @@
+"""Tests for the in-process memory-mapped vector store."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from apps.api.app.core.mmap_vector_store import GROWTH_ROWS, MmapVectorStore
+
+
+def _vector(axis: int, noise: float = 0.0) -> list:
+    vector = np.zeros(512, dtype=np.float32)
+    vector[axis] = 1.0
+    vector[511] = noise
+    return vector.tolist()
+
+
+def _row(tenant_id, person_id, axis, person_type="customer"):
+    return {
+        "tenant_id": tenant_id,
+        "person_id": person_id,
+        "person_type": person_type,
+        "embedding": _vector(axis),
+        "created_at": 1700000000 + axis,
+    }
+
+
+@pytest.mark.asyncio
+async def test_search_is_exact_top_k_within_tenant(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    await store.connect()
+    await store.insert_embeddings(
+        [_row("t1", 7, 0), _row("t1", 8, 1), _row("t2", 9, 0)]
+    )
+    await store.insert_embedding(**_row("t1", 10, 0))
+
+    results = await store.search_similar_faces_batch(
+        "t1", [_vector(0, noise=0.1), _vector(2)], limit=1, threshold=0.5
+    )
+    assert len(results[0]) == 1
+    assert results[0][0]["person_id"] in (7, 10)
+    assert results[0][0]["similarity"] == pytest.approx(1 / np.sqrt(1.01), rel=1e-5)
+    assert results[1] == []
+
+    matches = await store.search_similar_faces("t1", _vector(0), limit=5)
+    assert sorted(m["person_id"] for m in matches) == [7, 10]
+    assert await store.search_similar_faces("unknown", _vector(0)) == []
+
+
+@pytest.mark.asyncio
+async def test_deletes_are_tombstones_that_survive_reopen(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    deleted = []
+    store.add_delete_listener(lambda *args: deleted.append(args))
+    await store.connect()
+    await store.insert_embeddings(
+        [_row("t/1", 7, 0), _row("t/1", 7, 0, person_type="staff"), _row("t/1", 8, 1)]
+    )
+    await store.delete_person_embeddings("t/1", 7, "customer")
+    assert deleted == [("t/1", "7", "customer")]
+    await store.disconnect()
+
+    reopened = MmapVectorStore(str(tmp_path))
+    await reopened.connect()
+    matches = await reopened.search_similar_faces("t/1", _vector(0))
+    assert [(m["person_id"], m["person_type"]) for m in matches] == [(7, "staff")]
+
+    health = await reopened.health_check()
+    assert health["rows"] == 3 and health["deleted_rows"] == 1
+
+    await reopened.delete_person_embeddings("t/1", 7)
+    await reopened.delete_person_embeddings("t/1", 8)
+    assert await reopened.search_similar_faces("t/1", _vector(1)) == []
+
+
+@pytest.mark.asyncio
+async def test_torn_append_is_overwritten_on_open(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    await store.connect()
+    await store.insert_embeddings([_row("t1", 7, 0)])
+    # A crash after writing a vector but before marking its metadata written
+    with open(tmp_path / "t1" / "vectors.f32", "r+b") as f:
+        f.seek(512 * 4)
+        f.write(np.ones(512, dtype=np.float32).tobytes())
+
+    reopened = MmapVectorStore(str(tmp_path))
+    await reopened.connect()
+    assert (await reopened.health_check())["rows"] == 1
+    await reopened.insert_embeddings([_row("t1", 8, 1)])
+    matches = await reopened.search_similar_faces("t1", _vector(1))
+    assert [m["person_id"] for m in matches] == [8]
+    assert matches[0]["id"] == "1"
+    assert matches[0]["similarity"] == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_appends_write_into_preallocated_rows(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    await store.connect()
+    await store.insert_embeddings([_row("t1", 7, 0)])
+    tenant = store._tenants["t1"]
+    vectors = tenant.vectors
+    assert tenant.capacity == GROWTH_ROWS
+    assert (tmp_path / "t1" / "vectors.f32").stat().st_size == GROWTH_ROWS * 512 * 4
+
+    await store.insert_embeddings([_row("t1", 8, 1), _row("t1", 9, 2)])
+    assert tenant.vectors is vectors
+    assert tenant.rows == 3
+
+    await store.insert_embeddings(
+        [_row("t1", 100 + i, i % 500) for i in range(GROWTH_ROWS)]
+    )
+    assert tenant.capacity == 2 * GROWTH_ROWS
+    assert tenant.rows == GROWTH_ROWS + 3
+    matches = await store.search_similar_faces("t1", _vector(1), limit=10)
+    assert sorted(m["person_id"] for m in matches) == [8, 101, 601, 1101]
+
+
+@pytest.mark.asyncio
+async def test_tenants_do_not_share_a_lock(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    await store.connect()
+    await store.insert_embeddings([_row("t1", 7, 0), _row("t2", 8, 0)])
+
+    with store._tenants["t2"].lock:
+        matches = await asyncio.wait_for(
+            store.search_similar_faces("t1", _vector(0)), timeout=1.0
+        )
+    assert [m["person_id"] for m in matches] == [7]
@@ -0,0 +1,108 @@
+"""Tests for per-camera clustering of unrecognized faces."""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from common.models import FaceDetectedEvent
+
+from apps.api.app.services.face_service import face_service
+from apps.api.app.services.pending_clusters import PendingClusters
+
+
+def _face(seed: int, noise: float = 0.0, noise_seed: int = 0) -> list:
+    base = np.random.default_rng(seed).normal(size=512)
+    base /= np.linalg.norm(base)
+    jitter = np.random.default_rng(1000 + noise_seed).normal(size=512) * noise / np.sqrt(512)
+    return (base + jitter).tolist()
+
+
+def test_frames_of_one_face_share_a_cluster():
+    clusters = PendingClusters(similarity_threshold=0.65, window_secs=10)
+    key = clusters.key("t1", 1, 1)
+
+    samples = [clusters.observe(key, _face(1, 0.3, i), now=100 + i) for i in range(4)]
+    other = clusters.observe(key, _face(2), now=104)
+
+    assert len({s.cluster_id for s in samples}) == 1
+    assert samples[-1].samples == 4
+    assert samples[-1].similarity > 0.9
+    assert other.cluster_id != samples[0].cluster_id
+    assert other.samples == 1
+
+
+def test_clusters_expire_and_memory_is_bounded():
+    clusters = PendingClusters(
+        similarity_threshold=0.65, window_secs=10, clusters_per_camera=2, max_cameras=2
+    )
+    key = clusters.key("t1", 1, 1)
+
+    first = clusters.observe(key, _face(1), now=0)
+    clusters.assign(key, first.cluster_id, 77)
+    assert clusters.observe(key, _face(1), now=5).person_id == 77
+
+    # Window elapsed: a fresh cluster without the customer
+    later = clusters.observe(key, _face(1), now=30)
+    assert later.cluster_id != first.cluster_id
+    assert later.person_id is None
+    assert clusters.stats["expired"] == 1
+
+    # A full camera replaces its least recently seen cluster
+    clusters.observe(key, _face(2), now=31)
+    clusters.observe(key, _face(3), now=32)
+    assert clusters.stats["replaced"] == 1
+    assert clusters.observe(key, _face(1), now=33).samples == 1
+
+    for camera in (2, 3, 4):
+        clusters.observe(clusters.key("t1", 1, camera), _face(camera), now=34)
+    assert clusters.get_stats()["cameras"] == 2
+
+
+@pytest.mark.asyncio
+async def test_new_customer_is_created_once_per_cluster(monkeypatch):
+    monkeypatch.setattr(face_service, "min_confidence_score", 0.2)
+    monkeypatch.setattr(face_service, "min_cluster_samples", 2)
+    monkeypatch.setattr(face_service, "min_track_length", 1)
+    monkeypatch.setattr(face_service.identity_cache, "capacity", 0)
+
+    def event(i: int) -> FaceDetectedEvent:
+        return FaceDetectedEvent(
+            tenant_id="t1",
+            site_id=1,
+            camera_id=5,
+            timestamp=datetime.utcnow(),
+            embedding=_face(9, 0.3, i),
+            bbox=[0, 0, 200, 200],
+            confidence=0.99,
+        )
+
+    create = AsyncMock(return_value=900)
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces",
+        new=AsyncMock(return_value=[]),
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.insert_embeddings",
+        new=AsyncMock(),
+    ), patch.object(face_service, "_create_new_customer", new=create), patch.object(
+        face_service, "_create_visit_record", new=AsyncMock(return_value="v-1")
+    ):
+        # Worker events carry a crop; they are still gated on cluster samples
+        results = [
+            await face_service.process_face_event_with_image(
+                event(i), b"jpeg", "face.jpg", AsyncMock(), tenant_id="t1"
+            )
+            for i in range(3)
+        ]
+
+        # Joining the customer's cluster takes a regular match's similarity
+        monkeypatch.setattr(face_service, "embedding_distance_thr", 0.999)
+        weak = await face_service.process_face_event_with_image(
+            event(3), b"jpeg", "face.jpg", AsyncMock(), tenant_id="t1"
+        )
+
+    assert results[0]["match"] == "rejected"
+    assert [r["person_id"] for r in results[1:]] == [900, 900]
+    assert results[2]["match"] == "known"
+    assert weak["match"] == "rejected"
+    create.assert_awaited_once()
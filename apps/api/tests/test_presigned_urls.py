@@ -0,0 +1,86 @@
+"""Tests for reuse and batch signing of presigned image URLs."""
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from apps.api.app.core import minio_client as minio_module
+from apps.api.app.core.minio_client import PresignedUrlCache, minio_client
+from apps.api.app.models.database import Customer, CustomerFaceImage, Tenant
+from apps.api.app.routers.customers import list_customers
+
+
+@pytest.fixture
+def signer(monkeypatch):
+    """Signs ``<bucket>/<object>?n=<call>``; objects named ``broken`` fail"""
+    calls = []
+
+    def presigned_get_object(bucket, object_name, expires):
+        if object_name == "broken":
+            raise RuntimeError("cannot sign")
+        calls.append((bucket, object_name))
+        return f"{bucket}/{object_name}?n={len(calls)}"
+
+    client = MagicMock()
+    client.presigned_get_object.side_effect = presigned_get_object
+    monkeypatch.setattr(minio_client, "client", client)
+    return calls
+
+
+def test_urls_are_reused_within_half_their_expiry(signer, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(minio_module.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(minio_client, "url_cache", PresignedUrlCache(10, ttl_secs=1200))
+
+    first = minio_client.get_presigned_url("faces-derived", "a.jpg", timedelta(minutes=2))
+    assert minio_client.get_presigned_url("faces-derived", "a.jpg", timedelta(minutes=2)) == first
+    # A different expiry is a different URL
+    minio_client.get_presigned_url("faces-derived", "a.jpg")
+    assert len(signer) == 2
+
+    # Half of the two-minute expiry is the limit, below the cache TTL
+    clock[0] += 61
+    again = minio_client.get_presigned_url("faces-derived", "a.jpg", timedelta(minutes=2))
+    assert again != first
+    assert minio_client.url_cache.stats["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_signs_each_missing_object_once(signer):
+    objects = [("faces-raw", "a.jpg"), None, ("faces-raw", "broken"), ("faces-raw", "a.jpg")]
+
+    urls = await minio_client.get_presigned_urls(objects)
+    assert urls == ["faces-raw/a.jpg?n=1", None, None, "faces-raw/a.jpg?n=1"]
+
+    assert await minio_client.get_presigned_urls(objects[:2]) == urls[:2]
+    assert signer == [("faces-raw", "a.jpg")]
+
+
+@pytest.mark.asyncio
+async def test_customer_avatars_come_from_one_query(db_session, signer):
+    now = datetime(2025, 1, 1)
+    db_session.add(Tenant(tenant_id="t-url", name="URL Tenant"))
+    db_session.add_all(
+        Customer(tenant_id="t-url", customer_id=cid, first_seen=now, last_seen=now)
+        for cid in (1, 2)
+    )
+    db_session.add_all(
+        CustomerFaceImage(
+            tenant_id="t-url",
+            image_id=image_id,
+            customer_id=1,
+            image_path=path,
+            confidence_score=confidence,
+        )
+        for image_id, path, confidence in [(1, "faces/worse.jpg", 0.7), (2, "faces/best.jpg", 0.9)]
+    )
+    await db_session.commit()
+
+    customers = await list_customers(
+        limit=10, offset=0, user={"tenant_id": "t-url"}, db_session=db_session
+    )
+
+    avatars = {c.customer_id: c.avatar_url for c in customers}
+    assert avatars == {1: "faces-derived/faces/best.jpg?n=1", 2: None}
+    assert signer == [("faces-derived", "faces/best.jpg")]
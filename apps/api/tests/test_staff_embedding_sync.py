@@ -0,0 +1,127 @@
+"""Tests for the versioned staff embedding sync feed."""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from common.staff_vectors import decode_staff_vectors, encode_staff_vectors
+
+from apps.api.app.models.database import Staff, StaffFaceImage, Tenant
+from apps.api.app.services.face_service import staff_service
+
+
+def test_staff_vector_codec_roundtrip():
+    rows = [(1, [0.5] * 4), (1, [0.25] * 4), (7, [1.0, 2.0, 3.0, 4.0])]
+    data = encode_staff_vectors([1, 7, 9], rows, dim=4, full=True)
+
+    assert len(data) == 20 + 8 * 3 + 8 * 3 + 4 * 12
+    payload = decode_staff_vectors(data)
+    assert payload.full
+    assert payload.active_ids == [1, 7, 9]
+    assert payload.vectors_by_staff() == {
+        1: [[0.5] * 4, [0.25] * 4],
+        7: [[1.0, 2.0, 3.0, 4.0]],
+    }
+
+    with pytest.raises(ValueError):
+        decode_staff_vectors(data[:-4])
+
+
+async def _seed(db_session):
+    db_session.add(Tenant(tenant_id="t-sync", name="Sync Tenant"))
+    old = datetime.utcnow() - timedelta(hours=1)
+    db_session.add_all(
+        [
+            Staff(staff_id=1, tenant_id="t-sync", name="Alice", updated_at=old),
+            Staff(
+                staff_id=2,
+                tenant_id="t-sync",
+                name="Bob",
+                face_embedding=json.dumps([0.2] * 4),
+                updated_at=old - timedelta(hours=1),
+            ),
+            Staff(staff_id=3, tenant_id="t-sync", name="No Face", updated_at=old),
+        ]
+    )
+    await db_session.flush()
+    db_session.add_all(
+        [
+            StaffFaceImage(
+                tenant_id="t-sync",
+                image_id=f"img-{i}",
+                staff_id=1,
+                image_path=f"staff/{i}.jpg",
+                face_embedding=json.dumps([0.1 * (i + 1)] * 4),
+                created_at=old,
+                updated_at=old,
+            )
+            for i in range(2)
+        ]
+    )
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_full_snapshot_and_delta(db_session):
+    await _seed(db_session)
+
+    version = await staff_service.get_staff_vector_version(db_session, "t-sync")
+    full, active_ids, rows = await staff_service.get_staff_vectors(
+        db_session, "t-sync"
+    )
+
+    assert full
+    assert sorted(active_ids) == [1, 2]
+    assert sorted(staff_id for staff_id, _ in rows) == [1, 1, 2]
+
+    # Nothing changed: the version is stable and the delta only resends the
+    # staff member changed exactly at the version boundary
+    assert (
+        await staff_service.get_staff_vector_version(db_session, "t-sync") == version
+    )
+    full, active_ids, rows = await staff_service.get_staff_vectors(
+        db_session, "t-sync", since=version
+    )
+    assert not full
+    assert {staff_id for staff_id, _ in rows} == {1}
+
+    # Enrolling a new face changes the version and ships that staff member
+    db_session.add(
+        StaffFaceImage(
+            tenant_id="t-sync",
+            image_id="img-new",
+            staff_id=3,
+            image_path="staff/new.jpg",
+            face_embedding=json.dumps([0.9] * 4),
+        )
+    )
+    await db_session.commit()
+
+    new_version = await staff_service.get_staff_vector_version(db_session, "t-sync")
+    assert new_version != version
+    full, active_ids, rows = await staff_service.get_staff_vectors(
+        db_session, "t-sync", since=version
+    )
+    assert not full
+    assert sorted(active_ids) == [1, 2, 3]
+    assert (3, [0.9] * 4) in rows
+    assert 2 not in {staff_id for staff_id, _ in rows}
+
+
+@pytest.mark.asyncio
+async def test_deleted_staff_changes_version(db_session):
+    await _seed(db_session)
+    version = await staff_service.get_staff_vector_version(db_session, "t-sync")
+
+    staff = await db_session.get(Staff, 2)
+    await db_session.delete(staff)
+    await db_session.commit()
+
+    assert (
+        await staff_service.get_staff_vector_version(db_session, "t-sync") != version
+    )
+    _, active_ids, rows = await staff_service.get_staff_vectors(
+        db_session, "t-sync", since=version
+    )
+    assert active_ids == [1]
+    assert 2 not in {staff_id for staff_id, _ in rows}
@@ -0,0 +1,202 @@
+"""Tests for the in-memory table of open visit sessions."""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from common.models import FaceDetectedEvent
+from sqlalchemy import delete, select
+
+from apps.api.app.models.database import Customer, Tenant, Visit
+from apps.api.app.services.face_service import face_service
+from apps.api.app.services.visit_sessions import VisitSession, VisitSessionTable
+
+
+def _visit(**kwargs) -> Visit:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    options = dict(
+        tenant_id="t-vs",
+        visit_id="v_1",
+        visit_session_id="session_1",
+        person_id=401,
+        person_type="customer",
+        site_id=1,
+        camera_id=1,
+        timestamp=now,
+        first_seen=now,
+        last_seen=now,
+        visit_duration_seconds=0,
+        detection_count=1,
+        confidence_score=0.9,
+        highest_confidence=0.9,
+        image_path="visits-faces/a.jpg",
+    )
+    options.update(kwargs)
+    return Visit(**options)
+
+
+def test_session_window_and_best_detection():
+    table = VisitSessionTable(merge_window=timedelta(minutes=30))
+    visit = _visit()
+    key = table.key("t-vs", "customer", 401, 1)
+    table.open(key, VisitSession.from_visit(visit))
+
+    session = table.get(key, visit.last_seen + timedelta(minutes=5))
+    session.record_detection(
+        visit.last_seen + timedelta(minutes=5), 0.95, "visits-faces/b.jpg", [1, 2, 3, 4], "[]"
+    )
+    session.record_detection(
+        visit.last_seen + timedelta(minutes=6), 0.8, "visits-faces/c.jpg", [5, 6, 7, 8], "[]"
+    )
+
+    assert session.dirty
+    assert session.detection_count == 3
+    assert session.duration_seconds == 360
+    assert session.highest_confidence == 0.95
+    assert (session.image_path, session.bbox) == ("visits-faces/b.jpg", (1, 2, 3, 4))
+    assert table.get(key, visit.last_seen + timedelta(minutes=40)) is None
+
+    table.close_visits("t-vs", ["v_1"])
+    assert table.get(key, visit.last_seen + timedelta(minutes=7)) is None
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_rows_and_drops_deleted_visits(db_session):
+    db_session.add(Tenant(tenant_id="t-vs", name="Visit Session Tenant"))
+    db_session.add_all([_visit(), _visit(visit_id="v_2", visit_session_id="session_2", site_id=2)])
+    await db_session.commit()
+
+    table = VisitSessionTable()
+    visits = (await db_session.execute(select(Visit))).scalars().all()
+    for visit in visits:
+        key = table.key("t-vs", "customer", 401, visit.site_id)
+        table.open(key, VisitSession.from_visit(visit))
+    for session in table.sessions.values():
+        session.record_detection(session.last_seen + timedelta(seconds=30), 0.5, None, [], "[]")
+
+    await db_session.execute(delete(Visit).where(Visit.visit_id == "v_2"))
+    await db_session.commit()
+
+    assert await table.flush(db_session, "t-vs") == 1
+    db_session.expire_all()
+    row = (await db_session.execute(select(Visit))).scalar_one()
+    assert (row.visit_id, row.detection_count, row.visit_duration_seconds) == ("v_1", 2, 30)
+    assert row.image_path == "visits-faces/a.jpg"
+    # The session of the deleted visit is gone; the other stays open
+    assert [s.visit_id for s in table.sessions.values()] == ["v_1"]
+    assert table.get_stats()["dirty"] == 0
+
+
+@pytest.mark.asyncio
+async def test_repeat_detections_update_one_visit_in_memory(db_session):
+    db_session.add(Tenant(tenant_id="t-vs", name="Visit Session Tenant"))
+    db_session.add(Customer(tenant_id="t-vs", customer_id=401, visit_count=1))
+    await db_session.commit()
+
+    def event(offset: int):
+        return FaceDetectedEvent(
+            tenant_id="t-vs",
+            site_id=1,
+            camera_id=1,
+            timestamp=datetime.utcnow() + timedelta(seconds=offset),
+            embedding=[0.1] * 512,
+            bbox=[0, 0, 120, 120],
+            confidence=0.95,
+        )
+
+    search = AsyncMock(
+        return_value=[{"person_id": 401, "person_type": "customer", "similarity": 0.97}]
+    )
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces",
+        new=search,
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.insert_embeddings",
+        new=AsyncMock(),
+    ), patch(
+        "apps.api.app.core.minio_client.minio_client.upload_image",
+        new=MagicMock(return_value=None),
+    ), patch.object(face_service, "_save_customer_face_image", new=AsyncMock()):
+        results = [
+            await face_service.process_face_event(event(i), db_session, "t-vs")
+            for i in range(3)
+        ]
+
+    assert len({r["visit_id"] for r in results}) == 1
+    db_session.expire_all()
+    row = (await db_session.execute(select(Visit))).scalar_one()
+    assert row.detection_count == 1  # later detections are still in memory
+
+    await face_service.visit_sessions.flush(db_session, "t-vs")
+    await face_service.customer_activity.flush(db_session, "t-vs")
+    db_session.expire_all()
+    row = (await db_session.execute(select(Visit))).scalar_one()
+    assert row.detection_count == 3
+    # Three detections, one visit
+    customer = (await db_session.execute(select(Customer))).scalar_one()
+    assert customer.visit_count == 2
+
+
+def test_rolled_back_detection_is_restored():
+    table = VisitSessionTable()
+    key = table.key("t-vs", "customer", 401, 1)
+    table.open(key, VisitSession.from_visit(_visit()))
+    session = table.get(key, datetime(2025, 1, 1, 12, 1, 0))
+
+    state = session.snapshot()
+    session.record_detection(
+        datetime(2025, 1, 1, 12, 1, 0), 0.95, "faces/t-vs/b.jpg", [1, 2, 3, 4], b""
+    )
+    assert session.replaced_images == ["visits-faces/a.jpg"]
+    session.restore(state)
+
+    assert not session.dirty
+    assert session.detection_count == 1
+    assert session.image_path == "visits-faces/a.jpg"
+    assert session.replaced_images == []
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_leaves_open_session_unchanged(db_session, monkeypatch):
+    db_session.add(Tenant(tenant_id="t-vs", name="Visit Session Tenant"))
+    db_session.add(Customer(tenant_id="t-vs", customer_id=401, visit_count=1))
+    await db_session.commit()
+
+    def event(offset: int, confidence: float):
+        return FaceDetectedEvent(
+            tenant_id="t-vs",
+            site_id=1,
+            camera_id=1,
+            timestamp=datetime.utcnow() + timedelta(seconds=offset),
+            embedding=[0.1] * 512,
+            bbox=[0, 0, 120, 120],
+            confidence=confidence,
+        )
+
+    search = AsyncMock(
+        return_value=[{"person_id": 401, "person_type": "customer", "similarity": 0.97}]
+    )
+    with patch(
+        "apps.api.app.services.face_service.milvus_client.search_similar_faces",
+        new=search,
+    ), patch(
+        "apps.api.app.services.face_service.milvus_client.insert_embeddings",
+        new=AsyncMock(),
+    ), patch(
+        "apps.api.app.core.minio_client.minio_client.upload_image",
+        new=MagicMock(return_value=None),
+    ), patch.object(face_service, "_save_customer_face_image", new=AsyncMock()):
+        await face_service.process_face_event(event(0, 0.9), db_session, "t-vs")
+        key = VisitSessionTable.key("t-vs", "customer", 401, 1)
+        session = face_service.visit_sessions.sessions[key]
+        before = session.snapshot()
+
+        monkeypatch.setattr(
+            db_session, "commit", AsyncMock(side_effect=RuntimeError("commit failed"))
+        )
+        with pytest.raises(RuntimeError):
+            await face_service.process_face_event(event(1, 0.99), db_session, "t-vs")
+
+    assert session.snapshot() == before
+    assert session.in_flight == 0
+    assert not session.dirty
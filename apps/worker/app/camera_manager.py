@@ -9,6 +9,8 @@ Features:
 - Thread-safe frame buffer management
 - Camera configuration and reconnection handling
 - Frame rate control and buffering
+- Decimating capture: every packet is grabbed to keep the stream current,
+  but frames are only decoded at the rate consumers actually need
 """
 
 import asyncio
@@ -26,7 +28,10 @@ logger = logging.getLogger(__name__)
 class CameraManager:
     """Manages camera capture and frame distribution"""
 
-    def __init__(self):
+    def __init__(self, decimate: bool = True):
+        # Decimating mode: grab() every packet, retrieve() only at consumer rate
+        self.decimate = decimate
+
         # Active cameras: {camera_id: camera_info}
         self.active_cameras: Dict[int, Dict[str, Any]] = {}
 
@@ -45,6 +50,9 @@ class CameraManager:
         # Camera statistics: {camera_id: stats}
         self.camera_stats: Dict[int, Dict[str, Any]] = {}
 
+        # Frame rate requested by each consumer: {camera_id: {consumer: fps}}
+        self.consumer_rates: Dict[int, Dict[str, float]] = {}
+
     async def start_camera(self, camera_id: int, camera_config: Dict[str, Any]) -> bool:
         """Start camera capture in separate thread"""
 
@@ -62,8 +70,10 @@ class CameraManager:
         self.camera_stats[camera_id] = {
             "start_time": time.time(),
             "frames_captured": 0,
+            "frames_grabbed": 0,
             "last_frame_time": 0,
             "fps": 0,
+            "decode_fps_target": 0,
             "errors": 0,
         }
 
@@ -125,6 +135,7 @@ class CameraManager:
             del self.stop_flags[camera_id]
         if camera_id in self.camera_stats:
             del self.camera_stats[camera_id]
+        self.consumer_rates.pop(camera_id, None)
 
         logger.info(f"Camera {camera_id} stopped and cleaned up")
 
@@ -152,6 +163,27 @@ class CameraManager:
         """Get list of active cameras"""
         return self.active_cameras.copy()
 
+    def set_consumer_rate(self, camera_id: int, consumer: str, fps: float):
+        """Register the frame rate a consumer (processing, WebRTC viewer) needs"""
+        self.consumer_rates.setdefault(camera_id, {})[consumer] = float(fps)
+
+    def remove_consumer(self, camera_id: int, consumer: str):
+        """Unregister a consumer so the camera can fall back to a lower decode rate"""
+        rates = self.consumer_rates.get(camera_id)
+        if rates:
+            rates.pop(consumer, None)
+
+    def get_decode_fps(self, camera_id: int) -> float:
+        """Decode rate for a camera: the highest rate any consumer needs.
+
+        Falls back to the camera's configured fps when no consumer registered.
+        """
+        rates = self.consumer_rates.get(camera_id)
+        if rates:
+            return max(rates.values())
+        camera_config = self.active_cameras.get(camera_id) or {}
+        return float(camera_config.get("fps", 30) or 30)
+
     def _camera_capture_thread(self, camera_id: int, camera_config: Dict[str, Any]):
         """Camera capture thread function"""
 
@@ -197,10 +229,31 @@ class CameraManager:
 
             # Capture loop
             last_stats_update = time.time()
+            last_decode_time = 0.0
             frame_count = 0
 
             while not self.stop_flags[camera_id].is_set():
-                ret, frame = cap.read()
+                if self.decimate:
+                    # Always grab to keep the stream current; decode only when
+                    # a consumer needs a new frame
+                    if not cap.grab():
+                        stats["errors"] += 1
+                        logger.warning(f"Camera {camera_id}: Failed to grab frame")
+                        time.sleep(0.1)  # Brief pause on error
+                        continue
+                    stats["frames_grabbed"] += 1
+
+                    decode_fps = self.get_decode_fps(camera_id)
+                    stats["decode_fps_target"] = decode_fps
+                    now = time.monotonic()
+                    if decode_fps > 0 and now - last_decode_time < 1.0 / decode_fps:
+                        continue
+                    last_decode_time = now
+
+                    ret, frame = cap.retrieve()
+                else:
+                    ret, frame = cap.read()
+                    stats["frames_grabbed"] += 1
 
                 if not ret:
                     stats["errors"] += 1
@@ -224,11 +277,12 @@ class CameraManager:
                     frame_count = 0
                     last_stats_update = current_time
                     logger.debug(
-                        f"Camera {camera_id}: capture FPS ~{stats['fps']:.1f}, last_frame_age={(time.time()-stats['last_frame_time']):.2f}s"
+                        f"Camera {camera_id}: decode FPS ~{stats['fps']:.1f}, last_frame_age={(time.time()-stats['last_frame_time']):.2f}s"
                     )
 
-                # Small delay to prevent CPU overload
-                time.sleep(0.01)
+                if not self.decimate:
+                    # Small delay to prevent CPU overload
+                    time.sleep(0.01)
 
         except Exception as e:
             logger.error(f"Camera {camera_id} capture error: {e}")
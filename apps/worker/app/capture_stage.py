@@ -0,0 +1,212 @@
+"""
+Capture Stage for Worker
+
+This module decouples blocking camera reads from the asyncio event loop.
+A dedicated decode thread reads from ``cv2.VideoCapture`` and publishes
+frames into a bounded ring buffer that the processing coroutine consumes.
+
+Features:
+- Bounded, drop-oldest frame ring (processing latency stays bounded)
+- Frame-age and dropped-frame counters for monitoring
+- Capture thread keeps the RTSP buffer drained even when processing is slow
+- Only frames that will be published are decoded (grab/retrieve decimation)
+- Async-friendly consumption that never blocks the event loop
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (frame, capture timestamp from time.monotonic())
+FrameItem = Tuple[np.ndarray, float]
+
+
+class FrameRing:
+    """Thread-safe bounded frame ring that drops the oldest frame when full"""
+
+    def __init__(self, capacity: int = 2):
+        if capacity < 1:
+            raise ValueError("FrameRing capacity must be at least 1")
+
+        self.capacity = capacity
+        self._frames: Deque[FrameItem] = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+
+        # Counters
+        self.frames_put = 0
+        self.frames_consumed = 0
+        self.frames_dropped = 0
+        self.last_frame_age = 0.0
+        self.max_frame_age = 0.0
+        self.avg_frame_age = 0.0
+
+    def put(self, frame: np.ndarray, captured_at: Optional[float] = None) -> None:
+        """Publish a frame, evicting the oldest one if the ring is full"""
+        if captured_at is None:
+            captured_at = time.monotonic()
+
+        with self._cond:
+            if len(self._frames) == self.capacity:
+                self.frames_dropped += 1
+            self._frames.append((frame, captured_at))
+            self.frames_put += 1
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[FrameItem]:
+        """Take the oldest buffered frame, waiting up to ``timeout`` seconds"""
+        with self._cond:
+            if not self._frames:
+                self._cond.wait(timeout)
+            if not self._frames:
+                return None
+
+            frame, captured_at = self._frames.popleft()
+            self._record_age(time.monotonic() - captured_at)
+            return frame, captured_at
+
+    async def get_async(self, timeout: float = 1.0) -> Optional[FrameItem]:
+        """Await a frame without blocking the event loop"""
+        item = self.get(timeout=0)
+        if item is not None:
+            return item
+        return await asyncio.to_thread(self.get, timeout)
+
+    def clear(self) -> None:
+        """Discard any buffered frames (e.g. after a reconnect)"""
+        with self._cond:
+            self._frames.clear()
+
+    def _record_age(self, age: float) -> None:
+        self.frames_consumed += 1
+        self.last_frame_age = age
+        self.max_frame_age = max(self.max_frame_age, age)
+        # Exponential moving average keeps the metric cheap and recent
+        if self.frames_consumed == 1:
+            self.avg_frame_age = age
+        else:
+            self.avg_frame_age = 0.9 * self.avg_frame_age + 0.1 * age
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._frames)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of ring counters"""
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "buffered": len(self._frames),
+                "frames_put": self.frames_put,
+                "frames_consumed": self.frames_consumed,
+                "frames_dropped": self.frames_dropped,
+                "last_frame_age": round(self.last_frame_age, 4),
+                "avg_frame_age": round(self.avg_frame_age, 4),
+                "max_frame_age": round(self.max_frame_age, 4),
+            }
+
+
+class CaptureStage:
+    """Dedicated decode thread feeding a FrameRing from an opened capture"""
+
+    def __init__(
+        self,
+        capture: Any,
+        ring: FrameRing,
+        publish_fps: Optional[float] = None,
+        name: str = "capture-stage",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capture = capture
+        self.ring = ring
+        self.publish_interval = 1.0 / publish_fps if publish_fps else 0.0
+        self.name = name
+        self._clock = clock
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.frames_grabbed = 0
+        self.frames_decoded = 0
+        self.read_failures = 0
+        self.error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the decode thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name=self.name
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the decode thread; the capture is released by the thread"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logger.warning(f"{self.name}: decode thread did not stop gracefully")
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self) -> None:
+        last_publish = 0.0
+
+        try:
+            while not self._stop_event.is_set():
+                # Grab every packet at source rate (drains the RTSP buffer) but
+                # only decode frames the processing stage will actually use
+                if not self.capture.grab():
+                    self._fail("Failed to grab frame")
+                    break
+                self.frames_grabbed += 1
+
+                now = self._clock()
+                if now - last_publish < self.publish_interval:
+                    continue
+
+                ret, frame = self.capture.retrieve()
+                if not ret:
+                    self._fail("Failed to decode frame")
+                    break
+
+                self.frames_decoded += 1
+                self.ring.put(frame, now)
+                last_publish = now
+
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"{self.name}: capture error: {e}")
+        finally:
+            try:
+                self.capture.release()
+            except Exception as e:
+                logger.debug(f"{self.name}: error releasing capture: {e}")
+
+    def _fail(self, message: str) -> None:
+        self.read_failures += 1
+        self.error = message
+        logger.warning(f"{self.name}: {message.lower()}, stopping")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of capture and ring counters"""
+        stats = self.ring.get_stats()
+        stats.update(
+            {
+                "frames_grabbed": self.frames_grabbed,
+                "frames_decoded": self.frames_decoded,
+                "read_failures": self.read_failures,
+                "alive": self.is_alive(),
+                "error": self.error,
+            }
+        )
+        return stats
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 import cv2
 import numpy as np
 
+from .recognition_engine import ArcFaceRecognitionEngine
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,6 +21,20 @@ class FaceEmbedder:
         """Generate face embedding from aligned face image"""
         raise NotImplementedError
 
+    def embed_batch(
+        self,
+        face_images: Sequence[np.ndarray],
+        landmarks: Optional[Sequence[Optional[np.ndarray]]] = None,
+    ) -> List[List[float]]:
+        """Generate embeddings for several faces; results keep input order.
+
+        Subclasses backed by a model that accepts batches should override this
+        to run a single forward pass.
+        """
+        if landmarks is None:
+            landmarks = [None] * len(face_images)
+        return [self.embed(face, lms) for face, lms in zip(face_images, landmarks)]
+
     def align_face(self, image: np.ndarray, landmarks: np.ndarray) -> np.ndarray:
         """Align face using landmarks"""
         raise NotImplementedError
@@ -30,10 +46,18 @@ class InsightFaceEmbedder(FaceEmbedder):
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path
         self.model = None
+        # Recognition-only ONNX engine (no detector); preferred when available
+        self.engine: Optional[ArcFaceRecognitionEngine] = None
         self._initialize()
 
     def _initialize(self):
         """Initialize the InsightFace model"""
+        # Aligned crops only need the recognition model: load it on its own so
+        # we neither run nor keep the FaceAnalysis detector around
+        self.engine = ArcFaceRecognitionEngine.load(self.model_path)
+        if self.engine is not None:
+            return
+
         try:
             import insightface
 
@@ -92,53 +116,58 @@ class InsightFaceEmbedder(FaceEmbedder):
         )
         return aligned
 
+    def _prepare_face(
+        self, face_image: np.ndarray, landmarks: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Align (or resize) a face crop to the 112x112 uint8 BGR model input"""
+        if landmarks is not None and len(landmarks) == 5:
+            # Align using landmarks
+            aligned_face = self.align_face(face_image, landmarks)
+        else:
+            # Simple resize without alignment
+            aligned_face = cv2.resize(face_image, (112, 112))
+
+        # Ensure correct format (BGR for InsightFace)
+        if len(aligned_face.shape) == 3 and aligned_face.shape[2] == 3:
+            # Convert RGB to BGR if needed
+            if aligned_face.max() <= 1.0:
+                aligned_face = (aligned_face * 255).astype(np.uint8)
+
+        return aligned_face
+
+    def _get_recognition_model(self):
+        """Return the ArcFace recognition model exposing ``get_feat``"""
+        if self.model is None:
+            return None
+        if hasattr(self.model, "get_feat"):
+            return self.model
+        for model in getattr(self.model, "models", {}).values():
+            if hasattr(model, "get_feat"):
+                return model
+        return None
+
     def embed(
         self, face_image: np.ndarray, landmarks: Optional[np.ndarray] = None
     ) -> List[float]:
         """Generate 512-dimensional face embedding using ArcFace"""
-        if self.model is None:
+        if self.engine is None and self.model is None:
             return self._generate_mock_embedding(face_image, landmarks)
 
         try:
-            # Prepare face image
-            if landmarks is not None and len(landmarks) == 5:
-                # Align using landmarks
-                aligned_face = self.align_face(face_image, landmarks)
-            else:
-                # Simple resize without alignment
-                aligned_face = cv2.resize(face_image, (112, 112))
+            aligned_face = self._prepare_face(face_image, landmarks)
 
-            # Ensure correct format (BGR for InsightFace)
-            if len(aligned_face.shape) == 3 and aligned_face.shape[2] == 3:
-                # Convert RGB to BGR if needed
-                if aligned_face.max() <= 1.0:
-                    aligned_face = (aligned_face * 255).astype(np.uint8)
+            # The crop is already aligned, so feed the recognition model
+            # directly instead of re-running face detection on it
+            if self.engine is not None:
+                return self.engine.embed([aligned_face])[0].tolist()
 
-            # For direct embedding without face detection, we need to use the recognition model directly
-            # First try the full face analysis pipeline
             try:
-                faces = self.model.get(aligned_face)
-                if len(faces) > 0:
-                    embedding = faces[0].embedding
-                    embedding = embedding / np.linalg.norm(embedding)
-                    return embedding.tolist()
-            except Exception:
-                pass
-
-            # Fallback: use direct model inference if available
-            try:
-                # Get the recognition model directly from the FaceAnalysis
-                rec_model = None
-                for model in self.model.models.values():
-                    if hasattr(model, "get_feat"):
-                        rec_model = model
-                        break
-
+                rec_model = self._get_recognition_model()
                 if rec_model is not None:
                     # Direct feature extraction
                     embedding = rec_model.get_feat(aligned_face)
                     embedding = embedding / np.linalg.norm(embedding)
-                    return embedding.tolist()
+                    return embedding.flatten().tolist()
 
             except Exception as inner_e:
                 logger.debug(f"Direct embedding failed: {inner_e}")
@@ -150,6 +179,40 @@ class InsightFaceEmbedder(FaceEmbedder):
             logger.error(f"Embedding generation failed: {e}")
             return self._generate_mock_embedding(face_image, landmarks)
 
+    def embed_batch(
+        self,
+        face_images: Sequence[np.ndarray],
+        landmarks: Optional[Sequence[Optional[np.ndarray]]] = None,
+    ) -> List[List[float]]:
+        """Align all faces and run one batched forward pass of the recognition model"""
+        if not face_images:
+            return []
+        if landmarks is None:
+            landmarks = [None] * len(face_images)
+
+        rec_model = self._get_recognition_model()
+        if self.engine is None and rec_model is None:
+            return super().embed_batch(face_images, landmarks)
+
+        try:
+            aligned = [
+                self._prepare_face(face, lms)
+                for face, lms in zip(face_images, landmarks)
+            ]
+            if self.engine is not None:
+                return self.engine.embed(aligned).tolist()
+
+            # get_feat builds one NCHW blob from the list -> single session.run
+            feats = np.asarray(rec_model.get_feat(aligned), dtype=np.float32)
+            feats = feats.reshape(len(aligned), -1)
+            norms = np.linalg.norm(feats, axis=1, keepdims=True)
+            feats = feats / np.maximum(norms, 1e-12)
+            return feats.tolist()
+
+        except Exception as e:
+            logger.warning(f"Batched embedding failed, embedding one by one: {e}")
+            return super().embed_batch(face_images, landmarks)
+
     def _generate_mock_embedding(
         self, face_image: np.ndarray, landmarks: Optional[np.ndarray] = None
     ) -> List[float]:
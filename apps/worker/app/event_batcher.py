@@ -0,0 +1,144 @@
+"""
+Micro-batching sender for face events
+
+Collects face events (with their JPEG crops) and hands them to a batch send
+callable when either ``max_batch_size`` events are waiting or the oldest
+waiting event is ``max_delay`` seconds old. Batches are sent one at a time
+from a background task, so events arriving during a send accumulate into the
+next batch.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from common.models import FaceDetectedEvent
+
+logger = logging.getLogger(__name__)
+
+EventItem = Tuple[FaceDetectedEvent, Optional[bytes]]
+SendBatch = Callable[[List[EventItem]], Awaitable[List[Dict[str, Any]]]]
+
+
+class EventBatcher:
+    """Flush face events in batches on size or time"""
+
+    def __init__(
+        self,
+        send_batch: SendBatch,
+        max_batch_size: int = 8,
+        max_delay: float = 0.5,
+    ):
+        self._send_batch = send_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+
+        self._pending: List[Tuple[EventItem, asyncio.Future]] = []
+        self._first_pending_at: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.stats = {
+            "batches_sent": 0,
+            "events_sent": 0,
+            "largest_batch": 0,
+            "size_flushes": 0,
+            "time_flushes": 0,
+            "send_errors": 0,
+        }
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def submit(
+        self, event: FaceDetectedEvent, face_image_bytes: Optional[bytes]
+    ) -> asyncio.Future:
+        """Queue an event; the returned future resolves to its API result"""
+        future = asyncio.get_running_loop().create_future()
+        if not self._pending:
+            self._first_pending_at = asyncio.get_running_loop().time()
+        self._pending.append(((event, face_image_bytes), future))
+        self._wakeup.set()
+        return future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            # Wait until the batch is full or the oldest event hits max_delay
+            while self._pending and len(self._pending) < self.max_batch_size:
+                remaining = self._first_pending_at + self.max_delay - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                    self._wakeup.clear()
+                except asyncio.TimeoutError:
+                    break
+
+            if not self._pending:
+                continue
+
+            if len(self._pending) >= self.max_batch_size:
+                self.stats["size_flushes"] += 1
+            else:
+                self.stats["time_flushes"] += 1
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Send everything that is waiting, in batches of max_batch_size"""
+        while self._pending:
+            # Events leave the queue only once sent, so a send interrupted by
+            # stop() is retried by its final flush
+            batch = self._pending[: self.max_batch_size]
+            try:
+                results = await self._send_batch([item for item, _ in batch])
+            except Exception as e:
+                logger.error(f"Face event batch send failed: {e}")
+                self.stats["send_errors"] += 1
+                results = [{"error": str(e)}] * len(batch)
+
+            del self._pending[: len(batch)]
+            self._first_pending_at = (
+                asyncio.get_running_loop().time() if self._pending else None
+            )
+
+            self.stats["batches_sent"] += 1
+            self.stats["events_sent"] += len(batch)
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+            # A short response would otherwise leave callers waiting forever
+            if len(results) < len(batch):
+                message = (
+                    f"Face event batch response had {len(results)} results "
+                    f"for {len(batch)} events"
+                )
+                logger.error(message)
+                self.stats["send_errors"] += 1
+                for _, future in batch[len(results) :]:
+                    if not future.done():
+                        future.set_exception(RuntimeError(message))
+
+    async def stop(self) -> None:
+        """Stop the background task and send whatever is still waiting"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["pending"] = len(self._pending)
+        return stats
@@ -0,0 +1,309 @@
+"""
+Disk-backed spool for face events the API could not accept
+
+Undelivered events (with their JPEG crops) are appended to segment files in
+a spool directory instead of being held in memory, so a long API outage
+neither grows worker memory nor loses events on restart. A small index file
+records the replay cursor; replay reads records in append order, a bounded
+window at a time, and acknowledged segments are deleted.
+
+The spool is bounded by total bytes (oldest segments are dropped first) and
+by age (expired records are skipped on replay). Each record carries the
+event's idempotency key so the API can drop replays of events it already
+recorded.
+
+Record layout: ``<III`` header (metadata length, image length, CRC32 of
+metadata + image), JSON metadata, raw image bytes.
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<III")
+_SEGMENT_SUFFIX = ".seg"
+_INDEX_FILE = "index.json"
+
+
+@dataclass
+class SpoolRecord:
+    """One spooled event, positioned so it can be acknowledged"""
+
+    key: str
+    enqueued_at: float
+    event: Dict[str, Any]
+    image: Optional[bytes]
+    segment: int
+    end_offset: int
+
+
+class EventSpool:
+    """Append-only segment files with a persisted replay cursor"""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age_seconds: float = 24 * 3600,
+        segment_bytes: int = 8 * 1024 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.segment_bytes = max(1, segment_bytes)
+
+        self._lock = threading.Lock()
+        self._segments: List[int] = []
+        self._sizes: Dict[int, int] = {}
+        self._cursor: Tuple[int, int] = (0, 0)
+
+        # Statistics
+        self.stats = {
+            "appended": 0,
+            "acked": 0,
+            "expired": 0,
+            "dropped_bytes": 0,
+            "corrupt_records": 0,
+        }
+
+        self._open()
+
+    # ------------------------------------------------------------------
+    # Public API
+
+    def append(
+        self, key: str, event: Dict[str, Any], image: Optional[bytes] = None
+    ) -> None:
+        """Durably append an event for later replay"""
+        meta = json.dumps(
+            {
+                "key": key,
+                "ts": time.time(),
+                "event": event,
+                "has_image": image is not None,
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        payload = image or b""
+        record = (
+            _HEADER.pack(len(meta), len(payload), zlib.crc32(meta + payload))
+            + meta
+            + payload
+        )
+
+        with self._lock:
+            if (
+                not self._segments
+                or self._sizes[self._segments[-1]] >= self.segment_bytes
+            ):
+                self._new_segment()
+            segment = self._segments[-1]
+            with open(self._segment_path(segment), "ab") as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            self._sizes[segment] += len(record)
+            self.stats["appended"] += 1
+            self._enforce_bounds()
+
+    def read(self, limit: int) -> List[SpoolRecord]:
+        """Return up to ``limit`` records from the cursor, oldest first.
+
+        Expired records are skipped and acknowledged as they are read.
+        """
+        records: List[SpoolRecord] = []
+        with self._lock:
+            start = self._cursor
+            segment, offset = self._cursor
+            cutoff = time.time() - self.max_age_seconds
+            for seg in [s for s in self._segments if s >= segment]:
+                if seg != segment:
+                    offset = 0
+                with open(self._segment_path(seg), "rb") as f:
+                    f.seek(offset)
+                    while len(records) < limit:
+                        record = self._read_record(f, seg)
+                        if record is None:
+                            break
+                        if record.enqueued_at < cutoff:
+                            self.stats["expired"] += 1
+                            self._advance(record.segment, record.end_offset)
+                            continue
+                        records.append(record)
+                if len(records) >= limit:
+                    break
+            if self._cursor != start:
+                self._save_index()
+        return records
+
+    def ack(self, record: SpoolRecord) -> None:
+        """Mark ``record`` and everything before it as delivered"""
+        with self._lock:
+            if (record.segment, record.end_offset) <= self._cursor:
+                return
+            self._advance(record.segment, record.end_offset)
+            self.stats["acked"] += 1
+            self._save_index()
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return self._pending_bytes()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending_bytes"] = self._pending_bytes()
+            stats["segments"] = len(self._segments)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold self._lock, except during __init__)
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"{segment:012d}{_SEGMENT_SUFFIX}"
+
+    def _open(self) -> None:
+        for path in sorted(self.directory.glob(f"*{_SEGMENT_SUFFIX}")):
+            try:
+                segment = int(path.stem)
+            except ValueError:
+                continue
+            self._segments.append(segment)
+            self._sizes[segment] = path.stat().st_size
+
+        try:
+            index = json.loads((self.directory / _INDEX_FILE).read_text())
+            self._cursor = (int(index["segment"]), int(index["offset"]))
+        except (OSError, ValueError, KeyError):
+            self._cursor = (self._segments[0], 0) if self._segments else (0, 0)
+
+        if self._segments:
+            self._truncate_torn_tail(self._segments[-1])
+            # Segments before the cursor were fully delivered
+            for segment in [s for s in self._segments if s < self._cursor[0]]:
+                self._delete_segment(segment)
+            if self._cursor[0] not in self._sizes:
+                self._cursor = (self._segments[0], 0) if self._segments else (0, 0)
+            logger.info(
+                f"Opened event spool with {self._pending_bytes()} pending bytes "
+                f"in {len(self._segments)} segments"
+            )
+
+    def _truncate_torn_tail(self, segment: int) -> None:
+        """Drop a partially written last record left by a crash"""
+        path = self._segment_path(segment)
+        valid = 0
+        with open(path, "rb") as f:
+            while self._read_record(f, segment, count_corrupt=False) is not None:
+                valid = f.tell()
+        if valid < self._sizes[segment]:
+            logger.warning(
+                f"Truncating {self._sizes[segment] - valid} bytes of incomplete "
+                f"records from spool segment {segment}"
+            )
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+            self._sizes[segment] = valid
+
+    def _read_record(
+        self, f, segment: int, count_corrupt: bool = True
+    ) -> Optional[SpoolRecord]:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return None
+        meta_len, image_len, crc = _HEADER.unpack(header)
+        body = f.read(meta_len + image_len)
+        if len(body) < meta_len + image_len or zlib.crc32(body) != crc:
+            if count_corrupt:
+                self.stats["corrupt_records"] += 1
+                logger.error(f"Corrupt record in spool segment {segment}, skipping rest")
+            return None
+        meta = json.loads(body[:meta_len])
+        return SpoolRecord(
+            key=meta["key"],
+            enqueued_at=meta["ts"],
+            event=meta["event"],
+            image=body[meta_len:] if meta.get("has_image") else None,
+            segment=segment,
+            end_offset=f.tell(),
+        )
+
+    def _new_segment(self) -> None:
+        segment = self._segments[-1] + 1 if self._segments else self._cursor[0]
+        self._segment_path(segment).touch()
+        self._segments.append(segment)
+        self._sizes[segment] = 0
+        if len(self._segments) == 1:
+            self._cursor = (segment, 0)
+
+    def _advance(self, segment: int, offset: int) -> None:
+        self._cursor = (segment, offset)
+        # Delete fully delivered segments, keeping the one being written
+        for seg in list(self._segments):
+            if seg < segment or (
+                seg == segment
+                and offset >= self._sizes[seg]
+                and seg != self._segments[-1]
+            ):
+                self._delete_segment(seg)
+        if segment not in self._sizes and self._segments:
+            self._cursor = (self._segments[0], 0)
+
+    def _enforce_bounds(self) -> None:
+        # Age: a segment whose last write is older than max_age holds only
+        # expired records
+        cutoff = time.time() - self.max_age_seconds
+        while (
+            len(self._segments) > 1
+            and self._segment_path(self._segments[0]).stat().st_mtime < cutoff
+        ):
+            self._drop_oldest("expired")
+
+        # Size: drop the oldest undelivered segments first
+        while self._pending_bytes() > self.max_bytes and len(self._segments) > 1:
+            self._drop_oldest("over max bytes")
+
+    def _drop_oldest(self, reason: str) -> None:
+        segment = self._segments[0]
+        lost = self._sizes[segment] - (
+            self._cursor[1] if self._cursor[0] == segment else 0
+        )
+        logger.warning(f"Dropping spool segment {segment} ({lost} bytes): {reason}")
+        self.stats["dropped_bytes"] += lost
+        self._delete_segment(segment)
+        self._cursor = (self._segments[0], 0)
+        self._save_index()
+
+    def _delete_segment(self, segment: int) -> None:
+        try:
+            self._segment_path(segment).unlink()
+        except FileNotFoundError:
+            pass
+        self._segments.remove(segment)
+        del self._sizes[segment]
+
+    def _pending_bytes(self) -> int:
+        segment, offset = self._cursor
+        return sum(
+            size - (offset if seg == segment else 0)
+            for seg, size in self._sizes.items()
+            if seg >= segment
+        )
+
+    def _save_index(self) -> None:
+        path = self.directory / _INDEX_FILE
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"segment": self._cursor[0], "offset": self._cursor[1]})
+        )
+        os.replace(tmp, path)
@@ -3,8 +3,10 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import random
 import signal
 import time
+import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
@@ -12,10 +14,16 @@ import cv2
 import httpx
 import numpy as np
 from common.models import FaceDetectedEvent
+from common.staff_vectors import decode_staff_vectors
 
 from .camera_manager import CameraManager
+from .capture_stage import CaptureStage, FrameRing
 from .detectors import FaceDetector, create_detector
 from .embedder import FaceEmbedder, create_embedder
+from .event_batcher import EventBatcher
+from .event_spool import EventSpool
+from .staff_matcher import StaffMatcher
+from .tracker import FaceTracker
 from .webrtc_streamer import WebRTCStreamer
 from .worker_client import WorkerClient
 
@@ -250,6 +258,32 @@ class WorkerConfig:
         self.usb_camera = int(os.getenv("USB_CAMERA", "0"))
         self.frame_width = int(os.getenv("FRAME_WIDTH", "640"))
         self.frame_height = int(os.getenv("FRAME_HEIGHT", "480"))
+        # Frames buffered between the capture thread and processing (drop-oldest)
+        self.frame_ring_size = int(os.getenv("FRAME_RING_SIZE", "2"))
+        # Grab every packet but only decode at the rate consumers need
+        self.capture_decimation = (
+            os.getenv("CAPTURE_DECIMATION", "true").lower() == "true"
+        )
+        self.webrtc_viewer_fps = float(os.getenv("WEBRTC_VIEWER_FPS", "15"))
+
+        # Face tracking: embed and report once per track instead of per frame
+        self.tracking_enabled = (
+            os.getenv("TRACKING_ENABLED", "true").lower() == "true"
+        )
+        self.track_iou_threshold = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+        self.track_max_misses = int(os.getenv("TRACK_MAX_MISSES", "10"))
+        self.track_reembed_interval = float(
+            os.getenv("TRACK_REEMBED_INTERVAL", "10")
+        )
+        self.track_kalman = os.getenv("TRACK_KALMAN", "true").lower() == "true"
+        self.min_track_length = int(os.getenv("MIN_TRACK_LENGTH", "1"))
+        # Track length at which a track is reported again so the API can
+        # create a customer from it (the API's max of MIN_TRACK_LENGTH and
+        # MIN_CLUSTER_SAMPLES)
+        self.track_confirm_length = int(os.getenv("TRACK_CONFIRM_LENGTH", "3"))
+
+        # Staff embedding sync (seconds between delta polls, 0 disables)
+        self.staff_sync_interval = float(os.getenv("STAFF_SYNC_INTERVAL", "60"))
 
         # Retry and Queue Configuration
         self.max_api_retries = int(os.getenv("MAX_API_RETRIES", "3"))
@@ -261,6 +295,26 @@ class WorkerConfig:
         )
         self.max_queue_retries = int(os.getenv("MAX_QUEUE_RETRIES", "5"))
 
+        # Embedding encoding on the wire: f32 (base64 float32), f16 (base64
+        # float16) or json; the API confirms it at registration
+        self.embedding_encoding = os.getenv("EMBEDDING_ENCODING", "f32").lower()
+
+        # Disk spool for events the API could not accept
+        self.event_spool_dir = os.getenv(
+            "EVENT_SPOOL_DIR", os.path.join(".worker_data", "event_spool")
+        )
+        self.event_spool_max_mb = float(os.getenv("EVENT_SPOOL_MAX_MB", "256"))
+        self.event_spool_max_age_hours = float(
+            os.getenv("EVENT_SPOOL_MAX_AGE_HOURS", "24")
+        )
+        self.event_spool_replay_concurrency = int(
+            os.getenv("EVENT_SPOOL_REPLAY_CONCURRENCY", "4")
+        )
+
+        # Face event micro-batching (EVENT_BATCH_SIZE=1 sends each event alone)
+        self.event_batch_size = int(os.getenv("EVENT_BATCH_SIZE", "8"))
+        self.event_batch_max_delay = float(os.getenv("EVENT_BATCH_MAX_DELAY", "0.5"))
+
         # Logging
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
 
@@ -301,7 +355,12 @@ class FaceRecognitionWorker:
         self.config = config
         self.detector: FaceDetector = create_detector(config.detector_type)
         self.embedder: FaceEmbedder = create_embedder(config.embedder_type)
-        self.staff_embeddings: Dict[str, List[float]] = {}
+        # Staff reference embeddings (one per face image), kept in sync
+        # with the API's versioned staff vector feed
+        self.staff_matcher = StaffMatcher()
+        self.staff_vector_version: Optional[str] = None
+        self.staff_sync_supported = False
+        self.staff_sync_task: Optional[asyncio.Task] = None
         self.http_client: Optional[httpx.AsyncClient] = None
         self.access_token: Optional[str] = None
         self.token_expires_at: float = 0
@@ -310,21 +369,47 @@ class FaceRecognitionWorker:
         self.worker_client = WorkerClient(config)
 
         # Camera manager for WebRTC streaming
-        self.camera_manager = CameraManager()
+        self.camera_manager = CameraManager(decimate=config.capture_decimation)
 
         # WebRTC streamer for P2P camera streaming
         self.webrtc_streamer = WebRTCStreamer(
             worker_id=None,  # Will be set after worker registration
             camera_manager=self.camera_manager,
+            viewer_fps=config.webrtc_viewer_fps,
         )
 
+        # Capture stage: decode thread feeding a bounded drop-oldest frame ring
+        self.frame_ring = FrameRing(capacity=max(1, config.frame_ring_size))
+        self.capture_stage: Optional[CaptureStage] = None
+
+        # Tracker between detection and embedding
+        self.tracker: Optional[FaceTracker] = None
+        if config.tracking_enabled:
+            self.tracker = FaceTracker(
+                iou_threshold=config.track_iou_threshold,
+                max_misses=config.track_max_misses,
+                min_track_length=config.min_track_length,
+                reembed_interval=config.track_reembed_interval,
+                use_kalman=config.track_kalman,
+                confirm_length=config.track_confirm_length,
+            )
+
         # Shared shutdown flag
         self._shutdown_requested = False
 
-        # Event queue for failed events
-        self.failed_events_queue: asyncio.Queue = asyncio.Queue()
+        # Undelivered events are spooled to disk and replayed in order
+        self.event_spool = EventSpool(
+            config.event_spool_dir,
+            max_bytes=int(config.event_spool_max_mb * 1024 * 1024),
+            max_age_seconds=config.event_spool_max_age_hours * 3600,
+        )
+        self._spool_wakeup = asyncio.Event()
         self.queue_processor_task: Optional[asyncio.Task] = None
 
+        # Micro-batching sender, created once the event loop is running
+        self.event_batcher: Optional[EventBatcher] = None
+        self.batch_endpoint_supported = True
+
     async def initialize(self):
         """Initialize the worker"""
         self.http_client = httpx.AsyncClient(timeout=30.0)
@@ -350,17 +435,31 @@ class FaceRecognitionWorker:
         # Set WebRTC reference in worker client
         self.worker_client.set_webrtc_streamer(self.webrtc_streamer)
 
+        # Expose capture stage counters in heartbeats
+        self.worker_client.set_capture_stats_provider(self.get_capture_stats)
+
         # Provide camera config to WebRTC streamer for on-demand start
         self.webrtc_streamer.set_camera_config_provider(self._get_camera_config_for)
 
-        # Start failed event queue processor
-        self.queue_processor_task = asyncio.create_task(
-            self._process_failed_events_queue()
-        )
+        # Start replaying spooled events
+        self.queue_processor_task = asyncio.create_task(self._replay_event_spool())
 
         # Start shutdown monitor task
         self.shutdown_monitor_task = asyncio.create_task(self._monitor_shutdown())
 
+        # Send face events in micro-batches
+        if self.config.event_batch_size > 1:
+            self.event_batcher = EventBatcher(
+                self._send_face_events_batch,
+                max_batch_size=self.config.event_batch_size,
+                max_delay=self.config.event_batch_max_delay,
+            )
+            self.event_batcher.start()
+
+        # Keep staff embeddings fresh without a restart
+        if self.staff_sync_supported and self.config.staff_sync_interval > 0:
+            self.staff_sync_task = asyncio.create_task(self._staff_sync_loop())
+
         logger.info("Worker initialized successfully")
 
     async def _on_assign_camera(
@@ -382,6 +481,9 @@ class FaceRecognitionWorker:
         # Cache on worker_client for later use
         self.worker_client.camera_config = cam_cfg
         self.worker_client.assigned_camera_id = int(camera_id)
+        self.camera_manager.set_consumer_rate(
+            int(camera_id), "processing", self.config.worker_fps
+        )
         try:
             started = await self.camera_manager.start_camera(int(camera_id), cam_cfg)
             if started:
@@ -412,10 +514,17 @@ class FaceRecognitionWorker:
         if self.webrtc_streamer:
             await self.webrtc_streamer.shutdown()
 
+        # Stop capture thread if still running
+        await self._stop_capture_stage()
+
+        # Send events still waiting in the current batch
+        if self.event_batcher:
+            await self.event_batcher.stop()
+
         # Shutdown worker client
         await self.worker_client.shutdown()
 
-        # Cancel queue processor
+        # Cancel spool replay (undelivered events stay on disk)
         if self.queue_processor_task and not self.queue_processor_task.done():
             self.queue_processor_task.cancel()
             try:
@@ -423,6 +532,14 @@ class FaceRecognitionWorker:
             except asyncio.CancelledError:
                 pass
 
+        # Cancel staff sync
+        if self.staff_sync_task and not self.staff_sync_task.done():
+            self.staff_sync_task.cancel()
+            try:
+                await self.staff_sync_task
+            except asyncio.CancelledError:
+                pass
+
         # Cancel shutdown monitor
         if (
             hasattr(self, "shutdown_monitor_task")
@@ -471,6 +588,12 @@ class FaceRecognitionWorker:
 
     async def _load_staff_embeddings(self):
         """Load staff embeddings for local pre-filtering"""
+        self.staff_vector_version = None
+        if await self._sync_staff_embeddings():
+            self.staff_sync_supported = True
+            return
+
+        # Older APIs without the sync feed: JSON staff list
         try:
             await self._ensure_authenticated()
 
@@ -484,23 +607,29 @@ class FaceRecognitionWorker:
             if response.status_code == 200:
                 staff_members = response.json()
 
-                # Load embeddings for staff members
+                # Load every reference embedding for each staff member
+                staff_embeddings: Dict[str, List[List[float]]] = {}
                 for member in staff_members:
-                    staff_id = member["staff_id"]
+                    staff_id = str(member["staff_id"])
 
-                    # Try to get embedding from face images
-                    if member.get("face_images"):
-                        # Use the first face image for embedding
-                        face_image = member["face_images"][0]
-                        if face_image.get("embedding"):
-                            self.staff_embeddings[staff_id] = face_image["embedding"]
+                    vectors = [
+                        face_image["embedding"]
+                        for face_image in member.get("face_images") or []
+                        if face_image.get("embedding")
+                    ]
 
                     # Fallback to direct embedding field
-                    elif member.get("face_embedding"):
-                        self.staff_embeddings[staff_id] = member["face_embedding"]
+                    if not vectors and member.get("face_embedding"):
+                        vectors = [member["face_embedding"]]
+
+                    if vectors:
+                        staff_embeddings[staff_id] = vectors
+
+                self.staff_matcher.load(staff_embeddings)
 
                 logger.info(
-                    f"Loaded {len(self.staff_embeddings)} staff embeddings for local matching"
+                    f"Loaded {len(self.staff_matcher.matrix)} embeddings for "
+                    f"{len(self.staff_matcher)} staff members for local matching"
                 )
             else:
                 logger.warning(
@@ -511,6 +640,66 @@ class FaceRecognitionWorker:
             logger.warning(f"Failed to load staff embeddings: {e}")
             # Continue without staff filtering - all faces will be processed as visitors
 
+    async def _sync_staff_embeddings(self) -> bool:
+        """Pull the staff vector feed: a full snapshot first, then deltas.
+
+        Returns False if the feed is unavailable (e.g. an older API).
+        """
+        try:
+            await self._ensure_authenticated()
+
+            params: Dict[str, Any] = {"site_id": self.config.site_id}
+            if self.staff_vector_version:
+                params["since"] = self.staff_vector_version
+
+            response = await self.http_client.get(
+                f"{self.config.api_url}/v1/staff/embeddings/sync",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+                params=params,
+            )
+
+            if response.status_code == 304:
+                return True
+            if response.status_code != 200:
+                logger.debug(f"Staff sync unavailable: {response.status_code}")
+                return False
+
+            payload = decode_staff_vectors(response.content)
+            vectors = np.frombuffer(payload.vectors, dtype=np.float32).reshape(
+                -1, payload.dim
+            )
+            replaced: Dict[str, List[np.ndarray]] = {}
+            for row, staff_id in zip(vectors, payload.row_owners):
+                replaced.setdefault(str(staff_id), []).append(row)
+
+            if payload.full:
+                self.staff_matcher.load(replaced)
+            else:
+                self.staff_matcher.apply_delta(
+                    replaced, active_ids=[str(i) for i in payload.active_ids]
+                )
+            self.staff_vector_version = response.headers.get("X-Staff-Version")
+
+            logger.info(
+                f"Staff sync ({'full' if payload.full else 'delta'}): "
+                f"{len(replaced)} updated, {len(self.staff_matcher)} staff members, "
+                f"{len(self.staff_matcher.matrix)} embeddings"
+            )
+            return True
+
+        except Exception as e:
+            logger.warning(f"Staff embedding sync failed: {e}")
+            return False
+
+    async def _staff_sync_loop(self):
+        """Poll the staff vector feed; unchanged polls are a cheap 304"""
+        while True:
+            try:
+                await asyncio.sleep(self.config.staff_sync_interval)
+                await self._sync_staff_embeddings()
+            except asyncio.CancelledError:
+                break
+
     def _is_staff_match(
         self, embedding: List[float], threshold: Optional[float] = None
     ) -> tuple[bool, Optional[str]]:
@@ -518,118 +707,134 @@ class FaceRecognitionWorker:
         Check if embedding matches any known staff member
         Returns (is_staff, staff_id) tuple
         """
+        if not embedding:
+            return False, None
+        return self._match_staff_batch([embedding], threshold)[0]
+
+    def _match_staff_batch(
+        self, embeddings: List[List[float]], threshold: Optional[float] = None
+    ) -> List[tuple[bool, Optional[str]]]:
+        """Staff check for all faces of a frame with one matrix product"""
         if threshold is None:
             threshold = self.config.staff_match_threshold
 
-        if not self.staff_embeddings or not embedding:
-            return False, None
+        if not len(self.staff_matcher):
+            return [(False, None)] * len(embeddings)
 
         try:
-            embedding_np = np.array(embedding, dtype=np.float32)
-            embedding_np = embedding_np / np.linalg.norm(embedding_np)  # Normalize
-
-            best_similarity = 0.0
-            matched_staff_id = None
-
-            for staff_id, staff_embedding in self.staff_embeddings.items():
-                if not staff_embedding or len(staff_embedding) != len(embedding):
-                    continue
-
-                try:
-                    staff_np = np.array(staff_embedding, dtype=np.float32)
-                    staff_np = staff_np / np.linalg.norm(staff_np)  # Normalize
-
-                    # Cosine similarity (dot product of normalized vectors)
-                    similarity = float(np.dot(embedding_np, staff_np))
-
-                    if similarity > best_similarity and similarity >= threshold:
-                        best_similarity = similarity
-                        matched_staff_id = staff_id
-
-                except Exception as e:
-                    logger.debug(f"Error comparing with staff {staff_id}: {e}")
-                    continue
-
-            if matched_staff_id:
-                logger.info(
-                    f"Matched staff member {matched_staff_id} with similarity {best_similarity:.3f}"
-                )
-                return True, matched_staff_id
-
-            return False, None
+            results = []
+            for is_staff, staff_id, similarity in self.staff_matcher.match_batch(
+                embeddings, threshold
+            ):
+                if is_staff:
+                    logger.info(
+                        f"Matched staff member {staff_id} with similarity {similarity:.3f}"
+                    )
+                results.append((is_staff, staff_id))
+            return results
 
         except Exception as e:
             logger.error(f"Error in staff matching: {e}")
-            return False, None
+            return [(False, None)] * len(embeddings)
 
-    async def _process_failed_events_queue(self):
-        """Process failed events from the queue with periodic retry"""
-        retry_interval = self.config.failed_event_retry_interval
+    async def _spool_event(
+        self, event: FaceDetectedEvent, face_image_bytes: Optional[bytes]
+    ) -> bool:
+        """Persist an undelivered event for replay"""
+        try:
+            await asyncio.to_thread(
+                self.event_spool.append,
+                event.idempotency_key or uuid.uuid4().hex,
+                event.to_wire("f32"),  # lossless and a third of the JSON size
+                face_image_bytes,
+            )
+        except Exception as e:
+            logger.error(f"Failed to spool event: {e}")
+            return False
+        self._spool_wakeup.set()
+        return True
+
+    async def _replay_event_spool(self):
+        """Replay spooled events in order with exponential backoff and jitter
+
+        Up to EVENT_SPOOL_REPLAY_CONCURRENCY events are sent at once and the
+        spool cursor only advances over the delivered prefix, so an event that
+        follows a failed one may be sent again; its idempotency key lets the
+        API ignore the duplicate.
+        """
+        max_backoff = self.config.failed_event_retry_interval
+        window = max(1, self.config.event_spool_replay_concurrency)
+        failures = 0
+        # Attempts for events failing while others in their window succeed
+        attempts: Dict[str, int] = {}
 
         while True:
             try:
-                # Process all events currently in queue
-                processed = 0
-                failed_again = []
-
-                # Process existing events in queue
-                while not self.failed_events_queue.empty():
+                records = await asyncio.to_thread(self.event_spool.read, window)
+                if not records:
+                    self._spool_wakeup.clear()
                     try:
-                        event_data = await asyncio.wait_for(
-                            self.failed_events_queue.get(), timeout=1.0
+                        await asyncio.wait_for(
+                            self._spool_wakeup.wait(), timeout=max_backoff
                         )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
 
-                        # Handle both old and new queue item formats for backward compatibility
-                        if len(event_data) == 2:
-                            # Old format: (event, retry_count)
-                            event, retry_count = event_data
-                            face_image_bytes = None
-                        else:
-                            # New format: (event, face_image_bytes, retry_count)
-                            event, face_image_bytes, retry_count = event_data
-
-                        # Try to send the event
-                        result = await self._send_face_event(
-                            event, face_image_bytes, max_retries=1
+                results = await asyncio.gather(
+                    *(
+                        self._send_face_event(
+                            FaceDetectedEvent(**record.event),
+                            record.image,
+                            max_retries=0,
+                            spool_on_failure=False,
                         )
+                        for record in records
+                    )
+                )
 
-                        if "error" not in result:
-                            processed += 1
-                            logger.info(
-                                f"Successfully processed queued event: {result}"
-                            )
-                        elif retry_count < self.config.max_queue_retries:
-                            failed_again.append(
-                                (event, face_image_bytes, retry_count + 1)
-                            )
-                        else:
-                            logger.error(
-                                f"Permanently dropping event after {self.config.max_queue_retries} retries: {event.camera_id}"
-                            )
-
-                    except asyncio.TimeoutError:
-                        break
-                    except Exception as e:
-                        logger.error(f"Error processing queued event: {e}")
+                delivered = sum(1 for r in results if not r.get("retryable"))
+                done = None
+                for record, result in zip(records, results):
+                    if result.get("retryable"):
+                        attempts[record.key] = attempts.get(record.key, 0) + 1
+                        if (
+                            delivered == 0
+                            or attempts[record.key] < self.config.max_queue_retries
+                        ):
+                            break
+                        logger.error(
+                            f"Permanently dropping spooled event after "
+                            f"{attempts[record.key]} attempts: camera {record.event.get('camera_id')}"
+                        )
+                    elif "error" in result:
+                        logger.error(
+                            f"API rejected spooled event, dropping: {result['error']}"
+                        )
+                    attempts.pop(record.key, None)
+                    done = record
 
-                # Re-queue events that failed again
-                for event_data in failed_again:
-                    await self.failed_events_queue.put(event_data)
+                if done is not None:
+                    await asyncio.to_thread(self.event_spool.ack, done)
 
-                if processed > 0:
-                    logger.info(
-                        f"Processed {processed} queued events, {len(failed_again)} still pending"
-                    )
+                if done is records[-1]:
+                    failures = 0
+                    logger.info(f"Replayed {len(records)} spooled events")
+                    continue
 
-                # Wait before next retry cycle
-                await asyncio.sleep(retry_interval)
+                # API still unavailable: back off with full jitter
+                if delivered == 0:
+                    attempts.clear()
+                failures += 1
+                delay = min(max_backoff, 2 ** min(failures, 16))
+                await asyncio.sleep(random.uniform(delay / 2, delay))
 
             except asyncio.CancelledError:
-                logger.info("Failed events queue processor cancelled")
+                logger.info("Event spool replay cancelled")
                 break
             except Exception as e:
-                logger.error(f"Error in failed events queue processor: {e}")
-                await asyncio.sleep(retry_interval)
+                logger.error(f"Error replaying event spool: {e}")
+                await asyncio.sleep(max_backoff)
 
     async def _upload_face_image(
         self, face_image: np.ndarray, max_retries: int = 3
@@ -686,8 +891,13 @@ class FaceRecognitionWorker:
         event: FaceDetectedEvent,
         face_image_bytes: Optional[bytes] = None,
         max_retries: Optional[int] = None,
+        spool_on_failure: bool = True,
     ) -> Dict:
-        """Send face event to API with face image as multipart form data"""
+        """Send face event to API with face image as multipart form data
+
+        When every attempt fails the event is spooled to disk for replay; with
+        ``spool_on_failure=False`` the result is flagged ``retryable`` instead.
+        """
         if max_retries is None:
             max_retries = self.config.max_api_retries
 
@@ -704,7 +914,7 @@ class FaceRecognitionWorker:
 
                     # Prepare the event data as form data
                     # Remove snapshot_url since we're sending the actual image
-                    event_dict = event.model_dump(mode="json")
+                    event_dict = event.to_wire(self.worker_client.embedding_encoding)
                     event_dict.pop("snapshot_url", None)  # Remove if present
 
                     data = {"event_data": json.dumps(event_dict)}
@@ -720,7 +930,7 @@ class FaceRecognitionWorker:
                     # Fallback to JSON if no image (shouldn't happen but safety)
                     response = await self.http_client.post(
                         f"{self.config.api_url}/v1/events/face",
-                        json=event.model_dump(mode="json"),
+                        json=event.to_wire(self.worker_client.embedding_encoding),
                         headers={"Authorization": f"Bearer {self.access_token}"},
                         timeout=30.0,
                     )
@@ -771,21 +981,106 @@ class FaceRecognitionWorker:
                 await asyncio.sleep(wait_time)
 
         # All retries failed
+        if not spool_on_failure:
+            return {"error": "Max retries exceeded", "retryable": True}
+
         logger.error(
             f"Failed to send face event after {max_retries + 1} attempts, queuing for later retry"
         )
-
-        # Add to failed events queue for later processing
-        try:
-            await self.failed_events_queue.put(
-                (event, face_image_bytes, 1)
-            )  # (event, face_image_bytes, retry_count)
+        if await self._spool_event(event, face_image_bytes):
             logger.info("Event queued for later retry")
-        except Exception as queue_error:
-            logger.error(f"Failed to queue event: {queue_error}")
 
         return {"error": "Max retries exceeded, event queued for retry"}
 
+    async def _send_face_events_batch(
+        self,
+        items: List[tuple],
+        max_retries: Optional[int] = None,
+    ) -> List[Dict]:
+        """Send several (event, face_image_bytes) pairs in one batch request"""
+        if len(items) == 1 or not self.batch_endpoint_supported:
+            return [await self._send_face_event(event, image) for event, image in items]
+
+        if max_retries is None:
+            max_retries = self.config.max_api_retries
+
+        import json
+
+        events_data = []
+        files = []
+        for i, (event, face_image_bytes) in enumerate(items):
+            event_dict = event.to_wire(self.worker_client.embedding_encoding)
+            event_dict.pop("snapshot_url", None)  # Sending the image itself
+            events_data.append(event_dict)
+            files.append(
+                ("face_images", (f"face_{i}.jpg", face_image_bytes or b"", "image/jpeg"))
+            )
+
+        for attempt in range(max_retries + 1):
+            try:
+                await self._ensure_authenticated()
+
+                response = await self.http_client.post(
+                    f"{self.config.api_url}/v1/events/face/batch",
+                    data={"events_data": json.dumps(events_data)},
+                    files=files,
+                    headers={"Authorization": f"Bearer {self.access_token}"},
+                    timeout=30.0,
+                )
+
+                if response.status_code in (404, 405):
+                    # Older API without the batch endpoint
+                    logger.warning(
+                        "Batch event endpoint unavailable, sending events individually"
+                    )
+                    self.batch_endpoint_supported = False
+                    return [
+                        await self._send_face_event(event, image)
+                        for event, image in items
+                    ]
+
+                response.raise_for_status()
+                results = response.json()["results"]
+
+                logger.info(f"Face event batch processed: {len(results)} events")
+                return results
+
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 401:
+                    logger.warning("Authentication token expired, will refresh")
+                    self.token_expires_at = 0
+                elif e.response.status_code < 500:
+                    logger.error(
+                        f"Client error: {e.response.status_code} - {e.response.text}"
+                    )
+                    error = {"error": f"HTTP {e.response.status_code}: {e.response.text}"}
+                    return [error] * len(items)
+                else:
+                    logger.warning(
+                        f"Server error (attempt {attempt + 1}/{max_retries + 1}): {e.response.status_code}"
+                    )
+            except (httpx.TimeoutException, httpx.RequestError) as e:
+                logger.warning(
+                    f"Batch request error (attempt {attempt + 1}/{max_retries + 1}): {e}"
+                )
+            except Exception as e:
+                logger.error(
+                    f"Unexpected error (attempt {attempt + 1}/{max_retries + 1}): {e}"
+                )
+
+            if attempt < max_retries:
+                wait_time = (2**attempt) + (0.1 * attempt)
+                logger.info(f"Retrying batch in {wait_time:.1f}s...")
+                await asyncio.sleep(wait_time)
+
+        logger.error(
+            f"Failed to send batch of {len(items)} face events, queuing for later retry"
+        )
+        for event, face_image_bytes in items:
+            await self._spool_event(event, face_image_bytes)
+
+        return [{"error": "Max retries exceeded, event queued for retry"}] * len(items)
+
     async def _monitor_shutdown(self):
         """Monitor for shutdown signals and initiate graceful shutdown"""
         check_interval = 2  # Check every 2 seconds
@@ -916,6 +1211,8 @@ class FaceRecognitionWorker:
             # Detect faces
             detections = self.detector.detect(frame)
 
+            # Collect usable face crops so they can be embedded in one batch
+            faces = []
             for detection in detections:
                 if detection["confidence"] < self.config.confidence_threshold:
                     continue
@@ -928,15 +1225,47 @@ class FaceRecognitionWorker:
                 if face_image.size == 0:
                     continue
 
-                # Generate embedding
                 landmarks = detection.get("landmarks")
                 if landmarks:
                     landmarks = np.array(landmarks)
 
-                embedding = self.embedder.embed(face_image, landmarks)
+                faces.append((detection, face_image, landmarks))
+
+            # Only embed faces whose track is new, uncertain or due a refresh
+            track_updates = [None] * len(faces)
+            if self.tracker:
+                track_updates = self.tracker.update([d for d, _, _ in faces])
+                pending = [
+                    (face, update)
+                    for face, update in zip(faces, track_updates)
+                    if update.needs_embedding
+                ]
+            else:
+                pending = list(zip(faces, track_updates))
+
+            if not pending:
+                return 0
 
-                # Check if staff member
-                is_staff_local, staff_id = self._is_staff_match(embedding)
+            # Generate embeddings with a single batched forward pass
+            embeddings = self.embedder.embed_batch(
+                [face_image for (_, face_image, _), _ in pending],
+                [landmarks for (_, _, landmarks), _ in pending],
+            )
+
+            # Check all faces against the staff matrix at once
+            staff_matches = self._match_staff_batch(embeddings)
+
+            for (
+                ((detection, face_image, _), track_update),
+                embedding,
+                (is_staff_local, staff_id),
+            ) in zip(pending, embeddings, staff_matches):
+                bbox = detection["bbox"]
+
+                if track_update:
+                    self.tracker.mark_embedded(
+                        track_update.track, embedding, is_staff_local, staff_id
+                    )
 
                 # Get assigned camera ID from worker client
                 assigned_camera_id = self.worker_client.get_assigned_camera()
@@ -960,12 +1289,18 @@ class FaceRecognitionWorker:
                     bbox=bbox,
                     confidence=detection["confidence"],
                     snapshot_url=None,  # No longer needed - sending image directly
+                    idempotency_key=uuid.uuid4().hex,
                     is_staff_local=is_staff_local,
                     staff_id=staff_id,
+                    track_id=track_update.track.track_id if track_update else None,
+                    track_length=track_update.track.length if track_update else None,
                 )
 
                 # Send to API with face image bytes
-                await self._send_face_event(event, face_image_bytes)
+                if self.event_batcher:
+                    self.event_batcher.submit(event, face_image_bytes)
+                else:
+                    await self._send_face_event(event, face_image_bytes)
 
                 # Report face processed to worker client
                 self.worker_client.report_face_processed()
@@ -991,9 +1326,54 @@ class FaceRecognitionWorker:
 
         return False
 
+    def _open_capture(self) -> cv2.VideoCapture:
+        """Open and configure the camera source (blocking, run off the event loop)"""
+        if self.config.rtsp_url:
+            cap = cv2.VideoCapture(self.config.rtsp_url)
+            logger.info(f"Opening RTSP stream: {self.config.rtsp_url}")
+        else:
+            cap = cv2.VideoCapture(self.config.usb_camera)
+            logger.info(f"Opening USB camera: {self.config.usb_camera}")
+
+        if not cap.isOpened():
+            cap.release()
+            raise RuntimeError("Failed to open camera")
+
+        # Set camera properties for optimal performance
+        cap.set(cv2.CAP_PROP_FPS, self.config.worker_fps)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.frame_width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.frame_height)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer to get latest frames
+        return cap
+
+    async def _stop_capture_stage(self):
+        """Stop the decode thread (it releases the capture itself)"""
+        stage, self.capture_stage = self.capture_stage, None
+        if stage:
+            # Joining may wait on a blocking read; keep it off the event loop
+            await asyncio.to_thread(stage.stop)
+            logger.info("Camera released")
+
+    def get_capture_stats(self) -> Optional[Dict[str, Any]]:
+        """Capture stage counters: frame age, dropped frames, read failures"""
+        if self.capture_stage:
+            stats = self.capture_stage.get_stats()
+        else:
+            stats = self.frame_ring.get_stats()
+        if self.tracker:
+            stats["tracking"] = self.tracker.get_stats()
+        if self.event_batcher:
+            stats["event_batching"] = self.event_batcher.get_stats()
+        stats["event_spool"] = self.event_spool.get_stats()
+        return stats
+
     async def run_camera_capture(self):
-        """Run continuous camera capture and processing"""
-        cap = None
+        """Run continuous camera capture and processing
+
+        Blocking reads happen in a dedicated capture thread that publishes into
+        ``self.frame_ring``; this coroutine only consumes frames, so slow
+        downstream stages drop old frames instead of stalling the event loop.
+        """
         reconnect_attempts = 0
         max_reconnect_attempts = self.config.max_camera_reconnect_attempts
 
@@ -1014,27 +1394,20 @@ class FaceRecognitionWorker:
                     break
 
                 try:
-                    # Initialize camera
-                    if self.config.rtsp_url:
-                        cap = cv2.VideoCapture(self.config.rtsp_url)
-                        logger.info(f"Opening RTSP stream: {self.config.rtsp_url}")
-                    else:
-                        cap = cv2.VideoCapture(self.config.usb_camera)
-                        logger.info(f"Opening USB camera: {self.config.usb_camera}")
-
-                    if not cap.isOpened():
-                        raise RuntimeError("Failed to open camera")
-
-                    # Set camera properties for optimal performance
-                    cap.set(cv2.CAP_PROP_FPS, self.config.worker_fps)
-                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.frame_width)
-                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.frame_height)
-                    cap.set(
-                        cv2.CAP_PROP_BUFFERSIZE, 1
-                    )  # Reduce buffer to get latest frames
-
-                    frame_delay = 1.0 / self.config.worker_fps
-                    last_process_time = 0
+                    # Opening an RTSP stream can block for seconds
+                    cap = await asyncio.to_thread(self._open_capture)
+
+                    self.frame_ring.clear()
+                    if self.tracker:
+                        # Tracks don't survive a gap in the stream
+                        self.tracker.reset()
+                    self.capture_stage = CaptureStage(
+                        cap,
+                        self.frame_ring,
+                        publish_fps=self.config.worker_fps,
+                        name=f"capture-{assigned_camera_id}",
+                    )
+                    self.capture_stage.start()
                     reconnect_attempts = 0  # Reset on successful connection
 
                     logger.info(
@@ -1045,42 +1418,27 @@ class FaceRecognitionWorker:
                     await self.worker_client.report_processing()
 
                     # Main processing loop
-                    frame_count = 0
-                    while True:
-                        # Check for shutdown signal every few frames
-                        if frame_count % 10 == 0 or self.should_shutdown():
-                            if self.should_shutdown():
+                    while not self.should_shutdown():
+                        item = await self.frame_ring.get_async(timeout=1.0)
+                        if item is None:
+                            if not self.capture_stage.is_alive():
+                                raise RuntimeError(
+                                    self.capture_stage.error or "Capture stage stopped"
+                                )
+                            continue
+
+                        frame, _captured_at = item
+                        try:
+                            faces_count = await self.process_frame(frame)
+                            if faces_count > 0:
                                 logger.info(
-                                    "Shutdown signal received, stopping camera capture"
+                                    f"Processed {faces_count} faces at {datetime.now().strftime('%H:%M:%S')}"
                                 )
-                                break
-
-                        ret, frame = cap.read()
-                        if not ret:
-                            logger.warning(
-                                "Failed to read frame, attempting reconnection"
-                            )
-                            break  # Break to outer loop for reconnection
-
-                        current_time = time.time()
-                        frame_count += 1
-
-                        # Process frame based on FPS setting
-                        if current_time - last_process_time >= frame_delay:
-                            try:
-                                faces_count = await self.process_frame(frame)
-                                if faces_count > 0:
-                                    logger.info(
-                                        f"Processed {faces_count} faces at {datetime.now().strftime('%H:%M:%S')}"
-                                    )
-                                last_process_time = current_time
-
-                            except Exception as frame_error:
-                                logger.error(f"Frame processing error: {frame_error}")
-                                continue
-
-                        # Small delay to prevent CPU overload
-                        await asyncio.sleep(0.01)
+                        except Exception as frame_error:
+                            logger.error(f"Frame processing error: {frame_error}")
+                            continue
+
+                    logger.info("Shutdown signal received, stopping camera capture")
 
                 except KeyboardInterrupt:
                     logger.info("Stopping camera capture")
@@ -1092,9 +1450,7 @@ class FaceRecognitionWorker:
                         f"Camera error: {str(camera_error)}"
                     )
 
-                    if cap:
-                        cap.release()
-                        cap = None
+                    await self._stop_capture_stage()
 
                     reconnect_attempts += 1
                     if reconnect_attempts >= max_reconnect_attempts:
@@ -1111,9 +1467,7 @@ class FaceRecognitionWorker:
                     await asyncio.sleep(wait_time)
 
         finally:
-            if cap:
-                cap.release()
-                logger.info("Camera released")
+            await self._stop_capture_stage()
 
             # Handle graceful shutdown
             if self.should_shutdown():
@@ -0,0 +1,138 @@
+"""
+Recognition-only ArcFace engine
+
+Runs the ArcFace recognition ONNX model directly on aligned 112x112 face
+crops. Unlike ``insightface.app.FaceAnalysis.get`` this never re-runs the
+640x640 face detector on a crop that is already aligned, and it reuses a
+single ONNX Runtime session plus preallocated input buffers across calls.
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INPUT_SIZE = 112
+INPUT_MEAN = 127.5
+INPUT_STD = 127.5
+
+
+def find_recognition_model(model_path: Optional[str] = None) -> Optional[str]:
+    """Locate an ArcFace recognition ONNX file.
+
+    Checks, in order: the explicit path, ``ARCFACE_MODEL_PATH``, then the
+    InsightFace model pack directory (``~/.insightface/models/<pack>``) for a
+    recognition model (``w600k_*`` / ``glintr100`` style names).
+    """
+    candidates = [model_path, os.getenv("ARCFACE_MODEL_PATH")]
+    for path in candidates:
+        if path and os.path.isfile(path):
+            return path
+
+    root = os.path.expanduser(os.getenv("INSIGHTFACE_ROOT", "~/.insightface"))
+    pack = os.getenv("INSIGHTFACE_MODEL_PACK", "buffalo_l")
+    pack_dir = os.path.join(root, "models", pack)
+    for pattern in ("w600k_*.onnx", "glintr100*.onnx", "*arcface*.onnx"):
+        matches = sorted(glob.glob(os.path.join(pack_dir, pattern)))
+        if matches:
+            return matches[0]
+
+    return None
+
+
+class ArcFaceRecognitionEngine:
+    """Direct ONNX Runtime inference for the ArcFace recognition model"""
+
+    def __init__(self, session, initial_batch: int = 8):
+        self.session = session
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_name = session.get_outputs()[0].name
+
+        # Models exported with a fixed batch dimension are fed full batches,
+        # padding the last chunk of faces
+        batch_dim = model_input.shape[0] if model_input.shape else None
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+
+        self._buffer = np.empty(
+            (self.fixed_batch or initial_batch, 3, INPUT_SIZE, INPUT_SIZE),
+            dtype=np.float32,
+        )
+
+    @classmethod
+    def load(
+        cls, model_path: Optional[str] = None, providers: Optional[List[str]] = None
+    ) -> Optional["ArcFaceRecognitionEngine"]:
+        """Create an engine from the recognition ONNX file, or None if unavailable"""
+        path = find_recognition_model(model_path)
+        if not path:
+            return None
+
+        try:
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = (
+                onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            )
+            session = onnxruntime.InferenceSession(
+                path,
+                sess_options=options,
+                providers=providers or ["CPUExecutionProvider"],
+            )
+            engine = cls(session)
+            logger.info(f"ArcFace recognition engine loaded from {path}")
+            return engine
+
+        except ImportError:
+            logger.warning("onnxruntime not available, recognition engine disabled")
+        except Exception as e:
+            logger.error(f"Failed to load recognition model {path}: {e}")
+        return None
+
+    def _ensure_capacity(self, count: int) -> np.ndarray:
+        if self._buffer.shape[0] < count:
+            capacity = max(count, self._buffer.shape[0] * 2)
+            self._buffer = np.empty(
+                (capacity, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32
+            )
+        return self._buffer[:count]
+
+    def preprocess(self, aligned_faces: Sequence[np.ndarray]) -> np.ndarray:
+        """Pack aligned BGR uint8 crops into the reusable NCHW RGB float32 buffer"""
+        batch = self._ensure_capacity(len(aligned_faces))
+        for i, face in enumerate(aligned_faces):
+            # HWC BGR -> CHW RGB, written straight into the preallocated buffer
+            np.copyto(batch[i], face[:, :, ::-1].transpose(2, 0, 1), casting="unsafe")
+        batch -= INPUT_MEAN
+        batch /= INPUT_STD
+        return batch
+
+    def embed(self, aligned_faces: Sequence[np.ndarray]) -> np.ndarray:
+        """Return L2-normalized (N, D) float32 embeddings for aligned crops"""
+        if len(aligned_faces) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        if self.fixed_batch is not None:
+            outputs = []
+            for start in range(0, len(aligned_faces), self.fixed_batch):
+                chunk = aligned_faces[start : start + self.fixed_batch]
+                self.preprocess(chunk)
+                blob = self._buffer[: self.fixed_batch]
+                blob[len(chunk) :] = 0
+                output = self.session.run([self.output_name], {self.input_name: blob})[0]
+                outputs.append(output[: len(chunk)])
+            feats = np.concatenate(outputs, axis=0)
+        else:
+            blob = self.preprocess(aligned_faces)
+            feats = self.session.run([self.output_name], {self.input_name: blob})[0]
+
+        feats = np.asarray(feats, dtype=np.float32).reshape(len(aligned_faces), -1)
+        norms = np.linalg.norm(feats, axis=1, keepdims=True)
+        return feats / np.maximum(norms, 1e-12)
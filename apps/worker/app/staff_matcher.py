@@ -0,0 +1,135 @@
+"""
+Vectorized staff matching
+
+Holds every staff reference embedding as one pre-normalized, contiguous
+float32 matrix so that matching a face is a single matrix-vector product
+(or one matrix-matrix product for all faces of a frame) followed by argmax.
+A staff member may contribute several reference vectors.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class StaffMatcher:
+    """Cosine-similarity matcher over a (num_vectors, dim) staff matrix"""
+
+    def __init__(self):
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        # owner[i] is the index into staff_ids of the member owning row i
+        self.owner = np.empty(0, dtype=np.int32)
+        self.staff_ids: List[str] = []
+        # staff_id -> raw reference vectors; the matrix is rebuilt from these
+        self._vectors: Dict[str, List[np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.staff_ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def load(self, staff_embeddings: Dict[str, Sequence[Sequence[float]]]) -> None:
+        """Rebuild the matrix from ``{staff_id: [embedding, ...]}``"""
+        self._vectors = {}
+        self.apply_delta(staff_embeddings)
+
+    def apply_delta(
+        self,
+        replaced: Dict[str, Sequence[Sequence[float]]],
+        active_ids: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Apply a sync delta without a full reload.
+
+        ``replaced`` swaps in the whole vector set of each listed staff
+        member; when ``active_ids`` is given, staff not in it are dropped.
+        """
+        if active_ids is not None:
+            active = set(active_ids)
+            for staff_id in list(self._vectors):
+                if staff_id not in active:
+                    del self._vectors[staff_id]
+
+        for staff_id, vectors in replaced.items():
+            rows = [
+                np.asarray(vector, dtype=np.float32).ravel()
+                for vector in vectors
+                if len(vector)
+            ]
+            rows = [row for row in rows if np.linalg.norm(row) > 0]
+            if rows:
+                self._vectors[staff_id] = rows
+            else:
+                self._vectors.pop(staff_id, None)
+
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        rows: List[np.ndarray] = []
+        owners: List[int] = []
+        staff_ids: List[str] = []
+        dim: Optional[int] = None
+
+        for staff_id, vectors in self._vectors.items():
+            member_index = len(staff_ids)
+            added = False
+            for row in vectors:
+                if dim is None:
+                    dim = row.shape[0]
+                if row.shape[0] != dim:
+                    logger.debug(
+                        f"Skipping staff {staff_id} vector with dim {row.shape[0]} != {dim}"
+                    )
+                    continue
+                rows.append(row / np.linalg.norm(row))
+                owners.append(member_index)
+                added = True
+            if added:
+                staff_ids.append(staff_id)
+
+        if rows:
+            self.matrix = np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+        else:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.owner = np.asarray(owners, dtype=np.int32)
+        self.staff_ids = staff_ids
+
+    def match_batch(
+        self, embeddings: Sequence[Sequence[float]], threshold: float
+    ) -> List[Tuple[bool, Optional[str], float]]:
+        """Best staff match for each embedding: (is_staff, staff_id, similarity)"""
+        if len(embeddings) == 0:
+            return []
+        no_match = [(False, None, 0.0)] * len(embeddings)
+        if not self.staff_ids:
+            return no_match
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.dim:
+            return no_match
+        queries = queries / np.maximum(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+        )
+
+        similarities = queries @ self.matrix.T
+        best_rows = similarities.argmax(axis=1)
+        best_scores = similarities[np.arange(len(queries)), best_rows]
+
+        results = []
+        for row, score in zip(best_rows, best_scores):
+            score = float(score)
+            if score >= threshold:
+                results.append((True, self.staff_ids[self.owner[row]], score))
+            else:
+                results.append((False, None, score))
+        return results
+
+    def match(
+        self, embedding: Sequence[float], threshold: float
+    ) -> Tuple[bool, Optional[str], float]:
+        """Best staff match for a single embedding"""
+        return self.match_batch([embedding], threshold)[0]
@@ -0,0 +1,325 @@
+"""
+Face Tracker for Worker
+
+Associates face detections across frames so that a person standing in front
+of the camera is embedded and reported once per track instead of once per
+frame.
+
+Features:
+- Greedy IoU association with centroid-distance fallback
+- Optional constant-velocity Kalman prediction of box position
+- Per-track state (hits, misses, last embedding, staff match)
+- Re-embed policy: track birth/confirmation, low-confidence association,
+  or every ``reembed_interval`` seconds
+- Confirmation: a track reported before it was ``confirm_length`` frames
+  long is reported again once it is, so the API sees the track length it
+  needs to create a new customer
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) arrays of [x, y, w, h] boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    x1 = np.maximum(a[..., 0], b[..., 0])
+    y1 = np.maximum(a[..., 1], b[..., 1])
+    x2 = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2])
+    y2 = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3])
+
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    return (inter / np.maximum(union, 1e-6)).astype(np.float32)
+
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter over box center and size.
+
+    State: [cx, cy, w, h, vx, vy]; measurement: [cx, cy, w, h].
+    """
+
+    def __init__(self, bbox: np.ndarray):
+        x, y, w, h = bbox
+        self.x = np.array([x + w / 2, y + h / 2, w, h, 0.0, 0.0], dtype=np.float64)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 100.0, 100.0])
+        self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 5.0, 5.0])
+        self.R = np.diag([4.0, 4.0, 9.0, 9.0])
+        self.H = np.zeros((4, 6))
+        self.H[:4, :4] = np.eye(4)
+
+    def _transition(self, dt: float) -> np.ndarray:
+        F = np.eye(6)
+        F[0, 4] = dt
+        F[1, 5] = dt
+        return F
+
+    def predict(self, dt: float = 1.0) -> np.ndarray:
+        F = self._transition(dt)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + self.Q
+        return self.bbox()
+
+    def update(self, bbox: np.ndarray) -> None:
+        x, y, w, h = bbox
+        z = np.array([x + w / 2, y + h / 2, w, h])
+        residual = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ residual
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+
+    def bbox(self) -> np.ndarray:
+        cx, cy, w, h = self.x[:4]
+        w, h = max(w, 1.0), max(h, 1.0)
+        return np.array([cx - w / 2, cy - h / 2, w, h], dtype=np.float32)
+
+
+@dataclass
+class Track:
+    """Per-track state kept between frames"""
+
+    track_id: int
+    bbox: np.ndarray
+    confidence: float
+    created_at: float
+    last_update: float
+    hits: int = 1
+    misses: int = 0
+    association_score: float = 1.0
+    embedding: Optional[List[float]] = None
+    last_embed_time: Optional[float] = None
+    staff_id: Optional[str] = None
+    is_staff: bool = False
+    confirmed: bool = False
+    kalman: Optional[KalmanBoxFilter] = field(default=None, repr=False)
+
+    @property
+    def length(self) -> int:
+        return self.hits
+
+
+@dataclass
+class TrackUpdate:
+    """A detection associated with a track for the current frame"""
+
+    track: Track
+    detection: Dict[str, Any]
+    needs_embedding: bool
+    reason: Optional[str] = None
+
+
+class FaceTracker:
+    """Multi-object face tracker with an embed-once-per-track policy"""
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        low_confidence_iou: float = 0.5,
+        max_misses: int = 10,
+        min_track_length: int = 1,
+        reembed_interval: float = 10.0,
+        use_kalman: bool = True,
+        confirm_length: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.iou_threshold = iou_threshold
+        self.low_confidence_iou = low_confidence_iou
+        self.max_misses = max_misses
+        self.min_track_length = max(1, min_track_length)
+        self.reembed_interval = reembed_interval
+        self.use_kalman = use_kalman
+        self.confirm_length = max(1, confirm_length)
+        self._clock = clock
+
+        self.tracks: Dict[int, Track] = {}
+        self._next_id = 1
+        self._last_frame_time: Optional[float] = None
+
+        # Statistics
+        self.stats = {
+            "tracks_created": 0,
+            "tracks_expired": 0,
+            "embeddings_requested": 0,
+            "embeddings_skipped": 0,
+        }
+
+    def _predict(self, now: float) -> None:
+        if not self.use_kalman or self._last_frame_time is None:
+            return
+        dt = max(now - self._last_frame_time, 1e-3)
+        for track in self.tracks.values():
+            if track.kalman is not None:
+                track.bbox = track.kalman.predict(dt)
+
+    def _centroid_fallback(
+        self, track_boxes: np.ndarray, det_boxes: np.ndarray
+    ) -> np.ndarray:
+        """Similarity from centroid distance, normalized by box size"""
+        t_c = track_boxes[:, None, :2] + track_boxes[:, None, 2:] / 2
+        d_c = det_boxes[None, :, :2] + det_boxes[None, :, 2:] / 2
+        dist = np.linalg.norm(t_c - d_c, axis=2)
+        scale = np.maximum(track_boxes[:, None, 2:].max(axis=2), 1.0)
+        return np.clip(1.0 - dist / scale, 0.0, 1.0)
+
+    def _associate(
+        self, det_boxes: np.ndarray
+    ) -> Tuple[List[Tuple[int, int, float]], List[int]]:
+        """Greedy association; returns (track_id, det_index, score) and new dets"""
+        track_ids = list(self.tracks.keys())
+        if not track_ids or len(det_boxes) == 0:
+            return [], list(range(len(det_boxes)))
+
+        track_boxes = np.array(
+            [self.tracks[t].bbox for t in track_ids], dtype=np.float32
+        )
+        iou = iou_matrix(track_boxes, det_boxes)
+
+        # Centroid fallback lets fast-moving faces with little overlap keep
+        # their track; it is scaled below iou_threshold so IoU matches win and
+        # the association is treated as low-confidence (forces a re-embed)
+        centroid = self._centroid_fallback(track_boxes, det_boxes)
+        scores = np.where(
+            iou >= self.iou_threshold,
+            iou,
+            np.where(centroid >= 0.5, centroid * self.iou_threshold, 0.0),
+        )
+
+        matches: List[Tuple[int, int, float]] = []
+        used_tracks, used_dets = set(), set()
+        flat_order = np.argsort(-scores, axis=None)
+        for t_idx, d_idx in zip(*np.unravel_index(flat_order, scores.shape)):
+            score = float(scores[t_idx, d_idx])
+            if score <= 0:
+                break
+            if t_idx in used_tracks or d_idx in used_dets:
+                continue
+            used_tracks.add(t_idx)
+            used_dets.add(d_idx)
+            matches.append((track_ids[t_idx], int(d_idx), score))
+
+        unmatched = [i for i in range(len(det_boxes)) if i not in used_dets]
+        return matches, unmatched
+
+    def _needs_embedding(self, track: Track, now: float) -> Tuple[bool, Optional[str]]:
+        if track.hits < self.min_track_length:
+            return False, None
+        if track.last_embed_time is None:
+            return True, "birth"
+        if (
+            not track.confirmed
+            and not track.is_staff
+            and track.hits >= self.confirm_length
+        ):
+            return True, "confirmed"
+        if track.association_score < self.low_confidence_iou:
+            return True, "low_confidence"
+        if now - track.last_embed_time >= self.reembed_interval:
+            return True, "interval"
+        return False, None
+
+    def update(self, detections: List[Dict[str, Any]]) -> List[TrackUpdate]:
+        """Associate this frame's detections with tracks.
+
+        Returns one TrackUpdate per detection, in detection order, flagging
+        which ones need a fresh embedding.
+        """
+        now = self._clock()
+        self._predict(now)
+        self._last_frame_time = now
+
+        det_boxes = np.array(
+            [d["bbox"] for d in detections], dtype=np.float32
+        ).reshape(-1, 4)
+        matches, unmatched = self._associate(det_boxes)
+
+        updates: List[Optional[TrackUpdate]] = [None] * len(detections)
+        matched_track_ids = set()
+
+        for track_id, d_idx, score in matches:
+            track = self.tracks[track_id]
+            detection = detections[d_idx]
+            bbox = det_boxes[d_idx]
+            if track.kalman is not None:
+                track.kalman.update(bbox)
+            track.bbox = bbox
+            track.confidence = float(detection.get("confidence", track.confidence))
+            track.hits += 1
+            track.misses = 0
+            track.last_update = now
+            track.association_score = score
+            matched_track_ids.add(track_id)
+            updates[d_idx] = TrackUpdate(track, detection, False)
+
+        for d_idx in unmatched:
+            detection = detections[d_idx]
+            bbox = det_boxes[d_idx]
+            track = Track(
+                track_id=self._next_id,
+                bbox=bbox,
+                confidence=float(detection.get("confidence", 0.0)),
+                created_at=now,
+                last_update=now,
+                kalman=KalmanBoxFilter(bbox) if self.use_kalman else None,
+            )
+            self._next_id += 1
+            self.tracks[track.track_id] = track
+            matched_track_ids.add(track.track_id)
+            self.stats["tracks_created"] += 1
+            updates[d_idx] = TrackUpdate(track, detection, False)
+
+        # Age out tracks that were not seen in this frame
+        for track_id in list(self.tracks.keys()):
+            if track_id in matched_track_ids:
+                continue
+            track = self.tracks[track_id]
+            track.misses += 1
+            if track.misses > self.max_misses:
+                del self.tracks[track_id]
+                self.stats["tracks_expired"] += 1
+
+        for update in updates:
+            needs, reason = self._needs_embedding(update.track, now)
+            update.needs_embedding = needs
+            update.reason = reason
+            if needs:
+                self.stats["embeddings_requested"] += 1
+            else:
+                self.stats["embeddings_skipped"] += 1
+
+        return updates
+
+    def mark_embedded(
+        self,
+        track: Track,
+        embedding: List[float],
+        is_staff: bool = False,
+        staff_id: Optional[str] = None,
+    ) -> None:
+        """Record a fresh embedding (and staff decision) for a track"""
+        track.embedding = embedding
+        track.last_embed_time = self._clock()
+        track.association_score = 1.0
+        track.is_staff = is_staff
+        track.staff_id = staff_id
+        track.confirmed = track.hits >= self.confirm_length
+
+    def reset(self) -> None:
+        """Drop all tracks (e.g. after a camera reconnect)"""
+        self.tracks.clear()
+        self._last_frame_time = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["active_tracks"] = len(self.tracks)
+        return stats
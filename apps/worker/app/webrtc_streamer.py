@@ -79,10 +79,15 @@ class CameraVideoTrack(VideoStreamTrack):
 class WebRTCStreamer:
     """WebRTC streaming client for worker"""
 
-    def __init__(self, worker_id: str, camera_manager: CameraManager):
+    def __init__(
+        self, worker_id: str, camera_manager: CameraManager, viewer_fps: float = 15
+    ):
         self.worker_id = worker_id
         self.camera_manager = camera_manager
 
+        # Decode rate requested from the camera manager while a viewer is connected
+        self.viewer_fps = viewer_fps
+
         # WebRTC connections: {session_id: RTCPeerConnection}
         self.peer_connections: Dict[str, RTCPeerConnection] = {}
 
@@ -309,6 +314,9 @@ class WebRTCStreamer:
             pc = RTCPeerConnection()
             self.peer_connections[session_id] = pc
             self.streaming_sessions[session_id] = camera_id
+            self.camera_manager.set_consumer_rate(
+                camera_id, f"webrtc:{session_id}", self.viewer_fps
+            )
 
             # Create video track for camera
             video_track = CameraVideoTrack(camera_id, self.camera_manager)
@@ -478,7 +486,8 @@ class WebRTCStreamer:
 
             # Remove session tracking
             if session_id in self.streaming_sessions:
-                del self.streaming_sessions[session_id]
+                camera_id = self.streaming_sessions.pop(session_id)
+                self.camera_manager.remove_consumer(camera_id, f"webrtc:{session_id}")
 
         except Exception as e:
             logger.error(f"Error cleaning up session {session_id}: {e}")
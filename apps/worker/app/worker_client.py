@@ -54,7 +54,11 @@ class WorkerClient:
             "streaming_enabled": True,
             "webrtc_streaming": True,  # Enable WebRTC P2P streaming
             "face_processing_enabled": True,
+            # Preferred compact embedding encoding for face events
+            "embedding_encoding": config.embedding_encoding,
         }
+        # Encoding the API agreed to at registration (None = JSON lists)
+        self.embedding_encoding: Optional[str] = None
 
         # Streaming service reference (set from parent worker)
         self.streaming_service = None
@@ -62,10 +66,17 @@ class WorkerClient:
         # WebRTC streaming reference
         self.webrtc_streamer = None
 
+        # Capture stage statistics provider (set from parent worker)
+        self._capture_stats_provider = None
+
     def set_streaming_service(self, streaming_service):
         """Set reference to streaming service for status checks"""
         self.streaming_service = streaming_service
 
+    def set_capture_stats_provider(self, provider):
+        """Set callable returning capture stage counters for heartbeats"""
+        self._capture_stats_provider = provider
+
     def set_webrtc_streamer(self, webrtc_streamer):
         """Set reference to WebRTC streamer for P2P streaming"""
         self.webrtc_streamer = webrtc_streamer
@@ -272,6 +283,9 @@ class WorkerClient:
 
                 self.worker_id = intended_worker_id  # Always use our intended ID
 
+                # Older APIs don't negotiate and keep JSON embeddings
+                self.embedding_encoding = result.get("embedding_encoding")
+
                 # Capture camera assignment from backend response
                 if "assigned_camera_id" in result and result["assigned_camera_id"]:
                     self.assigned_camera_id = int(result["assigned_camera_id"])
@@ -437,6 +451,14 @@ class WorkerClient:
                     }
                 )
 
+        if self._capture_stats_provider:
+            try:
+                capture_stats = self._capture_stats_provider()
+                if capture_stats:
+                    current_capabilities["capture_stats"] = capture_stats
+            except Exception as e:
+                logger.debug(f"Could not get capture stats: {e}")
+
         return current_capabilities
         # Don't raise - heartbeat failures shouldn't crash the worker
 
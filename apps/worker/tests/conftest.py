@@ -0,0 +1,13 @@
+import pytest
+
+from apps.worker.app.worker_id_manager import worker_id_manager
+
+
+@pytest.fixture(autouse=True)
+def isolated_worker_data(tmp_path, monkeypatch):
+    """Keep worker IDs and spooled events out of the checkout's .worker_data"""
+    data_dir = tmp_path / "worker_data"
+    data_dir.mkdir()
+    monkeypatch.setattr(worker_id_manager, "data_dir", data_dir)
+    monkeypatch.setenv("EVENT_SPOOL_DIR", str(data_dir / "event_spool"))
+    return data_dir
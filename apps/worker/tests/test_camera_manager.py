@@ -0,0 +1,108 @@
+"""
+Tests for CameraManager decimating capture
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from apps.worker.app.camera_manager import CameraManager
+
+
+class FakeVideoCapture:
+    """cv2.VideoCapture stand-in that counts grabs and decodes"""
+
+    def __init__(self, *_args, source_fps: float = 200.0):
+        self.interval = 1.0 / source_fps
+        self.grabs = 0
+        self.retrieves = 0
+        self.reads = 0
+
+    def isOpened(self):
+        return True
+
+    def set(self, *_args):
+        return True
+
+    def grab(self):
+        time.sleep(self.interval)
+        self.grabs += 1
+        return True
+
+    def retrieve(self):
+        self.retrieves += 1
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def read(self):
+        self.grab()
+        self.reads += 1
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+def _run_capture(manager: CameraManager, camera_id: int, duration: float):
+    config = {"camera_type": "webcam", "device_index": 0, "fps": 5}
+    manager.active_cameras[camera_id] = config
+    manager.frame_buffers[camera_id] = None
+    manager.frame_locks[camera_id] = threading.Lock()
+    manager.stop_flags[camera_id] = threading.Event()
+    manager.camera_stats[camera_id] = {
+        "start_time": time.time(),
+        "frames_captured": 0,
+        "frames_grabbed": 0,
+        "last_frame_time": 0,
+        "fps": 0,
+        "decode_fps_target": 0,
+        "errors": 0,
+    }
+
+    fake = FakeVideoCapture()
+    with patch("cv2.VideoCapture", return_value=fake):
+        thread = threading.Thread(
+            target=manager._camera_capture_thread, args=(camera_id, config)
+        )
+        thread.start()
+        time.sleep(duration)
+        manager.stop_flags[camera_id].set()
+        thread.join(timeout=2.0)
+
+    return fake, manager.camera_stats[camera_id]
+
+
+def test_decode_fps_uses_highest_consumer_rate():
+    manager = CameraManager()
+    manager.active_cameras[1] = {"fps": 5}
+
+    assert manager.get_decode_fps(1) == 5
+
+    manager.set_consumer_rate(1, "processing", 5)
+    manager.set_consumer_rate(1, "webrtc:abc", 15)
+    assert manager.get_decode_fps(1) == 15
+
+    manager.remove_consumer(1, "webrtc:abc")
+    assert manager.get_decode_fps(1) == 5
+
+
+def test_decimating_capture_decodes_at_consumer_rate():
+    manager = CameraManager(decimate=True)
+    fake, stats = _run_capture(manager, camera_id=1, duration=0.5)
+
+    assert fake.grabs > 30
+    # 5 FPS over ~0.5s -> only a handful of decodes despite many grabs
+    assert fake.retrieves <= 4
+    assert stats["frames_grabbed"] == fake.grabs
+    assert stats["frames_captured"] == fake.retrieves
+    assert manager.frame_buffers[1] is not None
+
+
+def test_non_decimating_capture_decodes_every_frame():
+    manager = CameraManager(decimate=False)
+    fake, stats = _run_capture(manager, camera_id=1, duration=0.3)
+
+    assert fake.reads > 0
+    assert fake.retrieves == fake.reads
+    assert stats["frames_captured"] == fake.reads
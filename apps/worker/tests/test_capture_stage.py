@@ -0,0 +1,126 @@
+"""
+Tests for the threaded capture stage and drop-oldest frame ring
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from apps.worker.app.capture_stage import CaptureStage, FrameRing
+
+
+class FakeCapture:
+    """Minimal cv2.VideoCapture stand-in producing a fixed number of frames"""
+
+    def __init__(self, num_frames: int = 10, delay: float = 0.0):
+        self.num_frames = num_frames
+        self.delay = delay
+        self.reads = 0
+        self.decodes = 0
+        self.released = False
+
+    def grab(self):
+        if self.reads >= self.num_frames:
+            return False
+        self.reads += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return True
+
+    def retrieve(self):
+        self.decodes += 1
+        return True, np.full((4, 4, 3), self.reads, dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def test_frame_ring_drops_oldest_when_full():
+    ring = FrameRing(capacity=2)
+
+    for i in range(5):
+        ring.put(np.full((2, 2), i, dtype=np.uint8))
+
+    assert len(ring) == 2
+    assert ring.frames_dropped == 3
+
+    frame, _ = ring.get(timeout=0)
+    assert frame[0, 0] == 3
+    frame, _ = ring.get(timeout=0)
+    assert frame[0, 0] == 4
+    assert ring.get(timeout=0) is None
+
+
+def test_frame_ring_tracks_frame_age():
+    ring = FrameRing(capacity=1)
+    ring.put(np.zeros((2, 2)), captured_at=time.monotonic() - 0.5)
+
+    ring.get(timeout=0)
+    stats = ring.get_stats()
+
+    assert stats["frames_consumed"] == 1
+    assert stats["last_frame_age"] >= 0.5
+    assert stats["max_frame_age"] >= 0.5
+
+
+def test_frame_ring_rejects_zero_capacity():
+    with pytest.raises(ValueError):
+        FrameRing(capacity=0)
+
+
+@pytest.mark.asyncio
+async def test_frame_ring_get_async_waits_for_frame():
+    ring = FrameRing(capacity=2)
+    assert await ring.get_async(timeout=0.05) is None
+
+    ring.put(np.zeros((2, 2)))
+    item = await ring.get_async(timeout=0.05)
+    assert item is not None
+
+
+def test_capture_stage_publishes_and_releases():
+    ring = FrameRing(capacity=100)
+    capture = FakeCapture(num_frames=10)
+    stage = CaptureStage(capture, ring)
+
+    stage.start()
+    stage._thread.join(timeout=2.0)
+
+    assert not stage.is_alive()
+    assert capture.released
+    assert stage.frames_grabbed == 10
+    assert stage.frames_decoded == 10
+    assert ring.frames_put == 10
+    # Stage reports the end-of-stream read failure so the caller can reconnect
+    assert stage.read_failures == 1
+    assert stage.error
+
+
+def test_capture_stage_decimates_to_publish_fps():
+    ring = FrameRing(capacity=100)
+    capture = FakeCapture(num_frames=20, delay=0.005)
+    stage = CaptureStage(capture, ring, publish_fps=1)
+
+    stage.start()
+    stage._thread.join(timeout=2.0)
+
+    # Every packet is grabbed but only the first fits into a 1 FPS publish
+    # window, so only that one is decoded
+    assert stage.frames_grabbed == 20
+    assert capture.decodes == 1
+    assert ring.frames_put == 1
+
+
+def test_capture_stage_stop():
+    ring = FrameRing(capacity=2)
+    capture = FakeCapture(num_frames=10_000, delay=0.001)
+    stage = CaptureStage(capture, ring)
+
+    stage.start()
+    time.sleep(0.05)
+    stage.stop()
+
+    assert not stage.is_alive()
+    assert capture.released
+    assert stage.get_stats()["frames_dropped"] > 0
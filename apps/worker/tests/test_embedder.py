@@ -106,3 +106,53 @@ def test_embedding_normalization():
 
         # Should be unit normalized
         assert abs(norm - 1.0) < 1e-5
+
+
+class _FakeRecognitionModel:
+    """Recognition model stand-in that records how often it is invoked"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_feat(self, imgs):
+        self.calls += 1
+        if not isinstance(imgs, list):
+            imgs = [imgs]
+        return np.stack(
+            [np.resize(img.astype(np.float32).mean(axis=2).ravel(), 512) + 1.0 for img in imgs]
+        )
+
+
+def test_embed_batch_mock_matches_single_embeddings():
+    """Default embed_batch keeps order and matches per-face embed()"""
+    embedder = MockEmbedder()
+    faces = [np.full((112, 112, 3), v, dtype=np.uint8) for v in (10, 80, 200)]
+
+    batch = embedder.embed_batch(faces)
+
+    assert len(batch) == 3
+    for face, embedding in zip(faces, batch):
+        assert embedding == embedder.embed(face)
+
+
+def test_embed_batch_runs_single_forward_pass():
+    """InsightFace embed_batch aligns all faces and calls the model once"""
+    embedder = InsightFaceEmbedder()
+    rec_model = _FakeRecognitionModel()
+    embedder.model = rec_model
+
+    faces = [
+        np.random.randint(0, 255, (90 + i * 10, 80 + i * 5, 3), dtype=np.uint8)
+        for i in range(8)
+    ]
+    embeddings = embedder.embed_batch(faces, [None] * len(faces))
+
+    assert rec_model.calls == 1
+    assert len(embeddings) == 8
+    for embedding in embeddings:
+        assert len(embedding) == 512
+        assert abs(np.linalg.norm(embedding) - 1.0) < 1e-5
+
+
+def test_embed_batch_empty():
+    assert InsightFaceEmbedder().embed_batch([]) == []
@@ -0,0 +1,101 @@
+"""
+Tests for the face event micro-batching sender
+"""
+
+import asyncio
+
+import pytest
+
+from apps.worker.app.event_batcher import EventBatcher
+
+
+class RecordingSender:
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+
+    async def __call__(self, items):
+        self.batches.append([event for event, _ in items])
+        await asyncio.sleep(self.delay)
+        return [{"match": "new", "event": event} for event, _ in items]
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_batch_is_full():
+    sender = RecordingSender()
+    batcher = EventBatcher(sender, max_batch_size=3, max_delay=10.0)
+    batcher.start()
+
+    futures = [batcher.submit(f"e{i}", b"jpg") for i in range(3)]
+    results = await asyncio.wait_for(asyncio.gather(*futures), timeout=1.0)
+
+    assert sender.batches == [["e0", "e1", "e2"]]
+    assert [r["event"] for r in results] == ["e0", "e1", "e2"]
+    assert batcher.get_stats()["size_flushes"] == 1
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_flushes_partial_batch_after_max_delay():
+    sender = RecordingSender()
+    batcher = EventBatcher(sender, max_batch_size=10, max_delay=0.05)
+    batcher.start()
+
+    future = batcher.submit("e0", b"jpg")
+    await asyncio.sleep(0.01)
+    assert sender.batches == []
+
+    result = await asyncio.wait_for(future, timeout=1.0)
+    assert result["event"] == "e0"
+    assert sender.batches == [["e0"]]
+    assert batcher.get_stats()["time_flushes"] == 1
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_events_arriving_during_send_form_next_batch():
+    sender = RecordingSender(delay=0.05)
+    batcher = EventBatcher(sender, max_batch_size=2, max_delay=0.01)
+    batcher.start()
+
+    first = [batcher.submit("e0", None), batcher.submit("e1", None)]
+    await asyncio.sleep(0.02)  # first batch is in flight
+    second = [batcher.submit("e2", None), batcher.submit("e3", None)]
+
+    await asyncio.wait_for(asyncio.gather(*first, *second), timeout=1.0)
+    assert sender.batches == [["e0", "e1"], ["e2", "e3"]]
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_pending_and_reports_errors():
+    async def failing_sender(items):
+        raise RuntimeError("api down")
+
+    batcher = EventBatcher(failing_sender, max_batch_size=10, max_delay=10.0)
+    batcher.start()
+    future = batcher.submit("e0", None)
+
+    await batcher.stop()
+
+    assert future.result() == {"error": "api down"}
+    assert batcher.get_stats()["send_errors"] == 1
+    assert batcher.get_stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_short_response_fails_leftover_futures():
+    async def short_sender(items):
+        return [{"id": items[0][0]}]
+
+    batcher = EventBatcher(short_sender, max_batch_size=10, max_delay=10.0)
+    batcher.start()
+    answered = batcher.submit("e0", None)
+    leftover = batcher.submit("e1", None)
+
+    await batcher.stop()
+
+    assert answered.result() == {"id": "e0"}
+    with pytest.raises(RuntimeError, match="1 results for 2 events"):
+        leftover.result()
+    assert batcher.get_stats()["send_errors"] == 1
@@ -0,0 +1,131 @@
+"""
+Tests for the disk-backed event spool and its replay loop
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from common.models import FaceDetectedEvent
+
+from apps.worker.app.event_spool import EventSpool
+from apps.worker.app.main import FaceRecognitionWorker, WorkerConfig
+
+
+def _event_dict(camera_id: int) -> dict:
+    return {"camera_id": camera_id, "embedding": [0.1] * 4}
+
+
+def test_records_survive_reopen_in_order(tmp_path):
+    spool = EventSpool(str(tmp_path), segment_bytes=200)
+    for i in range(5):
+        spool.append(f"k{i}", _event_dict(i), b"jpeg-%d" % i)
+
+    first = spool.read(2)
+    assert [r.key for r in first] == ["k0", "k1"]
+    spool.ack(first[-1])
+
+    reopened = EventSpool(str(tmp_path), segment_bytes=200)
+    records = reopened.read(10)
+    assert [r.key for r in records] == ["k2", "k3", "k4"]
+    assert records[0].image == b"jpeg-2"
+    assert records[0].event == _event_dict(2)
+
+    reopened.ack(records[-1])
+    assert reopened.read(10) == []
+    assert reopened.pending_bytes() == 0
+    # Delivered segments are deleted, only the one being written remains
+    assert len(list(tmp_path.glob("*.seg"))) == 1
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    spool = EventSpool(str(tmp_path))
+    spool.append("k0", _event_dict(0), b"jpeg")
+    spool.append("k1", _event_dict(1), b"jpeg")
+
+    segment = next(tmp_path.glob("*.seg"))
+    with open(segment, "r+b") as f:
+        f.truncate(segment.stat().st_size - 3)
+
+    reopened = EventSpool(str(tmp_path))
+    assert [r.key for r in reopened.read(10)] == ["k0"]
+    reopened.append("k2", _event_dict(2))
+    assert [r.key for r in reopened.read(10)] == ["k0", "k2"]
+
+
+def test_bounds_drop_oldest_and_skip_expired(tmp_path):
+    spool = EventSpool(str(tmp_path), max_bytes=600, segment_bytes=150)
+    for i in range(10):
+        spool.append(f"k{i}", _event_dict(i), b"x" * 50)
+
+    assert spool.pending_bytes() <= 600
+    assert spool.get_stats()["dropped_bytes"] > 0
+    keys = [r.key for r in spool.read(10)]
+    assert keys[-1] == "k9"
+    assert "k0" not in keys
+
+    spool.max_age_seconds = 0.01
+    time.sleep(0.02)
+    assert spool.read(10) == []
+    assert spool.get_stats()["expired"] == len(keys)
+
+
+def _event(camera_id: int) -> FaceDetectedEvent:
+    return FaceDetectedEvent(
+        tenant_id="t1",
+        site_id=1,
+        camera_id=camera_id,
+        timestamp=datetime.now(timezone.utc),
+        embedding=[0.1] * 512,
+        bbox=[0, 0, 100, 100],
+        confidence=0.9,
+        idempotency_key=f"evt-{camera_id}",
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_replays_spool_in_order_after_outage(tmp_path, monkeypatch):
+    config = WorkerConfig()
+    config.detector_type = "mock"
+    config.embedder_type = "mock"
+    config.event_spool_dir = str(tmp_path)
+    config.failed_event_retry_interval = 1
+    config.event_spool_replay_concurrency = 2
+    worker = FaceRecognitionWorker(config)
+    monkeypatch.setattr(
+        "apps.worker.app.main.random.uniform", lambda low, high: 0.0
+    )
+
+    for camera_id in range(3):
+        await worker._spool_event(_event(camera_id), b"jpeg")
+
+    sent = []
+    outage = {"left": 1}
+
+    async def fake_send(event, image, max_retries=None, spool_on_failure=True):
+        assert not spool_on_failure
+        if outage["left"]:
+            outage["left"] -= 1
+            return {"error": "Max retries exceeded", "retryable": True}
+        sent.append(event.idempotency_key)
+        return {"match": "new"}
+
+    worker._send_face_event = AsyncMock(side_effect=fake_send)
+    task = asyncio.create_task(worker._replay_event_spool())
+    try:
+        for _ in range(100):
+            if worker.event_spool.pending_bytes() == 0:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    # evt-1 was delivered while evt-0 failed, so the cursor stayed put and
+    # evt-1 is sent again; its idempotency key lets the API drop it
+    assert sent == ["evt-1", "evt-0", "evt-1", "evt-2"]
+    assert worker.event_spool.pending_bytes() == 0
+    assert os.path.exists(tmp_path / "index.json")
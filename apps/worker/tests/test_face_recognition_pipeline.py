@@ -15,9 +15,10 @@ from apps.worker.app.main import (FaceDetectedEvent, FaceRecognitionWorker,
 
 
 @pytest.fixture
-def worker_config():
+def worker_config(tmp_path):
     """Create test worker configuration"""
     config = WorkerConfig()
+    config.event_spool_dir = str(tmp_path / "event_spool")
     config.mock_mode = True
     config.detector_type = "mock"
     config.embedder_type = "mock"
@@ -223,7 +224,7 @@ async def test_failed_event_queuing(worker):
 
     # Should queue for retry
     assert "queued for retry" in result["error"]
-    assert not worker.failed_events_queue.empty()
+    assert worker.event_spool.pending_bytes() > 0
 
 
 @pytest.mark.asyncio
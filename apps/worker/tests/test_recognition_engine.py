@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from apps.worker.app.embedder import InsightFaceEmbedder
+from apps.worker.app.recognition_engine import (ArcFaceRecognitionEngine,
+                                                find_recognition_model)
+
+
+class FakeSession:
+    """onnxruntime.InferenceSession stand-in for an ArcFace model"""
+
+    def __init__(self, batch_dim="None"):
+        self.batch_dim = batch_dim
+        self.runs = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input.1", shape=[self.batch_dim, 3, 112, 112])]
+
+    def get_outputs(self):
+        return [SimpleNamespace(name="683")]
+
+    def run(self, output_names, feeds):
+        blob = feeds["input.1"]
+        if isinstance(self.batch_dim, int):
+            assert blob.shape == (self.batch_dim, 3, 112, 112)
+        self.runs.append(blob.copy())
+        # Deterministic "features": per-channel means tiled to 512 dims
+        means = blob.mean(axis=(2, 3))
+        return [np.tile(means, (1, 171))[:, :512] + 0.01]
+
+
+def test_engine_preprocess_layout_and_normalization():
+    engine = ArcFaceRecognitionEngine(FakeSession())
+    face = np.zeros((112, 112, 3), dtype=np.uint8)
+    face[:, :, 0] = 255  # Blue in BGR
+
+    blob = engine.preprocess([face])
+
+    assert blob.shape == (1, 3, 112, 112)
+    assert blob.dtype == np.float32
+    # BGR -> RGB: blue ends up in the last channel, scaled to [-1, 1]
+    assert np.allclose(blob[0, 2], 1.0)
+    assert np.allclose(blob[0, 0], -1.0)
+
+
+def test_engine_batches_in_one_run_and_reuses_buffer():
+    session = FakeSession()
+    engine = ArcFaceRecognitionEngine(session, initial_batch=4)
+    faces = [np.full((112, 112, 3), v, dtype=np.uint8) for v in range(0, 250, 50)]
+
+    buffer_before = engine._buffer
+    feats = engine.embed(faces[:3])
+    assert engine._buffer is buffer_before
+
+    assert len(session.runs) == 1
+    assert feats.shape == (3, 512)
+    assert np.allclose(np.linalg.norm(feats, axis=1), 1.0)
+
+    # Larger batches grow the buffer once, then reuse it
+    engine.embed(faces)
+    grown = engine._buffer
+    engine.embed(faces)
+    assert engine._buffer is grown
+    assert grown.shape[0] >= len(faces)
+
+
+def test_engine_fixed_batch_model_runs_per_face():
+    session = FakeSession(batch_dim=1)
+    engine = ArcFaceRecognitionEngine(session)
+    faces = [np.full((112, 112, 3), v, dtype=np.uint8) for v in (10, 20, 30)]
+
+    feats = engine.embed(faces)
+
+    assert len(session.runs) == 3
+    assert feats.shape == (3, 512)
+
+
+def test_engine_fixed_batch_model_pads_the_last_chunk():
+    session = FakeSession(batch_dim=4)
+    engine = ArcFaceRecognitionEngine(session)
+    faces = [np.full((112, 112, 3), v, dtype=np.uint8) for v in range(0, 250, 40)]
+
+    feats = engine.embed(faces)
+
+    assert len(session.runs) == 2
+    assert feats.shape == (len(faces), 512)
+    assert np.allclose(session.runs[1][3:], 0.0)
+    # Padding does not change the features of the faces in the chunk
+    expected = np.concatenate([engine.embed([face]) for face in faces])
+    assert np.allclose(feats, expected)
+
+
+def test_find_recognition_model_prefers_explicit_path(tmp_path, monkeypatch):
+    monkeypatch.delenv("ARCFACE_MODEL_PATH", raising=False)
+    monkeypatch.setenv("INSIGHTFACE_ROOT", str(tmp_path))
+    assert find_recognition_model() is None
+
+    pack_dir = tmp_path / "models" / "buffalo_l"
+    pack_dir.mkdir(parents=True)
+    (pack_dir / "det_10g.onnx").write_bytes(b"")
+    (pack_dir / "w600k_r50.onnx").write_bytes(b"")
+    assert find_recognition_model().endswith("w600k_r50.onnx")
+
+    explicit = tmp_path / "custom.onnx"
+    explicit.write_bytes(b"")
+    assert find_recognition_model(str(explicit)) == str(explicit)
+
+
+def test_embedder_uses_engine_without_detector():
+    embedder = InsightFaceEmbedder()
+    session = FakeSession()
+    embedder.engine = ArcFaceRecognitionEngine(session)
+    embedder.model = None
+
+    face = np.random.randint(0, 255, (150, 120, 3), dtype=np.uint8)
+    single = embedder.embed(face)
+    batch = embedder.embed_batch([face, face])
+
+    assert len(single) == 512
+    assert len(batch) == 2
+    assert np.allclose(batch[0], single, atol=1e-6)
+    assert len(session.runs) == 2
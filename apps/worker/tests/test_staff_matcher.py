@@ -0,0 +1,78 @@
+"""
+Tests for the vectorized staff matcher
+"""
+
+import numpy as np
+
+from apps.worker.app.staff_matcher import StaffMatcher
+
+
+def _unit(seed: int, dim: int = 512) -> np.ndarray:
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_load_builds_normalized_contiguous_matrix():
+    matcher = StaffMatcher()
+    matcher.load(
+        {
+            "alice": [(_unit(1) * 3).tolist(), (_unit(2) * 0.5).tolist()],
+            "bob": [_unit(3).tolist()],
+            "empty": [],
+        }
+    )
+
+    assert matcher.staff_ids == ["alice", "bob"]
+    assert matcher.matrix.shape == (3, 512)
+    assert matcher.matrix.dtype == np.float32
+    assert matcher.matrix.flags["C_CONTIGUOUS"]
+    assert np.allclose(np.linalg.norm(matcher.matrix, axis=1), 1.0)
+    assert matcher.owner.tolist() == [0, 0, 1]
+
+
+def test_match_uses_any_reference_vector():
+    matcher = StaffMatcher()
+    matcher.load({"alice": [_unit(1).tolist(), _unit(2).tolist()], "bob": [_unit(3).tolist()]})
+
+    is_staff, staff_id, similarity = matcher.match(_unit(2).tolist(), threshold=0.8)
+
+    assert is_staff
+    assert staff_id == "alice"
+    assert similarity > 0.99
+
+
+def test_match_batch_matches_per_face():
+    matcher = StaffMatcher()
+    matcher.load({"alice": [_unit(1).tolist()], "bob": [_unit(3).tolist()]})
+
+    results = matcher.match_batch(
+        [_unit(3).tolist(), _unit(99).tolist(), _unit(1).tolist()], threshold=0.8
+    )
+
+    assert [(r[0], r[1]) for r in results] == [
+        (True, "bob"),
+        (False, None),
+        (True, "alice"),
+    ]
+
+
+def test_dimension_mismatch_never_matches():
+    matcher = StaffMatcher()
+    matcher.load({"alice": [_unit(1).tolist(), _unit(2, dim=128).tolist()]})
+
+    assert matcher.matrix.shape == (1, 512)
+    assert matcher.match(_unit(1, dim=128).tolist(), threshold=0.5) == (
+        False,
+        None,
+        0.0,
+    )
+
+
+def test_empty_matcher():
+    matcher = StaffMatcher()
+    matcher.load({})
+
+    assert len(matcher) == 0
+    assert matcher.match_batch([_unit(1).tolist()], threshold=0.5) == [
+        (False, None, 0.0)
+    ]
@@ -0,0 +1,73 @@
+"""
+Tests for the worker's incremental staff embedding sync
+"""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from common.staff_vectors import encode_staff_vectors
+
+from apps.worker.app.main import FaceRecognitionWorker, WorkerConfig
+from apps.worker.app.staff_matcher import StaffMatcher
+
+
+def _unit(seed: int, dim: int = 512) -> list:
+    vec = np.random.default_rng(seed).standard_normal(dim)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def _response(status_code, content=b"", version=None):
+    headers = {"X-Staff-Version": version} if version else {}
+    return SimpleNamespace(status_code=status_code, content=content, headers=headers)
+
+
+def test_matcher_apply_delta_replaces_and_drops():
+    matcher = StaffMatcher()
+    matcher.load({"1": [_unit(1)], "2": [_unit(2)]})
+
+    matcher.apply_delta({"1": [_unit(11), _unit(12)], "3": [_unit(3)]}, ["1", "3"])
+
+    assert sorted(matcher.staff_ids) == ["1", "3"]
+    assert matcher.matrix.shape == (3, 512)
+    assert matcher.match(_unit(12), threshold=0.9)[1] == "1"
+    assert not matcher.match(_unit(1), threshold=0.9)[0]
+
+
+@pytest.mark.asyncio
+async def test_worker_applies_full_snapshot_then_delta():
+    config = WorkerConfig()
+    config.detector_type = "mock"
+    config.embedder_type = "mock"
+    worker = FaceRecognitionWorker(config)
+    worker.access_token = "test-token"
+    worker.token_expires_at = time.time() + 3600
+
+    full = encode_staff_vectors(
+        [1, 2], [(1, _unit(1)), (2, _unit(2))], dim=512, full=True
+    )
+    delta = encode_staff_vectors([1, 3], [(3, _unit(3))], dim=512)
+    worker.http_client = AsyncMock()
+    worker.http_client.get.side_effect = [
+        _response(200, full, "100-2-2"),
+        _response(200, delta, "200-3-3"),
+        _response(304),
+    ]
+
+    assert await worker._sync_staff_embeddings()
+    assert worker.staff_vector_version == "100-2-2"
+    assert worker._is_staff_match(_unit(2), threshold=0.9) == (True, "2")
+
+    assert await worker._sync_staff_embeddings()
+    assert worker.http_client.get.call_args.kwargs["params"]["since"] == "100-2-2"
+    assert worker.staff_vector_version == "200-3-3"
+    assert sorted(worker.staff_matcher.staff_ids) == ["1", "3"]
+    assert worker._is_staff_match(_unit(2), threshold=0.9) == (False, None)
+    assert worker._is_staff_match(_unit(3), threshold=0.9) == (True, "3")
+
+    # Unchanged feed: 304 keeps the current matrix and version
+    assert await worker._sync_staff_embeddings()
+    assert worker.staff_vector_version == "200-3-3"
+    assert len(worker.staff_matcher) == 2
@@ -0,0 +1,149 @@
+"""
+Tests for the face tracker (embed once per track)
+"""
+
+import numpy as np
+
+from apps.worker.app.tracker import FaceTracker, iou_matrix
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def _det(x, y, w=100, h=100, confidence=0.9):
+    return {"bbox": [x, y, w, h], "confidence": confidence}
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 10, 10], [50, 50, 10, 10]], dtype=np.float32)
+
+    iou = iou_matrix(a, b)
+
+    assert iou.shape == (1, 3)
+    assert np.isclose(iou[0, 0], 1.0)
+    assert np.isclose(iou[0, 1], 50 / 150)
+    assert iou[0, 2] == 0.0
+
+
+def test_stationary_face_embedded_once_per_track():
+    clock = FakeClock()
+    tracker = FaceTracker(reembed_interval=10.0, clock=clock)
+
+    embed_count = 0
+    track_ids = set()
+    for i in range(25):  # 5 seconds at 5 FPS
+        updates = tracker.update([_det(100 + i % 2, 100)])
+        assert len(updates) == 1
+        track_ids.add(updates[0].track.track_id)
+        if updates[0].needs_embedding:
+            embed_count += 1
+            tracker.mark_embedded(updates[0].track, [0.0] * 512)
+        clock.advance(0.2)
+
+    assert track_ids == {1}
+    assert embed_count == 1
+    assert updates[0].track.length == 25
+
+
+def test_reembed_after_interval():
+    clock = FakeClock()
+    tracker = FaceTracker(reembed_interval=2.0, clock=clock)
+
+    first = tracker.update([_det(100, 100)])[0]
+    assert first.reason == "birth"
+    tracker.mark_embedded(first.track, [0.0] * 512)
+
+    clock.advance(1.0)
+    assert not tracker.update([_det(100, 100)])[0].needs_embedding
+
+    clock.advance(1.5)
+    update = tracker.update([_det(100, 100)])[0]
+    assert update.needs_embedding
+    assert update.reason == "interval"
+
+
+def test_low_confidence_association_triggers_reembed():
+    clock = FakeClock()
+    tracker = FaceTracker(use_kalman=False, clock=clock)
+
+    first = tracker.update([_det(100, 100)])[0]
+    tracker.mark_embedded(first.track, [0.0] * 512)
+
+    # Large jump: little overlap, kept by the centroid fallback
+    clock.advance(0.2)
+    update = tracker.update([_det(140, 100)])[0]
+
+    assert update.track.track_id == first.track.track_id
+    assert update.needs_embedding
+    assert update.reason == "low_confidence"
+
+
+def test_two_faces_keep_separate_tracks_in_detection_order():
+    clock = FakeClock()
+    tracker = FaceTracker(clock=clock)
+
+    updates = tracker.update([_det(0, 0), _det(400, 0)])
+    left_id, right_id = (u.track.track_id for u in updates)
+    assert left_id != right_id
+
+    clock.advance(0.2)
+    updates = tracker.update([_det(402, 0), _det(2, 0)])
+    assert [u.track.track_id for u in updates] == [right_id, left_id]
+
+
+def test_tracks_expire_after_max_misses():
+    clock = FakeClock()
+    tracker = FaceTracker(max_misses=2, clock=clock)
+
+    first = tracker.update([_det(100, 100)])[0]
+    for _ in range(3):
+        clock.advance(0.2)
+        tracker.update([])
+
+    assert not tracker.tracks
+    assert tracker.get_stats()["tracks_expired"] == 1
+
+    # The same position now starts a new track that needs an embedding
+    update = tracker.update([_det(100, 100)])[0]
+    assert update.track.track_id != first.track.track_id
+    assert update.reason == "birth"
+
+
+def test_min_track_length_delays_first_embedding():
+    clock = FakeClock()
+    tracker = FaceTracker(min_track_length=3, clock=clock)
+
+    reasons = []
+    for _ in range(4):
+        update = tracker.update([_det(100, 100)])[0]
+        reasons.append(update.reason)
+        if update.needs_embedding:
+            tracker.mark_embedded(update.track, [0.0] * 512)
+        clock.advance(0.2)
+
+    assert reasons == [None, None, "birth", None]
+
+
+def test_track_reported_again_once_confirmed():
+    clock = FakeClock()
+    tracker = FaceTracker(confirm_length=3, clock=clock)
+
+    reasons = []
+    for _ in range(6):
+        update = tracker.update([_det(100, 100)])[0]
+        reasons.append(update.reason)
+        if update.needs_embedding:
+            tracker.mark_embedded(update.track, [0.0] * 512)
+        clock.advance(0.2)
+
+    assert reasons == ["birth", None, "confirmed", None, None, None]
+    assert update.track.confirmed
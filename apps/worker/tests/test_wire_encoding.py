@@ -0,0 +1,50 @@
+"""
+Tests for the negotiated embedding encoding on worker face events
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from common.models import FaceDetectedEvent
+
+from apps.worker.app.main import FaceRecognitionWorker, WorkerConfig
+
+
+@pytest.mark.parametrize("encoding", [None, "f16"])
+@pytest.mark.asyncio
+async def test_face_event_uses_negotiated_encoding(tmp_path, encoding):
+    config = WorkerConfig()
+    config.detector_type = "mock"
+    config.embedder_type = "mock"
+    config.event_spool_dir = str(tmp_path)
+    worker = FaceRecognitionWorker(config)
+    worker.access_token = "test-token"
+    worker.token_expires_at = time.time() + 3600
+    worker.worker_client.embedding_encoding = encoding
+
+    response = MagicMock()
+    response.json.return_value = {"match": "new", "person_id": 1}
+    worker.http_client = SimpleNamespace(post=AsyncMock(return_value=response))
+
+    event = FaceDetectedEvent(
+        tenant_id="t1",
+        site_id=1,
+        camera_id=1,
+        timestamp=datetime.now(timezone.utc),
+        embedding=[0.25] * 512,
+        bbox=[0, 0, 100, 100],
+        confidence=0.9,
+    )
+    await worker._send_face_event(event, b"jpeg")
+
+    sent = json.loads(worker.http_client.post.call_args.kwargs["data"]["event_data"])
+    if encoding:
+        assert sent["embedding_encoding"] == "f16"
+        assert isinstance(sent["embedding"], str)
+    else:
+        assert sent["embedding"] == [0.25] * 512
+    assert FaceDetectedEvent(**sent).embedding == [0.25] * 512
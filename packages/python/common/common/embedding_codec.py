@@ -0,0 +1,60 @@
+"""
+Compact wire encoding for face embeddings
+
+An embedding can travel as a base64 string of little-endian floats instead of
+a JSON list of ~10 KB of decimal text:
+
+    f32  float32, lossless for worker embeddings (2 KB raw for 512 dims)
+    f16  float16, half the size again; relative error below 1e-3
+
+Workers ask for an encoding when registering and the API answers with the
+one it accepts; JSON lists stay valid everywhere.
+"""
+
+import base64
+import binascii
+import struct
+import sys
+from array import array
+from typing import List, Optional, Sequence
+
+EMBEDDING_ENCODINGS = ("f32", "f16")
+
+
+def negotiate_embedding_encoding(requested: Optional[str]) -> Optional[str]:
+    """Encoding to use for a worker that asked for ``requested`` (None = JSON)"""
+    return requested if requested in EMBEDDING_ENCODINGS else None
+
+
+def encode_embedding(values: Sequence[float], encoding: str = "f32") -> str:
+    if encoding == "f32":
+        data = array("f", values)
+        if sys.byteorder != "little":
+            data.byteswap()
+        raw = data.tobytes()
+    elif encoding == "f16":
+        raw = struct.pack(f"<{len(values)}e", *values)
+    else:
+        raise ValueError(f"Unsupported embedding encoding {encoding!r}")
+    return base64.b64encode(raw).decode("ascii")
+
+
+def decode_embedding(data: str, encoding: str = "f32") -> List[float]:
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 embedding: {e}") from e
+
+    if encoding == "f32":
+        if len(raw) % 4:
+            raise ValueError("float32 embedding length is not a multiple of 4")
+        values = array("f")
+        values.frombytes(raw)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values.tolist()
+    if encoding == "f16":
+        if len(raw) % 2:
+            raise ValueError("float16 embedding length is not a multiple of 2")
+        return list(struct.unpack(f"<{len(raw) // 2}e", raw))
+    raise ValueError(f"Unsupported embedding encoding {encoding!r}")
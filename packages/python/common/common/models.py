@@ -1,9 +1,26 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Annotated, Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidatorFunctionWrapHandler, WrapValidator, model_validator
+
+from .embedding_codec import decode_embedding, encode_embedding
+
+EMBEDDING_DIM = 512
+
+
+class _DecodedEmbedding(list):
+    """Floats decoded from the compact wire encoding, valid by construction"""
+
+
+def _validate_embedding(value: Any, handler: ValidatorFunctionWrapHandler) -> List[float]:
+    # A decoded embedding skips per-element validation; only its size is checked
+    if isinstance(value, _DecodedEmbedding):
+        if len(value) != EMBEDDING_DIM:
+            raise ValueError(f"embedding must have {EMBEDDING_DIM} values, got {len(value)}")
+        return value
+    return handler(value)
 
 
 class FaceDetectedEvent(BaseModel):
@@ -11,7 +28,11 @@ class FaceDetectedEvent(BaseModel):
     site_id: int
     camera_id: int
     timestamp: datetime
-    embedding: List[float] = Field(min_length=512, max_length=512)
+    embedding: Annotated[
+        List[float],
+        Field(min_length=EMBEDDING_DIM, max_length=EMBEDDING_DIM),
+        WrapValidator(_validate_embedding),
+    ]
     bbox: List[float] = Field(min_length=4, max_length=4)
     confidence: float = Field(
         ge=0.0, le=1.0, description="Face detection confidence score"
@@ -19,6 +40,35 @@ class FaceDetectedEvent(BaseModel):
     snapshot_url: Optional[str] = None
     is_staff_local: bool = False
     staff_id: Optional[str] = None
+    track_id: Optional[int] = None
+    track_length: Optional[int] = Field(
+        default=None, ge=1, description="Frames the worker has tracked this face"
+    )
+    idempotency_key: Optional[str] = Field(
+        default=None,
+        max_length=64,
+        description="Unique per event; lets the API drop replays of a delivered event",
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def _decode_compact_embedding(cls, data: Any) -> Any:
+        # {"embedding": "<base64>", "embedding_encoding": "f32" | "f16"}
+        if isinstance(data, dict) and isinstance(data.get("embedding"), str):
+            data = dict(data)
+            data["embedding"] = _DecodedEmbedding(
+                decode_embedding(data["embedding"], data.pop("embedding_encoding", None) or "f32")
+            )
+        return data
+
+    def to_wire(self, embedding_encoding: Optional[str] = None) -> Dict[str, Any]:
+        """JSON-ready dict, with the embedding base64-encoded if requested"""
+        if not embedding_encoding:
+            return self.model_dump(mode="json")
+        data = self.model_dump(mode="json", exclude={"embedding"})
+        data["embedding"] = encode_embedding(self.embedding, embedding_encoding)
+        data["embedding_encoding"] = embedding_encoding
+        return data
 
 
 class VisitRecord(BaseModel):
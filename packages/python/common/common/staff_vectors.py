@@ -0,0 +1,117 @@
+"""
+Compact binary encoding for staff embedding sync
+
+Layout (little-endian):
+    header   magic "SVEC", u16 format, u16 flags, u32 dim, u32 n_active, u32 n_rows
+    int64    active staff ids      [n_active]
+    int64    row owner staff ids   [n_rows]
+    float32  embeddings            [n_rows * dim]
+
+``active`` lists every staff member that currently has vectors; a receiver
+drops any staff member not in it. Rows replace the full vector set of each
+staff member that owns at least one row. A full snapshot sets FLAG_FULL and
+carries rows for every active staff member.
+"""
+
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence
+
+MAGIC = b"SVEC"
+FORMAT_VERSION = 1
+FLAG_FULL = 0x1
+MEDIA_TYPE = "application/x-staff-vectors"
+
+_HEADER = struct.Struct("<4sHHIII")
+
+
+@dataclass
+class StaffVectorPayload:
+    full: bool
+    dim: int
+    active_ids: List[int]
+    row_owners: List[int]
+    vectors: array  # flat float32, len(row_owners) * dim
+
+    def vectors_by_staff(self) -> Dict[int, List[List[float]]]:
+        grouped: Dict[int, List[List[float]]] = {}
+        for i, staff_id in enumerate(self.row_owners):
+            row = self.vectors[i * self.dim : (i + 1) * self.dim]
+            grouped.setdefault(staff_id, []).append(list(row))
+        return grouped
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def encode_staff_vectors(
+    active_ids: Iterable[int],
+    rows: Sequence[tuple],
+    dim: int,
+    full: bool = False,
+) -> bytes:
+    """Encode ``rows`` of ``(staff_id, embedding)`` plus the active staff set"""
+    active = array("q", active_ids)
+    owners = array("q", (staff_id for staff_id, _ in rows))
+    vectors = array("f")
+    for staff_id, embedding in rows:
+        if len(embedding) != dim:
+            raise ValueError(
+                f"Staff {staff_id} embedding has dim {len(embedding)}, expected {dim}"
+            )
+        vectors.extend(embedding)
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        FLAG_FULL if full else 0,
+        dim,
+        len(active),
+        len(owners),
+    )
+    return header + _little_endian(active) + _little_endian(owners) + _little_endian(vectors)
+
+
+def decode_staff_vectors(data: bytes) -> StaffVectorPayload:
+    """Decode a payload produced by :func:`encode_staff_vectors`"""
+    if len(data) < _HEADER.size:
+        raise ValueError("Staff vector payload too short")
+
+    magic, fmt, flags, dim, n_active, n_rows = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a staff vector payload")
+    if fmt != FORMAT_VERSION:
+        raise ValueError(f"Unsupported staff vector format {fmt}")
+
+    offset = _HEADER.size
+    sizes = (8 * n_active, 8 * n_rows, 4 * n_rows * dim)
+    if len(data) != offset + sum(sizes):
+        raise ValueError("Staff vector payload size mismatch")
+
+    active = _from_little_endian("q", data[offset : offset + sizes[0]])
+    offset += sizes[0]
+    owners = _from_little_endian("q", data[offset : offset + sizes[1]])
+    offset += sizes[1]
+    vectors = _from_little_endian("f", data[offset:])
+
+    return StaffVectorPayload(
+        full=bool(flags & FLAG_FULL),
+        dim=dim,
+        active_ids=list(active),
+        row_owners=list(owners),
+        vectors=vectors,
+    )
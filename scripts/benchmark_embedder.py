@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark face embedding paths on aligned 112x112 crops
+
+Compares:
+- legacy:  FaceAnalysis.get() on the aligned crop (re-runs the 640x640 detector)
+- get_feat: FaceAnalysis recognition model, one crop at a time
+- engine:  ArcFaceRecognitionEngine, one crop at a time
+- batch:   ArcFaceRecognitionEngine, all crops in one forward pass
+
+Usage:
+    python scripts/benchmark_embedder.py [--faces 10] [--iterations 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apps.worker.app.recognition_engine import ArcFaceRecognitionEngine  # noqa: E402
+
+
+def _time_per_face(fn, faces, iterations):
+    fn(faces)  # warmup
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(faces)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000.0 / (iterations * len(faces))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--faces", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--model-path", default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    faces = [
+        rng.integers(0, 255, (112, 112, 3), dtype=np.uint8) for _ in range(args.faces)
+    ]
+    results = {}
+
+    try:
+        import insightface
+
+        app = insightface.app.FaceAnalysis(providers=["CPUExecutionProvider"])
+        app.prepare(ctx_id=-1, det_size=(640, 640))
+        rec_model = app.models.get("recognition")
+
+        results["legacy (FaceAnalysis.get)"] = _time_per_face(
+            lambda fs: [app.get(f) for f in fs], faces, args.iterations
+        )
+        if rec_model is not None:
+            results["get_feat (per face)"] = _time_per_face(
+                lambda fs: [rec_model.get_feat(f) for f in fs], faces, args.iterations
+            )
+    except ImportError:
+        print("insightface not installed - skipping legacy paths")
+
+    engine = ArcFaceRecognitionEngine.load(args.model_path)
+    if engine is None:
+        print("Recognition model not found - set ARCFACE_MODEL_PATH")
+    else:
+        results["engine (per face)"] = _time_per_face(
+            lambda fs: [engine.embed([f]) for f in fs], faces, args.iterations
+        )
+        results["engine (batched)"] = _time_per_face(
+            engine.embed, faces, args.iterations
+        )
+
+    if not results:
+        return 1
+
+    baseline = next(iter(results.values()))
+    print(f"\n{args.faces} faces x {args.iterations} iterations")
+    print(f"{'path':32s} {'ms/face':>10s} {'speedup':>10s}")
+    for name, ms in results.items():
+        print(f"{name:32s} {ms:10.2f} {baseline / ms:9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())